@@ -104,6 +104,10 @@ class Task(object):
         self.exception = response_body.get('exception')
         self.traceback = response_body.get('traceback')
         self.error = response_body.get('error')
+
+        # Changes whenever the status changes; None if the server doesn't
+        # support waiting for a change
+        self.hash = response_body.get('_hash')
         self.spawned_tasks = []
         spawned_tasks = response_body.get('spawned_tasks')
         if spawned_tasks:
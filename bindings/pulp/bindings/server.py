@@ -12,9 +12,14 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 import base64
+import httplib
 import locale
 import logging
+import os
+import socket
+import threading
 import urllib
+import zlib
 import oauth2 as oauth
 
 from types import NoneType
@@ -26,6 +31,10 @@ from pulp.common.compat import json
 from pulp.common.util import ensure_utf_8, encode_unicode
 
 
+# Maximum number of idle connections to the server kept open by each PulpConnection
+MAX_IDLE_CONNECTIONS = 8
+
+
 # -- server connection --------------------------------------------------------
 
 class PulpConnection(object):
@@ -236,36 +245,54 @@ class PulpConnection(object):
 
 # -- wrapper classes ----------------------------------------------------------
 
+class _StaleConnection(Exception):
+    """
+    Raised when a reused connection turns out to have been closed by the server
+    before the request reached it, so the request can safely be sent again.
+    """
+    pass
+
+
 class HTTPSServerWrapper(object):
     """
     Used by the PulpConnection class to make an invocation against the server.
     This abstraction is used to simplify mocking. In this implementation, the
     intricacies (read: ugliness) of invoking and getting the response from
     the HTTPConnection class are hidden in favor of a simpler API to mock.
+
+    Connections are kept open once a response has been read and reused for
+    later requests, so a series of calls pays for the TCP and SSL setup once.
+    The SSL context, and the SSL session of the last connection made, are
+    shared by every connection. A reused connection the server has since
+    closed is replaced transparently. Instances may be used by several
+    threads at once; each request uses a connection of its own.
     """
 
-    def __init__(self, pulp_connection):
+    def __init__(self, pulp_connection, max_idle=MAX_IDLE_CONNECTIONS):
         """
         :param pulp_connection: A pulp connection object.
         :type pulp_connection: PulpConnection
+        :param max_idle: maximum number of idle connections kept open; 0 closes
+                         every connection after its request
+        :type max_idle: int
         """
         self.pulp_connection = pulp_connection
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._idle = []
+        self._ssl_context = None
+        self._ssl_context_key = None
+        self._ssl_session = None
 
     def request(self, method, url, body):
 
         headers = dict(self.pulp_connection.headers)  # copy so we don't affect the calling method
+        headers['Accept-Encoding'] = 'gzip'
 
-        # Create a new connection each time since HTTPSConnection has problems
-        # reusing a connection for multiple calls (lame).
-        ssl_context = None
         if self.pulp_connection.username and self.pulp_connection.password:
             raw = ':'.join((self.pulp_connection.username, self.pulp_connection.password))
             encoded = base64.encodestring(raw)[:-1]
             headers['Authorization'] = 'Basic ' + encoded
-        elif self.pulp_connection.cert_filename:
-            ssl_context = SSL.Context('sslv3')
-            ssl_context.set_session_timeout(self.pulp_connection.timeout)
-            ssl_context.load_cert(self.pulp_connection.cert_filename)
 
         # oauth configuration
         if self.pulp_connection.oauth_key and self.pulp_connection.oauth_secret:
@@ -284,30 +311,150 @@ class HTTPSServerWrapper(object):
             headers.update(oauth_header)
             headers['pulp-user'] = self.pulp_connection.oauth_user
 
-        # Can't pass in None, so need to decide between two signatures (also lame)
-        if ssl_context is not None:
-            connection = httpslib.HTTPSConnection(
-                self.pulp_connection.host, self.pulp_connection.port, ssl_context=ssl_context)
-        else:
-            connection = httpslib.HTTPSConnection(self.pulp_connection.host, self.pulp_connection.port)
+        ssl_context = self._get_ssl_context()
 
         # Request against the server
-        connection.request(method, url, body=body, headers=headers)
-
+        connection, idle = self._get_connection(ssl_context)
         try:
-            response = connection.getresponse()
-        except SSL.SSLError, err:
-            # Translate stale login certificate to an auth exception
-            if 'sslv3 alert certificate expired' == str(err):
-                raise exceptions.ClientSSLException(self.pulp_connection.cert_filename)
-            else:
-                raise exceptions.ConnectionException(None, str(err), None)
+            response, response_body = self._send(connection, method, url, body, headers, idle)
+        except _StaleConnection:
+            # The server has closed the idle connections; try a new one.
+            self.close()
+            connection = self._create_connection(ssl_context)
+            response, response_body = self._send(connection, method, url, body, headers, False)
 
-        # Attempt to deserialize the body (should pass unless the server is busted)
-        response_body = response.read()
+        self._release(connection, response)
+
+        if response.getheader('content-encoding') == 'gzip':
+            response_body = zlib.decompress(response_body, 16 + zlib.MAX_WBITS)
 
+        # Attempt to deserialize the body (should pass unless the server is busted)
         try:
             response_body = json.loads(response_body)
         except:
             pass
         return response.status, response_body
+
+    def close(self):
+        """
+        Close the idle connections.
+        """
+        self._lock.acquire()
+        try:
+            idle, self._idle = self._idle, []
+        finally:
+            self._lock.release()
+        for connection in idle:
+            connection.close()
+
+    def _get_ssl_context(self):
+        """
+        :return: the SSL context shared by the connections; it is loaded again
+                 if the certificate file has changed since it was last loaded
+        :rtype:  M2Crypto.SSL.Context
+        """
+        cert_filename = None
+        if not (self.pulp_connection.username and self.pulp_connection.password):
+            cert_filename = self.pulp_connection.cert_filename
+
+        key = None
+        if cert_filename:
+            key = (cert_filename, os.path.getmtime(cert_filename))
+
+        self._lock.acquire()
+        try:
+            if self._ssl_context is None or key != self._ssl_context_key:
+                if cert_filename:
+                    ssl_context = SSL.Context('sslv3')
+                    ssl_context.set_session_timeout(self.pulp_connection.timeout)
+                    ssl_context.load_cert(cert_filename)
+                else:
+                    ssl_context = SSL.Context()
+                self._ssl_context = ssl_context
+                self._ssl_context_key = key
+                self._ssl_session = None
+                idle, self._idle = self._idle, []
+            else:
+                idle = []
+            ssl_context = self._ssl_context
+        finally:
+            self._lock.release()
+        # connections made with an earlier context can't be reused
+        for connection in idle:
+            connection.close()
+        return ssl_context
+
+    def _get_connection(self, ssl_context):
+        """
+        :return: an idle connection, if there is one, and whether it was idle;
+                 otherwise a new connection and False
+        :rtype:  tuple
+        """
+        self._lock.acquire()
+        try:
+            if self._idle:
+                return self._idle.pop(), True
+        finally:
+            self._lock.release()
+        return self._create_connection(ssl_context), False
+
+    def _create_connection(self, ssl_context):
+        connection = httpslib.HTTPSConnection(
+            self.pulp_connection.host, self.pulp_connection.port, ssl_context=ssl_context)
+        session = self._ssl_session
+        if session is not None:
+            connection.set_session(session)
+        return connection
+
+    def _release(self, connection, response):
+        """
+        Keep a connection whose response has been read to be used for another
+        request, unless the server is closing it or enough are already kept.
+        """
+        if self._ssl_session is None:
+            try:
+                self._ssl_session = connection.get_session()
+            except AttributeError:
+                # the connection was not made, as with a mocked connection
+                pass
+        self._lock.acquire()
+        try:
+            if not response.will_close and len(self._idle) < self.max_idle:
+                self._idle.append(connection)
+                return
+        finally:
+            self._lock.release()
+        connection.close()
+
+    def _send(self, connection, method, url, body, headers, idle):
+        """
+        Send a request and read its response, closing the connection if either
+        fails. A failure on a reused idle connection raises _StaleConnection
+        only when the server cannot have acted on the request: it could not be
+        sent, or the connection was closed without a status line being read.
+        Anything else is raised, so a request is never sent twice.
+        """
+        sent = False
+        try:
+            connection.request(method, url, body=body, headers=headers)
+            sent = True
+            response = connection.getresponse()
+            # the response must be read before the connection can be used again
+            return response, response.read()
+        except (httplib.HTTPException, socket.error, SSL.SSLError), err:
+            connection.close()
+            if idle and (not sent or isinstance(err, httplib.BadStatusLine)):
+                raise _StaleConnection()
+            self._raise(err)
+
+    def _raise(self, err):
+        """
+        Raise the exception from a failed request, translating SSL errors.
+        """
+        if isinstance(err, SSL.SSLError):
+            # Translate stale login certificate to an auth exception
+            if 'sslv3 alert certificate expired' == str(err):
+                raise exceptions.ClientSSLException(self.pulp_connection.cert_filename)
+            else:
+                raise exceptions.ConnectionException(None, str(err), None)
+        raise
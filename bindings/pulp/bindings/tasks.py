@@ -37,9 +37,16 @@ class TasksAPI(PulpAPI):
         response = self.server.DELETE(path)
         return response
 
-    def get_task(self, task_id):
+    def get_task(self, task_id, wait=None, since=None):
         """
-        Retrieves the status of the given task if it exists.
+        Retrieves the status of the given task if it exists. If wait is given,
+        the server holds the request for up to that many seconds until the
+        status changes from the one whose hash is given as since.
+
+        @param wait: maximum number of seconds to wait for the status to change
+        @type  wait: float
+        @param since: the hash attribute of the Task last retrieved
+        @type  since: str
 
         @return: response with a Task object in the response_body
         @rtype:  Response
@@ -47,14 +54,19 @@ class TasksAPI(PulpAPI):
         @raise NotFoundException: if there is no task with the given ID
         """
         path = '/v2/tasks/%s/' % task_id
-        response = self.server.GET(path)
+        queries = []
+        if wait is not None:
+            queries.append(('wait', wait))
+            if since is not None:
+                queries.append(('since', since))
+        response = self.server.GET(path, queries=queries)
 
         # Since it was a 200, the connection parsed the response body into a
         # Document. We know this will be task data, so convert the object here.
         response.response_body = Task(response.response_body)
         return response
 
-    def get_all_tasks(self, tags=()):
+    def get_all_tasks(self, tags=(), states=()):
         """
         Retrieves all tasks in the system. If tags are specified, only tasks
         that contain all of the given tags are returned. All tasks will be
@@ -65,13 +77,15 @@ class TasksAPI(PulpAPI):
         :param tags:              if specified, only tasks that contain all tags in the given
                                   list are returned; None to return all tasks
         :type  tags:              list
+        :param states:            if specified, only tasks in one of the given states are returned
+        :type  states:            list
         :return:                  response with a list of Task objects; empty list for no matching tasks
         :rtype:                   Response
         """
         path = '/v2/tasks/'
-        tags = [('tag', t) for t in tags]
+        queries = [('tag', t) for t in tags] + [('state', s) for s in states]
 
-        response = self.server.GET(path, queries=tags)
+        response = self.server.GET(path, queries=queries)
 
         tasks = []
         for doc in response.response_body:
@@ -37,7 +37,8 @@ class UploadAPI(PulpAPI):
         url = '/v2/content/uploads/%s/' % upload_id
         return self.server.DELETE(url)
 
-    def import_upload(self, upload_id, repo_id, unit_type_id, unit_key, unit_metadata):
+    def import_upload(self, upload_id, repo_id, unit_type_id, unit_key, unit_metadata,
+                      checksum=None):
         url = '/v2/repositories/%s/actions/import_upload/' % repo_id
         body = {
             'upload_id' : upload_id,
@@ -45,4 +46,6 @@ class UploadAPI(PulpAPI):
             'unit_key' : unit_key,
             'unit_metadata' : unit_metadata,
         }
+        if checksum is not None:
+            body['checksum'] = checksum
         return self.server.POST(url, body)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2014 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import errno
+import httplib
+import socket
+import unittest
+import zlib
+
+import mock
+
+from pulp.bindings import exceptions
+from pulp.bindings.server import PulpConnection, HTTPSServerWrapper
+from pulp.common.compat import json
+
+
+def response(body, status=200, will_close=False, encoding=None):
+    r = mock.Mock()
+    r.status = status
+    r.will_close = will_close
+    r.read.return_value = body
+    r.getheader.side_effect = lambda name: name == 'content-encoding' and encoding or None
+    return r
+
+
+@mock.patch('M2Crypto.SSL.Context')
+@mock.patch('M2Crypto.httpslib.HTTPSConnection')
+class HTTPSServerWrapperTests(unittest.TestCase):
+
+    def setUp(self):
+        self.pulp_connection = PulpConnection('localhost', username='admin', password='admin')
+        self.wrapper = self.pulp_connection.server_wrapper
+
+    def test_connection_reused(self, mock_connection_class, mock_context_class):
+        connection = mock_connection_class.return_value
+        connection.getresponse.side_effect = [response('{"a": 1}'), response('{"b": 2}')]
+
+        self.assertEqual(self.wrapper.request('GET', '/a/', None), (200, {'a': 1}))
+        self.assertEqual(self.wrapper.request('GET', '/b/', None), (200, {'b': 2}))
+
+        self.assertEqual(mock_connection_class.call_count, 1)
+        self.assertEqual(mock_context_class.call_count, 1)
+        self.assertEqual(connection.request.call_count, 2)
+        headers = connection.request.call_args[1]['headers']
+        self.assertEqual(headers['Accept-Encoding'], 'gzip')
+
+    def test_connection_closed_by_server(self, mock_connection_class, mock_context_class):
+        connection = mock_connection_class.return_value
+        connection.getresponse.side_effect = [response('{}', will_close=True), response('{}')]
+
+        self.wrapper.request('GET', '/a/', None)
+        self.wrapper.request('GET', '/b/', None)
+
+        self.assertEqual(mock_connection_class.call_count, 2)
+        self.assertEqual(connection.close.call_count, 1)
+
+    def test_no_idle_connections(self, mock_connection_class, mock_context_class):
+        wrapper = HTTPSServerWrapper(self.pulp_connection, max_idle=0)
+        mock_connection_class.return_value.getresponse.return_value = response('{}')
+
+        wrapper.request('GET', '/a/', None)
+        wrapper.request('GET', '/b/', None)
+
+        self.assertEqual(mock_connection_class.call_count, 2)
+
+    def test_stale_connection_replaced(self, mock_connection_class, mock_context_class):
+        stale = mock.Mock()
+        stale.getresponse.side_effect = [response('{}'), httplib.BadStatusLine('')]
+        fresh = mock.Mock()
+        fresh.getresponse.return_value = response('{"ok": true}')
+        mock_connection_class.side_effect = [stale, fresh]
+
+        self.wrapper.request('GET', '/a/', None)
+        self.assertEqual(self.wrapper.request('POST', '/b/', '{}'), (200, {'ok': True}))
+
+        self.assertEqual(stale.close.call_count, 1)
+        fresh.request.assert_called_once_with('POST', '/b/', body='{}', headers=mock.ANY)
+
+    def test_stale_connection_send_failure_replaced(self, mock_connection_class, mock_context_class):
+        stale = mock.Mock()
+        stale.getresponse.return_value = response('{}')
+        stale.request.side_effect = [None, socket.error(errno.EPIPE, 'Broken pipe')]
+        fresh = mock.Mock()
+        fresh.getresponse.return_value = response('{"ok": true}')
+        mock_connection_class.side_effect = [stale, fresh]
+
+        self.wrapper.request('GET', '/a/', None)
+        self.assertEqual(self.wrapper.request('POST', '/b/', '{}'), (200, {'ok': True}))
+
+        self.assertEqual(stale.close.call_count, 1)
+        fresh.request.assert_called_once_with('POST', '/b/', body='{}', headers=mock.ANY)
+
+    def test_stale_connection_sent_request_not_retried(self, mock_connection_class, mock_context_class):
+        connection = mock_connection_class.return_value
+        connection.getresponse.side_effect = [response('{}'), socket.error(errno.ECONNRESET, 'reset')]
+
+        self.wrapper.request('GET', '/a/', None)
+        self.assertRaises(socket.error, self.wrapper.request, 'POST', '/b/', '{}')
+
+        # the server may have received the request, so it is not sent again
+        self.assertEqual(mock_connection_class.call_count, 1)
+        self.assertEqual(connection.request.call_count, 2)
+
+    def test_new_connection_failure_not_retried(self, mock_connection_class, mock_context_class):
+        connection = mock_connection_class.return_value
+        connection.getresponse.side_effect = httplib.BadStatusLine('')
+
+        self.assertRaises(httplib.BadStatusLine, self.wrapper.request, 'GET', '/a/', None)
+
+        self.assertEqual(mock_connection_class.call_count, 1)
+
+    def test_ssl_error(self, mock_connection_class, mock_context_class):
+        from M2Crypto import SSL
+        connection = mock_connection_class.return_value
+        connection.getresponse.side_effect = SSL.SSLError('sslv3 alert certificate expired')
+
+        self.assertRaises(exceptions.ClientSSLException, self.wrapper.request, 'GET', '/a/', None)
+
+    def test_gzip(self, mock_connection_class, mock_context_class):
+        body = json.dumps([{'id': i} for i in range(100)])
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        compressed = compressor.compress(body) + compressor.flush()
+        connection = mock_connection_class.return_value
+        connection.getresponse.return_value = response(compressed, encoding='gzip')
+
+        status, response_body = self.wrapper.request('GET', '/a/', None)
+
+        self.assertEqual(response_body, json.loads(body))
+
+    @mock.patch('os.path.getmtime')
+    def test_cert_loaded_once(self, mock_getmtime, mock_connection_class, mock_context_class):
+        pulp_connection = PulpConnection('localhost', cert_filename='/tmp/cert.pem')
+        wrapper = pulp_connection.server_wrapper
+        mock_getmtime.return_value = 1
+        mock_connection_class.return_value.getresponse.return_value = response('{}')
+
+        wrapper.request('GET', '/a/', None)
+        wrapper.request('GET', '/b/', None)
+        self.assertEqual(mock_context_class.return_value.load_cert.call_count, 1)
+
+        # a new certificate is loaded and the connections using the old one closed
+        mock_getmtime.return_value = 2
+        wrapper.request('GET', '/c/', None)
+        self.assertEqual(mock_context_class.return_value.load_cert.call_count, 2)
+        self.assertEqual(mock_connection_class.call_count, 2)
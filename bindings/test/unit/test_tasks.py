@@ -61,3 +61,36 @@ class TaskSearchAPITests(unittest.TestCase):
         self.assertEqual(task.tags, response_body[0]['tags'])
         self.assertEqual(task.start_time, response_body[0]['start_time'])
         self.assertEqual(task.state, response_body[0]['state'])
+
+
+class TasksAPITests(unittest.TestCase):
+    """
+    Tests for the TasksAPI class.
+    """
+    def test_get_all_tasks(self):
+        """
+        Make sure the tags and states are passed as query parameters.
+        """
+        connection = mock.MagicMock()
+        connection.GET.return_value = responses.Response(200, [{u'task_id': u'some_task'}])
+
+        response = tasks.TasksAPI(connection).get_all_tasks(tags=['a'], states=['running',
+                                                                                 'waiting'])
+
+        connection.GET.assert_called_once_with(
+            '/v2/tasks/', queries=[('tag', 'a'), ('state', 'running'), ('state', 'waiting')])
+        self.assertEqual(response.response_body[0].task_id, u'some_task')
+
+    def test_get_task_wait(self):
+        """
+        Make sure wait and since are passed as query parameters, and the hash is read.
+        """
+        connection = mock.MagicMock()
+        connection.GET.return_value = responses.Response(
+            200, {u'task_id': u'some_task', u'_hash': u'new_hash'})
+
+        response = tasks.TasksAPI(connection).get_task('some_task', wait=5, since='old_hash')
+
+        connection.GET.assert_called_once_with(
+            '/v2/tasks/some_task/', queries=[('wait', 5), ('since', 'old_hash')])
+        self.assertEqual(response.response_body.hash, u'new_hash')
@@ -33,6 +33,10 @@ RESULT_ABORTED = 'aborted'
 # Returned from the poll command if the user elects to not poll the task
 RESULT_BACKGROUND = 'background'
 
+# Maximum number of seconds the server is asked to hold a request for a task
+# until its status changes; kept short so the spinners keep moving
+LONG_POLL_WAIT = 5
+
 DESC_BACKGROUND = _('if specified, the client process will end immediately (the task will '
                     'continue to run on the server)')
 FLAG_BACKGROUND = PulpCliFlag('--bg', DESC_BACKGROUND)
@@ -222,9 +226,13 @@ class PollingCommand(PulpCliCommand):
                     first_run = False
                 self.progress(task, running_spinner)
 
-            time.sleep(self.poll_frequency_in_seconds)
+            # Servers that support waiting for a change return a hash of the task, and hold
+            # the request until the task no longer matches it, so there is no need to sleep.
+            if task.hash is None:
+                time.sleep(self.poll_frequency_in_seconds)
 
-            response = self.context.server.tasks.get_task(task.task_id)
+            response = self.context.server.tasks.get_task(
+                task.task_id, wait=LONG_POLL_WAIT, since=task.hash)
             task = response.response_body
 
         # One final call to update the progress with the end state. It's possible the run state
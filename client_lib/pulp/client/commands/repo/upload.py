@@ -19,6 +19,8 @@ from okaara.prompt import COLOR_GREEN, COLOR_YELLOW
 from pulp.bindings.exceptions import ConflictException
 from pulp.client.commands import options
 from pulp.client.extensions.extensions import PulpCliCommand, PulpCliFlag, PulpCliOption
+from pulp.client.parsers import parse_positive_int
+from pulp.client.upload.manager import DEFAULT_PARALLEL
 
 # -- constants ----------------------------------------------------------------
 
@@ -49,6 +51,11 @@ OPTION_DIR = PulpCliOption('--dir', DESC_DIR, aliases=['-d'], allow_multiple=Tru
 DESC_VERBOSE = _('display extra information about the upload process')
 FLAG_VERBOSE = PulpCliFlag('-v', DESC_VERBOSE)
 
+DESC_PARALLEL = _('number of segments of each file to upload at once; defaults to %(d)s')
+DESC_PARALLEL = DESC_PARALLEL % {'d' : DEFAULT_PARALLEL}
+OPTION_PARALLEL = PulpCliOption('--parallel', DESC_PARALLEL, required=False,
+                                parse_func=parse_positive_int)
+
 # -- exceptions ---------------------------------------------------------------
 
 class MetadataException(Exception):
@@ -104,6 +111,7 @@ class UploadCommand(PulpCliCommand):
         if upload_files:
             self.add_option(OPTION_FILE)
             self.add_option(OPTION_DIR)
+            self.add_option(OPTION_PARALLEL)
 
         self.add_flag(FLAG_VERBOSE)
 
@@ -114,6 +122,7 @@ class UploadCommand(PulpCliCommand):
         specified_files = kwargs.get(OPTION_FILE.keyword) or []
         specified_dirs = kwargs.get(OPTION_DIR.keyword) or []
         verbose = kwargs.get(FLAG_VERBOSE.keyword) or False
+        parallel = kwargs.get(OPTION_PARALLEL.keyword) or DEFAULT_PARALLEL
 
         self._verify_repo_exists(repo_id)
 
@@ -237,7 +246,7 @@ class UploadCommand(PulpCliCommand):
         self.prompt.render_spacer()
 
         # Start the upload process
-        perform_upload(self.context, self.upload_manager, upload_ids)
+        perform_upload(self.context, self.upload_manager, upload_ids, parallel=parallel)
 
     def matching_files_in_dir(self, directory):
         """
@@ -387,9 +396,13 @@ class ResumeCommand(PulpCliCommand):
         self.prompt = context.prompt
         self.upload_manager = upload_manager
 
-    def run(self):
+        self.add_option(OPTION_PARALLEL)
+
+    def run(self, **kwargs):
         self.context.prompt.render_title(_('Upload Requests'))
 
+        parallel = kwargs.get(OPTION_PARALLEL.keyword) or DEFAULT_PARALLEL
+
         # Determine which (if any) uploads are eligible to resume
         uploads = self.upload_manager.list_uploads()
 
@@ -420,7 +433,7 @@ class ResumeCommand(PulpCliCommand):
 
         self.context.prompt.render_paragraph(_('Resuming upload for: %(u)s') % {'u' : ', '.join(selected_filenames)})
 
-        perform_upload(self.context, self.upload_manager, selected_ids)
+        perform_upload(self.context, self.upload_manager, selected_ids, parallel=parallel)
 
 
 class ListCommand(PulpCliCommand):
@@ -557,7 +570,7 @@ class FileBundle(object):
         return self.filename
 
 
-def perform_upload(context, upload_manager, upload_ids):
+def perform_upload(context, upload_manager, upload_ids, parallel=DEFAULT_PARALLEL):
     """
     Uploads (resumes if necessary) uploading the given upload requests. The
     context is used to retrieve the bindings and this call will use the prompt
@@ -571,6 +584,9 @@ def perform_upload(context, upload_manager, upload_ids):
 
     :param upload_ids: list of upload IDs to handle
     :type  upload_ids: list
+
+    :param parallel: number of segments of each file to upload at once
+    :type  parallel: int
     """
 
     d = _('Starting upload of selected units. If this process is stopped through '
@@ -595,7 +611,7 @@ def perform_upload(context, upload_manager, upload_ids):
                     msg = _('%(i)s/%(t)s bytes')
                     bar.render(item, total, msg % {'i' : item, 't' : total})
 
-                upload_manager.upload(upload_id, progress_callback)
+                upload_manager.upload(upload_id, progress_callback, parallel=parallel)
 
                 context.prompt.write(_('... completed'))
                 context.prompt.render_spacer()
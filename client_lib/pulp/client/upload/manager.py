@@ -19,15 +19,19 @@ client-side tracking of upload requests on the server.
 """
 
 import copy
+import hashlib
 import os
 import pickle
+import Queue
 import sys
+import threading
 
 from pulp.client.lock import LockFile
 
 # -- constants ----------------------------------------------------------------
 
 DEFAULT_CHUNKSIZE = 1048576 # 1 MB per upload call
+DEFAULT_PARALLEL = 1 # number of segments uploaded at once
 
 # -- exceptions ---------------------------------------------------------------
 
@@ -175,23 +179,32 @@ class UploadManager(object):
 
         return upload_id
 
-    def upload(self, upload_id, callback_func=None, force=False):
+    def upload(self, upload_id, callback_func=None, force=False, parallel=DEFAULT_PARALLEL):
         """
         Begins or resumes the upload process for the given upload request.
         This call will not return until the upload is complete. The other
         expected exit point is a KeyboardError to kill the process. The
-        client-side on disk tracker files will store the current offset and
-        resume the upload from where it left off on the next call to this method.
+        client-side on disk tracker files will store the byte ranges uploaded
+        so far and resume the upload from where it left off on the next call
+        to this method.
 
         The callback_func is used to get feedback on the upload process. After
         each successful upload segment call to the server, this function
-        will be invoked with the new offset in the file and the file size
+        will be invoked with the number of bytes uploaded and the file size
         (intended to be fed into a progress indicator). As this is called
         after each upload segment call, the granularity at which it is called
         depends on the chunk_size value for this instance.
 
         The callback_func should have a signature of (int, int).
 
+        When parallel is greater than one, that many segments are uploaded at
+        once, each by its own thread. Segments may then complete out of order;
+        the tracker records each completed range so a resumed upload only
+        sends the missing segments.
+
+        A SHA-256 checksum of the file is calculated as it is read and stored
+        in the tracker to be sent with the import.
+
         This call will raise an exception if an upload is already in progress
         for the given upload_id. If that isn't the case and the tracker file's
         running flag is stale, the force parameter will bypass this check and
@@ -208,6 +221,9 @@ class UploadManager(object):
                uploads
         @type  force: bool
 
+        @param parallel: number of segments to upload at once
+        @type  parallel: int
+
         @raise MissingUploadRequestException: if a tracker file for upload_id
                cannot be found
         @raise ConcurrentUploadException: if an upload is already in progress
@@ -225,6 +241,7 @@ class UploadManager(object):
         if not force and tracker_file.is_running:
             raise ConcurrentUploadException()
 
+        pool = None
         try:
             # Flag the upload request as running so other processes don't
             # attempt to run it as well
@@ -233,25 +250,54 @@ class UploadManager(object):
 
             source_file_size = os.path.getsize(tracker_file.source_filename)
 
-            f = open(tracker_file.source_filename, 'r')
-            while True:
-                # Load the chunk to upload
-                f.seek(tracker_file.offset)
-                data = f.read(self.chunk_size)
-                if not data:
-                    break
-
-                # Server request
-                self.bindings.uploads.upload_segment(upload_id, tracker_file.offset, data)
-
+            def segment_uploaded(start, end):
                 # Status update and callback notification
-                tracker_file.offset = min(tracker_file.offset + self.chunk_size, source_file_size)
+                tracker_file.add_completed(start, end)
                 tracker_file.save()
 
-                callback_func(tracker_file.offset, source_file_size)
+                if callback_func:
+                    callback_func(tracker_file.completed_bytes(), source_file_size)
 
+            if parallel > 1:
+                pool = SegmentPool(self.bindings, upload_id, parallel)
+
+            checksum = hashlib.sha256()
+            offset = 0
+            f = open(tracker_file.source_filename, 'r')
+            try:
+                while True:
+                    # Load the chunk to upload; every chunk is read, even those
+                    # already uploaded, to calculate the checksum
+                    f.seek(offset)
+                    data = f.read(self.chunk_size)
+                    if not data:
+                        break
+                    checksum.update(data)
+                    end = offset + len(data)
+
+                    if not tracker_file.is_completed(offset, end):
+                        if pool is None:
+                            # Server request
+                            self.bindings.uploads.upload_segment(upload_id, offset, data)
+                            segment_uploaded(offset, end)
+                        else:
+                            for start, stop in pool.submit(offset, data):
+                                segment_uploaded(start, stop)
+
+                    offset = end
+
+                if pool is not None:
+                    for start, stop in pool.finish():
+                        segment_uploaded(start, stop)
+            finally:
+                f.close()
+
+            tracker_file.checksum = checksum.hexdigest()
             tracker_file.is_finished_uploading = True
         finally:
+            if pool is not None:
+                pool.stop()
+
             # Regardless of how this ends, it's no longer running, so make sure
             # we update the tracker accordingly.
             tracker_file.is_running = False
@@ -282,7 +328,8 @@ class UploadManager(object):
             raise IncompleteUploadException()
 
         response = self.bindings.uploads.import_upload(upload_id, tracker.repo_id,
-                   tracker.unit_type_id, tracker.unit_key, tracker.unit_metadata)
+                   tracker.unit_type_id, tracker.unit_key, tracker.unit_metadata,
+                   checksum=tracker.checksum)
 
         return response
 
@@ -387,6 +434,114 @@ class UploadManager(object):
         if not self.is_initialized:
             raise ManagerUninitializedException()
 
+class SegmentPool(object):
+    """
+    Threads that upload the segments of a single file at the same time. At
+    most the configured number of segments are in flight at once, which also
+    bounds the amount of the file held in memory.
+
+    Only the thread that submits segments may use an instance; it is the one
+    told which segments have completed so it can update the tracker.
+    """
+
+    def __init__(self, bindings, upload_id, parallel):
+        """
+        @param bindings: server bindings from the client context
+        @type  bindings: Bindings
+
+        @param upload_id: identifies the upload request
+        @type  upload_id: str
+
+        @param parallel: number of segments to upload at once
+        @type  parallel: int
+        """
+        self.bindings = bindings
+        self.upload_id = upload_id
+        self.parallel = parallel
+
+        self.in_flight = 0
+        self.segments = Queue.Queue()
+        self.results = Queue.Queue()
+
+        self.threads = []
+        for i in range(parallel):
+            thread = threading.Thread(target=self._run)
+            thread.setDaemon(True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, offset, data):
+        """
+        Queues a segment to be uploaded, first waiting for one to complete
+        if the maximum number are already in flight.
+
+        @param offset: offset of the segment in the file
+        @type  offset: int
+
+        @param data: contents of the segment
+        @type  data: str
+
+        @return: list of (start, end) byte ranges of completed segments
+        @rtype:  list
+        """
+        completed = []
+        if self.in_flight >= self.parallel:
+            completed.append(self._wait())
+        self.segments.put((offset, data))
+        self.in_flight += 1
+        while True:
+            try:
+                completed.append(self._result(self.results.get_nowait()))
+            except Queue.Empty:
+                break
+        return completed
+
+    def finish(self):
+        """
+        Waits for every queued segment to complete.
+
+        @return: list of (start, end) byte ranges of completed segments
+        @rtype:  list
+        """
+        completed = []
+        while self.in_flight:
+            completed.append(self._wait())
+        return completed
+
+    def stop(self):
+        """
+        Tells the threads to exit once they finish their current segment.
+        """
+        for thread in self.threads:
+            self.segments.put(None)
+
+    def _wait(self):
+        return self._result(self.results.get())
+
+    def _result(self, result):
+        """
+        Accounts for a segment that is no longer in flight, raising the
+        exception from uploading it if there was one.
+        """
+        self.in_flight -= 1
+        start, end, exc_info = result
+        if exc_info is not None:
+            raise exc_info[0], exc_info[1], exc_info[2]
+        return start, end
+
+    def _run(self):
+        while True:
+            segment = self.segments.get()
+            if segment is None:
+                break
+            offset, data = segment
+            try:
+                self.bindings.uploads.upload_segment(self.upload_id, offset, data)
+                self.results.put((offset, offset + len(data), None))
+            except Exception:
+                self.results.put((offset, offset + len(data), sys.exc_info()))
+
+
 class UploadTracker(object):
     """
     Client-side file to carry all information related to a single upload
@@ -399,7 +554,9 @@ class UploadTracker(object):
         # Upload call information
         self.upload_id = None
         self.location = None # URL to the upload request on the server
-        self.offset = None # start of next chunk to upload
+        self.offset = None # end of the uploaded bytes at the start of the file
+        self.completed = [] # sorted, non-overlapping [start, end) byte ranges uploaded
+        self.checksum = None # SHA-256 of the source file, calculated while uploading
         self.source_filename = None # path on disk to the file to upload
 
         # Import call information
@@ -412,6 +569,48 @@ class UploadTracker(object):
         self.is_running = False
         self.is_finished_uploading = False
 
+    def add_completed(self, start, end):
+        """
+        Records that the given byte range has been uploaded, merging it with
+        adjacent ranges already recorded.
+
+        @param start: offset of the first byte uploaded
+        @type  start: int
+
+        @param end: offset after the last byte uploaded
+        @type  end: int
+        """
+        merged = []
+        for range_start, range_end in self.completed:
+            if range_end < start or range_start > end:
+                merged.append([range_start, range_end])
+            else:
+                start = min(start, range_start)
+                end = max(end, range_end)
+        merged.append([start, end])
+        merged.sort()
+        self.completed = merged
+
+        if merged[0][0] == 0:
+            self.offset = merged[0][1]
+
+    def is_completed(self, start, end):
+        """
+        @return: true if the given byte range has already been uploaded
+        @rtype:  bool
+        """
+        for range_start, range_end in self.completed:
+            if range_start <= start and end <= range_end:
+                return True
+        return False
+
+    def completed_bytes(self):
+        """
+        @return: number of bytes uploaded so far
+        @rtype:  int
+        """
+        return sum(end - start for start, end in self.completed)
+
     def save(self):
         """
         Saves the current state of the tracker file. This will lock on the file
@@ -451,4 +650,12 @@ class UploadTracker(object):
         status_file = pickle.load(f)
         f.close()
 
+        # Trackers saved before uploads were tracked by byte range only
+        # know how far into the file the upload got
+        if not hasattr(status_file, 'completed'):
+            status_file.completed = []
+            if status_file.offset:
+                status_file.completed.append([0, status_file.offset])
+            status_file.checksum = None
+
         return status_file
@@ -11,8 +11,10 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import hashlib
 import math
 import os
+import pickle
 import shutil
 import unittest
 
@@ -234,6 +236,84 @@ class UploadManagerTests(unittest.TestCase):
         tracker = self.upload_manager._get_tracker_file_by_id(upload_id)
         self.assertEqual(rpm_size, tracker.offset)
 
+    def test_upload_parallel(self):
+        # Setup
+        self.upload_manager.chunk_size = 100
+        self.upload_manager.initialize()
+        upload_id = self.upload_manager.initialize_upload(TEST_RPM_FILENAME, 'repo-1', 'type-1', {'k' : 'v'}, 'm-1')
+
+        mock_callback = mock.Mock()
+
+        # Test
+        self.upload_manager.upload(upload_id, mock_callback.update_status, parallel=4)
+
+        # Verify
+        rpm_size = os.path.getsize(TEST_RPM_FILENAME)
+        num_upload_calls = int(math.ceil(float(rpm_size) / float(self.upload_manager.chunk_size)))
+
+        self.assertEqual(num_upload_calls, self.mock_upload_bindings.upload_segment.call_count)
+        self.assertEqual(num_upload_calls, mock_callback.update_status.call_count)
+        self.assertEqual(rpm_size, mock_callback.update_status.call_args[0][0])
+
+        # Segments may arrive in any order; together they are the whole file
+        f = open(TEST_RPM_FILENAME, 'r')
+        contents = f.read()
+        f.close()
+        segments = sorted(c[0][1:] for c in self.mock_upload_bindings.upload_segment.call_args_list)
+        self.assertEqual(contents, ''.join(data for offset, data in segments))
+        for offset, data in segments:
+            self.assertEqual(contents[offset:offset + len(data)], data)
+
+        tracker = self.upload_manager._get_tracker_file_by_id(upload_id)
+        self.assertEqual([[0, rpm_size]], tracker.completed)
+        self.assertEqual(rpm_size, tracker.offset)
+        self.assertEqual(hashlib.sha256(contents).hexdigest(), tracker.checksum)
+        self.assertEqual(True, tracker.is_finished_uploading)
+        self.assertEqual(False, tracker.is_running)
+
+    def test_upload_parallel_failure(self):
+        # Setup
+        self.upload_manager.chunk_size = 100
+        self.upload_manager.initialize()
+        upload_id = self.upload_manager.initialize_upload(TEST_RPM_FILENAME, 'repo-1', 'type-1', {'k' : 'v'}, 'm-1')
+        self.mock_upload_bindings.upload_segment.side_effect = ValueError()
+
+        # Test
+        self.assertRaises(ValueError, self.upload_manager.upload, upload_id, parallel=2)
+
+        # Verify
+        tracker = self.upload_manager._get_tracker_file_by_id(upload_id)
+        self.assertEqual(False, tracker.is_finished_uploading)
+        self.assertEqual(False, tracker.is_running)
+
+    def test_upload_resume_skips_completed(self):
+        # Setup
+        self.upload_manager.chunk_size = 100
+        self.upload_manager.initialize()
+        upload_id = self.upload_manager.initialize_upload(TEST_RPM_FILENAME, 'repo-1', 'type-1', {'k' : 'v'}, 'm-1')
+
+        # Simulate a parallel upload that was interrupted with gaps
+        tracker = self.upload_manager._get_tracker_file_by_id(upload_id)
+        tracker.add_completed(0, 200)
+        tracker.add_completed(300, 500)
+
+        # Test
+        self.upload_manager.upload(upload_id)
+
+        # Verify
+        rpm_size = os.path.getsize(TEST_RPM_FILENAME)
+        num_upload_calls = int(math.ceil(float(rpm_size) / float(self.upload_manager.chunk_size)))
+        self.assertEqual(num_upload_calls - 4, self.mock_upload_bindings.upload_segment.call_count)
+        offsets = [c[0][1] for c in self.mock_upload_bindings.upload_segment.call_args_list]
+        self.assertEqual(200, offsets[0])
+        self.assertEqual(500, offsets[1])
+
+        f = open(TEST_RPM_FILENAME, 'r')
+        contents = f.read()
+        f.close()
+        self.assertEqual([[0, rpm_size]], tracker.completed)
+        self.assertEqual(hashlib.sha256(contents).hexdigest(), tracker.checksum)
+
     def test_upload_concurrent_upload(self):
         # Setup
         self.upload_manager.initialize()
@@ -334,6 +414,8 @@ class UploadManagerTests(unittest.TestCase):
         self.assertEqual(args[2], 't')
         self.assertEqual(args[3], {'k' : 'v'})
         self.assertEqual(args[4], 'm')
+        kwargs = self.mock_upload_bindings.import_upload.call_args[1]
+        self.assertEqual(kwargs['checksum'], None)
 
     def test_import_upload_incomplete_upload(self):
         # Setup
@@ -391,4 +473,44 @@ class UploadManagerTests(unittest.TestCase):
         """
         Configures the mock bindings to return a valid response on importing an upload.
         """
-        self.mock_upload_bindings.import_upload.return_value = Response(200, {})
\ No newline at end of file
+        self.mock_upload_bindings.import_upload.return_value = Response(200, {})
+
+
+class UploadTrackerTests(unittest.TestCase):
+
+    def test_add_completed_merges(self):
+        tracker = upload_util.UploadTracker('unused')
+        tracker.add_completed(200, 300)
+        self.assertEqual(None, tracker.offset)
+        tracker.add_completed(0, 100)
+        self.assertEqual([[0, 100], [200, 300]], tracker.completed)
+        self.assertEqual(100, tracker.offset)
+        tracker.add_completed(100, 200)
+        self.assertEqual([[0, 300]], tracker.completed)
+        self.assertEqual(300, tracker.offset)
+        self.assertEqual(300, tracker.completed_bytes())
+
+    def test_is_completed(self):
+        tracker = upload_util.UploadTracker('unused')
+        tracker.add_completed(100, 300)
+        self.assertTrue(tracker.is_completed(100, 200))
+        self.assertTrue(tracker.is_completed(200, 300))
+        self.assertFalse(tracker.is_completed(0, 100))
+        self.assertFalse(tracker.is_completed(250, 350))
+
+    def test_load_offset_only_tracker(self):
+        tracker = upload_util.UploadTracker('/tmp/pulp-upload-tracker-test')
+        tracker.offset = 500
+        del tracker.completed
+        del tracker.checksum
+        f = open(tracker.filename, 'w')
+        pickle.dump(tracker, f)
+        f.close()
+
+        try:
+            loaded = upload_util.UploadTracker.load(tracker.filename)
+        finally:
+            os.remove(tracker.filename)
+
+        self.assertEqual([[0, 500]], loaded.completed)
+        self.assertEqual(None, loaded.checksum)
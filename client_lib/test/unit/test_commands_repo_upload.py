@@ -17,6 +17,7 @@ This module tests the pulp.client.commands.repo.upload module.
 
 import mock
 
+from pulp.client.commands import options
 from pulp.client.commands.repo import upload
 from pulp.devel.unit import base
 
@@ -65,6 +66,19 @@ class TestPerformUpload(base.PulpClientTests):
         self.assertEqual(render_failure_message.call_count, 0)
 
 
+    def test_upload_parallel(self):
+        """
+        Assert that the number of segments to upload at once is passed to the upload manager.
+        """
+        upload_manager = mock.MagicMock()
+        upload_manager.get_upload.return_value.source_filename = '/tmp/file.iso'
+
+        upload.perform_upload(self.context, upload_manager, ['an_id'], parallel=3)
+
+        self.assertEqual(upload_manager.upload.call_count, 1)
+        self.assertEqual(upload_manager.upload.call_args[1]['parallel'], 3)
+
+
 class UploadCommandTests(base.PulpClientTests):
 
     def setUp(self):
@@ -73,6 +87,26 @@ class UploadCommandTests(base.PulpClientTests):
         self.mock_upload_manager = mock.MagicMock()
         self.upload_command = upload.UploadCommand(self.context, self.mock_upload_manager)
 
+    @mock.patch('pulp.client.commands.repo.upload.perform_upload')
+    def test_run_parallel(self, mock_perform_upload):
+        """
+        Assert that the --parallel option reaches perform_upload.
+        """
+        self.upload_command._verify_repo_exists = mock.MagicMock()
+        self.upload_command.determine_type_id = mock.MagicMock(return_value='type')
+        self.upload_command.generate_unit_key_and_metadata = mock.MagicMock(return_value=({}, {}))
+        self.mock_upload_manager.initialize_upload.return_value = 'an_id'
+
+        kwargs = {
+            options.OPTION_REPO_ID.keyword: 'repo-1',
+            upload.OPTION_FILE.keyword: [__file__],
+            upload.OPTION_PARALLEL.keyword: 4,
+        }
+        self.upload_command.run(**kwargs)
+
+        mock_perform_upload.assert_called_once_with(self.context, self.mock_upload_manager,
+                                                    ['an_id'], parallel=4)
+
     def test_verify_repo_exists(self):
         # Setup
         mock_repo_api = mock.MagicMock()
@@ -94,3 +128,23 @@ class UploadCommandTests(base.PulpClientTests):
             self.fail('Exception was not bubbled up')
         except Exception, e:
             self.assertTrue(e is mock_repo_api.side_effect)
+
+
+class ResumeCommandTests(base.PulpClientTests):
+
+    @mock.patch('pulp.client.commands.repo.upload.perform_upload')
+    def test_run_parallel(self, mock_perform_upload):
+        """
+        Assert that the --parallel option reaches perform_upload.
+        """
+        upload_manager = mock.MagicMock()
+        tracker = mock.MagicMock(is_running=False, source_filename='/tmp/file.iso',
+                                 upload_id='an_id')
+        upload_manager.list_uploads.return_value = [tracker]
+        self.context.prompt.prompt_multiselect_menu = mock.MagicMock(return_value=[0])
+        command = upload.ResumeCommand(self.context, upload_manager)
+
+        command.run(**{upload.OPTION_PARALLEL.keyword: 2})
+
+        mock_perform_upload.assert_called_once_with(self.context, upload_manager, ['an_id'],
+                                                    parallel=2)
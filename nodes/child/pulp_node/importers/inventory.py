@@ -9,61 +9,211 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+"""
+The unit inventory compares the units in the parent and child inventories.
+Both are sorted by unit key and compared with a single merge, so neither has
+to be held in memory whole: beyond INVENTORY_BUFFER_SIZE units, the sorted
+units and the results of the comparison are spilled to temporary files.
+"""
+
+import heapq
+import tempfile
+import cPickle as pickle
+
 from pulp_node import constants
+from pulp_node.manifest import unit_key
+
+
+# Number of units held in memory by each sorted inventory, and each result
+# of comparing them, before spilling to disk.
+INVENTORY_BUFFER_SIZE = 10000
 
 
-class UniqueKey(object):
+# --- spooling --------------------------------------------------------------------------
+
+
+def dump(items, fp):
     """
-    A unique unit key consisting of a unit's type_id & unit_key.
-    The unit key is sorted to ensure consistency.
-    :ivar uid: The unique ID.
-    :type uid: A tuple of: (type_id, unit_key)
+    Write items to a temporary file.
+    :param items: The items to write.
+    :type items: iterable
+    :param fp: An open temporary file.
+    :type fp: file
     """
+    pickler = pickle.Pickler(fp, pickle.HIGHEST_PROTOCOL)
+    for item in items:
+        pickler.dump(item)
+        # the memo would otherwise keep every item written
+        pickler.clear_memo()
+
+
+def load(fp):
+    """
+    Read the items written to a temporary file.
+    :param fp: A temporary file written using dump().
+    :type fp: file
+    :return: A generator of items.
+    :rtype: generator
+    """
+    fp.seek(0)
+    unpickler = pickle.Unpickler(fp)
+    while True:
+        try:
+            yield unpickler.load()
+        except EOFError:
+            break
+
+
+class Spool(object):
+    """
+    A sequence of items held in memory up to a number of items and
+    written to a temporary file beyond that.  Iterated in the order added.
+    :ivar buffer_size: The number of items held in memory.
+    :type buffer_size: int
+    :ivar buffer: The items held in memory.
+    :type buffer: list
+    :ivar fp: The temporary file the items are written to, once there are more
+        items than buffer_size; otherwise None.
+    :type fp: file
+    :ivar length: The number of items added.
+    :type length: int
+    """
+
+    def __init__(self, buffer_size=None):
+        """
+        :param buffer_size: The number of items held in memory.
+            Defaults to INVENTORY_BUFFER_SIZE.
+        :type buffer_size: int
+        """
+        self.buffer_size = buffer_size or INVENTORY_BUFFER_SIZE
+        self.buffer = []
+        self.fp = None
+        self.length = 0
+
+    def add(self, item):
+        """
+        Add an item.
+        :param item: An item, which must be picklable.
+        """
+        self.buffer.append(item)
+        self.length += 1
+        if len(self.buffer) >= self.buffer_size:
+            if self.fp is None:
+                self.fp = tempfile.TemporaryFile()
+            self.fp.seek(0, 2)
+            dump(self.buffer, self.fp)
+            self.buffer = []
+
+    def __iter__(self):
+        if self.fp is not None:
+            for item in load(self.fp):
+                yield item
+        for item in self.buffer:
+            yield item
+
+    def __len__(self):
+        return self.length
+
+
+class SortedUnits(object):
+    """
+    Units sorted by unit key.  Up to a number of units are sorted in memory.
+    Beyond that, each buffer full is sorted and written to a temporary file and
+    the files are merged when iterated.  When there is more than one unit with
+    the same key, the last one added is kept.
+    :ivar buffer_size: The number of units held in memory.
+    :type buffer_size: int
+    :ivar buffer: The (key, index, item) held in memory.
+    :type buffer: list
+    :ivar runs: The temporary files of sorted (key, index, item) written so far.
+    :type runs: list
+    :ivar index: The number of units added, used to keep the last one added.
+    :type index: int
+    """
+
+    def __init__(self, buffer_size=None):
+        """
+        :param buffer_size: The number of units held in memory.
+            Defaults to INVENTORY_BUFFER_SIZE.
+        :type buffer_size: int
+        """
+        self.buffer_size = buffer_size or INVENTORY_BUFFER_SIZE
+        self.buffer = []
+        self.runs = []
+        self.index = 0
 
-    def __init__(self, unit):
+    def add(self, unit, item):
         """
+        Add an item for a unit.
         :param unit: A content unit.
         :type unit: dict
+        :param item: The item to be sorted by the unit's key, which must be picklable.
         """
-        type_id = unit['type_id']
-        unit_key = tuple(sorted(unit['unit_key'].items()))
-        self.uid = (type_id, unit_key)
+        self.buffer.append((unit_key(unit), self.index, item))
+        self.index += 1
+        if len(self.buffer) >= self.buffer_size:
+            fp = tempfile.TemporaryFile()
+            self.buffer.sort()
+            dump(self.buffer, fp)
+            self.runs.append(fp)
+            self.buffer = []
 
-    def __hash__(self):
-        return hash(self.uid)
+    def __iter__(self):
+        """
+        :return: A generator of (key, item) sorted by key.
+        :rtype: generator
+        """
+        self.buffer.sort()
+        merged = heapq.merge(self.buffer, *[load(fp) for fp in self.runs])
+        last = None
+        for key, index, item in merged:
+            if last is not None and last[0] != key:
+                yield last
+            last = (key, item)
+        if last is not None:
+            yield last
 
-    def __eq__(self, other):
-        return self.uid == other.uid
 
-    def __ne__(self, other):
-        return self.uid != other.uid
+def merge(parent_units, child_units):
+    """
+    Merge units sorted by key.
+    :param parent_units: The (key, item) of the parent units sorted by key.
+    :type parent_units: iterable
+    :param child_units: The (key, item) of the child units sorted by key.
+    :type child_units: iterable
+    :return: A generator of (parent item, child item) for each key.
+        The item is None for a unit that's not in one of the inventories.
+    :rtype: generator
+    """
+    parent_units = iter(parent_units)
+    child_units = iter(child_units)
+    parent = next(parent_units, None)
+    child = next(child_units, None)
+    while parent is not None or child is not None:
+        if child is None or (parent is not None and parent[0] < child[0]):
+            yield parent[1], None
+            parent = next(parent_units, None)
+        elif parent is None or child[0] < parent[0]:
+            yield None, child[1]
+            child = next(child_units, None)
+        else:
+            yield parent[1], child[1]
+            parent = next(parent_units, None)
+            child = next(child_units, None)
+
+
+# --- inventory -------------------------------------------------------------------------
 
 
 class UnitInventory(object):
     """
     The unit inventory contains both the parent and child inventory
-    of content units associated with a specific repository.  Each is contained
-    within a dictionary keyed by {UnitKey} to ensure uniqueness.
+    of content units associated with a specific repository.  The inventories
+    are sorted by unit key and compared when the inventory is built, which
+    yields the units only in the parent, the units only in the child and
+    the units updated in the parent.
     """
 
-    @staticmethod
-    def _import_parent_units(units):
-        _units = {}
-        for unit, ref in units:
-            unit.pop('metadata', None)
-            key = UniqueKey(unit)
-            _units[key] = (unit, ref)
-        return _units
-
-    @staticmethod
-    def _import_child_units(units):
-        _units = {}
-        for unit in units:
-            unit.pop('metadata', None)
-            key = UniqueKey(unit)
-            _units[key] = unit
-        return _units
-
     def __init__(self, base_URL, parent_units, child_units):
         """
         :param base_URL: The base URL for downloading parent units.
@@ -73,40 +223,61 @@ class UnitInventory(object):
         :type child_units: iterable
         """
         self.base_URL = base_URL
-        self.parent_units = self._import_parent_units(parent_units)
-        self.child_units = self._import_child_units(child_units)
+        self.parent_only = Spool()
+        self.child_only = Spool()
+        self.updated = Spool()
+        parent_units = self._sort_parent_units(parent_units)
+        child_units = self._sort_child_units(child_units)
+        for parent, child_unit in merge(parent_units, child_units):
+            if child_unit is None:
+                self.parent_only.add(parent)
+            elif parent is None:
+                self.child_only.add(child_unit)
+            else:
+                unit, ref = parent
+                parent_last_updated = unit.get(constants.LAST_UPDATED, 0)
+                child_last_updated = child_unit.get(constants.LAST_UPDATED, 0)
+                if parent_last_updated > child_last_updated:
+                    self.updated.add(parent)
+
+    @staticmethod
+    def _sort_parent_units(units):
+        _units = SortedUnits()
+        for unit, ref in units:
+            unit.pop('metadata', None)
+            _units.add(unit, (unit, ref))
+        return _units
+
+    @staticmethod
+    def _sort_child_units(units):
+        _units = SortedUnits()
+        for unit in units:
+            unit.pop('metadata', None)
+            _units.add(unit, unit)
+        return _units
 
     def units_on_parent_only(self):
         """
         Listing of units contained in the parent inventory
         but not contained in the child inventory.
-        :return: List of (unit, ref).
-        :rtype: list
+        :return: Sequence of (unit, ref).
+        :rtype: Spool
         """
-        return [r for k, r in self.parent_units.items() if k not in self.child_units]
+        return self.parent_only
 
     def units_on_child_only(self):
         """
         Listing of units contained in the child inventory
         but not contained in the parent inventory.
-        :return: List of units that need to be purged.
-        :rtype: list
+        :return: Sequence of units that need to be purged.
+        :rtype: Spool
         """
-        return [u for k, u in self.child_units.items() if k not in self.parent_units]
+        return self.child_only
 
     def updated_units(self):
         """
         Listing of units updated on the parent.
-        :return: List of (unit, ref).
-        :rtype: list
+        :return: Sequence of (unit, ref).
+        :rtype: Spool
         """
-        updated = []
-        for key, (unit, ref) in self.parent_units.items():
-            child_unit = self.child_units.get(key)
-            if child_unit is None:
-                continue
-            parent_last_updated = unit.get(constants.LAST_UPDATED, 0)
-            child_last_updated = child_unit.get(constants.LAST_UPDATED, 0)
-            if parent_last_updated > child_last_updated:
-                updated.append((unit, ref))
-        return updated
\ No newline at end of file
+        return self.updated
@@ -177,7 +177,7 @@ class ImporterStrategy(object):
         # fetch child units
         try:
             conduit = NodesConduit()
-            child_units = conduit.get_units(request.repo_id)
+            child_units = conduit.get_units(request.repo_id, metadata=False)
         except NodeError:
             raise
         except Exception:
@@ -201,8 +201,10 @@ class ImporterStrategy(object):
             fetched_manifest.fetch()
             if manifest != fetched_manifest or \
                     not manifest.is_valid() or not manifest.has_valid_units():
-                fetched_manifest.write()
-                fetched_manifest.fetch_units()
+                # only the delta is fetched when based on the local manifest
+                if not fetched_manifest.apply_delta(manifest):
+                    fetched_manifest.write()
+                    fetched_manifest.fetch_units()
                 manifest = fetched_manifest
             if not manifest.is_valid():
                 raise InvalidManifestError()
@@ -9,34 +9,42 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+from itertools import groupby
+
 from pulp.plugins.types import database as types_db
 from pulp.server.db.model.repository import RepoContentUnit
 from pulp.server.config import config as pulp_conf
 
 
+# Number of units fetched from the database with each query
+UNIT_BATCH_SIZE = 1000
+
+# Association fields needed to build units
+ASSOCIATION_FIELDS = ('unit_id', 'unit_type_id', 'owner_type', 'owner_id')
+
+
 # --- nodes conduit  ----------------------------------------------------------
 
 
 class NodesConduit(object):
 
-    def get_units(self, repo_id):
+    def get_units(self, repo_id, metadata=True):
         """
         Get all units associated with a repository.
+        The units are fetched in batches as they are iterated, sorted
+        by type and unit ID.
         :param repo_id: The repository ID used to query the units.
         :type repo_id: str
+        :param metadata: When False, only the unit key and last updated fields of
+            each unit are fetched and its metadata is empty.
+        :type metadata: bool
         :return: unit iterator
         :rtype: UnitsIterator
         """
-        units = {}
-        types = {}
         collection = RepoContentUnit.get_collection()
-        for unit in collection.find({'repo_id': repo_id}):
-            unit_id = unit['unit_id']
-            type_id = unit['unit_type_id']
-            units[unit_id] = unit
-            unit_list = types.setdefault(type_id, [])
-            unit_list.append(unit['unit_id'])
-        return UnitsIterator(units, types)
+        cursor = collection.find({'repo_id': repo_id}, fields=ASSOCIATION_FIELDS)
+        cursor.sort([('unit_type_id', 1), ('unit_id', 1)])
+        return UnitsIterator(cursor, metadata)
 
 
 # --- typedef -----------------------------------------------------------------
@@ -85,27 +93,54 @@ class UnitsIterator:
             metadata=metadata)
 
     @staticmethod
-    def open_cursors(types):
-        for type_id, unit_ids in types.items():
-            query = {'_id': {'$in': unit_ids}}
-            collection = types_db.type_units_collection(type_id)
-            cursor = collection.find(query)
-            yield cursor
+    def batches(associations):
+        """
+        Split the associations into batches of up to UNIT_BATCH_SIZE units
+        of the same type.  The associations of a unit, which are adjacent since
+        sorted by unit ID, are kept in the same batch.
+        :param associations: Associations sorted by type and unit ID.
+        :type associations: iterable
+        :return: A generator of (type_id, units) where units is a dictionary of
+            associations keyed by unit ID.
+        :rtype: generator
+        """
+        for type_id, type_associations in groupby(associations, lambda a: a['unit_type_id']):
+            units = {}
+            for unit in type_associations:
+                unit_id = unit['unit_id']
+                if len(units) >= UNIT_BATCH_SIZE and unit_id not in units:
+                    yield type_id, units
+                    units = {}
+                units[unit_id] = unit
+            if units:
+                yield type_id, units
 
     @staticmethod
-    def get_units(units, types):
+    def get_units(associations, metadata=True):
         typedefs = Typedef()
-        for cursor in UnitsIterator.open_cursors(types):
-            for metadata in cursor:
-                unit_id = metadata['_id']
-                unit = units[unit_id]
-                type_id = unit['unit_type_id']
-                typedef = typedefs.get(type_id)
-                yield UnitsIterator.associated_unit(typedef, unit, metadata)
-
-    def __init__(self, units, types):
-        self.length = len(units)
-        self.unit_generator = UnitsIterator.get_units(units, types)
+        for type_id, units in UnitsIterator.batches(associations):
+            typedef = typedefs.get(type_id)
+            fields = None
+            if not metadata:
+                fields = list(typedef['unit_key']) + ['_last_updated']
+            query = {'_id': {'$in': units.keys()}}
+            collection = types_db.type_units_collection(type_id)
+            for unit_metadata in collection.find(query, fields=fields):
+                unit = units[unit_metadata['_id']]
+                yield UnitsIterator.associated_unit(typedef, unit, unit_metadata)
+
+    def __init__(self, associations, metadata=True):
+        """
+        :param associations: A cursor of the repository's unit associations,
+            sorted by type and unit ID.
+        :type associations: pymongo.cursor.Cursor
+        :param metadata: When False, only the unit key and last updated
+            fields of each unit are fetched.
+        :type metadata: bool
+        """
+        # A unit associated more than once is only generated once.
+        self.length = len(associations.distinct('unit_id'))
+        self.unit_generator = UnitsIterator.get_units(associations, metadata)
 
     def next(self):
         return self.unit_generator.next()
@@ -114,4 +149,4 @@ class UnitsIterator:
         return self
 
     def __len__(self):
-        return self.length
\ No newline at end of file
+        return self.length
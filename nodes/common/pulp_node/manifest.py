@@ -14,11 +14,15 @@ Provides classes for managing the content unit manifest.
 The manifest is a json encoded file that defines content units
 associated with repository.  The units themselves are stored in a separate
 json encoded file.  For performance reasons, the unit files are compressed.
+A delta file listing the units added, updated and removed since the previous
+manifest may be published with the manifest.  A child that has the units of
+the previous manifest applies the delta rather than downloading every unit.
 """
 
 import os
 import gzip
 import errno
+import hashlib
 
 from logging import getLogger
 
@@ -39,6 +43,7 @@ log = getLogger(__name__)
 MANIFEST_VERSION = 2
 MANIFEST_FILE_NAME = 'manifest.json'
 UNITS_FILE_NAME = 'units.json.gz'
+DELTA_FILE_NAME = 'delta.json.gz'
 
 ID = 'id'
 VERSION = 'version'
@@ -48,6 +53,15 @@ UNITS = 'units'
 UNITS_PATH = 'path'
 UNITS_TOTAL = 'total'
 UNITS_SIZE = 'size'
+DELTA = 'delta'
+DELTA_BASE = 'base'
+
+# delta actions
+ACTION = 'action'
+UNIT = 'unit'
+ADDED = 'added'
+UPDATED = 'updated'
+REMOVED = 'removed'
 
 
 # --- utils -----------------------------------------------------------------------------
@@ -76,6 +90,50 @@ def unzip(path, destination, bfrlen=65535):
         fp_in.close()
 
 
+def read_units(path):
+    """
+    Read the units in the units file at the specified path.
+    :param path: The path to a units file, which may be compressed.
+    :type path: str
+    :return: A generator of units.
+    :rtype: generator
+    :raise IOError: on I/O errors.
+    :raise ValueError: json decoding errors
+    """
+    if path.endswith('.gz'):
+        fp = gzip.open(path)
+    else:
+        fp = open(path)
+    try:
+        for json_unit in fp:
+            yield json.loads(json_unit)
+    finally:
+        fp.close()
+
+
+def unit_key(unit):
+    """
+    Get a key that uniquely identifies a unit within a units file.
+    :param unit: A content unit.
+    :type unit: dict
+    :return: A hashable key: (type_id, json encoded unit_key).
+    :rtype: tuple(2)
+    """
+    return unit['type_id'], json.dumps(unit['unit_key'], sort_keys=True)
+
+
+def unit_digest(unit):
+    """
+    Get a digest of everything published for a unit, used to
+    detect units that have changed since the previous manifest.
+    :param unit: A content unit.
+    :type unit: dict
+    :return: The hex SHA-1 digest of the json encoded unit.
+    :rtype: str
+    """
+    return hashlib.sha1(json.dumps(unit, sort_keys=True)).hexdigest()
+
+
 # --- manifest --------------------------------------------------------------------------
 
 
@@ -90,6 +148,9 @@ class Manifest(object):
     :type total_units: int
     :param publishing_details: Details of how units have been published.
     :type publishing_details: dict
+    :ivar delta: The delta file published with the manifest and the ID of the
+        manifest it is based on.  The base is None when no delta was published.
+    :type delta: dict
     """
 
     def __init__(self, path, manifest_id=None):
@@ -103,6 +164,7 @@ class Manifest(object):
         self.id = manifest_id
         self.version = MANIFEST_VERSION
         self.units = {UNITS_PATH: None, UNITS_TOTAL: 0, UNITS_SIZE: 0}
+        self.delta = {DELTA_BASE: None, UNITS_TOTAL: 0, UNITS_SIZE: 0}
         self.publishing_details = {}
         if os.path.isdir(path):
             path = pathlib.join(path, MANIFEST_FILE_NAME)
@@ -118,6 +180,7 @@ class Manifest(object):
             ID: self.id,
             VERSION: self.version,
             UNITS: self.units,
+            DELTA: self.delta,
             PUBLISHING_DETAILS: self.publishing_details
         }
         with open(self.path, 'w+') as fp:
@@ -137,6 +200,7 @@ class Manifest(object):
         self.id = d.get(ID)
         self.version = d.get(VERSION, 0)
         self.units = d.get(UNITS, {UNITS_PATH: None, UNITS_TOTAL: 0, UNITS_SIZE: 0})
+        self.delta = d.get(DELTA, {DELTA_BASE: None, UNITS_TOTAL: 0, UNITS_SIZE: 0})
         self.publishing_details = d.get(PUBLISHING_DETAILS, {})
 
     def get_units(self):
@@ -164,6 +228,16 @@ class Manifest(object):
         self.units[UNITS_TOTAL] = unit_writer.total_units
         self.units[UNITS_SIZE] = unit_writer.bytes_written
 
+    def delta_published(self, delta_writer):
+        """
+        Update the manifest delta information.
+        :param delta_writer: A writer used to publish the delta.
+        :type delta_writer: DeltaWriter
+        """
+        self.delta[DELTA_BASE] = delta_writer.base_id
+        self.delta[UNITS_TOTAL] = delta_writer.total_units
+        self.delta[UNITS_SIZE] = delta_writer.bytes_written
+
     def published(self, details):
         """
         Update the publishing details.
@@ -281,9 +355,86 @@ class RemoteManifest(Manifest):
         :raise HTTPError: on URL errors.
         :raise ValueError: on json decoding errors
         """
+        self._fetch_file(UNITS_FILE_NAME)
+
+    def apply_delta(self, manifest):
+        """
+        Build the units file referenced in this manifest by fetching the delta
+        published with it and applying the delta to the units of the specified
+        local manifest.  This only works when the delta is based on the local
+        manifest and its units are intact; otherwise, the units file must be
+        fetched instead.  On success, this manifest (and the built units file)
+        replaces the local manifest.
+        :param manifest: The local manifest.
+        :type manifest: Manifest
+        :return: True if the delta has been applied.
+        :rtype: bool
+        """
+        base_id = self.delta[DELTA_BASE]
+        if not base_id or base_id != manifest.id:
+            return False
+        if not manifest.is_valid() or not manifest.has_valid_units():
+            return False
+        try:
+            return self._apply_delta(manifest)
+        except Exception:
+            log.exception(self.url)
+            return False
+
+    def _apply_delta(self, manifest):
+        """
+        Fetch the delta and apply it to the units of the local manifest.
+        :param manifest: The local manifest.
+        :type manifest: Manifest
+        :return: True if the delta has been applied.
+        :rtype: bool
+        """
+        dir_path = os.path.dirname(self.path)
+        delta_path = self._fetch_file(DELTA_FILE_NAME)
+        changes = {}
+        try:
+            for change in read_units(delta_path):
+                changes[unit_key(change[UNIT])] = change
+        finally:
+            os.unlink(delta_path)
+        tmp_path = pathlib.join(dir_path, '.' + UNITS_FILE_NAME)
+        with UnitWriter(tmp_path) as writer:
+            for unit in read_units(manifest.units_path()):
+                change = changes.pop(unit_key(unit), None)
+                if change is None:
+                    writer.add(unit)
+                    continue
+                if change[ACTION] != REMOVED:
+                    writer.add(change[UNIT])
+            for change in changes.values():
+                if change[ACTION] != REMOVED:
+                    writer.add(change[UNIT])
+        if writer.total_units != self.units[UNITS_TOTAL]:
+            # the local units are not those the delta is based on
+            os.unlink(tmp_path)
+            return False
+        units_path = pathlib.join(dir_path, UNITS_FILE_NAME)
+        os.rename(tmp_path, units_path)
+        if manifest.units_path() != units_path:
+            os.unlink(manifest.units_path())
+        self.units[UNITS_PATH] = None
+        self.units[UNITS_SIZE] = writer.bytes_written
+        self.write()
+        return True
+
+    def _fetch_file(self, file_name):
+        """
+        Fetch a file published with the manifest.
+        :param file_name: The name of the file.
+        :type file_name: str
+        :return: The absolute path to the downloaded file.
+        :rtype: str
+        :raise ManifestDownloadError: on downloading errors.
+        :raise HTTPError: on URL errors.
+        """
         base_url = self.url.rsplit('/', 1)[0]
-        url = pathlib.join(base_url, UNITS_FILE_NAME)
-        destination = pathlib.join(os.path.dirname(self.path), UNITS_FILE_NAME)
+        url = pathlib.join(base_url, file_name)
+        destination = pathlib.join(os.path.dirname(self.path), file_name)
         request = DownloadRequest(str(url), destination)
         listener = AggregatingEventListener()
         self.downloader.event_listener = listener
@@ -291,6 +442,7 @@ class RemoteManifest(Manifest):
         if listener.failed_reports:
             report = listener.failed_reports[0]
             raise ManifestDownloadError(self.url, report.error_msg)
+        return destination
 
 
 class UnitWriter(object):
@@ -373,6 +525,82 @@ class UnitWriter(object):
         self.close()
 
 
+class DeltaWriter(object):
+    """
+    Writes the units added, updated and removed since a previous (base)
+    manifest to a delta file.  Each line of the file is a json encoded
+    dictionary of the ACTION and the UNIT.  Removed units contain only
+    the type_id and unit_key.
+    :ivar base_id: The ID of the base manifest.
+    :type base_id: str
+    :ivar published: The digest of each unit in the base manifest, keyed by unit_key().
+        Units are removed as they are added to the delta writer.
+    :type published: dict
+    :ivar writer: Used to write the delta file.
+    :type writer: UnitWriter
+    """
+
+    def __init__(self, path, base):
+        """
+        :param path: The absolute path to the delta file.
+        :type path: str
+        :param base: The base manifest.  Its units file must be valid.
+        :type base: Manifest
+        :raise IOError: on I/O errors.
+        :raise ValueError: json decoding errors
+        """
+        self.base_id = base.id
+        self.published = {}
+        for unit in read_units(base.units_path()):
+            self.published[unit_key(unit)] = unit_digest(unit)
+        self.writer = UnitWriter(path)
+
+    @property
+    def total_units(self):
+        return self.writer.total_units
+
+    @property
+    def bytes_written(self):
+        return self.writer.bytes_written
+
+    def add(self, unit):
+        """
+        Add a unit being published, writing it to the delta
+        when it was not published in the base manifest or has changed.
+        :param unit: A content unit.
+        :type unit: dict
+        :raise IOError: on I/O errors.
+        :raise ValueError: json encoding errors
+        """
+        digest = self.published.pop(unit_key(unit), None)
+        if digest is None:
+            self.writer.add({ACTION: ADDED, UNIT: unit})
+        elif digest != unit_digest(unit):
+            self.writer.add({ACTION: UPDATED, UNIT: unit})
+
+    def close(self):
+        """
+        Write the units published in the base manifest that have not
+        been added, which have been removed, and close the delta file.
+        This method is idempotent.
+        :return: The number of changes written.
+        :rtype: int
+        """
+        if not self.writer.closed:
+            for type_id, json_unit_key in self.published:
+                unit = dict(type_id=type_id, unit_key=json.loads(json_unit_key))
+                self.writer.add({ACTION: REMOVED, UNIT: unit})
+            self.published = {}
+        return self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *unused):
+        self.close()
+        return False
+
+
 class UnitIterator:
     """
     Used to iterate content units inventory file associated with a manifest.
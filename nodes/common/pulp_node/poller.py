@@ -40,11 +40,14 @@ class TaskPoller(object):
     The task poller is used to poll a running task by ID.
     :ivar binding: A pulp API binding.
     :type binding: pulp_node.handlers.model.PulpBinding
-    :ivar delay: The delay in seconds between each poll.
+    :ivar delay: The delay in seconds between each poll when the server
+        does not support waiting for the task to change.
     :type delay: int
     """
 
     DELAY = 1
+    # Maximum seconds the server holds each poll until the task changes.
+    WAIT = 10
 
     def __init__(self, binding, delay=DELAY):
         """
@@ -73,20 +76,23 @@ class TaskPoller(object):
         poll = True
         task_result = None
         last_hash = 0
+        task_hash = None
 
         while poll:
             if cancelled():
                 poll = False
                 continue
 
-            sleep(self.delay)
+            if task_hash is None:
+                sleep(self.delay)
 
-            http = self.binding.tasks.get_task(task_id)
+            http = self.binding.tasks.get_task(task_id, wait=self.WAIT, since=task_hash)
             if http.response_code != httplib.OK:
                 msg = FETCH_TASK_FAILED % {'t': task_id, 'c': http.response_code}
                 raise PollingFailed(msg)
 
             task = http.response_body
+            task_hash = task.hash
 
             if task.state == CALL_ERROR_STATE:
                 msg = TASK_FAILED % {'t': task_id, 's': task.state}
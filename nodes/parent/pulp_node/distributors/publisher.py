@@ -18,7 +18,7 @@ from logging import getLogger
 
 from pulp_node import constants
 from pulp_node import pathlib
-from pulp_node.manifest import Manifest, UnitWriter
+from pulp_node.manifest import Manifest, UnitWriter, DeltaWriter, DELTA_FILE_NAME
 
 
 log = getLogger(__name__)
@@ -114,7 +114,9 @@ class FilePublisher(Publisher):
         """
         Publish the specified units.
         Writes the units.json file and symlinks each of the files associated
-        to the unit.storage_path.  Publishing is staged in a temporary directory and
+        to the unit.storage_path.  When the repository has been published before,
+        the delta.json file listing the units added, updated and removed since
+        is written as well.  Publishing is staged in a temporary directory and
         must use commit() to make the publishing permanent.
         :param units: A list of units to publish.
         :type units: iterable
@@ -123,17 +125,44 @@ class FilePublisher(Publisher):
         """
         pathlib.mkdir(self.publish_dir)
         self.tmp_dir = mkdtemp(dir=self.publish_dir)
+        delta_writer = self.delta_writer()
         with UnitWriter(self.tmp_dir) as writer:
             for unit in units:
                 self.publish_unit(unit)
                 writer.add(unit)
+                if delta_writer is not None:
+                    delta_writer.add(unit)
         manifest_id = str(uuid4())
         manifest = Manifest(self.tmp_dir, manifest_id)
         manifest.units_published(writer)
+        if delta_writer is not None:
+            delta_writer.close()
+            manifest.delta_published(delta_writer)
         manifest.write()
         self.staged = True
         return manifest.path
 
+    def delta_writer(self):
+        """
+        Get a writer for the delta between the currently published
+        manifest and the one being published.
+        :return: The delta writer or None when the repository has not been
+            published or the published manifest cannot be used as the base.
+        :rtype: DeltaWriter
+        """
+        dir_path = pathlib.join(self.publish_dir, self.repo_id)
+        if not os.path.isdir(dir_path):
+            return None
+        base = Manifest(dir_path)
+        try:
+            base.read()
+            if not base.is_valid() or not base.has_valid_units():
+                return None
+            return DeltaWriter(pathlib.join(self.tmp_dir, DELTA_FILE_NAME), base)
+        except (IOError, ValueError):
+            log.exception(dir_path)
+            return None
+
     def publish_unit(self, unit):
         """
         Publish the file associated with the unit into the publish directory.
@@ -54,10 +54,9 @@ class ServerTests(TestCase):
     def setUpClass(cls):
         # This will make Celery tasks run synchronously
         celery_instance.celery.conf.CELERY_ALWAYS_EAGER = True
-        cls.reserve_resources_patch = mock.patch('pulp.server.async.tasks._reserve_resource.'
-                                                 'apply_async')
-        mock_patch = cls.reserve_resources_patch.start()
-        mock_patch.return_value.get.return_value = 'some_queue'
+        cls.reserve_resources_patch = mock.patch('pulp.server.managers.resources.reserve_resource',
+                                                 return_value='some_queue')
+        cls.reserve_resources_patch.start()
 
         if not os.path.exists(cls.TMP_ROOT):
             os.makedirs(cls.TMP_ROOT)
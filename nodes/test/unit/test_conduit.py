@@ -9,7 +9,7 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
-from mock import Mock
+from mock import Mock, patch
 from base import ServerTests
 from operator import itemgetter
 
@@ -122,4 +122,37 @@ class QueryTests(ServerTests):
             unit_key = u['unit_key']
             self.assertEqual(unit_key['N'], n)
             self.assertEqual(u['storage_path'], create_storage_path(unit_id))
-            n += 1
\ No newline at end of file
+            n += 1
+
+    @patch('pulp_node.conduit.UNIT_BATCH_SIZE', 3)
+    def test_query_without_metadata(self):
+        num_units = 5
+        units_created = populate(num_units)
+        conduit = NodesConduit()
+        units = conduit.get_units(REPO_ID, metadata=False)
+        self.assertEqual(len(units), len(units_created))
+        unit_list = list(units)
+        self.assertEqual(len(unit_list), len(units_created))
+        n = 0
+        for u in sorted(unit_list, key=itemgetter('unit_id')):
+            unit_id = u['unit_id']
+            self.assertEqual(create_unit_id(u['type_id'], n), unit_id)
+            self.assertEqual(u['unit_key']['N'], n)
+            self.assertEqual(u['storage_path'], None)
+            self.assertEqual(u['metadata'], {})
+            n += 1
+
+    def test_query_multiple_associations(self):
+        num_units = 5
+        units_created = populate(num_units)
+        manager = managers.repo_unit_association_manager()
+        manager.associate_unit_by_id(
+            REPO_ID,
+            TYPE_A,
+            create_unit_id(TYPE_A, 0),
+            RepoContentUnit.OWNER_TYPE_USER,
+            'admin')
+        conduit = NodesConduit()
+        units = conduit.get_units(REPO_ID)
+        self.assertEqual(len(units), len(units_created))
+        self.assertEqual(len(list(units)), len(units_created))
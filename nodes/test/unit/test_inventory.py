@@ -0,0 +1,104 @@
+# Copyright (c) 2014 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+from unittest import TestCase
+
+from mock import patch
+
+from pulp_node import constants
+from pulp_node.importers import inventory
+from pulp_node.importers.inventory import Spool, SortedUnits, UnitInventory
+from pulp_node.manifest import UnitRef
+
+
+def unit(type_id, n, last_updated=0):
+    return {'type_id': type_id, 'unit_key': {'n': n}, constants.LAST_UPDATED: last_updated,
+            'metadata': {'m': n}}
+
+
+class TestSpool(TestCase):
+
+    def test_memory(self):
+        spool = Spool(10)
+        for n in range(5):
+            spool.add(n)
+        self.assertEqual(spool.fp, None)
+        self.assertEqual(len(spool), 5)
+        self.assertEqual(list(spool), range(5))
+
+    def test_spilled(self):
+        spool = Spool(2)
+        for n in range(5):
+            spool.add({'n': n})
+        self.assertNotEqual(spool.fp, None)
+        self.assertEqual(len(spool), 5)
+        self.assertEqual(list(spool), [{'n': n} for n in range(5)])
+        # iterated more than once
+        self.assertEqual(len(list(spool)), 5)
+
+
+class TestSortedUnits(TestCase):
+
+    def test_sorted(self):
+        units = SortedUnits(2)
+        for n in (3, 0, 4, 1, 2):
+            units.add(unit('T', n), n)
+        self.assertEqual(len(units.runs), 2)
+        self.assertEqual([item for key, item in units], range(5))
+
+    def test_duplicate_keys(self):
+        units = SortedUnits(2)
+        for n, item in ((1, 'a'), (0, 'b'), (1, 'c'), (1, 'd'), (0, 'e')):
+            units.add(unit('T', n), item)
+        # the last added is kept
+        self.assertEqual([item for key, item in units], ['e', 'd'])
+
+
+class TestUnitInventory(TestCase):
+
+    def build(self):
+        ref = UnitRef('units.json', 0, 0)
+        parent_units = [
+            (unit('A', 0), ref),
+            (unit('A', 1, 2), ref),
+            (unit('B', 0, 2), ref),
+            (unit('B', 2), ref),
+        ]
+        child_units = [
+            unit('B', 2),
+            unit('A', 1, 1),
+            unit('B', 0, 3),
+            unit('C', 0),
+        ]
+        return UnitInventory('http://', parent_units, child_units)
+
+    def verify(self, unit_inventory):
+        parent_only = [(u['type_id'], u['unit_key']['n']) for u, r in
+                       unit_inventory.units_on_parent_only()]
+        self.assertEqual(parent_only, [('A', 0)])
+        child_only = [(u['type_id'], u['unit_key']['n']) for u in
+                      unit_inventory.units_on_child_only()]
+        self.assertEqual(child_only, [('C', 0)])
+        updated = [(u['type_id'], u['unit_key']['n']) for u, r in
+                   unit_inventory.updated_units()]
+        self.assertEqual(updated, [('A', 1)])
+        for u, r in unit_inventory.units_on_parent_only():
+            self.assertFalse('metadata' in u)
+            self.assertTrue(isinstance(r, UnitRef))
+
+    def test_inventory(self):
+        self.verify(self.build())
+
+    @patch.object(inventory, 'INVENTORY_BUFFER_SIZE', 1)
+    def test_inventory_spilled(self):
+        unit_inventory = self.build()
+        self.assertNotEqual(unit_inventory.child_only.fp, None)
+        self.verify(unit_inventory)
@@ -131,4 +131,117 @@ class TestManifest(TestCase):
             units_in.append(unit)
             _unit = ref.fetch()
             self.assertEqual(unit, _unit)
-        self.verify(units, units_in)
\ No newline at end of file
+        self.verify(units, units_in)
+
+class TestDelta(TestCase):
+
+    BASE_ID = '123'
+    MANIFEST_ID = '456'
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.publish_dir = os.path.join(self.tmp_dir, 'published')
+        self.working_dir = os.path.join(self.tmp_dir, 'working_dir')
+        os.makedirs(self.publish_dir)
+        os.makedirs(self.working_dir)
+        self.downloader = HTTPSCurlDownloader(DownloaderConfig())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def units(self, numbers, version=0):
+        return [dict(type_id='T', unit_key={'n': n}, version=version) for n in numbers]
+
+    def publish(self, manifest_id, units, base=None):
+        manifest = Manifest(self.publish_dir, manifest_id)
+        delta_writer = None
+        if base is not None:
+            delta_path = os.path.join(self.publish_dir, DELTA_FILE_NAME)
+            delta_writer = DeltaWriter(delta_path, base)
+        with UnitWriter(self.publish_dir) as writer:
+            for unit in units:
+                writer.add(unit)
+                if delta_writer is not None:
+                    delta_writer.add(unit)
+        manifest.units_published(writer)
+        if delta_writer is not None:
+            delta_writer.close()
+            manifest.delta_published(delta_writer)
+        manifest.write()
+        return manifest
+
+    def fetch(self):
+        url = 'file://%s' % os.path.join(self.publish_dir, MANIFEST_FILE_NAME)
+        manifest = RemoteManifest(url, self.downloader, self.working_dir)
+        manifest.fetch()
+        return manifest
+
+    def test_delta_writer(self):
+        base = self.publish(self.BASE_ID, self.units(range(4)))
+        units = self.units([0, 1]) + self.units([2], version=1) + self.units([4])
+        # Test
+        manifest = self.publish(self.MANIFEST_ID, units, base)
+        # Verify
+        self.assertEqual(manifest.delta[DELTA_BASE], self.BASE_ID)
+        self.assertEqual(manifest.delta[UNITS_TOTAL], 3)
+        changes = list(read_units(os.path.join(self.publish_dir, DELTA_FILE_NAME)))
+        actions = sorted((c[ACTION], c[UNIT]['unit_key']['n']) for c in changes)
+        self.assertEqual(actions, [(ADDED, 4), (REMOVED, 3), (UPDATED, 2)])
+
+    def test_apply_delta(self):
+        self.publish(self.BASE_ID, self.units(range(4)))
+        local = self.fetch()
+        local.write()
+        local.fetch_units()
+        # unzipped, as it is once the units have been read
+        self.assertEqual(len(local.get_units()), 4)
+        base = Manifest(self.publish_dir)
+        base.read()
+        units = self.units([0, 1]) + self.units([2], version=1) + self.units([4])
+        self.publish(self.MANIFEST_ID, units, base)
+        # Test
+        manifest = self.fetch()
+        applied = manifest.apply_delta(local)
+        # Verify
+        self.assertTrue(applied)
+        self.assertTrue(manifest.has_valid_units())
+        units_in = sorted([u for u, r in manifest.get_units()], key=lambda u: u['unit_key']['n'])
+        self.assertEqual(units_in, units)
+        self.assertFalse(os.path.exists(os.path.join(self.working_dir, DELTA_FILE_NAME)))
+        local = Manifest(self.working_dir)
+        local.read()
+        self.assertEqual(local.id, self.MANIFEST_ID)
+
+    def test_apply_delta_other_base(self):
+        self.publish(self.BASE_ID, self.units(range(4)))
+        local = self.fetch()
+        local.id = 'other'
+        local.write()
+        local.fetch_units()
+        base = Manifest(self.publish_dir)
+        base.read()
+        self.publish(self.MANIFEST_ID, self.units(range(5)), base)
+        # Test
+        manifest = self.fetch()
+        applied = manifest.apply_delta(local)
+        # Verify
+        self.assertFalse(applied)
+
+    def test_apply_delta_units_mismatch(self):
+        self.publish(self.BASE_ID, self.units(range(4)))
+        local = self.fetch()
+        local.write()
+        local.fetch_units()
+        base = Manifest(self.publish_dir)
+        base.read()
+        self.publish(self.MANIFEST_ID, self.units(range(5)), base)
+        # the local units are not those of the base
+        local_units = os.path.join(self.working_dir, UNITS_FILE_NAME)
+        with UnitWriter(local_units) as writer:
+            writer.add(self.units([0])[0])
+        local.units_published(writer)
+        # Test
+        manifest = self.fetch()
+        applied = manifest.apply_delta(local)
+        # Verify
+        self.assertFalse(applied)
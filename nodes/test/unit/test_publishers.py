@@ -21,7 +21,7 @@ from nectar.config import DownloaderConfig
 from pulp_node import constants
 from pulp_node import pathlib
 from pulp_node.distributors.http.publisher import HttpPublisher
-from pulp_node.manifest import RemoteManifest
+from pulp_node.manifest import Manifest, RemoteManifest, DELTA_BASE, UNITS_TOTAL
 
 
 class TestHttp(TestCase):
@@ -126,6 +126,29 @@ class TestHttp(TestCase):
             self.assertEqual(unit['unit_key']['n'], n)
             n += 1
 
+    def test_publisher_delta(self):
+        # setup
+        units = self.populate()
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        virtual_host = (publish_dir, publish_dir)
+        with HttpPublisher(base_url, virtual_host, repo_id) as p:
+            p.publish(units[:2])
+            p.commit()
+        base = Manifest(pathlib.join(publish_dir, repo_id))
+        base.read()
+        # test
+        with HttpPublisher(base_url, virtual_host, repo_id) as p:
+            p.publish(units)
+            p.commit()
+        # verify
+        self.assertEqual(base.delta[DELTA_BASE], None)
+        manifest = Manifest(pathlib.join(publish_dir, repo_id))
+        manifest.read()
+        self.assertEqual(manifest.delta[DELTA_BASE], base.id)
+        self.assertEqual(manifest.delta[UNITS_TOTAL], 1)
+
     def test_unstage(self):
         # setup
         units = self.populate()
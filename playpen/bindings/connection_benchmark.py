@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2014 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Benchmark of the connections the bindings make to the server.
+
+It sends the same request to a running server with a new connection for each
+request, which the bindings used to do, and with the connections kept open
+between requests.
+
+Usage: python connection_benchmark.py host username password [requests] [path]
+"""
+
+import sys
+import time
+
+from pulp.bindings.server import PulpConnection, HTTPSServerWrapper
+
+
+def timed(wrapper, count, path):
+    start = time.time()
+    for i in range(count):
+        status, body = wrapper.request('GET', path, None)
+        if status != 200:
+            raise Exception('request failed: %s %s' % (status, body))
+    wrapper.close()
+    return time.time() - start
+
+
+def main():
+    if len(sys.argv) < 4:
+        print __doc__
+        sys.exit(1)
+    host, username, password = sys.argv[1:4]
+    count = len(sys.argv) > 4 and int(sys.argv[4]) or 200
+    path = len(sys.argv) > 5 and sys.argv[5] or '/pulp/api/v2/repositories/'
+
+    connection = PulpConnection(host, username=username, password=password)
+    print '%d requests of %s' % (count, path)
+    for name, wrapper in (('new connection each request', HTTPSServerWrapper(connection, 0)),
+                          ('connections kept open', HTTPSServerWrapper(connection))):
+        elapsed = timed(wrapper, count, path)
+        print '%-30s %10.1f ms %10.1f requests/s' % (name, elapsed * 1000, count / elapsed)
+
+
+if __name__ == '__main__':
+    main()
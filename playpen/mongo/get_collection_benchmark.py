@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2014 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Micro-benchmark of the per call overhead of pulp.server.db.connection.get_collection.
+
+It compares building a new PulpCollection on every call, which get_collection
+used to do, with the collections get_collection now builds once per name.
+Neither sends anything to the database, but a connection is made, so this
+needs the database configured in /etc/pulp/server.conf to be running.
+
+Usage: python get_collection_benchmark.py [calls]
+"""
+
+import sys
+import timeit
+
+from pulp.server import config
+from pulp.server.db import connection
+
+
+COLLECTION_NAME = 'units_rpm'
+
+
+def build_each_call():
+    # what every get_collection call used to do
+    retries = config.config.getint('database', 'operation_retries')
+    return connection.PulpCollection(connection.get_database(), COLLECTION_NAME,
+                                     retries=retries)
+
+
+def registry():
+    return connection.get_collection(COLLECTION_NAME)
+
+
+def main():
+    calls = len(sys.argv) > 1 and int(sys.argv[1]) or 10000
+    connection.initialize()
+
+    for name, function in (('built on every call', build_each_call),
+                           ('collection registry', registry)):
+        seconds = min(timeit.repeat(function, number=calls, repeat=3))
+        print '%-20s %8.2f usec per call' % (name, seconds / calls * 1000000)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2014 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Benchmark of how the celery beat scheduler picks up schedule changes.
+
+It creates schedules in the database configured in /etc/pulp/server.conf,
+which must be running, and compares loading every schedule again, which the
+scheduler used to do after any change, with applying only the changes. The
+schedules are removed when it finishes.
+
+Usage: python scheduler_benchmark.py [schedules]
+"""
+
+import sys
+import time
+
+from pulp.server.async import scheduler
+from pulp.server.async.celery_instance import celery as app
+from pulp.server.db import connection
+from pulp.server.db.model.dispatch import ScheduledCall
+
+
+RESOURCE = 'scheduler_benchmark'
+TASK = 'pulp.server.tasks.repository.sync_with_auto_publish'
+
+
+class BenchmarkScheduler(scheduler.Scheduler):
+    """
+    Scheduler that doesn't start the failure watcher, which needs a broker.
+    """
+    def __init__(self):
+        self.app = app
+        self._schedule = None
+
+
+def timed(function):
+    start = time.time()
+    function()
+    return (time.time() - start) * 1000
+
+
+def main():
+    count = len(sys.argv) > 1 and int(sys.argv[1]) or 10000
+    connection.initialize()
+    collection = ScheduledCall.get_collection()
+
+    try:
+        for i in range(count):
+            ScheduledCall('2014-01-01T00:00Z/PT24H', TASK, args=['repo-%d' % i],
+                          resource=RESOURCE).save()
+
+        sched = BenchmarkScheduler()
+        print '%d schedules' % count
+        print '%-30s %10.1f ms' % ('initial load', timed(sched.setup_schedule))
+        print '%-30s %10.1f ms' % ('check, nothing changed', timed(lambda: sched.schedule))
+
+        call = collection.find_one({'resource': RESOURCE})
+        collection.update({'_id': call['_id']}, {'$set': {'last_updated': time.time()}})
+        print '%-30s %10.1f ms' % ('reload after one change', timed(sched.setup_schedule))
+
+        collection.update({'_id': call['_id']}, {'$set': {'last_updated': time.time()}})
+        print '%-30s %10.1f ms' % ('apply one change', timed(lambda: sched.schedule))
+
+        collection.remove({'_id': call['_id']}, safe=True)
+        print '%-30s %10.1f ms' % ('apply one deletion', timed(lambda: sched.schedule))
+    finally:
+        collection.remove({'resource': RESOURCE}, safe=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -18,6 +18,12 @@ class Cataloger(object):
     def refresh(self, conduit, config, url):
         """
         Refresh the content catalog.
+        Each call refreshes one URL of a content source and may be made
+        concurrently with calls refreshing other URLs.  The cataloger should
+        add an entry for every unit provided at the URL.  Entries added by an
+        earlier refresh are purged by the platform once every URL of the
+        content source has been refreshed successfully, so they do not
+        need to be deleted.
         :param conduit: Access to pulp platform API.
         :type conduit: pulp.server.plugins.conduits.cataloger.CatalogerConduit
         :param config: The content source configuration.
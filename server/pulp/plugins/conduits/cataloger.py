@@ -10,26 +10,36 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 
+from pulp.server.db.model.content import ContentCatalog
 from pulp.server.managers import factory as managers
+from pulp.server.managers.content.catalog import INSERT_CHUNK_SIZE
 
 
 class CatalogerConduit(object):
     """
     Provides access to pulp platform API.
+    Added entries are buffered and written to the content catalog in bulk
+    whenever INSERT_CHUNK_SIZE entries have been added and when flush() is
+    called.  The caller of the cataloger must call flush() once the cataloger
+    has finished.
     """
 
-    def __init__(self, source_id, expires):
+    def __init__(self, source_id, expires, refresh_id=None):
         """
         :param source_id: The content source ID.
         :type source_id: str
         :param expires: The content expiration in seconds.
         :type expires: int
+        :param refresh_id: The ID of the refresh adding entries.
+        :type refresh_id: str
         :return:
         """
         self.source_id = source_id
         self.expires = expires
+        self.refresh_id = refresh_id
         self.added_count = 0
         self.deleted_count = 0
+        self._buffer = []
 
     def add_entry(self, type_id, unit_key, url):
         """
@@ -41,25 +51,39 @@ class CatalogerConduit(object):
         :param url: The URL used to download content associated with the unit.
         :type url: str
         """
-        manager = managers.content_catalog_manager()
-        manager.add_entry(self.source_id, self.expires, type_id, unit_key, url)
+        entry = ContentCatalog(self.source_id, self.expires, type_id, unit_key, url, self.refresh_id)
+        self._buffer.append(entry)
         self.added_count += 1
+        if len(self._buffer) >= INSERT_CHUNK_SIZE:
+            self.flush()
 
     def delete_entry(self, type_id, unit_key):
         """
         Delete an entry from the content catalog.
+        Entries already added are written first so they are deleted as well.
         :param type_id: The content unit type ID.
         :type type_id: str
         :param unit_key: The content unit key.
         :type unit_key: dict
         """
+        self.flush()
         manager = managers.content_catalog_manager()
         manager.delete_entry(self.source_id, type_id, unit_key)
         self.deleted_count += 1
 
+    def flush(self):
+        """
+        Write the buffered entries to the content catalog.
+        """
+        if not self._buffer:
+            return
+        manager = managers.content_catalog_manager()
+        manager.add_entries(self._buffer)
+        self._buffer = []
+
     def reset(self):
         """
         Reset statistics.
         """
         self.added_count = 0
-        self.deleted_count = 0
\ No newline at end of file
+        self.deleted_count = 0
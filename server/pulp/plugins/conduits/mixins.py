@@ -19,7 +19,7 @@ import sys
 import pulp.plugins.conduits._common as common_utils
 from pulp.plugins.model import Unit, PublishReport
 from pulp.plugins.types import database as types_db
-from pulp.server.async.task_status_manager import TaskStatusManager
+from pulp.server.async import progress
 from pulp.server.async.tasks import get_current_task_id
 from pulp.server.exceptions import MissingResource
 import pulp.server.managers.factory as manager_factory
@@ -32,6 +32,10 @@ from pulp.server.db.model.criteria import UnitAssociationCriteria, Criteria
 
 _LOG = logging.getLogger(__name__)
 
+# Default number of units resolved, inserted and associated per round trip
+# by AddUnitMixin.save_units
+SAVE_UNITS_BATCH_SIZE = 500
+
 # -- exceptions ---------------------------------------------------------------
 
 class ImporterConduitException(Exception):
@@ -460,7 +464,8 @@ class AddUnitMixin(object):
         - Associates the unit to the repository being synchronized.
 
         If a unit with the provided unit key already exists, it is updated with
-        the attributes on the passed-in unit.
+        the attributes on the passed-in unit. An existing unit whose stored
+        values already match is left untouched.
 
         A reference to the provided unit is returned from this call. This call
         will populate the unit's id field with the UUID for the unit.
@@ -481,7 +486,10 @@ class AddUnitMixin(object):
             try:
                 existing_unit = content_query_manager.get_content_unit_by_keys_dict(unit.type_id, unit.unit_key)
                 unit.id = existing_unit['_id']
-                content_manager.update_content_unit(unit.type_id, unit.id, pulp_unit)
+                if _unit_changed(pulp_unit, existing_unit):
+                    content_manager.update_content_unit(unit.type_id, unit.id, pulp_unit)
+                    manager_factory.applicability_regeneration_manager().record_updated_units(
+                        unit.type_id, [unit.id])
                 self._updated_count += 1
             except MissingResource:
                 unit.id = content_manager.add_content_unit(unit.type_id, None, pulp_unit)
@@ -495,6 +503,132 @@ class AddUnitMixin(object):
             _LOG.exception(_('Content unit association failed [%s]' % str(unit)))
             raise ImporterConduitException(e), None, sys.exc_info()[2]
 
+    def save_units(self, units, batch_size=SAVE_UNITS_BATCH_SIZE):
+        """
+        Bulk equivalent of save_unit. Each unit is created or updated in Pulp
+        and associated to the repository exactly as save_unit would, but the
+        database work is done in batches: existing units are resolved with one
+        query per type per batch, existing units are only written back when a
+        value differs from the stored document, new units are inserted in
+        bulk, and the associations are created in bulk. The repository's unit
+        counts are updated once per type after all batches have been saved.
+
+        The added and updated counts tracked by this conduit are incremented
+        per unit, the same way save_unit does.
+
+        A reference to each provided unit is returned from this call. This call
+        will populate each unit's id field with the UUID for the unit.
+
+        @param units: unit objects returned from the init_unit call
+        @type  units: iterable of L{Unit}
+
+        @param batch_size: maximum number of units saved per database round trip
+        @type  batch_size: int
+
+        @return: list of the provided units, their state updated from the call
+        @rtype:  list of L{Unit}
+        """
+        saved_units = []
+        unique_counts = {}
+        try:
+            saved = False
+            try:
+                batch = []
+                for unit in units:
+                    batch.append(unit)
+                    if len(batch) >= batch_size:
+                        self._save_units_batch(batch, unique_counts)
+                        saved_units.extend(batch)
+                        batch = []
+                if batch:
+                    self._save_units_batch(batch, unique_counts)
+                    saved_units.extend(batch)
+                saved = True
+            finally:
+                # Units saved before a failure remain associated, so the
+                # counts must reflect them either way. A failure to update
+                # them must not hide the error that stopped the save.
+                try:
+                    repo_manager = manager_factory.repo_manager()
+                    for type_id, unique_count in unique_counts.items():
+                        repo_manager.update_unit_count(self.repo_id, type_id, unique_count)
+                except Exception:
+                    if saved:
+                        raise
+                    _LOG.exception(_('Unit count update failed for repository [%(r)s]') %
+                                   {'r': self.repo_id})
+
+            return saved_units
+        except Exception, e:
+            _LOG.exception(_('Bulk content unit save failed for repository [%(r)s]') %
+                           {'r': self.repo_id})
+            raise ImporterConduitException(e), None, sys.exc_info()[2]
+
+    def _save_units_batch(self, units, unique_counts):
+        """
+        Saves and associates a single batch of units for save_units.
+
+        @param units: units to save; their id fields are populated by this call
+        @type  units: list of L{Unit}
+
+        @param unique_counts: mapping of type ID to the number of units newly
+               associated to the repository, updated by this call
+        @type  unique_counts: dict
+        """
+        content_query_manager = manager_factory.content_query_manager()
+        content_manager = manager_factory.content_manager()
+        association_manager = manager_factory.repo_unit_association_manager()
+        applicability_manager = manager_factory.applicability_regeneration_manager()
+
+        units_by_type = {}
+        for unit in units:
+            units_by_type.setdefault(unit.type_id, []).append(unit)
+
+        for type_id, type_units in units_by_type.items():
+            key_fields = types_db.type_units_unit_key(type_id)
+
+            unit_keys = dict((_unit_key_hash(u.unit_key), u.unit_key) for u in type_units)
+            existing_units = content_query_manager.find_by_unit_keys(type_id, unit_keys.values())
+            existing_by_key = dict((_unit_key_hash(dict((k, u[k]) for k in key_fields)), u)
+                                   for u in existing_units)
+
+            # The same unit key may appear more than once in a batch; the last
+            # unit wins, matching the behavior of repeated save_unit calls.
+            new_units = {}
+            updated_ids = set()
+            for unit in type_units:
+                key_hash = _unit_key_hash(unit.unit_key)
+                if key_hash in existing_by_key:
+                    existing_unit = existing_by_key[key_hash]
+                    unit.id = existing_unit['_id']
+                    pulp_unit = common_utils.to_pulp_unit(unit)
+                    if _unit_changed(pulp_unit, existing_unit):
+                        content_manager.update_content_unit(type_id, unit.id, pulp_unit)
+                        existing_unit.update(pulp_unit)
+                        updated_ids.add(unit.id)
+                    self._updated_count += 1
+                elif key_hash in new_units:
+                    new_units[key_hash].append(unit)
+                    self._updated_count += 1
+                else:
+                    new_units[key_hash] = [unit]
+                    self._added_count += 1
+
+            new_unit_lists = new_units.values()
+            new_unit_ids = content_manager.add_content_units(
+                type_id, [common_utils.to_pulp_unit(l[-1]) for l in new_unit_lists])
+            for unit_list, unit_id in zip(new_unit_lists, new_unit_ids):
+                for unit in unit_list:
+                    unit.id = unit_id
+
+            if updated_ids:
+                applicability_manager.record_updated_units(type_id, list(updated_ids))
+
+            unique_count = association_manager.bulk_associate_units_by_ids(
+                self.repo_id, type_id, [u.id for u in type_units],
+                self.association_owner_type, self.association_owner_id)
+            unique_counts[type_id] = unique_counts.get(type_id, 0) + unique_count
+
     def link_unit(self, from_unit, to_unit, bidirectional=False):
         """
         Creates a reference between two content units. The semantics of what
@@ -541,14 +675,16 @@ class StatusMixin(object):
         contents of the status is dependent on how the distributor
         implementation chooses to divide up the publish process.
 
+        Updates are coalesced, so the status may not be written until the
+        next call or until the task finishes, unless its state changed.
+
         @param status: contains arbitrary data to describe the state of the
                publish; the contents may contain whatever information is relevant
                to the distributor implementation so long as it is serializable
         """
         try:
             self.progress_report[self.report_id] = status
-            delta = {'progress_report': self.progress_report}
-            TaskStatusManager.update_task_status(self.task_id, delta)
+            progress.get_writer(self.task_id).set(self.report_id, status)
         except Exception, e:
             _LOG.exception('Exception from server setting progress for report [%s]' % self.report_id)
             try:
@@ -610,6 +746,38 @@ class PublishReportMixin(object):
 
 # -- utilities ----------------------------------------------------------------
 
+def _unit_key_hash(unit_key):
+    """
+    Returns a hashable representation of a unit key so units can be matched
+    by key in memory.
+
+    @param unit_key: unit key dictionary
+    @type  unit_key: dict
+
+    @rtype: tuple
+    """
+    return tuple(sorted(unit_key.items()))
+
+
+def _unit_changed(pulp_unit, existing_unit):
+    """
+    Returns whether saving the given unit would change the stored document
+    for it, so that units re-saved with identical values can be skipped.
+
+    @param pulp_unit: unit as it would be saved by the content manager
+    @type  pulp_unit: dict
+
+    @param existing_unit: unit document currently in the database
+    @type  existing_unit: dict
+
+    @rtype: bool
+    """
+    for field, value in pulp_unit.items():
+        if field not in existing_unit or existing_unit[field] != value:
+            return True
+    return False
+
+
 def do_get_repo_units(repo_id, criteria, exception_class, as_generator=False):
     """
     Performs a repo unit association query. This is split apart so we can have
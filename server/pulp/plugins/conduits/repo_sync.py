@@ -29,7 +29,9 @@ its calls into this conduit:
    b. Uses the storage_path field in the returned unit to save the bits for the
       unit to disk.
    c. Calls save_unit which creates/updates Pulp's knowledge of the content unit
-      and creates an association between the unit and the repository
+      and creates an association between the unit and the repository. Large
+      numbers of units can instead be handed to save_units, which does the
+      same work in batches.
    d. If necessary, calls link_unit to establish any relationships between units.
 3. For units previously associated with the repository (known from get_units)
    that should no longer be, calls remove_unit to remove that association.
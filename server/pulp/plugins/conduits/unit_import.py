@@ -110,6 +110,39 @@ class ImportUnitConduit(ImporterScratchPadMixin, RepoScratchPadMixin,
             _LOG.exception(_('Content unit association failed [%s]' % str(unit)))
             raise ImporterConduitException(e), None, sys.exc_info()[2]
 
+    def associate_units(self, units):
+        """
+        Associates all of the given units with the destination repository for
+        the import. The associations are created in bulk, one set of queries
+        per unit type, which is considerably faster than calling
+        associate_unit for each unit when copying large numbers of units.
+
+        This call is idempotent. Associations that already exist are left
+        unchanged.
+
+        :param units: unit objects, each with its id field populated
+        :type  units: iterable of pulp.plugins.model.Unit
+
+        :return: list of the provided units
+        :rtype:  list of pulp.plugins.model.Unit
+        """
+        units = list(units)
+        unit_ids_by_type = {}
+        for unit in units:
+            unit_ids_by_type.setdefault(unit.type_id, []).append(unit.id)
+
+        try:
+            for type_id, unit_ids in unit_ids_by_type.items():
+                self.__association_manager.associate_all_by_ids(self.dest_repo_id, type_id,
+                                                                unit_ids,
+                                                                self.association_owner_type,
+                                                                self.association_owner_id)
+            return units
+        except Exception, e:
+            _LOG.exception(_('Content unit association failed for repository [%(r)s]') %
+                           {'r': self.dest_repo_id})
+            raise ImporterConduitException(e), None, sys.exc_info()[2]
+
     def get_source_units(self, criteria=None):
         """
         Returns the collection of content units associated with the source
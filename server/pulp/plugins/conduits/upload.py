@@ -11,15 +11,53 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import sys
+
 from pulp.plugins.conduits.mixins import (
     AddUnitMixin, SingleRepoUnitsMixin, SearchUnitsMixin,
     ImporterConduitException)
+import pulp.server.managers.factory as manager_factory
+
 
 class UploadConduit(AddUnitMixin, SingleRepoUnitsMixin, SearchUnitsMixin):
 
     def __init__(self, repo_id, importer_id, association_owner_type,
-                 association_owner_id):
+                 association_owner_id, upload_id=None):
         AddUnitMixin.__init__(self, repo_id, importer_id,
                               association_owner_type, association_owner_id)
         SingleRepoUnitsMixin.__init__(self, repo_id, ImporterConduitException)
         SearchUnitsMixin.__init__(self, ImporterConduitException)
+        self.upload_id = upload_id
+
+    def get_upload_checksum(self):
+        """
+        Returns the SHA-256 digest of the uploaded file, calculated as it was
+        uploaded. Importers that need it can use it rather than reading the
+        file again. It is only known if the file was uploaded in order.
+
+        :return: hex SHA-256 digest of the uploaded file; None if it isn't known
+        :rtype:  str or None
+        """
+        if self.upload_id is None:
+            return None
+        upload_manager = manager_factory.content_upload_manager()
+        return upload_manager.upload_checksum(self.upload_id)
+
+    def store_upload(self, storage_path):
+        """
+        Moves the uploaded file to the storage path of the unit, as returned by
+        init_unit. The file is renamed rather than copied when both are on the
+        same filesystem. The file_path passed to the importer must not be used
+        afterwards.
+
+        :param storage_path: full path the file is stored at
+        :type  storage_path: str
+        :return: True if the file was renamed; False if it was copied
+        :rtype:  bool
+        :raise ImporterConduitException: if the file could not be stored
+        """
+        try:
+            upload_manager = manager_factory.content_upload_manager()
+            return upload_manager.store_upload(self.upload_id, storage_path)
+        except Exception, e:
+            raise ImporterConduitException(e), None, sys.exc_info()[2]
@@ -131,7 +131,8 @@ class Importer(object):
         * Initializing the unit through the conduit which populates the final
           destination of the unit.
         * Moving the unit from the provided temporary location into the unit's
-          final destination.
+          final destination. The conduit's store_upload call does this by
+          renaming the file where it can, rather than copying it.
         * Saving the unit in Pulp, which both adds the unit to Pulp's database and
           associates it to the repository.
 
@@ -253,3 +253,44 @@ class Profiler(object):
         :rtype:               list of str
         """
         raise NotImplementedError()
+
+    def update_applicable_units(self, unit_profile, bound_repo_id, applicability,
+                                added_unit_ids, removed_unit_ids, config, conduit):
+        """
+        Optional. Update previously calculated applicability for consumers with given
+        unit_profile after the contents of the bound repository changed, without evaluating
+        the repository's entire contents.
+
+        Only the units associated with or removed from the repository since the applicability
+        was last calculated are given. Units whose metadata was updated are included in
+        added_unit_ids so they are evaluated again. The same delta may be applied to
+        applicability that already reflects some of it, so implementations must treat the
+        unit id lists as sets: adding an id that is already applicable or removing one that
+        is not must be harmless.
+
+        Profilers that do not implement this method have their applicability recalculated
+        in full with calculate_applicable_units.
+
+        :param unit_profile:     a consumer unit profile
+        :type  unit_profile:     object
+        :param bound_repo_id:    repo id of the repository whose contents changed
+        :type  bound_repo_id:    str
+        :param applicability:    the previously calculated applicability, mapping content
+                                 type ids to lists of applicable unit ids
+        :type  applicability:    dict
+        :param added_unit_ids:   content type ids mapped to lists of ids of units added to
+                                 (or updated in) the repository; types without changes
+                                 may be missing
+        :type  added_unit_ids:   dict
+        :param removed_unit_ids: content type ids mapped to lists of ids of units removed
+                                 from the repository; types without changes may be missing
+        :type  removed_unit_ids: dict
+        :param config:           plugin configuration
+        :type  config:           pulp.server.plugins.config.PluginCallConfiguration
+        :param conduit:          provides access to relevant Pulp functionality
+        :type  conduit:          pulp.plugins.conduits.profile.ProfilerConduit
+        :return:                 the updated applicability, in the same format returned by
+                                 calculate_applicable_units
+        :rtype:                  dict
+        """
+        raise NotImplementedError()
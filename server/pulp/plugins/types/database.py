@@ -18,18 +18,35 @@ type-specific collections that exist to suit the type needs.
 """
 
 import logging
+import threading
+import time
 
 from pymongo import ASCENDING
 
 import pulp.server.db.connection as pulp_db
-from pulp.server.db.model.content import ContentType
+from pulp.server.db.model.content import ContentType, ContentTypeGeneration
 
 # -- constants ----------------------------------------------------------------
 
 TYPE_COLLECTION_PREFIX = 'units_'
 
+# _id of the generation counter document
+GENERATION_ID = 'content_types'
+
+# Seconds between checks of whether another process, such as pulp-manage-db,
+# changed the type definitions
+GENERATION_CHECK_INTERVAL = 5
+
 LOG = logging.getLogger('db')
 
+# -- registry state -----------------------------------------------------------
+
+_REGISTRY_LOCK = threading.Lock()
+_REGISTRY = None
+
+# type id -> (database, collection) of the type's units
+_UNITS_COLLECTIONS = {}
+
 # -- database exceptions ------------------------------------------------------
 
 class UpdateFailed(Exception):
@@ -127,6 +144,9 @@ def update_database(definitions, error_on_missing_definitions=False):
             error_defs.append(type_def)
             continue
 
+    # Even a partially failed update may have changed some of the definitions
+    _definitions_changed()
+
     if len(error_defs) > 0:
         raise UpdateFailed(error_defs)
 
@@ -152,10 +172,13 @@ def clean():
     type_collection = ContentType.get_collection()
     type_collection.remove(safe=True)
 
+    _definitions_changed()
+
 
 def type_units_collection(type_id):
     """
     Returns a reference to the collection used to store units of the given type.
+    The reference is created once per type and reused by later calls.
 
     @param type_id: identifier for the type
     @type  type_id: str
@@ -163,8 +186,14 @@ def type_units_collection(type_id):
     @return: database collection holding units of the given type
     @rtype:  L{pymongo.collection.Collection}
     """
+    database = pulp_db.get_database()
+    cached = _UNITS_COLLECTIONS.get(type_id)
+    # the database is compared in case the connection was initialized again
+    if cached is not None and cached[0] is database:
+        return cached[1]
     collection_name = unit_collection_name(type_id)
     collection = pulp_db.get_collection(collection_name, create=False)
+    _UNITS_COLLECTIONS[type_id] = (database, collection)
     return collection
 
 
@@ -174,12 +203,7 @@ def all_type_ids():
              if there are no IDs in the database
     @rtype:  list of str
     """
-
-    collection = ContentType.get_collection()
-    type_id_son = list(collection.find(fields={'id' : 1}))
-    type_ids = [t['id'] for t in type_id_son]
-
-    return type_ids
+    return list(_registry().type_ids)
 
 
 def all_type_collection_names():
@@ -200,28 +224,41 @@ def all_type_collection_names():
 
 def all_type_definitions():
     """
+    The definitions are shared by the whole process and cannot be modified;
+    copy.deepcopy returns a modifiable copy.
+
     @return: list of all type definitions in the database (mongo SON objects)
     @rtype:  list of dict
     """
-
-    coll = ContentType.get_collection()
-    types = list(coll.find())
-    return types
+    registry = _registry()
+    return [registry.definitions[type_id] for type_id in registry.type_ids]
 
 
 def type_definition(type_id):
     """
-    Return a type definition
+    Return a type definition. It is shared by the whole process and cannot be
+    modified; copy.deepcopy returns a modifiable copy.
+
     @param type_id: unique type id
     @type type_id: str
     @return: corresponding type definition, None if not found
     @rtype: SON or None
     """
-    collection = ContentType.get_collection()
-    type_ = collection.find_one({'id': type_id})
+    type_ = _registry().definitions.get(type_id)
+    if type_ is None:
+        # It may have been added since the definitions were loaded
+        type_ = _reload_if_defined(type_id).definitions.get(type_id)
     return type_
 
 
+def load_type_definitions():
+    """
+    Load the type definitions into the registry of this process now, rather
+    than on first use.
+    """
+    _load_registry()
+
+
 def unit_collection_name(type_id):
     """
     Returns the name of the collection used to store units of the given type.
@@ -246,8 +283,7 @@ def type_units_unit_key(type_id):
              content type collection
     @rtype: list of str or None
     """
-    collection = ContentType.get_collection()
-    type_def = collection.find_one({'id': type_id})
+    type_def = type_definition(type_id)
     if type_def is None:
         return None
     return type_def['unit_key']
@@ -274,6 +310,8 @@ def _create_or_update_type(type_def):
     # XXX this still causes a potential race condition when 2 users are updating the same type
     content_type_collection.save(content_type, safe=True)
 
+    _definitions_changed()
+
 def _update_indexes(type_def, unique):
 
     collection_name = unit_collection_name(type_def.id)
@@ -331,3 +369,136 @@ def _create_index_keypair(index):
 
     mongo_index = [(k, ASCENDING) for k in index]
     return mongo_index
+
+# -- registry -----------------------------------------------------------------
+
+class _TypeRegistry(object):
+    """
+    Snapshot of all type definitions, in the order they are found in the
+    database.
+
+    @ivar generation: generation the definitions were loaded at
+    @type generation: int
+    @ivar type_ids: ids of the types, in the order they were found
+    @type type_ids: list
+    @ivar definitions: immutable type definitions keyed by type id
+    @type definitions: dict
+    @ivar checked: time the generation was last found to be current
+    @type checked: float
+    """
+
+    def __init__(self, generation, type_ids, definitions):
+        self.generation = generation
+        self.type_ids = type_ids
+        self.definitions = definitions
+        self.checked = time.time()
+
+
+class _FrozenList(list):
+    """
+    List in a type definition, which cannot be modified.
+    """
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError('type definitions cannot be modified')
+
+    __setitem__ = __delitem__ = __setslice__ = __delslice__ = _immutable
+    __iadd__ = __imul__ = append = extend = insert = pop = remove = reverse = sort = _immutable
+
+    def __reduce__(self):
+        # copies are ordinary, modifiable lists
+        return list, (list(self),)
+
+
+class _FrozenDict(dict):
+    """
+    Type definition, or dict within one, which cannot be modified.
+    """
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError('type definitions cannot be modified')
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _immutable
+
+    def __reduce__(self):
+        # copies are ordinary, modifiable dicts
+        return dict, (dict(self),)
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return _FrozenDict((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return _FrozenList(_freeze(v) for v in value)
+    return value
+
+
+def _current_generation():
+    document = ContentTypeGeneration.get_collection().find_one({'_id': GENERATION_ID})
+    if document is None:
+        return 0
+    return document['generation']
+
+
+def _definitions_changed():
+    """
+    Record that the type definitions changed, so every process reloads them.
+    """
+    global _REGISTRY
+    ContentTypeGeneration.get_collection().update(
+        {'_id': GENERATION_ID}, {'$inc': {'generation': 1}}, upsert=True, safe=True)
+    _REGISTRY = None
+    _UNITS_COLLECTIONS.clear()
+
+
+def _load_registry():
+    """
+    Load all type definitions from the database.
+
+    @rtype: _TypeRegistry
+    """
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        # The generation is read first so a change made while loading results
+        # in another load rather than stale definitions.
+        generation = _current_generation()
+        type_ids = []
+        definitions = {}
+        for type_def in ContentType.get_collection().find():
+            type_ids.append(type_def['id'])
+            definitions[type_def['id']] = _freeze(type_def)
+        _REGISTRY = _TypeRegistry(generation, type_ids, definitions)
+        LOG.debug('Loaded type definitions [%s] generation [%s]' %
+                  (', '.join(type_ids), generation))
+        return _REGISTRY
+
+
+def _registry():
+    """
+    Return the type definitions, loading them if they have not been, or if
+    they were changed by another process since last checked.
+
+    @rtype: _TypeRegistry
+    """
+    registry = _REGISTRY
+    if registry is None:
+        return _load_registry()
+    now = time.time()
+    if now - registry.checked < GENERATION_CHECK_INTERVAL:
+        return registry
+    if _current_generation() != registry.generation:
+        return _load_registry()
+    registry.checked = now
+    return registry
+
+
+def _reload_if_defined(type_id):
+    """
+    Reload the type definitions if the given type, missing from them, has been
+    defined since they were loaded.
+
+    @rtype: _TypeRegistry
+    """
+    if ContentType.get_collection().find_one({'id': type_id}, fields=[]) is None:
+        return _registry()
+    return _load_registry()
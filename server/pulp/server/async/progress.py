@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2014 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+"""
+This module coalesces the progress reports that plugins set while a task runs, so that the task's
+status is written at most once per interval rather than once per report.
+"""
+import logging
+import threading
+import time
+
+from celery.signals import task_postrun
+
+from pulp.server.async.task_status_manager import TaskStatusManager
+from pulp.server.config import config
+
+
+logger = logging.getLogger(__name__)
+
+_LOCK = threading.Lock()
+# Maps task ids to the ProgressReportWriter for the task, so that the reports can be flushed when
+# the task finishes
+_WRITERS = {}
+
+
+class ProgressReportWriter(object):
+    """
+    Holds the latest progress reports of a task, keyed by report id, and writes the reports that
+    changed since the last write. Reports are written immediately the first time they are set and
+    whenever their state changes; otherwise they are written once the interval has passed since
+    the last write.
+
+    :ivar task_id:  The id of the task the reports are for
+    :type task_id:  basestring
+    :ivar interval: The minimum number of seconds between writes
+    :type interval: float
+    """
+
+    def __init__(self, task_id, interval=None):
+        """
+        :param task_id:  The id of the task the reports are for
+        :type  task_id:  basestring
+        :param interval: The minimum number of seconds between writes. Defaults to the
+                         progress_interval in the tasks section of the server config.
+        :type  interval: float
+        """
+        if interval is None:
+            interval = config.getfloat('tasks', 'progress_interval')
+        self.task_id = task_id
+        self.interval = interval
+        self._lock = threading.RLock()
+        self._pending = {}
+        self._states = {}
+        self._last_write = None
+
+    def set(self, report_id, report):
+        """
+        Set the progress report of the given report id, writing it and any other pending reports
+        if it is due.
+
+        :param report_id: Identifies the report within the task's progress_report
+        :type  report_id: basestring
+        :param report:    The progress report
+        :type  report:    object
+        :raise MissingResource: if a write is due and there is no status for the task
+        """
+        state = _state(report)
+        with self._lock:
+            self._pending[report_id] = report
+            due = (self._last_write is None or report_id not in self._states or
+                   self._states[report_id] != state or
+                   time.time() - self._last_write >= self.interval)
+            if due:
+                self.flush()
+
+    def flush(self):
+        """
+        Write the reports that changed since the last write.
+
+        :raise MissingResource: if there is no status for the task
+        """
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            try:
+                TaskStatusManager.update_progress_report(self.task_id, pending)
+            except Exception:
+                # Keep the reports that were not written, unless newer ones replaced them
+                pending.update(self._pending)
+                self._pending = pending
+                raise
+            self._last_write = time.time()
+            for report_id, report in pending.items():
+                self._states[report_id] = _state(report)
+
+
+def get_writer(task_id):
+    """
+    Return the ProgressReportWriter for the given task, creating it if this is the first report
+    set for the task.
+
+    :param task_id: The id of the task
+    :type  task_id: basestring
+    :return:        The task's writer
+    :rtype:         ProgressReportWriter
+    """
+    with _LOCK:
+        writer = _WRITERS.get(task_id)
+        if writer is None:
+            writer = _WRITERS[task_id] = ProgressReportWriter(task_id)
+        return writer
+
+
+def flush(task_id):
+    """
+    Write the progress reports of the given task that have not been written yet, and forget the
+    task's writer. This must be called when the task finishes, before its final state is set.
+    Failures are logged rather than raised, so that they don't mask the outcome of the task.
+
+    :param task_id: The id of the task
+    :type  task_id: basestring
+    """
+    with _LOCK:
+        writer = _WRITERS.pop(task_id, None)
+    if writer is None:
+        return
+    try:
+        writer.flush()
+    except Exception:
+        logger.exception('Failed to write the progress report of task [%s]' % task_id)
+
+
+@task_postrun.connect
+def _task_postrun(task_id=None, **kwargs):
+    """
+    Flush and forget the writer of every task the worker runs once it returns. Tasks run through
+    pulp.server.async.tasks.Task have already been flushed before their final state was set, but
+    other tasks may set progress too, and their writers would otherwise never be removed.
+
+    :param task_id: The id of the task that returned
+    :type  task_id: basestring
+    """
+    flush(task_id)
+
+
+def _state(report):
+    """
+    :param report: A progress report
+    :type  report: object
+    :return:       The value of the report's state key or, for reports made up of steps, the
+                   states of the steps; None if the report has no state
+    :rtype:        object
+    """
+    if not isinstance(report, dict):
+        return None
+    if 'state' in report:
+        return report['state']
+    return tuple((key, value.get('state')) for key, value in sorted(report.items())
+                 if isinstance(value, dict))
@@ -146,7 +146,10 @@ class Scheduler(beat.Scheduler):
     def __init__(self, *args, **kwargs):
         self._schedule = None
         self._failure_watcher = FailureWatcher()
-        self._loaded_from_db_count = 0
+        # IDs of the enabled schedules in the database, including those that
+        # are ignored because they have no remaining runs
+        self._enabled_ids = set()
+        self._most_recent_timestamp = 0
         # start monitoring events in a thread
         thread = threading.Thread(target=self._failure_watcher.monitor_events)
         thread.daemon = True
@@ -183,42 +186,69 @@ class Scheduler(beat.Scheduler):
         update_timestamps = [0]
 
         _logger.debug(_('loading schedules from DB'))
-        ignored_db_count = 0
-        self._loaded_from_db_count = 0
+        self._enabled_ids = set()
         for call in itertools.imap(ScheduledCall.from_db, utils.get_enabled()):
-            if call.remaining_runs == 0:
-                _logger.debug(_('ignoring schedule with 0 remaining runs: %(id)s') % {'id': call.id})
-                ignored_db_count += 1
-            else:
-                self._schedule[call.id] = call.as_schedule_entry()
-                update_timestamps.append(call.last_updated)
-                self._loaded_from_db_count += 1
+            self._load_call(call)
+            update_timestamps.append(call.last_updated)
 
-        _logger.debug('loaded %(count)d schedules' % {'count': self._loaded_from_db_count})
+        _logger.debug('loaded %(count)d schedules' % {'count': len(self._enabled_ids)})
 
         self._most_recent_timestamp = max(update_timestamps)
 
-    @property
-    def schedule_changed(self):
+    def update_schedule(self):
+        """
+        Applies the schedules added, changed, disabled or deleted in the database
+        since the schedule was loaded to the "_schedule" dictionary, rather than
+        loading every schedule again.
+
+        Schedules that were added or changed are found by their update
+        timestamps. Deleted schedules leave nothing to find, so they are found by
+        comparing the IDs of the enabled schedules when their number differs from
+        what was loaded. Indexing should make this very fast when nothing changed.
         """
-        Looks at the update timestamps in the database to determine if there
-        are new or modified schedules.
+        update_timestamps = [self._most_recent_timestamp]
+        for call in itertools.imap(ScheduledCall.from_db,
+                                   utils.get_changed_since(self._most_recent_timestamp)):
+            _logger.debug(_('schedule %(id)s has been updated') % {'id': call.id})
+            self._unload_call(call.id)
+            if call.enabled:
+                self._load_call(call)
+            update_timestamps.append(call.last_updated)
+        self._most_recent_timestamp = max(update_timestamps)
 
-        Indexing should make this very fast.
+        if utils.get_enabled().count() != len(self._enabled_ids):
+            _logger.debug(_('number of enabled schedules has changed'))
+            enabled_ids = utils.get_enabled_ids()
+            for schedule_id in self._enabled_ids - enabled_ids:
+                self._unload_call(schedule_id)
+            if enabled_ids != self._enabled_ids:
+                # enabled without a newer timestamp, which only a clock that is
+                # behind can cause; it is found by loading everything again
+                self.setup_schedule()
+
+    def _load_call(self, call):
+        """
+        Adds an enabled scheduled call to the schedule, unless it has no
+        remaining runs.
 
-        :return:    True iff the set of enabled scheduled calls has changed
-                    in the database.
-        :rtype:     bool
+        :param call:    an enabled scheduled call
+        :type  call:    pulp.server.db.model.dispatch.ScheduledCall
         """
-        if utils.get_enabled().count() != self._loaded_from_db_count:
-            logging.debug(_('number of enabled schedules has changed'))
-            return True
+        self._enabled_ids.add(call.id)
+        if call.remaining_runs == 0:
+            _logger.debug(_('ignoring schedule with 0 remaining runs: %(id)s') % {'id': call.id})
+        else:
+            self._schedule[call.id] = call.as_schedule_entry()
 
-        if utils.get_updated_since(self._most_recent_timestamp).count() > 0:
-            logging.debug(_('one or more enabled schedules has been updated'))
-            return True
+    def _unload_call(self, schedule_id):
+        """
+        Removes a scheduled call from the schedule, if it is there.
 
-        return False
+        :param schedule_id: ID of the scheduled call
+        :type  schedule_id: basestring
+        """
+        self._enabled_ids.discard(schedule_id)
+        self._schedule.pop(schedule_id, None)
 
     @property
     def schedule(self):
@@ -228,8 +258,10 @@ class Scheduler(beat.Scheduler):
                     the schedules currently in active use by the scheduler.
         :rtype:     dict
         """
-        if self._schedule is None or self.schedule_changed:
+        if self._schedule is None:
             self.setup_schedule()
+        else:
+            self.update_schedule()
 
         return self._schedule
 
@@ -12,14 +12,31 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 from datetime import datetime
+import hashlib
+import sys
+import threading
+import time
+
+import pymongo
 from pymongo.errors import DuplicateKeyError
 
 from pulp.common import dateutils
 from pulp.server.async import constants as dispatch_constants
+from pulp.server.compat import json, json_util, ObjectId
+from pulp.server.config import config
 from pulp.server.db.model.dispatch import TaskStatus
 from pulp.server.exceptions import DuplicateResource, InvalidValue, MissingResource
 
 
+# Number of requests in this process currently waiting in wait_for_change()
+_waits = 0
+_WAITS_LOCK = threading.Lock()
+
+
+# Number of task statuses in a page returned by find_page() when the criteria has no limit
+DEFAULT_PAGE_SIZE = 1000
+
+
 class TaskStatusManager(object):
     """
     Performs task status related functions including both CRUD operations and queries on task
@@ -153,6 +170,87 @@ class TaskStatusManager(object):
         TaskStatus.get_collection().save(task_status, safe=True)
         return task_status
 
+    @staticmethod
+    def update_progress_report(task_id, reports):
+        """
+        Sets the given reports in the progress_report of the task with given task id, leaving
+        its other reports and the rest of the task status as they are.
+
+        :param task_id: identity of the task this status corresponds to
+        :type  task_id: basestring
+        :param reports: progress reports to set, keyed by report id
+        :type  reports: dict
+        :raise MissingResource: if there is no task status corresponding to the given task_id
+        """
+        update = dict(('progress_report.%s' % report_id, report)
+                      for report_id, report in reports.items())
+        result = TaskStatus.get_collection().update({'task_id': task_id}, {'$set': update},
+                                                    safe=True)
+        if not result['n']:
+            raise MissingResource(task_id)
+
+    @staticmethod
+    def wait_for_change(task_id, since, timeout):
+        """
+        Returns the status of the given task once its hash differs from the given one, or once
+        the task is complete or the timeout has passed if it doesn't. The status is checked every
+        long_poll_interval seconds, and the timeout is limited to long_poll_timeout seconds, both
+        from the tasks section of the server config.
+
+        Each waiting request holds a server thread, so at most long_poll_max_waits requests wait
+        at once in each process; any other request gets the current status without waiting.
+
+        :param task_id: identity of the task this status corresponds to
+        :type  task_id: basestring
+        :param since:   the status_hash() of the status the caller already has, or None
+        :type  since:   basestring or None
+        :param timeout: maximum number of seconds to wait for a change
+        :type  timeout: float
+        :return: serialized task status
+        :rtype:  dict
+        :raise MissingResource: if there is no task status corresponding to the given task_id
+        """
+        interval = config.getfloat('tasks', 'long_poll_interval')
+        timeout = min(timeout, config.getfloat('tasks', 'long_poll_timeout'))
+        if not timeout > 0:
+            # negative and NaN timeouts don't wait at all
+            timeout = 0
+        deadline = time.time() + timeout
+        waiting = False
+        try:
+            while True:
+                task_status = TaskStatusManager.find_by_task_id(task_id)
+                if task_status is None:
+                    raise MissingResource(task_id)
+                if since != TaskStatusManager.status_hash(task_status) or \
+                        task_status['state'] in dispatch_constants.CALL_COMPLETE_STATES:
+                    return task_status
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return task_status
+                if not waiting:
+                    waiting = _start_wait()
+                    if not waiting:
+                        return task_status
+                time.sleep(min(interval, remaining))
+        finally:
+            if waiting:
+                _end_wait()
+
+    @staticmethod
+    def status_hash(task_status):
+        """
+        Returns a hash of the given task status, which changes whenever any part of the status,
+        such as its state or progress report, changes.
+
+        :param task_status: serialized task status
+        :type  task_status: dict
+        :return: hex digest of the task status
+        :rtype:  str
+        """
+        encoded = json.dumps(task_status, sort_keys=True, default=json_util.default)
+        return hashlib.sha1(encoded).hexdigest()
+
     @staticmethod
     def delete_task_status(task_id):
         """
@@ -205,3 +303,74 @@ class TaskStatusManager(object):
         """
         return TaskStatus.get_collection().query(criteria)
 
+    @staticmethod
+    def find_page(criteria, continuation=None):
+        """
+        Return a page of the task statuses that match the provided criteria, in the order they
+        were created. The criteria's limit is the size of the page, and defaults to
+        DEFAULT_PAGE_SIZE. Each page starts directly after the task status the previous one ended
+        with, so the cost of retrieving a page does not depend on how many came before it.
+
+        :param criteria:     A Criteria object representing a search you want to perform. It
+                             may not have a sort or a skip.
+        :type  criteria:     pulp.server.db.model.criteria.Criteria
+        :param continuation: The continuation returned with the previous page, or None to
+                             retrieve the first page
+        :type  continuation: basestring or None
+        :return:    The task statuses in the page, and the continuation to pass to retrieve the
+                    next page; the continuation is None if this is the last page.
+        :rtype:     tuple of (list, basestring or None)
+        :raise InvalidValue: if the criteria has a sort or a skip, or the continuation was not
+                             returned by this method
+        """
+        if criteria.sort:
+            raise InvalidValue(['sort'])
+        if criteria.skip:
+            raise InvalidValue(['skip'])
+        page_size = criteria.limit or DEFAULT_PAGE_SIZE
+
+        spec = criteria.spec or {}
+        if continuation is not None:
+            try:
+                after = ObjectId(continuation)
+            except Exception:
+                raise InvalidValue(['continuation']), None, sys.exc_info()[2]
+            spec = {'$and': [spec, {'_id': {'$gt': after}}]}
+
+        cursor = TaskStatus.get_collection().find(spec, fields=criteria.fields)
+        task_statuses = list(cursor.sort('_id', pymongo.ASCENDING).limit(page_size))
+        next_continuation = None
+        if len(task_statuses) == page_size:
+            next_continuation = str(task_statuses[-1]['_id'])
+        return task_statuses, next_continuation
+
+
+def _start_wait():
+    """
+    Claims one of the long_poll_max_waits waits allowed in this process.
+
+    :return: True if the wait was claimed and must be released with _end_wait(), False if the
+             limit has been reached
+    :rtype:  bool
+    """
+    global _waits
+    _WAITS_LOCK.acquire()
+    try:
+        if _waits >= config.getint('tasks', 'long_poll_max_waits'):
+            return False
+        _waits += 1
+        return True
+    finally:
+        _WAITS_LOCK.release()
+
+
+def _end_wait():
+    """
+    Releases a wait claimed with _start_wait().
+    """
+    global _waits
+    _WAITS_LOCK.acquire()
+    try:
+        _waits -= 1
+    finally:
+        _WAITS_LOCK.release()
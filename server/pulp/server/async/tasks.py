@@ -22,13 +22,12 @@ from celery.result import AsyncResult
 
 from pulp.common import dateutils
 from pulp.common.error_codes import PLP0023
-from pulp.server.async import constants as dispatch_constants
+from pulp.server.async import constants as dispatch_constants, progress
 from pulp.server.async.celery_instance import celery, RESOURCE_MANAGER_QUEUE
 from pulp.server.async.task_status_manager import TaskStatusManager
 from pulp.server.exceptions import PulpException, MissingResource, PulpCodedException
 from pulp.server.db.model.criteria import Criteria
 from pulp.server.db.model.dispatch import TaskStatus
-from pulp.server.db.model.resources import AvailableQueue, DoesNotExist, ReservedResource
 from pulp.server.managers import resources
 
 
@@ -126,78 +125,15 @@ def _delete_queue(queue):
 @task
 def _queue_release_resource(resource_id):
     """
-    This function will queue the _release_resource() task in the resource manager's queue for the
-    given resource_id. It is necessary to have this function in addition to the _release_resource()
-    function because we typically do not want to queue the _release_resource() task until the task
-    that is using the resource is finished. Therefore, when queuing a function that reserves a
-    resource, you should always queue a call to this function after it, and it is important that you
-    queue this task in the same queue that the resource reserving task is being performed in so that
-    it happens afterwards. You should not queue the _release_resource() task yourself.
+    This function will release the reservation on the given resource_id. When queuing a function
+    that reserves a resource, you should always queue a call to this function after it, and it is
+    important that you queue this task in the same queue that the resource reserving task is being
+    performed in so that it happens afterwards. apply_async_with_reservation() does this for you.
 
     :param resource_id: The resource_id that you wish to release
     :type  resource_id: basestring
     """
-    _release_resource.apply_async(args=(resource_id,), queue=RESOURCE_MANAGER_QUEUE)
-
-
-@task
-def _release_resource(resource_id):
-    """
-    Do not queue this task yourself, but always use the _queue_release_resource() task instead.
-    Please see the docblock on that function for an explanation.
-
-    When a resource-reserving task is complete, this method must be called with the
-    resource_id so that the we know when it is safe to unmap a resource_id from
-    its given queue name.
-
-    :param resource_id: The resource that is no longer in use
-    :type  resource_id: basestring
-    """
-    try:
-        reserved_resource = ReservedResource(resource_id)
-        reserved_resource.decrement_num_reservations()
-        # Now we need to decrement the AvailabeQueue that the reserved_resource was using. If the
-        # ReservedResource does not exist for some reason, we won't know its assigned_queue, but
-        # these next lines won't execute anyway.
-        available_queue = AvailableQueue(reserved_resource.assigned_queue)
-        available_queue.decrement_num_reservations()
-    except DoesNotExist:
-        # If we are trying to decrement the count on one of these obejcts, and they don't exist,
-        # that's OK
-        pass
-
-
-@task
-def _reserve_resource(resource_id):
-    """
-    When you wish you queue a task that needs to reserve a resource, you should make a call to this
-    function() first, queueing it in the RESOURCE_MANAGER_QUEUE. This Task will return the
-    name of the queue you should put your task in.
-
-    Please be sure to also add a task to run _queue_release_resource() in the same queue name that
-    this function returns to you. It is important that _release_resource() is called after your task
-    is completed, regardless of whether your task completes successfully or not.
-
-    :param resource_id: The name of the resource you wish to reserve for your task. The system
-                        will ensure that no other tasks that want that same reservation will run
-                        concurrently with yours.
-    :type  resource_id: basestring
-    :return:            The name of a queue that you should put your task in
-    :rtype:             basestring
-    """
-    reserved_resource = resources.get_or_create_reserved_resource(resource_id)
-    if reserved_resource.assigned_queue is None:
-        # The assigned_queue will be None if the reserved_resource was just created, so we'll
-        # need to assign a queue to it
-        reserved_resource.assigned_queue = resources.get_least_busy_available_queue().name
-        reserved_resource.save()
-    else:
-        # The assigned_queue is set, so we just need to increment the num_reservations on the
-        # reserved resource
-        reserved_resource.increment_num_reservations()
-
-    AvailableQueue(reserved_resource.assigned_queue).increment_num_reservations()
-    return reserved_resource.assigned_queue
+    resources.release_resources([resource_id])
 
 
 class TaskResult(object):
@@ -295,7 +231,9 @@ class ReservedTaskMixin(object):
         # Form a resource_id for reservation by combining given resource type and id. This way,
         # two different resources having the same id will not block each other.
         resource_id = ":".join((resource_type, resource_id))
-        queue = _reserve_resource.apply_async((resource_id,), queue=RESOURCE_MANAGER_QUEUE).get()
+        # The reservation is made here rather than by the resource manager, so the caller doesn't
+        # wait on a round trip through the broker before the task is queued.
+        queue = resources.reserve_resource(resource_id)
 
         kwargs['queue'] = queue
         try:
@@ -384,6 +322,8 @@ class Task(CeleryTask, ReservedTaskMixin):
         """
         logger.debug("Task successful : [%s]" % task_id)
         if not self.request.called_directly:
+            # Write any progress the task reported since the last write before it is finished
+            progress.flush(task_id)
             now = datetime.now(dateutils.utc_tz())
             finish_time = dateutils.format_iso8601_datetime(now)
             delta = {'state': dispatch_constants.CALL_FINISHED_STATE,
@@ -421,6 +361,7 @@ class Task(CeleryTask, ReservedTaskMixin):
         """
         logger.debug("Task failed : [%s]" % task_id)
         if not self.request.called_directly:
+            progress.flush(task_id)
             now = datetime.now(dateutils.utc_tz())
             finish_time = dateutils.format_iso8601_datetime(now)
             delta = {'state': dispatch_constants.CALL_ERROR_STATE,
@@ -34,6 +34,7 @@ _default_values = {
         'repo_sync_history': '60',
         'repo_publish_history': '60',
         'repo_group_publish_history': '60',
+        'task_status_history': '7',
     },
     'database': {
         'name': 'pulp_database',
@@ -45,6 +46,14 @@ _default_values = {
         'port': '25',
         'enabled' : 'false'
     },
+    'notifications': {
+        'workers': '4',
+        'queue_size': '1000',
+        'queue_timeout': '5',
+        'retries': '3',
+        'retry_delay': '1',
+        'batch_size': '100',
+    },
     'oauth': {
         'enabled': 'false',
     },
@@ -79,6 +88,8 @@ _default_values = {
         'user_cert_expiration': '7',
         'consumer_cert_expiration': '3650',
         'serial_number_path': '/var/lib/pulp/sn.dat',
+        'auth_cache_ttl': '300',
+        'auth_cache_max_size': '10000',
     },
     'server': {
         'server_name': socket.gethostname(),
@@ -95,6 +106,10 @@ _default_values = {
         'create_weight': '0',
         'publish_weight': '1',
         'sync_weight': '2',
+        'progress_interval': '0.5',
+        'long_poll_interval': '0.5',
+        'long_poll_timeout': '5',
+        'long_poll_max_waits': '2',
     },
 }
 
@@ -9,7 +9,11 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import sys
+import time
+
 from logging import getLogger
+from threading import Thread, RLock, Condition
 
 from nectar.listener import DownloadEventListener
 from nectar.request import DownloadRequest
@@ -20,6 +24,9 @@ from pulp.server.content.sources.model import ContentSource, PrimarySource, Refr
 
 log = getLogger(__name__)
 
+# The maximum number of URLs refreshed concurrently by ContentContainer.refresh().
+REFRESH_THREADS = 4
+
 
 class ContentContainer(object):
     """
@@ -67,6 +74,9 @@ class ContentContainer(object):
         content sources in the order specified by priority.  The specified
         downloader is designated as the primary source and is used in the event that
         the request cannot be completed using alternate sources.
+        The content sources download concurrently, each using its own downloader
+        and limited by its own max_concurrent setting.  A failed request is
+        queued to its next content source as soon as it fails.
         :param cancel_event: An event that indicates the download has been canceled.
         :type cancel_event: threading.Event
         :param downloader: A primary nectar downloader.  Used to download the
@@ -77,27 +87,50 @@ class ContentContainer(object):
         :type request_list: list
         :param listener: An optional download request listener.
         :type listener: Listener
+        :return: The download statistics keyed by content source ID.
+        :rtype: dict
         """
         self.refresh(cancel_event)
         primary = PrimarySource(downloader)
+        self.find_sources(primary, request_list)
+        if cancel_event.isSet():
+            return {}
+        scheduler = DownloadScheduler(cancel_event, listener)
+        stats = scheduler.run(self.collated(request_list))
+        if listener:
+            NectarListener._notify(listener.download_stats, stats)
+        return stats
+
+    def find_sources(self, primary, request_list):
+        """
+        Find the content sources for each download request.  The content
+        catalog entries for all of the requests for each unit type are
+        found using find_many() rather than one query per request.  When there
+        are no alternate content sources, the catalog is not searched.
+        :param primary: The primary content source.
+        :type primary: ContentSource
+        :param request_list: A list of pulp.server.content.sources.model.Request.
+        :type request_list: list
+        """
+        requests_by_type = {}
         for request in request_list:
-            request.find_sources(primary, self.sources)
-        while not cancel_event.isSet():
-            collated = self.collated(request_list)
-            if not collated:
-                #  Either we have exhausted our content sources or all
-                #  of the requests have been satisfied.
-                break
-            for source, nectar_list in collated.items():
-                downloader = source.downloader()
-                downloader.event_listener = NectarListener(cancel_event, downloader, listener)
-                downloader.download(nectar_list)
-                if cancel_event.isSet():
-                    break
+            requests_by_type.setdefault(request.type_id, []).append(request)
+        catalog = managers.content_catalog_manager()
+        for type_id, requests in requests_by_type.items():
+            if self.sources:
+                found = catalog.find_many(type_id, [r.unit_key for r in requests])
+            else:
+                found = [[]] * len(requests)
+            for request, entries in zip(requests, found):
+                request.find_sources(primary, self.sources, entries)
 
     def refresh(self, cancel_event, force=False):
         """
         Refresh the content catalog using available content sources.
+        The URLs of all of the content sources are refreshed concurrently
+        using up to REFRESH_THREADS threads.  Once every URL of a content source
+        has been refreshed successfully, the entries added by earlier refreshes
+        of that source are purged.
         :param cancel_event: An event that indicates the refresh has been canceled.
         :type cancel_event: threading.Event
         :param force: Force refresh of content sources with unexpired catalog entries.
@@ -105,22 +138,25 @@ class ContentContainer(object):
         :return: A list of refresh reports.
         :rtype: list of: pulp.server.content.sources.model.RefreshReport
         """
-        reports = []
         catalog = managers.content_catalog_manager()
-        for source_id, source in self.sources.items():
-            if cancel_event.isSet():
-                break
+        if cancel_event.isSet():
+            return []
+        jobs = []
+        for source_id, source in sorted(self.sources.items()):
             if force or not catalog.has_entries(source_id):
-                try:
-                    report = source.refresh(cancel_event)
-                    reports.extend(report)
-                except Exception, e:
-                    log.error('refresh %s, failed: %s', source_id, e)
-                    report = RefreshReport(source_id, '')
-                    report.errors.append(str(e))
-                    reports.append(report)
+                refresh_id = source.refresh_id()
+                for url in source.urls():
+                    jobs.append((source, url, refresh_id))
+        pool = RefreshPool(cancel_event, jobs)
+        reports = pool.run(REFRESH_THREADS)
+        refreshed = {}
+        for (source, url, refresh_id), report in zip(jobs, reports):
+            if report is not None:
+                refreshed.setdefault(source, (refresh_id, []))[1].append(report)
+        for source, (refresh_id, source_reports) in refreshed.items():
+            source.purge_superseded(refresh_id, source_reports)
         catalog.purge_expired()
-        return reports
+        return [r for r in reports if r is not None]
 
     def purge_orphans(self):
         """
@@ -133,6 +169,347 @@ class ContentContainer(object):
         catalog.purge_orphans(valid_ids)
 
 
+class RefreshPool(object):
+    """
+    A bounded pool of threads used to refresh content source URLs.
+    Each thread refreshes URLs until none are left or the refresh
+    has been canceled.
+    :ivar cancel_event: An event that indicates the refresh has been canceled.
+    :type cancel_event: threading.Event
+    :ivar jobs: A list of tuple: (ContentSource, url, refresh_id).
+    :type jobs: list
+    :ivar reports: The refresh report for each job.  None when the job
+        was not run because the refresh was canceled.
+    :type reports: list
+    """
+
+    def __init__(self, cancel_event, jobs):
+        """
+        :param cancel_event: An event that indicates the refresh has been canceled.
+        :type cancel_event: threading.Event
+        :param jobs: A list of tuple: (ContentSource, url, refresh_id).
+        :type jobs: list
+        """
+        self.cancel_event = cancel_event
+        self.jobs = jobs
+        self.reports = [None] * len(jobs)
+        self._next = 0
+        self._lock = RLock()
+
+    def run(self, threads):
+        """
+        Run the jobs and wait for them to finish.
+        :param threads: The maximum number of threads.
+        :type threads: int
+        :return: The refresh report for each job.  None when the job
+            was not run because the refresh was canceled.
+        :rtype: list
+        """
+        pool = []
+        for n in range(min(threads, len(self.jobs))):
+            thread = Thread(target=self._work, name='refresh-%d' % n)
+            thread.setDaemon(True)
+            thread.start()
+            pool.append(thread)
+        for thread in pool:
+            thread.join()
+        return self.reports
+
+    def _take(self):
+        """
+        Take the next job.
+        :return: The index of the next job; or None when no jobs remain
+            or the refresh has been canceled.
+        :rtype: int
+        """
+        with self._lock:
+            if self._next >= len(self.jobs) or self.cancel_event.isSet():
+                return None
+            index = self._next
+            self._next += 1
+            return index
+
+    def _work(self):
+        """
+        Refresh URLs until no jobs remain or the refresh has been canceled.
+        """
+        while True:
+            index = self._take()
+            if index is None:
+                break
+            source, url, refresh_id = self.jobs[index]
+            try:
+                report = source.refresh_url(url, refresh_id)
+            except Exception, e:
+                log.error('refresh %s, failed: %s', source.id, e)
+                report = RefreshReport(source.id, url)
+                report.errors.append(str(e))
+            self.reports[index] = report
+
+
+class DownloadStats(object):
+    """
+    Download statistics for a content source.
+    :ivar source_id: The content source ID.
+    :type source_id: str
+    :ivar succeeded: The number of requests downloaded.
+    :type succeeded: int
+    :ivar failed: The number of requests that failed.
+    :type failed: int
+    :ivar bytes: The number of bytes downloaded.
+    :type bytes: int
+    :ivar elapsed: The number of seconds spent downloading.
+    :type elapsed: float
+    """
+
+    def __init__(self, source_id):
+        """
+        :param source_id: The content source ID.
+        :type source_id: str
+        """
+        self.source_id = source_id
+        self.succeeded = 0
+        self.failed = 0
+        self.bytes = 0
+        self.elapsed = 0.0
+
+    def throughput(self):
+        """
+        Get the download throughput.
+        :return: The number of bytes downloaded per second.
+        :rtype: float
+        """
+        if not self.elapsed:
+            return 0.0
+        return self.bytes / self.elapsed
+
+
+class SourceWorker(object):
+    """
+    Downloads the requests queued to a content source using a thread.
+    The thread downloads whatever is queued, one batch after another,
+    and ends when the queue is empty or the download has been canceled.
+    It is started again when more requests are queued.
+    :ivar scheduler: The scheduler that owns the worker.
+    :type scheduler: DownloadScheduler
+    :ivar source: The content source.
+    :type source: pulp.server.content.sources.model.ContentSource
+    :ivar queue: The queued nectar download requests.
+    :type queue: list
+    :ivar running: Indicates whether the thread is running.
+    :type running: bool
+    :ivar stats: The download statistics.
+    :type stats: DownloadStats
+    """
+
+    def __init__(self, scheduler, source):
+        """
+        :param scheduler: The scheduler that owns the worker.
+        :type scheduler: DownloadScheduler
+        :param source: The content source.
+        :type source: pulp.server.content.sources.model.ContentSource
+        """
+        self.scheduler = scheduler
+        self.source = source
+        self.queue = []
+        self.running = False
+        self.stats = DownloadStats(source.id)
+        self._downloader = None
+        self._lock = RLock()
+
+    def start(self):
+        """
+        Start the thread.
+        Must be called while holding the scheduler lock.
+        :return: The started thread.
+        :rtype: threading.Thread
+        """
+        self.running = True
+        thread = Thread(target=self._run, name='download-%s' % self.source.id)
+        thread.setDaemon(True)
+        thread.start()
+        return thread
+
+    def succeeded(self, report):
+        """
+        A request downloaded by this worker has succeeded.
+        :param report: A nectar download report.
+        :type report: nectar.report.DownloadReport
+        """
+        with self._lock:
+            self.stats.succeeded += 1
+            self.stats.bytes += report.bytes_downloaded or 0
+
+    def failed(self, request):
+        """
+        A request downloaded by this worker has failed.
+        The request is queued to its next content source.
+        :param request: The failed request.
+        :type request: pulp.server.content.sources.model.Request
+        :return: True if queued to another content source.
+        :rtype: bool
+        """
+        with self._lock:
+            self.stats.failed += 1
+        return self.scheduler.schedule(request)
+
+    def _run(self):
+        """
+        Download queued requests until none remain or the
+        download has been canceled.
+        """
+        condition = self.scheduler.condition
+        while True:
+            with condition:
+                batch = self.queue
+                self.queue = []
+                if not batch:
+                    self.running = False
+                    condition.notifyAll()
+                    return
+            try:
+                self._download(batch)
+            except Exception:
+                self.scheduler.exc_info = sys.exc_info()
+                canceled = True
+            else:
+                canceled = self.scheduler.cancel_event.isSet()
+            if canceled:
+                with condition:
+                    self.queue = []
+                    self.running = False
+                    condition.notifyAll()
+                return
+
+    def _download(self, batch):
+        """
+        Download a batch of requests.
+        :param batch: A list of nectar download requests.
+        :type batch: list
+        """
+        if self._downloader is None:
+            try:
+                self._downloader = self.source.downloader()
+            except Exception, e:
+                log.error('downloader for %s, failed: %s', self.source.id, e)
+                for nectar_request in batch:
+                    request = nectar_request.data
+                    request.errors.append(str(e))
+                    self.failed(request)
+                return
+        downloader = self._downloader
+        downloader.event_listener = NectarListener(
+            self.scheduler.cancel_event, downloader, self.scheduler.listener, self)
+        started = time.time()
+        try:
+            downloader.download(batch)
+        finally:
+            with self._lock:
+                self.stats.elapsed += time.time() - started
+
+
+class DownloadScheduler(object):
+    """
+    Downloads requests using each content source concurrently.
+    Each content source has a worker that downloads the requests queued
+    to it.  A request that fails is queued to its next content source as
+    soon as it fails rather than after every content source has finished.
+    :ivar cancel_event: An event that indicates the download has been canceled.
+    :type cancel_event: threading.Event
+    :ivar listener: An optional download request listener.
+    :type listener: Listener
+    :ivar workers: The workers keyed by content source.
+    :type workers: dict
+    :ivar condition: Protects the workers and is notified when a worker stops.
+    :type condition: threading.Condition
+    :ivar exc_info: The exception raised by a downloader.
+    :type exc_info: tuple
+    """
+
+    def __init__(self, cancel_event, listener=None):
+        """
+        :param cancel_event: An event that indicates the download has been canceled.
+        :type cancel_event: threading.Event
+        :param listener: An optional download request listener.
+        :type listener: Listener
+        """
+        self.cancel_event = cancel_event
+        self.listener = listener
+        self.workers = {}
+        self.condition = Condition(RLock())
+        self.exc_info = None
+        self._threads = []
+
+    def run(self, collated):
+        """
+        Download the collated requests and wait for every worker to finish.
+        An exception raised by a downloader is raised once the
+        workers have finished.
+        :param collated: A dictionary of nectar download requests
+            collated by content source.
+        :type collated: dict
+        :return: The download statistics keyed by content source ID.
+        :rtype: dict
+        """
+        with self.condition:
+            for source, nectar_list in collated.items():
+                for nectar_request in nectar_list:
+                    self._queue(source, nectar_request)
+            while self._running():
+                self.condition.wait()
+        for thread in self._threads:
+            thread.join()
+        if self.exc_info:
+            raise self.exc_info[0], self.exc_info[1], self.exc_info[2]
+        return dict((w.source.id, w.stats) for w in self.workers.values())
+
+    def schedule(self, request):
+        """
+        Queue a request to its next content source.
+        :param request: A download request.
+        :type request: pulp.server.content.sources.model.Request
+        :return: True if queued; False when the request has no more sources.
+        :rtype: bool
+        """
+        source = request.next_source()
+        if source is None:
+            return False
+        nectar_request = DownloadRequest(source[1], request.destination, data=request)
+        with self.condition:
+            self._queue(source[0], nectar_request)
+        return True
+
+    def _queue(self, source, nectar_request):
+        """
+        Queue a nectar request to the worker for the content source,
+        starting the worker as needed.
+        Must be called while holding the lock.
+        :param source: A content source.
+        :type source: pulp.server.content.sources.model.ContentSource
+        :param nectar_request: A nectar download request.
+        :type nectar_request: nectar.request.DownloadRequest
+        """
+        worker = self.workers.get(source)
+        if worker is None:
+            worker = SourceWorker(self, source)
+            self.workers[source] = worker
+        worker.queue.append(nectar_request)
+        if not worker.running:
+            self._threads.append(worker.start())
+
+    def _running(self):
+        """
+        Get whether any worker is running.
+        Must be called while holding the lock.
+        :return: True if running.
+        :rtype: bool
+        """
+        for worker in self.workers.values():
+            if worker.running:
+                return True
+        return False
+
+
 class Listener(object):
     """
     Download event listener.
@@ -159,6 +536,14 @@ class Listener(object):
         :type request: pulp.server.content.sources.model.Request
         """
 
+    def download_stats(self, stats):
+        """
+        Notification of the download statistics of each content source
+        used once downloading has finished.
+        :param stats: The download statistics keyed by content source ID.
+        :type stats: dict of: DownloadStats
+        """
+
 
 class NectarListener(DownloadEventListener):
 
@@ -177,7 +562,7 @@ class NectarListener(DownloadEventListener):
         except Exception:
             log.exception(str(method))
 
-    def __init__(self, cancel_event, downloader, listener=None):
+    def __init__(self, cancel_event, downloader, listener=None, worker=None):
         """
         :param cancel_event: An event that indicates the download has been canceled.
         :type cancel_event: threading.Event
@@ -185,10 +570,13 @@ class NectarListener(DownloadEventListener):
         :type downloader: nectar.downloaders.base.Downloader
         :param listener: An optional download request listener.
         :type listener: Listener
+        :param worker: The optional worker using the downloader.
+        :type worker: SourceWorker
         """
         self.cancel_event = cancel_event
         self.downloader = downloader
         self.listener = listener
+        self.worker = worker
 
     def download_started(self, report):
         """
@@ -219,6 +607,8 @@ class NectarListener(DownloadEventListener):
             return
         request = report.data
         request.downloaded = True
+        if self.worker is not None:
+            self.worker.succeeded(report)
         listener = self.listener
         if not listener:
             return
@@ -227,6 +617,7 @@ class NectarListener(DownloadEventListener):
     def download_failed(self, report):
         """
         Nectar download failed.
+        The request is queued to its next content source by the worker.
         Forwarded to the listener registered with the container.
         The request is marked as failed ONLY if the request has no more
         content sources to try.
@@ -238,9 +629,13 @@ class NectarListener(DownloadEventListener):
             return
         request = report.data
         request.errors.append(report.error_msg)
+        if self.worker is not None:
+            retrying = self.worker.failed(request)
+        else:
+            retrying = request.has_source()
         listener = self.listener
         if not listener:
             return
-        if request.has_source():
+        if retrying:
             return
         self._notify(listener.download_failed, request)
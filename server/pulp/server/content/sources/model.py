@@ -12,7 +12,9 @@
 import sys
 import os
 import re
+import time
 
+from uuid import uuid4
 from urlparse import urlsplit, urljoin
 from logging import getLogger
 from ConfigParser import ConfigParser
@@ -89,7 +91,7 @@ class Request(object):
         self.errors = []
         self.data = None
 
-    def find_sources(self, primary, alternates):
+    def find_sources(self, primary, alternates, entries=None):
         """
         Find and set the list of content sources in the order they are to
         be used to satisfy the request.  The alternate sources are
@@ -98,10 +100,15 @@ class Request(object):
         :type primary: ContentSource
         :param alternates: A list of alternative sources.
         :type list of: ContentSource
+        :param entries: The content catalog entries for the requested unit when
+            already found.  When None, they are found in the catalog.
+        :type entries: list
         """
         resolved = [(primary, self.url)]
-        catalog = managers.content_catalog_manager()
-        for entry in catalog.find(self.type_id, self.unit_key):
+        if entries is None:
+            catalog = managers.content_catalog_manager()
+            entries = catalog.find(self.type_id, self.unit_key)
+        for entry in entries:
             source_id = entry[constants.SOURCE_ID]
             source = alternates.get(source_id)
             if source is None:
@@ -280,35 +287,84 @@ class ContentSource(object):
     def refresh(self, cancel_event):
         """
         Refresh the content catalog using the cataloger plugin as
-        defined by the "type" descriptor property.
+        defined by the "type" descriptor property.  The URLs are refreshed
+        one after another.  When all of them succeed, the entries added by
+        earlier refreshes are purged.
         :param cancel_event: An event that indicates the refresh has been canceled.
         :type cancel_event: threading.Event
         :return: The list of refresh reports.
         :rtype: list of: RefreshReport
         """
         reports = []
-        plugin_id = self.descriptor[constants.TYPE]
-        plugin, cfg = plugins.get_cataloger_by_id(plugin_id)
-        conduit = CatalogerConduit(self.id, self.expires())
+        refresh_id = self.refresh_id()
         for url in self.urls():
             if cancel_event.isSet():
                 break
-            conduit.reset()
-            report = RefreshReport(self.id, url)
-            log.info(REFRESHING, self.id, url)
-            try:
-                plugin.refresh(conduit, self.descriptor, url)
-                log.info(REFRESH_SUCCEEDED, self.id, conduit.added_count, conduit.deleted_count)
-                report.succeeded = True
-                report.added_count = conduit.added_count
-                report.deleted_count = conduit.deleted_count
-            except Exception, e:
-                log.error(REFRESH_FAILED, self.id, url, e)
-                report.errors.append(str(e))
-            finally:
-                reports.append(report)
+            reports.append(self.refresh_url(url, refresh_id))
+        self.purge_superseded(refresh_id, reports)
         return reports
 
+    def refresh_id(self):
+        """
+        Get a new refresh ID.  The entries added by a refresh of all of the
+        URLs are added under the same refresh ID.
+        :return: A new refresh ID.
+        :rtype: str
+        """
+        return str(uuid4())
+
+    def refresh_url(self, url, refresh_id):
+        """
+        Refresh the content catalog for one of the URLs using the cataloger
+        plugin as defined by the "type" descriptor property.  Entries are
+        added under the specified refresh ID.
+        :param url: The URL to be refreshed.
+        :type url: str
+        :param refresh_id: The refresh ID.
+        :type refresh_id: str
+        :return: The refresh report.
+        :rtype: RefreshReport
+        """
+        report = RefreshReport(self.id, url)
+        report.started = time.time()
+        log.info(REFRESHING, self.id, url)
+        try:
+            plugin_id = self.descriptor[constants.TYPE]
+            plugin, cfg = plugins.get_cataloger_by_id(plugin_id)
+            conduit = CatalogerConduit(self.id, self.expires(), refresh_id)
+            plugin.refresh(conduit, self.descriptor, url)
+            conduit.flush()
+            log.info(REFRESH_SUCCEEDED, self.id, conduit.added_count, conduit.deleted_count)
+            report.succeeded = True
+            report.added_count = conduit.added_count
+            report.deleted_count = conduit.deleted_count
+        except Exception, e:
+            log.error(REFRESH_FAILED, self.id, url, e)
+            report.errors.append(str(e))
+        report.duration = time.time() - report.started
+        return report
+
+    def purge_superseded(self, refresh_id, reports):
+        """
+        Purge the entries added by earlier refreshes when every URL
+        has been refreshed successfully under the specified refresh ID.
+        Otherwise, the earlier entries remain until they expire.
+        :param refresh_id: The refresh ID.
+        :type refresh_id: str
+        :param reports: The refresh reports for the refresh ID.
+        :type reports: list of: RefreshReport
+        :return: True if purged.
+        :rtype: bool
+        """
+        if len(reports) < len(self.urls()):
+            return False
+        for report in reports:
+            if not report.succeeded:
+                return False
+        catalog = managers.content_catalog_manager()
+        catalog.purge_superseded(self.id, refresh_id)
+        return True
+
     def __eq__(self, other):
         return self.id == other.id
 
@@ -370,6 +426,10 @@ class RefreshReport(object):
     :type deleted_count: int
     :ivar errors: The list of errors.
     :type errors: list
+    :ivar started: When the refresh started (seconds since the epoch).
+    :type started: float
+    :ivar duration: How long the refresh took in seconds.
+    :type duration: float
     """
 
     def __init__(self, source_id, url):
@@ -384,4 +444,6 @@ class RefreshReport(object):
         self.succeeded = False
         self.added_count = 0
         self.deleted_count = 0
-        self.errors = []
\ No newline at end of file
+        self.errors = []
+        self.started = None
+        self.duration = 0
\ No newline at end of file
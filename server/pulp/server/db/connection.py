@@ -29,16 +29,29 @@ from pulp.server.exceptions import PulpException
 _CONNECTION = None
 _DATABASE = None
 
+# collection name -> PulpCollection, built once for each name
+_COLLECTIONS = {}
+_RETRIES = None
+
 _LOG = logging.getLogger(__name__)
 _DEFAULT_MAX_POOL_SIZE = 10
 
+# read_preference values in server.conf -> pymongo read preferences
+_READ_PREFERENCES = {
+    'primary': pymongo.ReadPreference.PRIMARY,
+    'primaryPreferred': pymongo.ReadPreference.PRIMARY_PREFERRED,
+    'secondary': pymongo.ReadPreference.SECONDARY,
+    'secondaryPreferred': pymongo.ReadPreference.SECONDARY_PREFERRED,
+    'nearest': pymongo.ReadPreference.NEAREST,
+}
+
 # -- connection api ------------------------------------------------------------
 
 def initialize(name=None, seeds=None, max_pool_size=None, replica_set=None):
     """
     Initialize the connection pool and top-level database for pulp.
     """
-    global _CONNECTION, _DATABASE
+    global _CONNECTION, _DATABASE, _RETRIES
 
     try:
         connection_kwargs = {}
@@ -50,10 +63,20 @@ def initialize(name=None, seeds=None, max_pool_size=None, replica_set=None):
             seeds = config.config.get('database', 'seeds')
 
         if max_pool_size is None:
-            # we may want to make this configurable, but then again, we may not
             max_pool_size = _DEFAULT_MAX_POOL_SIZE
+            if config.config.has_option('database', 'max_pool_size'):
+                max_pool_size = config.config.getint('database', 'max_pool_size')
         connection_kwargs['max_pool_size'] = max_pool_size
 
+        connection_kwargs.update(_write_concern())
+
+        if config.config.has_option('database', 'read_preference'):
+            read_preference = config.config.get('database', 'read_preference')
+            if read_preference not in _READ_PREFERENCES:
+                raise ValueError(_('Unknown read_preference [%(r)s]; must be one of %(v)s') %
+                                 {'r': read_preference, 'v': ', '.join(sorted(_READ_PREFERENCES))})
+            connection_kwargs['read_preference'] = _READ_PREFERENCES[read_preference]
+
         if replica_set is None:
             if config.config.has_option('database', 'replica_set'):
                 replica_set = config.config.get('database', 'replica_set')
@@ -73,6 +96,10 @@ def initialize(name=None, seeds=None, max_pool_size=None, replica_set=None):
 
         _DATABASE = getattr(_CONNECTION, name)
 
+        # Collections of a previous connection must not be handed out
+        _COLLECTIONS.clear()
+        _RETRIES = config.config.getint('database', 'operation_retries')
+
         # If username & password have been specified in the database config,
         # attempt to authenticate to the database
         if config.config.has_option('database', 'username') and \
@@ -103,6 +130,23 @@ def initialize(name=None, seeds=None, max_pool_size=None, replica_set=None):
         _DATABASE = None
         raise
 
+
+def _write_concern():
+    """
+    Read the write concern from the database section of the server config.
+
+    :return: w and j keyword arguments for the connection, for the options set
+    :rtype:  dict
+    """
+    write_concern = {}
+    if config.config.has_option('database', 'write_concern'):
+        w = config.config.get('database', 'write_concern')
+        # a number of servers, or a tag set name such as majority
+        write_concern['w'] = int(w) if w.isdigit() else w
+    if config.config.has_option('database', 'journal_writes'):
+        write_concern['j'] = config.config.getboolean('database', 'journal_writes')
+    return write_concern
+
 # -- collection wrapper class --------------------------------------------------
 
 class PulpCollectionFailure(PulpException):
@@ -226,14 +270,21 @@ def get_collection(name, create=False):
     """
     Factory function to instantiate PulpConnection objects using configurable
     parameters.
+
+    Each collection is built once and then reused by later calls for the same
+    name, since building one wraps each of its methods for retries.
     """
     global _DATABASE
 
     if _DATABASE is None:
         raise PulpCollectionFailure(_('Cannot get collection from uninitialized database'))
 
-    retries = config.config.getint('database', 'operation_retries')
-    return PulpCollection(_DATABASE, name, retries=retries, create=create)
+    collection = _COLLECTIONS.get(name)
+    # create=True always goes to the database, in case the collection was dropped
+    if collection is None or create:
+        collection = PulpCollection(_DATABASE, name, retries=_RETRIES, create=create)
+        _COLLECTIONS[name] = collection
+    return collection
 
 
 def get_database():
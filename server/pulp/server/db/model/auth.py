@@ -96,3 +96,16 @@ class Permission(Model):
 
         self.resource = resource
         self.users = users or {}
+
+
+class PermissionIndexGeneration(Model):
+    """
+    Counts the changes made to users, roles and permissions. Each process
+    keeping a copy of them for authorization reloads it when this changes.
+    There is a single document, with the _id 'permission_index'.
+
+    @ivar generation: number of changes made
+    @type generation: int
+    """
+
+    collection_name = 'permission_index_generation'
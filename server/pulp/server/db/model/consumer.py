@@ -160,6 +160,8 @@ class RepoProfileApplicability(Model):
     unique_indices = (
         ('profile_hash', 'repo_id'),
     )
+    # Regeneration for repositories looks up applicability by repo_id alone
+    search_indices = ('repo_id',)
 
     def __init__(self, profile_hash, repo_id, profile, applicability, _id=None, **kwargs):
         """
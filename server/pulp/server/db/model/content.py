@@ -65,6 +65,19 @@ class ContentType(Model):
         self.referenced_types = referenced_types
 
 
+class ContentTypeGeneration(Model):
+    """
+    Counts the changes made to the content type definitions, so processes
+    caching them know to reload them. There is a single document, with the
+    _id 'content_types'.
+
+    @ivar generation: number of times the definitions were changed
+    @type generation: int
+    """
+
+    collection_name = 'content_types_generation'
+
+
 class ContentCatalog(Model):
     """
     Represents a catalog of available content provided by content sources.
@@ -92,6 +105,8 @@ class ContentCatalog(Model):
     :type locator: str
     :ivar url: The URL used to download the file associated with the unit.
     :type url: str
+    :ivar refresh_id: The ID of the refresh that added the entry.
+    :type refresh_id: str
     """
 
     collection_name = 'content_catalog'
@@ -128,7 +143,7 @@ class ContentCatalog(Model):
         dt = now + timedelta(seconds=duration)
         return dateutils.datetime_to_utc_timestamp(dt)
 
-    def __init__(self, source_id, expiration, type_id, unit_key, url):
+    def __init__(self, source_id, expiration, type_id, unit_key, url, refresh_id=None):
         """
         :param source_id: The ID of the contributing content source.
         :type source_id: str
@@ -140,6 +155,8 @@ class ContentCatalog(Model):
         :type unit_key: dict
         :param url: The URL used to download the file associated with the unit.
         :type url: str
+        :param refresh_id: The ID of the refresh that added the entry.
+        :type refresh_id: str
         """
         Model.__init__(self)
         self.source_id = source_id
@@ -148,3 +165,4 @@ class ContentCatalog(Model):
         self.unit_key = unit_key
         self.locator = self.get_locator(type_id, unit_key)
         self.url = url
+        self.refresh_id = refresh_id
@@ -88,7 +88,7 @@ class ScheduledCall(Model):
 
     collection_name = 'scheduled_calls'
     unique_indices = ()
-    search_indices = ('resource', 'last_updated')
+    search_indices = ('resource', 'last_updated', 'enabled')
 
 
     def __init__(self, iso_schedule, task, total_run_count=0, next_run=None,
@@ -389,8 +389,9 @@ class ScheduleEntry(beat.ScheduleEntry):
     def _next_instance(self, last_run_at=None):
         """
         Returns an instance of this class with the appropriate fields incremented
-        and updated to reflect that its task has been queued. The parent
-        ScheduledCall gets saved to the database with these updated values.
+        and updated to reflect that its task has been queued. Only the changed
+        fields of the parent ScheduledCall are written to the database, so
+        changes made to its other fields since it was loaded are not lost.
 
         :param last_run_at: not used here, but it is part of the superclass
                             function signature
@@ -399,15 +400,21 @@ class ScheduleEntry(beat.ScheduleEntry):
                     its date and count fields updated.
         :rtype:     pulp.server.db.model.dispatch.ScheduleEntry
         """
-        self._scheduled_call.last_run_at = dateutils.format_iso8601_utc_timestamp(time.time())
-        self._scheduled_call.total_run_count += 1
-        if self._scheduled_call.remaining_runs:
-            self._scheduled_call.remaining_runs -= 1
-        if self._scheduled_call.remaining_runs == 0:
-            logger.info('disabling schedule with 0 remaining runs: %s' % self._scheduled_call.id)
-            self._scheduled_call.enabled = False
-        self._scheduled_call.save()
-        return self._scheduled_call.as_schedule_entry()
+        call = self._scheduled_call
+        call.last_run_at = dateutils.format_iso8601_utc_timestamp(time.time())
+        call.total_run_count += 1
+        delta = {'$set': {'last_run_at': call.last_run_at}, '$inc': {'total_run_count': 1}}
+        if call.remaining_runs:
+            call.remaining_runs -= 1
+            delta['$inc']['remaining_runs'] = -1
+        if call.remaining_runs == 0:
+            logger.info('disabling schedule with 0 remaining runs: %s' % call.id)
+            call.enabled = False
+            # updating the timestamp lets the scheduler see that it was disabled
+            call.last_updated = time.time()
+            delta['$set'].update({'enabled': False, 'last_updated': call.last_updated})
+        call.get_collection().update({'_id': ObjectId(call.id)}, delta)
+        return call.as_schedule_entry()
 
     __next__ = next = _next_instance
 
@@ -499,7 +506,8 @@ class TaskStatus(Model):
 
     collection_name = 'task_status'
     unique_indices = ('task_id',)
-    search_indices = ('task_id', 'tags', 'state')
+    # ('state', '_id') serves listings filtered by state and paged in the order of creation
+    search_indices = ('task_id', 'tags', 'state', ('state', '_id'), 'queue')
 
     def __init__(self, task_id, queue, tags=None, state=None, error=None, spawned_tasks=None,
                  progress_report=None):
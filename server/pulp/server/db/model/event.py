@@ -38,4 +38,16 @@ class EventListener(Model):
 
         self.notifier_type_id = notifier_type_id
         self.notifier_config = notifier_config
-        self.event_types = event_types
\ No newline at end of file
+        self.event_types = event_types
+
+class EventListenerGeneration(Model):
+    """
+    Counts the changes made to event listeners. Each process keeping a copy
+    of the listeners for firing events reloads it when this changes. There is
+    a single document, with the _id 'event_listeners'.
+
+    @ivar generation: number of changes made
+    @type generation: int
+    """
+
+    collection_name = 'event_listener_generation'
@@ -273,6 +273,49 @@ class RepoContentUnit(Model):
         self.updated = self.created
 
 
+class RepoContentDelta(Model):
+    """
+    Records the content units associated with and unassociated from a repository
+    since its applicability data was last regenerated. Applicability regeneration
+    consumes this document so that profilers supporting incremental updates only
+    need to evaluate the units that changed instead of the repository's entire
+    contents.
+
+    Deltas are only recorded for repositories that have applicability data. If a
+    repository has no delta document, or the delta grew past the point where it
+    is cheaper to start over, applicability is fully recalculated.
+
+    @ivar repo_id: identifies the repo
+    @type repo_id: str
+
+    @ivar added: maps unit type IDs to the IDs of units associated with the repo
+    @type added: dict
+
+    @ivar removed: maps unit type IDs to the IDs of units no longer associated
+                   with the repo
+    @type removed: dict
+
+    @ivar unit_count: running total of unit IDs recorded in this delta
+    @type unit_count: int
+
+    @ivar full: if true, the added and removed lists were discarded and the
+                repo's applicability must be fully recalculated
+    @type full: bool
+    """
+
+    collection_name = 'repo_content_deltas'
+    unique_indices = ('repo_id',)
+
+    def __init__(self, repo_id, added=None, removed=None, unit_count=0, full=False):
+        super(RepoContentDelta, self).__init__()
+
+        self.repo_id = repo_id
+        self.added = added or {}
+        self.removed = removed or {}
+        self.unit_count = unit_count
+        self.full = full
+
+
 class RepoSyncResult(Model):
     """
     Stores the results of a repo sync.
@@ -19,6 +19,7 @@ from celery import task
 
 from pulp.common import dateutils
 from pulp.server import config as pulp_config
+from pulp.server.async import constants as dispatch_constants
 from pulp.server.async.tasks import Task
 from pulp.server.compat import ObjectId
 from pulp.server.db.model import consumer, dispatch, repo_group, repository
@@ -34,6 +35,13 @@ _COLLECTION_TIMEDELTAS = {
     repository.RepoSyncResult: 'repo_sync_history',
     repository.RepoPublishResult: 'repo_publish_history',
     repo_group.RepoGroupPublishResult: 'repo_group_publish_history',
+    dispatch.TaskStatus: 'task_status_history',
+}
+
+# Only the documents that also match the spec given here for their collection are removed. Task
+# statuses are kept until their task is complete, however old they are.
+_COLLECTION_SPECS = {
+    dispatch.TaskStatus: {'state': {'$in': dispatch_constants.CALL_COMPLETE_STATES}},
 }
 
 
@@ -55,7 +63,9 @@ def reap_expired_documents():
         # Generate an ObjectId that we can use to know which objects to remove
         expired_object_id = _create_expired_object_id(age)
         # Remove all objects older than the timestamp encoded into the generated ObjectId
-        collection.remove({'_id': {'$lte': expired_object_id}})
+        spec = {'_id': {'$lte': expired_object_id}}
+        spec.update(_COLLECTION_SPECS.get(model, {}))
+        collection.remove(spec)
     _logger.info(_('The reaper task has completed.'))
 
 
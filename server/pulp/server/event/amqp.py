@@ -13,6 +13,7 @@
 
 import logging
 
+from pulp.server.event import delivery
 from pulp.server.managers import factory
 
 TYPE_ID = 'amqp'
@@ -32,4 +33,18 @@ def handle_event(notifier_config, event):
     :return: None
     """
 
-    factory.topic_publish_manager().publish(event, notifier_config.get('exchange'))
+    delivery.submit(_publish, notifier_config, [event])
+
+def _publish(notifier_config, events):
+    """
+    Publish each event to the exchange in the notifier_config. This is called
+    by the event delivery workers.
+
+    :param notifier_config: see handle_event
+    :type  notifier_config: dict
+    :param events:  Event instances
+    :type  events:  list of pulp.server.event.data.event
+    :return: None
+    """
+    for event in events:
+        factory.topic_publish_manager().publish(event, notifier_config.get('exchange'))
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2014 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Delivers events to notifiers in the background, so that firing an event never
+waits on, or is broken by, the systems being notified.
+
+Notifiers submit their deliveries to a bounded queue that a pool of worker
+threads takes them from. A failed delivery is retried with an increasing delay.
+Deliveries submitted with the same batch key may be combined, so that several
+events are sent in one call. The pool is configured in the notifications
+section of the server config.
+"""
+
+import logging
+import os
+import Queue
+import threading
+import time
+
+from pulp.server.config import config
+
+
+_LOG = logging.getLogger(__name__)
+
+_LOCK = threading.Lock()
+_PIPELINE = None
+
+
+class Delivery(object):
+    """
+    One or more events to send using the same notifier configuration.
+
+    :ivar send:             called with the notifier_config and the list of events
+    :type send:             callable
+    :ivar notifier_config:  configuration of the notifier
+    :type notifier_config:  dict
+    :ivar events:           events to send
+    :type events:           list of pulp.server.event.data.Event
+    :ivar batch_key:        deliveries with the same key may be combined into one;
+                            None if this delivery may not be combined
+    :type batch_key:        hashable
+    """
+
+    def __init__(self, send, notifier_config, events, batch_key=None):
+        self.send = send
+        self.notifier_config = notifier_config
+        self.events = events
+        self.batch_key = batch_key
+
+
+class Pipeline(object):
+    """
+    A bounded queue of deliveries and the worker threads that send them.
+
+    :ivar queue:            deliveries waiting for a worker
+    :type queue:            Queue.Queue
+    :ivar queue_timeout:    seconds to wait for room in the queue before a
+                            delivery is dropped
+    :type queue_timeout:    float
+    :ivar retries:          number of times a failed delivery is retried
+    :type retries:          int
+    :ivar retry_delay:      seconds before the first retry; it doubles with
+                            each retry
+    :type retry_delay:      float
+    :ivar batch_size:       maximum number of events combined into one delivery
+    :type batch_size:       int
+    :ivar pid:              process the worker threads were started in
+    :type pid:              int
+    """
+
+    def __init__(self, workers, queue_size, queue_timeout, retries, retry_delay, batch_size):
+        self.queue = Queue.Queue(queue_size)
+        self.queue_timeout = queue_timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.batch_size = batch_size
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._counts = {'delivered': 0, 'retried': 0, 'failed': 0, 'dropped': 0}
+        self._workers = workers
+        for i in range(workers):
+            thread = threading.Thread(target=self._work, name='event-delivery-%d' % i)
+            thread.daemon = True
+            thread.start()
+
+    @classmethod
+    def from_config(cls):
+        """
+        :return: a pipeline configured by the notifications section of the server config
+        :rtype:  Pipeline
+        """
+        return cls(config.getint('notifications', 'workers'),
+                   config.getint('notifications', 'queue_size'),
+                   config.getfloat('notifications', 'queue_timeout'),
+                   config.getint('notifications', 'retries'),
+                   config.getfloat('notifications', 'retry_delay'),
+                   config.getint('notifications', 'batch_size'))
+
+    def submit(self, delivery):
+        """
+        Queue a delivery, waiting up to queue_timeout seconds for room in the
+        queue. A delivery that doesn't fit is logged and dropped.
+
+        :param delivery: the delivery to queue
+        :type  delivery: Delivery
+        """
+        try:
+            self.queue.put(delivery, timeout=self.queue_timeout)
+        except Queue.Full:
+            self._count('dropped', len(delivery.events))
+            _LOG.error('Event delivery queue is full; dropping %d event(s)' % len(delivery.events))
+
+    def join(self):
+        """
+        Block until every queued delivery has been sent or has failed.
+        """
+        self.queue.join()
+
+    def stats(self):
+        """
+        :return: the number of deliveries waiting in the queue, the number of
+                 worker threads, and the number of events delivered, retried,
+                 failed after the last retry and dropped because the queue was full
+        :rtype:  dict
+        """
+        with self._lock:
+            stats = dict(self._counts)
+        stats['queued'] = self.queue.qsize()
+        stats['workers'] = self._workers
+        return stats
+
+    def _work(self):
+        """
+        Send deliveries from the queue until the process exits.
+        """
+        while True:
+            deliveries = [self.queue.get()]
+            try:
+                if deliveries[0].batch_key is not None:
+                    deliveries.extend(self._take_queued(len(deliveries[0].events)))
+                for delivery in self._combine(deliveries):
+                    self._deliver(delivery)
+            finally:
+                for delivery in deliveries:
+                    self.queue.task_done()
+
+    def _take_queued(self, count):
+        """
+        Take the deliveries already in the queue, without waiting, until they
+        add up to batch_size events.
+
+        :param count: number of events already taken
+        :type  count: int
+        :return: the deliveries taken
+        :rtype:  list of Delivery
+        """
+        taken = []
+        while count < self.batch_size:
+            try:
+                delivery = self.queue.get_nowait()
+            except Queue.Empty:
+                break
+            taken.append(delivery)
+            count += len(delivery.events)
+        return taken
+
+    def _combine(self, deliveries):
+        """
+        :param deliveries: deliveries in the order they were queued
+        :type  deliveries: list of Delivery
+        :return: the deliveries, with those that have the same batch key
+                 combined into the first of them
+        :rtype:  list of Delivery
+        """
+        combined = []
+        batches = {}
+        for delivery in deliveries:
+            if delivery.batch_key is None:
+                combined.append(delivery)
+            elif delivery.batch_key in batches:
+                batches[delivery.batch_key].events.extend(delivery.events)
+            else:
+                batch = Delivery(delivery.send, delivery.notifier_config, list(delivery.events),
+                                 delivery.batch_key)
+                batches[delivery.batch_key] = batch
+                combined.append(batch)
+        return combined
+
+    def _deliver(self, delivery):
+        """
+        Send a delivery, retrying it with an increasing delay if it fails.
+
+        :param delivery: the delivery to send
+        :type  delivery: Delivery
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                delivery.send(delivery.notifier_config, delivery.events)
+            except Exception:
+                if attempt == self.retries:
+                    self._count('failed', len(delivery.events))
+                    _LOG.exception('Failed to deliver %d event(s) after %d attempt(s)' %
+                                   (len(delivery.events), attempt + 1))
+                    return
+                self._count('retried', len(delivery.events))
+                _LOG.debug('Delivery of %d event(s) failed; retrying' % len(delivery.events))
+                time.sleep(self.retry_delay * 2 ** attempt)
+            else:
+                self._count('delivered', len(delivery.events))
+                return
+
+    def _count(self, name, events):
+        with self._lock:
+            self._counts[name] += events
+
+
+def pipeline():
+    """
+    Return the pipeline of this process, starting it if this is the first
+    delivery. A process forked after the pipeline started gets its own, since
+    the worker threads don't survive the fork.
+
+    :rtype: Pipeline
+    """
+    global _PIPELINE
+    with _LOCK:
+        if _PIPELINE is None or _PIPELINE.pid != os.getpid():
+            _PIPELINE = Pipeline.from_config()
+        return _PIPELINE
+
+
+def submit(send, notifier_config, events, batch_key=None):
+    """
+    Queue events to be sent in the background by calling send with the
+    notifier_config and a list of events. Exceptions raised by send cause the
+    delivery to be retried.
+
+    :param send:            called with the notifier_config and the list of events
+    :type  send:            callable
+    :param notifier_config: configuration of the notifier
+    :type  notifier_config: dict
+    :param events:          events to send
+    :type  events:          list of pulp.server.event.data.Event
+    :param batch_key:       deliveries with the same key may be combined into one
+                            call to send; None if this delivery may not be combined
+    :type  batch_key:       hashable
+    """
+    pipeline().submit(Delivery(send, notifier_config, events, batch_key))
+
+
+def stats():
+    """
+    :return: the stats of this process's pipeline; None if it hasn't started
+    :rtype:  dict or None
+    """
+    current = _PIPELINE
+    if current is None or current.pid != os.getpid():
+        return None
+    return current.stats()
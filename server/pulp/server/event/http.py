@@ -19,15 +19,25 @@ url
   Full URL to contact with the event data. A POST request will be made to this
   URL with the contents of the events in the body.
 
-Eventually this should be enhanced to support authentication credentials as well.
+username, password
+  Optional credentials sent using basic authentication.
+
+batch
+  Optional; if true, the events fired while earlier ones wait to be sent are
+  combined into one request, whose body is a list of events rather than one.
+
+The requests are sent by the event delivery workers, which keep the
+connections to each server open between requests.
 """
 
 import base64
 import httplib
 import logging
+import socket
 import threading
 
 from pulp.server.compat import json
+from pulp.server.event import delivery
 
 # -- constants ----------------------------------------------------------------
 
@@ -38,26 +48,8 @@ LOG = logging.getLogger(__name__)
 # -- framework hook -----------------------------------------------------------
 
 def handle_event(notifier_config, event):
-    # fire the actual http push function off in a separate thread to keep
-    # pulp from blocking or deadlocking due to the tasking subsystem
-
-    data = event.data()
-
-    LOG.info(data)
-
-    body = json.dumps(data)
-
-    thread = threading.Thread(target=_send_post, args=[notifier_config, body])
-    thread.setDaemon(True)
-    thread.start()
-
-# -- private ------------------------------------------------------------------
-
-def _send_post(notifier_config, body):
-
-    # Basic headers
-    headers = {'Accept': 'application/json',
-               'Content-Type': 'application/json'}
+    # the POST is sent by the delivery workers to keep pulp from blocking or
+    # deadlocking due to the tasking subsystem
 
     # Parse the URL for the pieces we need
     if 'url' not in notifier_config or not notifier_config['url']:
@@ -72,7 +64,77 @@ def _send_post(notifier_config, body):
         LOG.warn('Improperly configured post_sync_url: %(u)s' % {'u': url})
         return
 
-    connection = _create_connection(scheme, server)
+    LOG.info(event.data())
+
+    batch_key = None
+    if notifier_config.get('batch'):
+        batch_key = (TYPE_ID, json.dumps(notifier_config, sort_keys=True))
+
+    delivery.submit(_send_post, notifier_config, [event], batch_key)
+
+# -- private ------------------------------------------------------------------
+
+class HTTPNotifierError(Exception):
+    """
+    Raised for a server error response, so the delivery is retried.
+    """
+    pass
+
+
+class ConnectionPool(object):
+    """
+    Idle connections to each server, so that a connection is used for more
+    than one request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle = {}
+
+    def get(self, scheme, server):
+        """
+        @return: an idle connection to the server, if there is one, and whether
+                 it was idle; otherwise a new connection and False
+        @rtype:  tuple
+        """
+        with self._lock:
+            idle = self._idle.get((scheme, server))
+            if idle:
+                return idle.pop(), True
+        return _create_connection(scheme, server), False
+
+    def put(self, scheme, server, connection):
+        """
+        Keep a connection that can be used for another request.
+        """
+        with self._lock:
+            self._idle.setdefault((scheme, server), []).append(connection)
+
+    def clear(self, scheme=None, server=None):
+        """
+        Close the idle connections to the given server, or to every server.
+        """
+        with self._lock:
+            if scheme is None:
+                idle, self._idle = self._idle, {}
+            else:
+                idle = {(scheme, server): self._idle.pop((scheme, server), [])}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+_POOL = ConnectionPool()
+
+
+def _send_post(notifier_config, events):
+
+    # Basic headers
+    headers = {'Accept': 'application/json',
+               'Content-Type': 'application/json'}
+
+    url = notifier_config['url']
+    scheme, empty, server, path = url.split('/', 3)
 
     # Process authentication
     if 'username' in notifier_config and 'password' in notifier_config:
@@ -80,12 +142,42 @@ def _send_post(notifier_config, body):
         encoded = base64.encodestring(raw)[:-1]
         headers['Authorization'] = 'Basic ' + encoded
 
-    connection.request('POST', '/' + path, body=body, headers=headers)
-    response = connection.getresponse()
+    if notifier_config.get('batch'):
+        body = json.dumps([event.data() for event in events])
+    else:
+        body = json.dumps(events[0].data())
+
+    connection, idle = _POOL.get(scheme, server)
+    try:
+        response, error_msg = _post(connection, '/' + path, body, headers)
+    except (httplib.HTTPException, socket.error):
+        connection.close()
+        if not idle:
+            raise
+        # The server may have closed the idle connections; try a new one.
+        _POOL.clear(scheme, server)
+        connection = _create_connection(scheme, server)
+        try:
+            response, error_msg = _post(connection, '/' + path, body, headers)
+        except (httplib.HTTPException, socket.error):
+            connection.close()
+            raise
+
+    if response.will_close:
+        connection.close()
+    else:
+        _POOL.put(scheme, server, connection)
+
+    if response.status >= httplib.INTERNAL_SERVER_ERROR:
+        raise HTTPNotifierError('Error response from HTTP notifier: %(e)s' % {'e': error_msg})
     if response.status != httplib.OK:
-        error_msg = response.read()
         LOG.warn('Error response from HTTP notifier: %(e)s' % {'e': error_msg})
-    connection.close()
+
+def _post(connection, path, body, headers):
+    connection.request('POST', path, body=body, headers=headers)
+    response = connection.getresponse()
+    # the response must be read before the connection can be used again
+    return response, response.read()
 
 def _create_connection(scheme, server):
     if scheme.startswith('https'):
@@ -11,9 +11,7 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
-import logging
 import smtplib
-import threading
 
 try:
     from email.mime.text import MIMEText
@@ -23,14 +21,15 @@ except ImportError:
 
 from pulp.server.compat import json
 from pulp.server.config import config
+from pulp.server.event import delivery
 
 TYPE_ID = 'email'
-logger = logging.getLogger(__name__)
 
 def handle_event(notifier_config, event):
     """
     If email is enabled in the server settings, sends an email to each recipient
-    listed in the notifier_config.
+    listed in the notifier_config. Each recipient is a delivery of its own, so
+    a failure to reach one of them is retried without emailing the others again.
 
     :param notifier_config: dictionary with keys 'subject', which defines the
                             subject of each email message, and 'addresses',
@@ -43,14 +42,27 @@ def handle_event(notifier_config, event):
     """
     if not config.getboolean('email', 'enabled'):
         return
-    body = json.dumps(event.data(), indent=2)
     subject = notifier_config['subject']
-    addresses = notifier_config['addresses']
+    for address in notifier_config['addresses']:
+        delivery.submit(_send_events, {'subject': subject, 'address': address}, [event])
 
-    for address in addresses:
-        thread = threading.Thread(target=_send_email, args=(subject, body, address))
-        thread.daemon = True
-        thread.start()
+def _send_events(delivery_config, events):
+    """
+    Send a text email with each event to one recipient. This is called by the
+    event delivery workers, which retry the delivery if it raises.
+
+    :param delivery_config: dictionary with keys 'subject', the subject of each
+                            email message, and 'address', the email address of
+                            the recipient
+    :type  delivery_config: dict
+    :param events:  Event instances
+    :type  events:  list of pulp.server.event.data.event
+
+    :return: None
+    """
+    for event in events:
+        body = json.dumps(event.data(), indent=2)
+        _send_email(delivery_config['subject'], body, delivery_config['address'])
 
 def _send_email(subject, body, to_address):
     """
@@ -64,6 +76,8 @@ def _send_email(subject, body, to_address):
     :type  to_address:  basestring
 
     :return: None
+    :raise smtplib.SMTPException: if the server refuses the connection or the message
+    :raise socket.error: if the server can't be reached
     """
     host = config.get('email', 'host')
     port = config.getint('email', 'port')
@@ -74,17 +88,10 @@ def _send_email(subject, body, to_address):
     message['From'] = from_address
     message['To'] = to_address
 
-    try:
-        connection = smtplib.SMTP(host=host, port=port)
-    except smtplib.SMTPConnectError:
-        logger.exception('SMTP connection failed to %s on %s' % (host, port))
-        return
-
+    connection = smtplib.SMTP(host=host, port=port)
     try:
         connection.sendmail(from_address, to_address, message.as_string())
-    except smtplib.SMTPException, e:
-        try:
-            logger.exception('Error sending mail.')
-        except AttributeError:
-            logger.error('SMTP error while sending mail')
+    except:
+        connection.close()
+        raise
     connection.quit()
@@ -19,6 +19,7 @@ from pulp.server.db import connection as db_connection
 db_connection.initialize()
 
 from pulp.plugins.loader import api as plugin_api
+from pulp.plugins.types import database as types_db
 from pulp.server.managers import factory as manager_factory
 
 
@@ -49,6 +50,9 @@ def initialize():
         msg += 'Error message: %s' % str(e)
         raise InitializationException(msg), None, sys.exc_info()[2]
 
+    # Load the type definitions now rather than on the first request
+    types_db.load_type_definitions()
+
     # Load the mappings of manager type to managers
     manager_factory.initialize()
 
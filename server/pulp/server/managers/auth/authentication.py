@@ -9,7 +9,14 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import calendar
+import collections
+import hashlib
+import hmac
 import logging
+import os
+import threading
+import time
 
 import oauth2
 
@@ -23,10 +30,162 @@ from pulp.server.exceptions import PulpException
 
 _LOG = logging.getLogger(__name__)
 
+# Tag of the cached certificate verification results
+CERTIFICATE_TAG = 'certificate'
+
 
 # -- classes ------------------------------------------------------------------
 
 
+class AuthenticationCache(object):
+    """
+    Bounded cache of authentication results that expire after the number of
+    seconds given by the auth_cache_ttl setting. The least recently used
+    results are dropped when more than auth_cache_max_size are cached.
+
+    Results are stored under a hash of the credentials keyed with a secret
+    generated for each process, so no credential can be recovered from the
+    cache. Each result is tagged so all of those for a user, or for all
+    certificates, can be invalidated at once.
+
+    Each use of a result is recorded in an access ordered queue of
+    (stamp, key) pairs. A key may be queued several times; only the pair with
+    the stamp stored in its entry is current, the others are skipped.
+    """
+
+    def __init__(self):
+        self._secret = os.urandom(32)
+        self._entries = {}
+        self._order = collections.deque()
+        self._stamp = 0
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, *parts):
+        """
+        :param parts: the credentials and anything else the result depends on
+        :type  parts: str or unicode
+        :return: keyed hash of the given parts
+        :rtype:  str
+        """
+        parts = [isinstance(p, unicode) and p.encode('utf-8') or p for p in parts]
+        return hmac.new(self._secret, '\0'.join(parts), hashlib.sha256).digest()
+
+    def get(self, key):
+        """
+        :param key: key returned by the key method
+        :type  key: str
+        :return: tuple of whether a result is cached, and the result
+        :rtype:  tuple
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return False, None
+            # mark it as the most recently used
+            self._store(key, entry[:3])
+            self.hits += 1
+            return True, entry[1]
+
+    def set(self, key, value, tag, expires=None):
+        """
+        :param key: key returned by the key method
+        :type  key: str
+        :param value: authentication result
+        :param tag: tag the result is invalidated with
+        :type  tag: str
+        :param expires: optional time, in seconds since the epoch, at which the
+                        result must expire even if its time to live is longer
+        :type  expires: float
+        """
+        ttl = config.getint('security', 'auth_cache_ttl')
+        if ttl <= 0:
+            return
+        max_size = config.getint('security', 'auth_cache_max_size')
+        expires = min(time.time() + ttl, expires or float('inf'))
+        with self._lock:
+            self._store(key, (expires, value, tag))
+            while len(self._entries) > max_size:
+                stamp, oldest = self._order.popleft()
+                entry = self._entries.get(oldest)
+                if entry is not None and entry[3] == stamp:
+                    del self._entries[oldest]
+
+    def invalidate(self, tag):
+        """
+        Drop the cached results with the given tag.
+
+        :param tag: tag the results were set with
+        :type  tag: str
+        """
+        with self._lock:
+            for key, entry in self._entries.items():
+                if entry[2] == tag:
+                    del self._entries[key]
+
+    def set_generation(self, tag, generation):
+        """
+        Record the generation of whatever the results with the given tag were
+        checked against, invalidating them if it changed.
+
+        :param tag: tag the results are set with
+        :type  tag: str
+        :param generation: current generation
+        :type  generation: str
+        """
+        with self._lock:
+            previous = self._generations.get(tag)
+            self._generations[tag] = generation
+        if previous is not None and previous != generation:
+            self.invalidate(tag)
+
+    def clear(self):
+        """
+        Drop all cached results and reset the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._order.clear()
+            self._generations.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _store(self, key, entry):
+        """
+        Store an entry as the most recently used. The lock must be held.
+
+        :param key: key returned by the key method
+        :type  key: str
+        :param entry: tuple of the expiration time, result and tag
+        :type  entry: tuple
+        """
+        self._stamp += 1
+        self._entries[key] = entry + (self._stamp,)
+        self._order.append((self._stamp, key))
+        # drop the pairs that are no longer current once they outnumber the entries
+        if len(self._order) > 2 * len(self._entries) + 64:
+            current = [(e[3], k) for k, e in self._entries.items()]
+            current.sort()
+            self._order = collections.deque(current)
+
+    def stats(self):
+        """
+        :return: number of cached results, hits and misses
+        :rtype:  dict
+        """
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# Authentication results of this process
+_CACHE = AuthenticationCache()
+
+
 class AuthenticationManager(object):
     """
     Manages user and consumer authentication in pulp.
@@ -60,11 +219,33 @@ class AuthenticationManager(object):
             return None
     
         if password is not None:
-            if not factory.password_manager().check_password(user['password'], password):
+            if not self._check_password(user, password):
                 _LOG.debug('Password for user [%s] was incorrect' % username)
                 return None
     
         return user
+
+    def _check_password(self, user, password):
+        """
+        Check a password against the one saved for a local user. The result is
+        cached under the saved password too, so it does not outlive a password
+        change made by any server process.
+
+        :type user: L{pulp.server.db.model.auth.User} instance
+        :param user: user whose password is checked
+
+        :type password: str
+        :param password: password of the user
+
+        :rtype: bool
+        :return: True if the password is correct
+        """
+        key = _CACHE.key('password', user['login'], user['password'], password)
+        found, valid = _CACHE.get(key)
+        if not found:
+            valid = factory.password_manager().check_password(user['password'], password)
+            _CACHE.set(key, valid, user['login'])
+        return valid
     
     def _check_username_password_ldap(self, username, password=None):
         """
@@ -117,6 +298,34 @@ class AuthenticationManager(object):
         return None
 
     # -- ssl cert authentication ---------------------------------------------------
+
+    def _verify_cert(self, cert, cert_pem):
+        """
+        Verify a client ssl certificate against the server's CA. The result
+        is cached by the fingerprints of the certificate and the CA, and never
+        past the expiration of the certificate.
+
+        :type cert: L{pulp.server.managers.auth.cert.certificate.CertificateManager}
+        :param cert: the parsed certificate
+
+        :type cert_pem: str
+        :param cert_pem: pem encoded ssl certificate
+
+        :rtype: bool
+        :return: True if the certificate was signed by the server's CA
+        """
+        cert_gen_manager = factory.cert_generation_manager()
+        ca_fingerprint = cert_gen_manager.ca_fingerprint()
+        _CACHE.set_generation(CERTIFICATE_TAG, ca_fingerprint)
+
+        key = _CACHE.key('certificate', ca_fingerprint, cert.x509.get_fingerprint('sha256'))
+        found, valid = _CACHE.get(key)
+        if not found:
+            valid = cert_gen_manager.verify_cert(cert_pem)
+            not_after = cert.x509.get_not_after().get_datetime()
+            _CACHE.set(key, valid, CERTIFICATE_TAG,
+                       expires=calendar.timegm(not_after.utctimetuple()))
+        return valid
     
     def check_user_cert(self, cert_pem):
         """
@@ -136,12 +345,12 @@ class AuthenticationManager(object):
         if not encoded_user:
             return None
     
-        cert_gen_manager = factory.cert_generation_manager()
-        if not cert_gen_manager.verify_cert(cert_pem):
+        if not self._verify_cert(cert, cert_pem):
             _LOG.error('Auth certificate with CN [%s] is signed by a foreign CA' %
                        encoded_user)
             return None
     
+        cert_gen_manager = factory.cert_generation_manager()
         try:
             username, id = cert_gen_manager.decode_admin_user(encoded_user)
         except PulpException:
@@ -167,14 +376,39 @@ class AuthenticationManager(object):
         if consumerid is None:
             return None
     
-        cert_gen_manager = factory.cert_generation_manager()
-        if not cert_gen_manager.verify_cert(cert_pem):
+        if not self._verify_cert(cert, cert_pem):
             _LOG.error('Auth certificate with CN [%s] is signed by a foreign CA' %
                        consumerid)
             return None
     
         return consumerid
     
+    # -- authentication cache ------------------------------------------------------
+
+    def invalidate_user(self, login):
+        """
+        Drop the cached authentication results of a user, to be called when the
+        user's password is changed or the user is deleted.
+
+        :type login: str
+        :param login: the login of the user
+        """
+        _CACHE.invalidate(login)
+
+    def invalidate_certificates(self):
+        """
+        Drop the cached certificate verification results. This happens when
+        the server's CA certificate changes; this is for forcing it sooner.
+        """
+        _CACHE.invalidate(CERTIFICATE_TAG)
+
+    def cache_stats(self):
+        """
+        :rtype: dict
+        :return: number of cached authentication results, cache hits and misses
+        """
+        return _CACHE.stats()
+
     # oauth authentication --------------------------------------------------------
     
     def check_oauth(self, username, method, url, auth, query):
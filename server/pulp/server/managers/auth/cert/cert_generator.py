@@ -12,6 +12,8 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 import logging
+import os
+from datetime import datetime
 from M2Crypto import X509, EVP, RSA, util
 from threading import RLock
 import subprocess
@@ -98,33 +100,41 @@ class CertGenerationManager(object):
         '''
         Ensures the given certificate can be verified against the server's CA.
 
+        The CA certificate is loaded once and reloaded only when its file
+        changes, so verification does not need to call out to openssl.
+
         @param cert_pem: PEM encoded certificate to be verified
         @type  cert_pem: string
 
         @return: True if the certificate is successfully verified against the CA; False otherwise
         @rtype:  boolean
         '''
+        ca = CertificateAuthority().certificate()
+        try:
+            cert = X509.load_cert_string(str(cert_pem))
+            # The same checks made by openssl verify for a certificate issued
+            # directly by the CA: issuer, signature and validity period.
+            if cert.get_issuer().as_der() != ca.get_subject().as_der():
+                return False
+            if cert.verify(ca.get_pubkey()) != 1:
+                return False
+            not_before = cert.get_not_before().get_datetime()
+            not_after = cert.get_not_after().get_datetime()
+        except (X509.X509Error, ValueError), e:
+            log.debug('Certificate could not be verified: %s' % e)
+            return False
+        now = datetime.now(not_before.tzinfo)
+        return not_before <= now <= not_after
 
-        # M2Crypto doesn't support verifying a cert against a CA, so call out to openssl
-        ca_cert = config.config.get('security', 'cacert')
-        cmd = 'openssl verify -CAfile %s' % ca_cert
-        p = subprocess.Popen(cmd, shell=True, stdin=subprocess.PIPE,
-                         stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-        # Use communicate to pipe the certificate to the verify call
-        stdout, stderr = p.communicate(input=cert_pem)
-
-        # Successful result example:
-        #   stdin: OK\n
-        # Failed result example:
-        #   stdin: C = US, ST = NC, L = Raleigh, O = Red Hat, CN = localhost
-        #   error 20 at 0 depth lookup:unable to get local issuer certificate\n
-        result = stdout.rstrip()
+    def ca_fingerprint(self):
+        '''
+        Returns the fingerprint of the server's current CA certificate. It changes
+        when the CA is rotated, so results of verify_cert may be cached by it.
 
-        if result.endswith('OK'):
-            return True
-        else:
-            return False
+        @return: hex encoded SHA256 fingerprint of the CA certificate
+        @rtype:  string
+        '''
+        return CertificateAuthority().fingerprint()
 
     def encode_admin_user(self, user):
         '''
@@ -216,6 +226,54 @@ class SerialNumber:
         finally:
             self.__mutex.release()
 
+
+class CertificateAuthority:
+    """
+    The server's CA certificate, loaded from the cacert file once per process
+    and reloaded when the file changes, which is how CA rotation is detected.
+    """
+
+    __mutex = RLock()
+    __metaclass__ = Singleton
+
+    def __init__(self):
+        self.__path = None
+        self.__stat = None
+        self.__certificate = None
+        self.__fingerprint = None
+
+    def certificate(self):
+        """
+        Get the CA certificate
+        @return: The CA certificate
+        @rtype: M2Crypto.X509.X509
+        """
+        return self.__load()[0]
+
+    def fingerprint(self):
+        """
+        Get the fingerprint of the CA certificate
+        @return: The hex encoded SHA256 fingerprint
+        @rtype: str
+        """
+        return self.__load()[1]
+
+    def __load(self):
+        path = config.config.get('security', 'cacert')
+        st = os.stat(path)
+        stat = (st.st_ino, st.st_size, st.st_mtime)
+        self.__mutex.acquire()
+        try:
+            if path != self.__path or stat != self.__stat:
+                certificate = X509.load_cert(path)
+                self.__fingerprint = certificate.get_fingerprint('sha256')
+                self.__certificate = certificate
+                self.__path = path
+                self.__stat = stat
+                log.info('Loaded CA certificate [%s]' % path)
+            return self.__certificate, self.__fingerprint
+        finally:
+            self.__mutex.release()
     
 #----------------------------------------------------------------------------------------------------
 
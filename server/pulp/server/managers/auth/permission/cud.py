@@ -27,6 +27,7 @@ from pulp.server.exceptions import (
     DuplicateResource, InvalidValue, MissingResource, PulpDataException,
     PulpExecutionException)
 from pulp.server.managers import factory
+from pulp.server.managers.auth.permission import index as permission_index
 from pulp.server.managers.auth.user import system
 
 
@@ -59,6 +60,8 @@ class PermissionManager(object):
         create_me = Permission(resource=resource_uri)
         Permission.get_collection().save(create_me, safe=True)
 
+        permission_index.bump_generation()
+
         # Retrieve the permission to return the SON object
         created = Permission.get_collection().find_one({'resource' : resource_uri})
 
@@ -94,6 +97,8 @@ class PermissionManager(object):
 
         Permission.get_collection().save(found, safe=True)
 
+        permission_index.bump_generation()
+
     @staticmethod
     def delete_permission(resource_uri):
         """
@@ -116,6 +121,8 @@ class PermissionManager(object):
 
         Permission.get_collection().remove({'resource' : resource_uri}, safe=True)
 
+        permission_index.bump_generation()
+
     @staticmethod
     def grant(resource, login, operations):
         """
@@ -155,6 +162,8 @@ class PermissionManager(object):
 
         Permission.get_collection().save(permission, safe=True)
 
+        permission_index.bump_generation()
+
     @staticmethod
     def revoke(resource, login, operations):
         """
@@ -199,6 +208,8 @@ class PermissionManager(object):
 
         Permission.get_collection().save(permission, safe=True)
 
+        permission_index.bump_generation()
+
     def grant_automatic_permissions_for_resource(self, resource):
         """
         Grant CRUDE permissions for a newly created resource to current principal.
@@ -272,6 +283,8 @@ class PermissionManager(object):
                 # Delete entire permission if there are no more users
                 Permission.get_collection().remove({'resource':permission['resource']}, safe=True)
 
+        permission_index.bump_generation()
+
 
 grant = task(PermissionManager.grant, base=Task, ignore_result=True)
 revoke = task(PermissionManager.revoke, base=Task, ignore_result=True)
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2014 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Contains the in memory index of users' roles and permissions used to authorize
+requests, and the generation counter that tells processes when to reload it.
+
+Every change to users, roles or permissions must call bump_generation once
+the change has been saved.
+"""
+
+import logging
+import threading
+
+from pulp.server.db.model.auth import Permission, PermissionIndexGeneration, User
+
+
+_LOG = logging.getLogger(__name__)
+
+# _id of the generation counter document
+GENERATION_ID = 'permission_index'
+
+_LOCK = threading.Lock()
+_INDEX = None
+
+
+class PermissionIndex(object):
+    """
+    Snapshot of the roles of every user and the permissions on every resource.
+    It is not changed once loaded; a new one replaces it when the generation
+    changes.
+
+    @ivar generation: generation the snapshot was loaded at
+    @type generation: int
+    @ivar roles: role ids of each user, keyed by login
+    @type roles: dict
+    @ivar permissions: operations allowed on each resource, keyed by resource
+                       and then by login
+    @type permissions: dict
+    """
+
+    def __init__(self, generation, roles, permissions):
+        self.generation = generation
+        self.roles = roles
+        self.permissions = permissions
+
+    @classmethod
+    def load(cls, generation):
+        """
+        Load the index from the database.
+
+        @param generation: generation read before loading
+        @type  generation: int
+        @rtype: PermissionIndex
+        """
+        roles = {}
+        for user in User.get_collection().find(fields=['login', 'roles']):
+            roles[user['login']] = frozenset(user.get('roles') or ())
+        permissions = {}
+        for permission in Permission.get_collection().find(fields=['resource', 'users']):
+            permissions[permission['resource']] = dict(
+                (login, frozenset(operations))
+                for login, operations in permission['users'].items())
+        return cls(generation, roles, permissions)
+
+    def is_authorized(self, resource, login, operation):
+        """
+        Check if a user was granted an operation on a resource or any of the
+        resources above it.
+
+        @type resource: str
+        @param resource: pulp resource path
+        @type login: str
+        @param login: login of user to check permissions for
+        @type operation: int
+        @param operation: operation to be performed on resource
+        @rtype: bool
+        """
+        parts = [p for p in resource.split('/') if p]
+        while parts:
+            current_resource = '/%s/' % '/'.join(parts)
+            if operation in self.permissions.get(current_resource, {}).get(login, ()):
+                return True
+            parts = parts[:-1]
+        return operation in self.permissions.get('/', {}).get(login, ())
+
+
+def current_generation():
+    """
+    @return: the current generation of users, roles and permissions
+    @rtype:  int
+    """
+    document = PermissionIndexGeneration.get_collection().find_one({'_id': GENERATION_ID})
+    if document is None:
+        return 0
+    return document['generation']
+
+
+def bump_generation():
+    """
+    Record that users, roles or permissions have changed, so every process
+    reloads its index before authorizing another request.
+    """
+    PermissionIndexGeneration.get_collection().update(
+        {'_id': GENERATION_ID}, {'$inc': {'generation': 1}}, upsert=True, safe=True)
+
+
+def permission_index():
+    """
+    Return the index of the current generation, loading it if users, roles or
+    permissions changed since it was last loaded by this process.
+
+    @rtype: PermissionIndex
+    """
+    global _INDEX
+    # The generation is read before the documents, so a change made while
+    # loading results in another reload rather than a stale index.
+    generation = current_generation()
+    index = _INDEX
+    if index is not None and index.generation == generation:
+        return index
+    with _LOCK:
+        if _INDEX is None or _INDEX.generation != generation:
+            _INDEX = PermissionIndex.load(generation)
+            _LOG.debug('Loaded permission index generation [%s]' % generation)
+        return _INDEX
+
+
+def loaded_index():
+    """
+    @return: the index last loaded by this process, without checking whether
+             it is current; None if it has not been loaded
+    @rtype:  PermissionIndex or None
+    """
+    return _INDEX
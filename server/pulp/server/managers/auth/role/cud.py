@@ -25,6 +25,7 @@ from pulp.server.db.model.auth import Role, User
 from pulp.server.exceptions import (DuplicateResource, InvalidValue, MissingResource,
                                     PulpDataException)
 from pulp.server.managers import factory
+from pulp.server.managers.auth.permission import index as permission_index
 from pulp.server.util import Delta
 
 
@@ -64,6 +65,8 @@ class RoleManager(object):
         create_me = Role(id=role_id, display_name=display_name, description=description)
         Role.get_collection().save(create_me, safe=True)
 
+        permission_index.bump_generation()
+
         # Retrieve the role to return the SON object
         created = Role.get_collection().find_one({'id' : role_id})
 
@@ -100,6 +103,8 @@ class RoleManager(object):
 
         Role.get_collection().save(role, safe=True)
 
+        permission_index.bump_generation()
+
         # Retrieve the user to return the SON object
         updated = Role.get_collection().find_one({'id' : role_id})
         return updated
@@ -143,6 +148,8 @@ class RoleManager(object):
 
         Role.get_collection().remove({'id' : role_id}, safe=True)
 
+        permission_index.bump_generation()
+
     @staticmethod
     def add_permissions_to_role(role_id, resource, operations):
         """
@@ -175,6 +182,8 @@ class RoleManager(object):
 
         Role.get_collection().save(role, safe=True)
 
+        permission_index.bump_generation()
+
     @staticmethod
     def remove_permissions_from_role(role_id, resource, operations):
         """
@@ -217,6 +226,8 @@ class RoleManager(object):
 
         Role.get_collection().save(role, safe=True)
 
+        permission_index.bump_generation()
+
     @staticmethod
     def add_user_to_role(role_id, login):
         """
@@ -245,6 +256,8 @@ class RoleManager(object):
         user['roles'].append(role_id)
         User.get_collection().save(user, safe=True)
 
+        permission_index.bump_generation()
+
         for resource, operations in role['permissions'].items():
             factory.permission_manager().grant(resource, login, operations)
 
@@ -282,6 +295,8 @@ class RoleManager(object):
         user['roles'].remove(role_id)
         User.get_collection().save(user, safe=True)
 
+        permission_index.bump_generation()
+
         for resource, operations in role['permissions'].items():
             other_roles = factory.role_query_manager().get_other_roles(role, user['roles'])
             user_ops = _operations_not_granted_by_roles(resource,
@@ -301,6 +316,8 @@ class RoleManager(object):
             role['permissions'] = {'/':[pm.CREATE, pm.READ, pm.UPDATE, pm.DELETE, pm.EXECUTE]}
             Role.get_collection().save(role, safe=True)
 
+            permission_index.bump_generation()
+
 
 add_permissions_to_role = task(RoleManager.add_permissions_to_role, base=Task, ignore_result=True)
 add_user_to_role = task(RoleManager.add_user_to_role, base=Task, ignore_result=True)
@@ -27,6 +27,7 @@ from pulp.server.db.model.auth import User
 from pulp.server.exceptions import (PulpDataException, DuplicateResource, InvalidValue,
                                     MissingResource)
 from pulp.server.managers import factory
+from pulp.server.managers.auth.permission import index as permission_index
 from pulp.server.managers.auth.role.cud import SUPER_USER_ROLE
 
 
@@ -87,6 +88,8 @@ class UserManager(object):
         create_me = User(login=login, password=hashed_password, name=name, roles=roles)
         User.get_collection().save(create_me, safe=True)
 
+        permission_index.bump_generation()
+
         # Grant permissions
         permission_manager = factory.permission_manager()
         permission_manager.grant_automatic_permissions_for_user(create_me['login'])
@@ -155,6 +158,11 @@ class UserManager(object):
 
         User.get_collection().save(user, safe=True)
 
+        permission_index.bump_generation()
+
+        if 'password' in delta:
+            factory.authentication_manager().invalidate_user(login)
+
         # Retrieve the user to return the SON object
         updated = User.get_collection().find_one({'login' : login})
         updated.pop('password')
@@ -192,6 +200,10 @@ class UserManager(object):
 
         User.get_collection().remove({'login' : login}, safe=True)
 
+        permission_index.bump_generation()
+
+        factory.authentication_manager().invalidate_user(login)
+
     def ensure_admin(self):
         """
         This function ensures that there is at least one super user for the system.
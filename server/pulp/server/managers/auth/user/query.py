@@ -16,9 +16,10 @@ Contains users query classes
 
 from gettext import gettext as _
 
-from pulp.server.db.model.auth import User, Permission, Role
+from pulp.server.db.model.auth import User, Role
 from pulp.server.exceptions import PulpDataException, MissingResource
 from pulp.server.managers import factory
+from pulp.server.managers.auth.permission import index as permission_index
 from pulp.server.managers.auth.role.cud import SUPER_USER_ROLE
 
 
@@ -103,18 +104,16 @@ class UserQueryManager(object):
         @rtype: bool
         @return: True if the user is a super user, False otherwise
         """
-        user = User.get_collection().find_one({'login' : login})
-        if user is None:
-            raise MissingResource(login)
-
-        role_manager = factory.role_manager()
-        return SUPER_USER_ROLE in user['roles']
+        return self._is_superuser(permission_index.permission_index(), login)
 
 
     def is_authorized(self, resource, login, operation):
         """
         Check to see if a user is authorized to perform an operation on a resource
 
+        The check is made against this process' index of users and permissions,
+        which is reloaded only when they have changed.
+
         @type resource: str
         @param resource: pulp resource path
 
@@ -128,23 +127,24 @@ class UserQueryManager(object):
         @return: True if the user is authorized for the operation on the resource,
                  False otherwise
         """
-        if self.is_superuser(login):
+        index = permission_index.permission_index()
+        if self._is_superuser(index, login):
             return True
+        return index.is_authorized(resource, login, operation)
 
-        permission_query_manager = factory.permission_query_manager()
-
-        parts = [p for p in resource.split('/') if p]
-        while parts:
-            current_resource = '/%s/' % '/'.join(parts)
-            permission = permission_query_manager.find_by_resource(current_resource)
-            if permission is not None:
-                if operation in permission['users'].get(login, []):
-                    return True
-            parts = parts[:-1]
 
-        permission = Permission.get_collection().find_one({'resource' : '/'})
-        return (permission is not None and
-                operation in permission['users'].get(login, []))
+    @staticmethod
+    def _is_superuser(index, login):
+        """
+        @type index: L{pulp.server.managers.auth.permission.index.PermissionIndex}
+        @type login: str
+        @rtype: bool
+        @raise MissingResource: if there is no user with the given login
+        """
+        roles = index.roles.get(login)
+        if roles is None:
+            raise MissingResource(login)
+        return SUPER_USER_ROLE in roles
 
 
     def is_last_super_user(self, login):
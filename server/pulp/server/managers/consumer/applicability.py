@@ -17,6 +17,7 @@ Contains content applicability management classes
 
 from gettext import gettext as _
 from logging import getLogger
+from uuid import uuid4
 
 from celery import task
 
@@ -24,16 +25,25 @@ from pulp.plugins.conduits.profiler import ProfilerConduit
 from pulp.plugins.config import PluginCallConfiguration
 from pulp.plugins.loader import api as plugin_api, exceptions as plugin_exceptions
 from pulp.plugins.profiler import Profiler
+from pulp.server.async import constants as dispatch_constants
 from pulp.server.db.model.consumer import Bind, RepoProfileApplicability, UnitProfile
 from pulp.server.db.model.criteria import Criteria
-from pulp.server.db.model.repository import Repo
+from pulp.server.db.model.repository import Repo, RepoContentDelta, RepoContentUnit
 from pulp.server.managers import factory as managers
 from pulp.server.managers.consumer.query import ConsumerQueryManager
-from pulp.server.async.tasks import Task
+from pulp.server.async.tasks import Task, TaskResult
 
 
 logger = getLogger(__name__)
 
+# Maximum number of (repo, profile) pairs regenerated by a single applicability
+# task; larger regenerations are split into subtasks of this size
+APPLICABILITY_BATCH_SIZE = 100
+
+# Maximum number of unit ids recorded in a repository's content delta; beyond this the
+# delta is discarded and the repository's applicability is recalculated in full
+REPO_CONTENT_DELTA_MAX_UNITS = 50000
+
 
 class ApplicabilityRegenerationManager(object):
     @staticmethod
@@ -102,25 +112,91 @@ class ApplicabilityRegenerationManager(object):
                     for unit_profile_tuple in consumer_unit_profiles_map[consumer_id]:
                         repo_profile_hashes.add((repo_id, unit_profile_tuple))
 
-        # Iterate through each tuple in repo_profile_hashes set and regenerate applicability,
-        # if it doesn't exist. These are all guaranteed to be unique tuples because of the logic
-        # used to create maps and sets above, eliminating multiple unnecessary queries
-        # to check for existing applicability for same profiles.
-        manager = managers.applicability_regeneration_manager()
-        for repo_id, (profile_hash, content_type) in repo_profile_hashes:
-            # Check if applicability for given profile_hash and repo_id already exists
-            if ApplicabilityRegenerationManager._is_existing_applicability(repo_id, profile_hash):
+        # Find the pairs that already have applicability with a single query rather than
+        # checking each of them. These are all guaranteed to be unique tuples because of the
+        # logic used to create maps and sets above.
+        existing_pairs = ApplicabilityRegenerationManager._existing_applicability_pairs(
+            repo_consumers_map.keys(), profile_hash_profile_id_map.keys())
+
+        repo_profiles = []
+        for repo_id, (profile_hash, content_type) in sorted(repo_profile_hashes):
+            if (repo_id, profile_hash) in existing_pairs:
                 continue
-            # If applicability does not exist, generate applicability data for given profile
-            # and repo id.
             profile_id = profile_hash_profile_id_map[profile_hash]
-            manager.regenerate_applicability(profile_hash, content_type, profile_id, repo_id)
+            repo_profiles.append([repo_id, profile_hash, content_type, profile_id])
+
+        # Small regenerations are done in this task. Larger ones are fanned out to subtasks
+        # so they can be spread across the workers; the subtasks are reported as spawned by
+        # this task.
+        if len(repo_profiles) <= APPLICABILITY_BATCH_SIZE:
+            ApplicabilityRegenerationManager.batch_regenerate_applicability(repo_profiles)
+            return
+
+        # Workers only consume their reserved queues, so each subtask is dispatched with a
+        # reservation. The batches never share a (repo, profile) pair, so each one reserves a
+        # resource of its own and lands on the least busy worker.
+        spawned_tasks = []
+        for index in range(0, len(repo_profiles), APPLICABILITY_BATCH_SIZE):
+            batch = repo_profiles[index:index + APPLICABILITY_BATCH_SIZE]
+            spawned_tasks.append(batch_regenerate_applicability.apply_async_with_reservation(
+                dispatch_constants.RESOURCE_REPOSITORY_PROFILE_APPLICABILITY_TYPE, str(uuid4()),
+                (batch,)))
+        return TaskResult(spawned_tasks=spawned_tasks)
+
+    @staticmethod
+    def batch_regenerate_applicability(repo_profiles):
+        """
+        Regenerate and save applicability data for a batch of (repo, profile) pairs that do
+        not have applicability data yet.
+
+        The bound repositories' content types and the profiles are each loaded with a single
+        query and the profilers are resolved once per content type for the whole batch.
+
+        :param repo_profiles: list of [repo_id, profile_hash, content_type, profile_id] lists
+        :type  repo_profiles: list
+        """
+        if not repo_profiles:
+            return
+
+        repo_content_types = ApplicabilityRegenerationManager._get_existing_repo_content_types_map(
+            list(set(r[0] for r in repo_profiles)))
+
+        profilers = {}
+        pending = []
+        for repo_id, profile_hash, content_type, profile_id in repo_profiles:
+            if content_type not in profilers:
+                profilers[content_type] = ApplicabilityRegenerationManager._profiler(content_type)
+            profiler, profiler_cfg = profilers[content_type]
+            if ApplicabilityRegenerationManager._is_applicable_profiler(
+                    profiler, repo_content_types.get(repo_id, [])):
+                pending.append((repo_id, profile_hash, content_type, profile_id))
+
+        if not pending:
+            return
+
+        profile_ids = list(set(p[3] for p in pending))
+        profiles = dict((p['id'], p['profile']) for p in UnitProfile.get_collection().find(
+            {'id': {'$in': profile_ids}}, fields=['id', 'profile']))
+
+        profiler_conduit = ProfilerConduit()
+        for repo_id, profile_hash, content_type, profile_id in pending:
+            if profile_id not in profiles:
+                # The profile was removed since this batch was assembled
+                continue
+            profiler, profiler_cfg = profilers[content_type]
+            ApplicabilityRegenerationManager._calculate_and_save_applicability(
+                profile_hash, content_type, profiles[profile_id], repo_id, profiler,
+                profiler_cfg, profiler_conduit)
 
     @staticmethod
     def regenerate_applicability_for_repos(repo_criteria):
         """
         Regenerate and save applicability data affected by given updated repositories.
 
+        If the content changes to a repository since its last regeneration were recorded,
+        profilers that implement update_applicable_units only evaluate those changes. All
+        other applicability is recalculated in full.
+
         :param repo_criteria: The repo selection criteria
         :type repo_criteria: dict
         """
@@ -132,21 +208,177 @@ class ApplicabilityRegenerationManager(object):
         repo_ids = [r['id'] for r in repo_query_manager.find_by_criteria(repo_criteria)]
 
         for repo_id in repo_ids:
-            # Find all existing applicabilities for given repo_id
-            existing_applicabilities = RepoProfileApplicability.get_collection().find(
-                {'repo_id':repo_id})
-            for existing_applicability in existing_applicabilities:
-                # Convert cursor to RepoProfileApplicability object
-                existing_applicability = RepoProfileApplicability(**dict(existing_applicability))
-                profile_hash = existing_applicability['profile_hash']
-                unit_profile = UnitProfile.get_collection().find_one({'profile_hash': profile_hash},
-                                                                     fields=['id', 'content_type'])
-                # Regenerate applicability data for given unit_profile and repo id
-                ApplicabilityRegenerationManager.regenerate_applicability(profile_hash, 
-                                                                          unit_profile['content_type'],
-                                                                          unit_profile['id'],
-                                                                          repo_id,
-                                                                          existing_applicability)
+            # The delta is claimed before the applicability is read so that content changes
+            # made while this runs are recorded in a new delta for the next regeneration.
+            delta = ApplicabilityRegenerationManager._pop_repo_content_delta(repo_id)
+            try:
+                ApplicabilityRegenerationManager._regenerate_repo_applicability(repo_id, delta)
+            except Exception:
+                # The claimed delta is lost; make sure the next regeneration starts over
+                ApplicabilityRegenerationManager._invalidate_repo_content_delta(repo_id)
+                raise
+
+    @staticmethod
+    def _regenerate_repo_applicability(repo_id, delta):
+        """
+        Regenerate and save all existing applicability data for a single repository.
+
+        :param repo_id: id of the repository
+        :type  repo_id: str
+        :param delta:   content changes recorded for the repository, or None to recalculate
+                        all applicability in full
+        :type  delta:   dict or None
+        """
+        # Find all existing applicabilities for given repo_id
+        existing_applicabilities = [RepoProfileApplicability(**dict(a)) for a in
+                                    RepoProfileApplicability.get_collection().find(
+                                        {'repo_id': repo_id})]
+        if not existing_applicabilities:
+            return
+
+        # Look up the content type of all of the profiles with a single query
+        profile_hashes = list(set(a.profile_hash for a in existing_applicabilities))
+        unit_profiles = UnitProfile.get_collection().find(
+            {'profile_hash': {'$in': profile_hashes}}, fields=['profile_hash', 'content_type'])
+        profile_content_types = dict((p['profile_hash'], p['content_type'])
+                                     for p in unit_profiles)
+
+        repo_content_types = ApplicabilityRegenerationManager._get_existing_repo_content_types(
+            repo_id)
+
+        profilers = {}
+        profiler_conduit = ProfilerConduit()
+        for existing_applicability in existing_applicabilities:
+            content_type = profile_content_types.get(existing_applicability.profile_hash)
+            if content_type is None:
+                # The profile no longer exists; the applicability is removed as an orphan
+                continue
+            if content_type not in profilers:
+                profilers[content_type] = ApplicabilityRegenerationManager._profiler(content_type)
+            profiler, profiler_cfg = profilers[content_type]
+
+            if not ApplicabilityRegenerationManager._is_applicable_profiler(profiler,
+                                                                            repo_content_types):
+                continue
+
+            if delta is not None and \
+                    ApplicabilityRegenerationManager._is_incremental_profiler(profiler):
+                ApplicabilityRegenerationManager._update_and_save_applicability(
+                    existing_applicability, delta, profiler, profiler_cfg, profiler_conduit)
+            else:
+                ApplicabilityRegenerationManager._calculate_and_save_applicability(
+                    existing_applicability.profile_hash, content_type,
+                    existing_applicability.profile, repo_id, profiler, profiler_cfg,
+                    profiler_conduit, existing_applicability)
+
+    @staticmethod
+    def record_repo_content_delta(repo_id, added_unit_ids=None, removed_unit_ids=None):
+        """
+        Record units associated with or removed from a repository so the repository's
+        applicability can later be updated incrementally. Callers record every change made by
+        one bulk operation with a single call, which checks the repository once and updates its
+        delta once for the added units and once for the removed units, whatever their types.
+
+        Nothing is recorded for repositories without applicability data, which includes every
+        repository without bound consumers, since their applicability is calculated from
+        scratch anyway. A unit that is removed after being added (or the reverse) is only kept
+        in the list matching its latest change. Once the delta holds more than
+        REPO_CONTENT_DELTA_MAX_UNITS unit ids it is discarded and the repository's
+        applicability will be recalculated in full.
+
+        :param repo_id:          id of the repository
+        :type  repo_id:          str
+        :param added_unit_ids:   content type id -> ids of units associated with the repository
+        :type  added_unit_ids:   dict
+        :param removed_unit_ids: content type id -> ids of units no longer associated with the
+                                 repository
+        :type  removed_unit_ids: dict
+        """
+        added_unit_ids = dict((unit_type_id, list(unit_ids)) for unit_type_id, unit_ids
+                              in (added_unit_ids or {}).items() if unit_ids)
+        removed_unit_ids = dict((unit_type_id, list(unit_ids)) for unit_type_id, unit_ids
+                                in (removed_unit_ids or {}).items() if unit_ids)
+        if not added_unit_ids and not removed_unit_ids:
+            return
+
+        if not RepoProfileApplicability.get_collection().find_one({'repo_id': repo_id},
+                                                                  fields=['_id']):
+            return
+
+        collection = RepoContentDelta.get_collection()
+        changes = ((added_unit_ids, 'added', 'removed'),
+                   (removed_unit_ids, 'removed', 'added'))
+        for unit_ids_by_type, add_to_key, pull_from_key in changes:
+            if not unit_ids_by_type:
+                continue
+            unit_count = 0
+            add_to_set = {}
+            pull_all = {}
+            for unit_type_id, unit_ids in unit_ids_by_type.items():
+                unit_count += len(unit_ids)
+                add_to_set['%s.%s' % (add_to_key, unit_type_id)] = {'$each': unit_ids}
+                pull_all['%s.%s' % (pull_from_key, unit_type_id)] = unit_ids
+            document = {'$inc': {'unit_count': unit_count},
+                        '$addToSet': add_to_set,
+                        '$pullAll': pull_all}
+            delta = collection.find_and_modify({'repo_id': repo_id}, document, upsert=True,
+                                               new=True, fields=['unit_count'])
+            if delta['unit_count'] > REPO_CONTENT_DELTA_MAX_UNITS:
+                ApplicabilityRegenerationManager._invalidate_repo_content_delta(repo_id)
+                return
+
+    @staticmethod
+    def record_updated_units(unit_type_id, unit_ids):
+        """
+        Record units whose metadata changed as added to every repository they are associated
+        with, so that incremental applicability regeneration evaluates them again.
+
+        :param unit_type_id: content type id of the units
+        :type  unit_type_id: str
+        :param unit_ids:     ids of the updated units
+        :type  unit_ids:     list
+        """
+        if not unit_ids:
+            return
+        associations = RepoContentUnit.get_collection().find(
+            {'unit_type_id': unit_type_id, 'unit_id': {'$in': list(unit_ids)}},
+            fields=['repo_id', 'unit_id'])
+        repo_unit_ids = {}
+        for association in associations:
+            repo_unit_ids.setdefault(association['repo_id'], set()).add(association['unit_id'])
+        for repo_id, repo_ids in repo_unit_ids.items():
+            ApplicabilityRegenerationManager.record_repo_content_delta(
+                repo_id, added_unit_ids={unit_type_id: list(repo_ids)})
+
+    @staticmethod
+    def _pop_repo_content_delta(repo_id):
+        """
+        Atomically remove and return the content delta recorded for a repository.
+
+        :param repo_id: id of the repository
+        :type  repo_id: str
+        :return:        the delta document, or None if the repository's applicability must
+                        be recalculated in full
+        :rtype:         dict or None
+        """
+        delta = RepoContentDelta.get_collection().find_and_modify({'repo_id': repo_id},
+                                                                  remove=True)
+        if delta is None or delta.get('full'):
+            return None
+        return delta
+
+    @staticmethod
+    def _invalidate_repo_content_delta(repo_id):
+        """
+        Make sure the next applicability regeneration for a repository is a full one.
+
+        :param repo_id: id of the repository
+        :type  repo_id: str
+        """
+        RepoContentDelta.get_collection().update(
+            {'repo_id': repo_id},
+            {'$set': {'full': True}, '$unset': {'added': 1, 'removed': 1}},
+            upsert=True, safe=True)
 
     @staticmethod
     def regenerate_applicability(profile_hash, content_type, profile_id,
@@ -171,51 +403,143 @@ class ApplicabilityRegenerationManager(object):
         :param existing_applicability: existing RepoProfileApplicability object to be replaced
         :type existing_applicability: pulp.server.db.model.consumer.RepoProfileApplicability
         """
-        profiler_conduit = ProfilerConduit()
         # Get the profiler for content_type of given unit_profile
         profiler, profiler_cfg = ApplicabilityRegenerationManager._profiler(content_type)
 
-        # Check if the profiler supports applicability, else return
-        if profiler.calculate_applicable_units == Profiler.calculate_applicable_units:
-            # If base class calculate_applicable_units method is called,
-            # skip applicability regeneration
-            return
-
         # Find out which content types have unit counts greater than zero in the bound repo
         repo_content_types = ApplicabilityRegenerationManager._get_existing_repo_content_types(
             bound_repo_id)
+
+        if not ApplicabilityRegenerationManager._is_applicable_profiler(profiler,
+                                                                        repo_content_types):
+            return
+
+        # Get the actual profile for existing_applicability or lookup using profile_id
+        if existing_applicability:
+            profile = existing_applicability.profile
+        else:
+            unit_profile = UnitProfile.get_collection().find_one({'id': profile_id},
+                                                                 fields=['profile'])
+            profile = unit_profile['profile']
+
+        ApplicabilityRegenerationManager._calculate_and_save_applicability(
+            profile_hash, content_type, profile, bound_repo_id, profiler, profiler_cfg,
+            ProfilerConduit(), existing_applicability)
+
+    @staticmethod
+    def _is_applicable_profiler(profiler, repo_content_types):
+        """
+        Determine if the given profiler supports applicability and handles any of the
+        content types in a repository.
+
+        :param profiler:           profiler instance
+        :type  profiler:           pulp.plugins.profiler.Profiler
+        :param repo_content_types: content type ids with units in the repository
+        :type  repo_content_types: list
+        :return:                   True if applicability should be calculated
+        :rtype:                    bool
+        """
+        # If the base class calculate_applicable_units method would be called,
+        # skip applicability regeneration
+        if profiler.calculate_applicable_units == Profiler.calculate_applicable_units:
+            return False
+
         # Get the intersection of existing types in the repo and the types that the profiler
         # handles. If the intersection is not empty, regenerate applicability
-        if (set(repo_content_types) & set(profiler.metadata()['types'])):
-            # Get the actual profile for existing_applicability or lookup using profile_id
-            if existing_applicability:
-                profile = existing_applicability.profile
-            else:
-                unit_profile = UnitProfile.get_collection().find_one({'id': profile_id},
-                                                                     fields=['profile'])
-                profile = unit_profile['profile']
-            call_config = PluginCallConfiguration(plugin_config=profiler_cfg,
-                                                  repo_plugin_config=None)
-            try:
-                applicability = profiler.calculate_applicable_units(profile,
-                                                                    bound_repo_id,
-                                                                    call_config,
-                                                                    profiler_conduit)
-            except NotImplementedError:
-                logger.debug("Profiler for content type [%s] does not support applicability"
-                           % content_type)
-                return
+        return bool(set(repo_content_types) & set(profiler.metadata()['types']))
 
-            if existing_applicability:
-                # Update existing applicability object
-                existing_applicability.applicability = applicability
-                existing_applicability.save()
-            else:
-                # Create a new RepoProfileApplicability object and save it in the db
-                RepoProfileApplicability.objects.create(profile_hash,
-                                                        bound_repo_id,
-                                                        unit_profile['profile'],
-                                                        applicability)
+    @staticmethod
+    def _is_incremental_profiler(profiler):
+        """
+        Determine if the given profiler can update existing applicability incrementally.
+
+        :param profiler: profiler instance
+        :type  profiler: pulp.plugins.profiler.Profiler
+        :return:         True if the profiler implements update_applicable_units
+        :rtype:          bool
+        """
+        return profiler.update_applicable_units != Profiler.update_applicable_units
+
+    @staticmethod
+    def _update_and_save_applicability(existing_applicability, delta, profiler, profiler_cfg,
+                                       profiler_conduit):
+        """
+        Apply a repository content delta to existing applicability with the given profiler
+        and save it.
+
+        :param existing_applicability: existing RepoProfileApplicability object to update
+        :type  existing_applicability: pulp.server.db.model.consumer.RepoProfileApplicability
+        :param delta:                  content changes recorded for the repository
+        :type  delta:                  dict
+        :param profiler:               profiler for the profile's content type
+        :type  profiler:               pulp.plugins.profiler.Profiler
+        :param profiler_cfg:           profiler plugin configuration
+        :type  profiler_cfg:           dict
+        :param profiler_conduit:       conduit passed to the profiler
+        :type  profiler_conduit:       pulp.plugins.conduits.profiler.ProfilerConduit
+        """
+        added = delta.get('added') or {}
+        removed = delta.get('removed') or {}
+        if not any(added.values()) and not any(removed.values()):
+            return
+
+        call_config = PluginCallConfiguration(plugin_config=profiler_cfg,
+                                              repo_plugin_config=None)
+        applicability = profiler.update_applicable_units(existing_applicability.profile,
+                                                         existing_applicability.repo_id,
+                                                         existing_applicability.applicability,
+                                                         added, removed, call_config,
+                                                         profiler_conduit)
+        existing_applicability.applicability = applicability
+        existing_applicability.save()
+
+    @staticmethod
+    def _calculate_and_save_applicability(profile_hash, content_type, profile, bound_repo_id,
+                                          profiler, profiler_cfg, profiler_conduit,
+                                          existing_applicability=None):
+        """
+        Calculate applicability for a profile against a bound repo with the given profiler
+        and save it, replacing existing_applicability if it is not None.
+
+        :param profile_hash:           hash of the unit profile
+        :type  profile_hash:           basestring
+        :param content_type:           profile (unit) type ID
+        :type  content_type:           str
+        :param profile:                the unit profile
+        :type  profile:                object
+        :param bound_repo_id:          repo id to calculate applicability against
+        :type  bound_repo_id:          str
+        :param profiler:               profiler for the content type
+        :type  profiler:               pulp.plugins.profiler.Profiler
+        :param profiler_cfg:           profiler plugin configuration
+        :type  profiler_cfg:           dict
+        :param profiler_conduit:       conduit passed to the profiler
+        :type  profiler_conduit:       pulp.plugins.conduits.profiler.ProfilerConduit
+        :param existing_applicability: existing RepoProfileApplicability object to be replaced
+        :type  existing_applicability: pulp.server.db.model.consumer.RepoProfileApplicability
+        """
+        call_config = PluginCallConfiguration(plugin_config=profiler_cfg,
+                                              repo_plugin_config=None)
+        try:
+            applicability = profiler.calculate_applicable_units(profile,
+                                                                bound_repo_id,
+                                                                call_config,
+                                                                profiler_conduit)
+        except NotImplementedError:
+            logger.debug("Profiler for content type [%s] does not support applicability"
+                       % content_type)
+            return
+
+        if existing_applicability:
+            # Update existing applicability object
+            existing_applicability.applicability = applicability
+            existing_applicability.save()
+        else:
+            # Create a new RepoProfileApplicability object and save it in the db
+            RepoProfileApplicability.objects.create(profile_hash,
+                                                    bound_repo_id,
+                                                    profile,
+                                                    applicability)
 
     @staticmethod
     def _get_existing_repo_content_types(repo_id):
@@ -235,6 +559,47 @@ class ApplicabilityRegenerationManager(object):
                     repo_content_types_with_non_zero_unit_count.append(content_type)
         return repo_content_types_with_non_zero_unit_count
 
+    @staticmethod
+    def _get_existing_repo_content_types_map(repo_ids):
+        """
+        For each of the given repo_ids, find the content_type_ids that have content unit
+        counts greater than 0, using a single query.
+
+        :param repo_ids: ids of the repositories
+        :type  repo_ids: list
+        :return:         mapping of repo_id to a list of content type ids that have unit
+                         counts greater than 0; missing repositories are not included
+        :rtype:          dict
+        """
+        repo_content_types = {}
+        repos = Repo.get_collection().find({'id': {'$in': repo_ids}},
+                                           fields=['id', 'content_unit_counts'])
+        for repo in repos:
+            counts = repo.get('content_unit_counts') or {}
+            repo_content_types[repo['id']] = [t for t, c in counts.items() if c > 0]
+        return repo_content_types
+
+    @staticmethod
+    def _existing_applicability_pairs(repo_ids, profile_hashes):
+        """
+        Find the (repo_id, profile_hash) pairs that already have applicability calculated,
+        using a single query.
+
+        :param repo_ids:       repo ids to check
+        :type  repo_ids:       list
+        :param profile_hashes: unit profile hashes to check
+        :type  profile_hashes: list
+        :return:               set of (repo_id, profile_hash) tuples
+        :rtype:                set
+        """
+        if not repo_ids or not profile_hashes:
+            return set()
+        query_params = {'repo_id': {'$in': list(repo_ids)},
+                        'profile_hash': {'$in': list(profile_hashes)}}
+        applicabilities = RepoProfileApplicability.get_collection().find(
+            query_params, fields=['repo_id', 'profile_hash'])
+        return set((a['repo_id'], a['profile_hash']) for a in applicabilities)
+
     @staticmethod
     def _is_existing_applicability(repo_id, profile_hash):
         """
@@ -278,6 +643,9 @@ regenerate_applicability_for_consumers = task(
 regenerate_applicability_for_repos = task(
     ApplicabilityRegenerationManager.regenerate_applicability_for_repos, base=Task,
     ignore_result=True)
+batch_regenerate_applicability = task(
+    ApplicabilityRegenerationManager.batch_regenerate_applicability, base=Task,
+    ignore_result=True)
 
 
 class DoesNotExist(Exception):
@@ -24,6 +24,12 @@ log = getLogger(__name__)
 # in the catalog after it has expired.
 GRACE_PERIOD = 3600  # 1 hour.
 
+# The maximum number of locators in each query made by find_many().
+QUERY_CHUNK_SIZE = 1000
+
+# The maximum number of entries in each insert made by add_entries().
+INSERT_CHUNK_SIZE = 1000
+
 
 class ContentCatalogManager(object):
     """
@@ -35,6 +41,9 @@ class ContentCatalogManager(object):
      - The locator is a hashed json encoding of the type_id and unit_key.  It is
        used for fast indexing and searching since the unit_key is arbitrary.
      - The catalog may be refreshed concurrently.
+     - Each refresh of a content source adds its entries under a new refresh ID.
+       Once the refresh has succeeded, the entries added by earlier refreshes
+       are purged rather than deleted one at a time.
      - The catalog provides best effort read consistency by:
        - lazily purging expired entries.
        - supporting find() operations on a catalog containing multiple entries
@@ -42,7 +51,7 @@ class ContentCatalogManager(object):
          included for each source in the result set.
     """
 
-    def add_entry(self, source_id, expires, type_id, unit_key, url):
+    def add_entry(self, source_id, expires, type_id, unit_key, url, refresh_id=None):
         """
         Add an entry to the content catalog.
         :param source_id: A content source ID.
@@ -55,11 +64,24 @@ class ContentCatalogManager(object):
         :type unit_key: dict
         :param url: The download URL.
         :type url: str
+        :param refresh_id: The ID of the refresh adding the entry.
+        :type refresh_id: str
         """
         collection = ContentCatalog.get_collection()
-        entry = ContentCatalog(source_id, expires, type_id, unit_key, url)
+        entry = ContentCatalog(source_id, expires, type_id, unit_key, url, refresh_id)
         collection.insert(entry, safe=True)
 
+    def add_entries(self, entries):
+        """
+        Add entries to the content catalog using one insert for every
+        INSERT_CHUNK_SIZE entries rather than one insert per entry.
+        :param entries: A list of entries to add.
+        :type entries: list of: pulp.server.db.model.content.ContentCatalog
+        """
+        collection = ContentCatalog.get_collection()
+        for i in range(0, len(entries), INSERT_CHUNK_SIZE):
+            collection.insert(entries[i:i + INSERT_CHUNK_SIZE], safe=True)
+
     def delete_entry(self, source_id, type_id, unit_key):
         """
         Delete an entry from the content catalog.
@@ -86,6 +108,19 @@ class ContentCatalogManager(object):
         query = {'source_id': source_id}
         collection.remove(query, safe=True)
 
+    def purge_superseded(self, source_id, refresh_id):
+        """
+        Purge (delete) entries from the content catalog belonging to the
+        specified content source that were not added by the specified refresh.
+        :param source_id: A content source ID.
+        :type source_id: str
+        :param refresh_id: The ID of the refresh that superseded earlier entries.
+        :type refresh_id: str
+        """
+        collection = ContentCatalog.get_collection()
+        query = {'source_id': source_id, 'refresh_id': {'$ne': refresh_id}}
+        collection.remove(query, safe=True)
+
     def purge_expired(self, grace_period=GRACE_PERIOD):
         """
         Purge (delete) expired entries from the content catalog belonging
@@ -138,6 +173,35 @@ class ContentCatalogManager(object):
             newest_by_source[entry['source_id']] = entry
         return newest_by_source.values()
 
+    def find_many(self, type_id, unit_keys):
+        """
+        Find entries in the content catalog for each of the specified unit keys
+        of the unit type_id.  The entries are found using one query for every
+        QUERY_CHUNK_SIZE distinct unit keys rather than one query per unit key.
+        As with find(), only the newest entry for each source is included.
+        :param type_id: The unit type ID.
+        :type type_id: str
+        :param unit_keys: A list of unit keys.
+        :type unit_keys: list
+        :return: A list of matching entries for each unit key, in the order
+            of the unit keys.
+        :rtype: list
+        """
+        collection = ContentCatalog.get_collection()
+        locators = [ContentCatalog.get_locator(type_id, unit_key) for unit_key in unit_keys]
+        distinct = list(set(locators))
+        expiration = ContentCatalog.get_expiration(0)
+        newest_by_locator = {}
+        for i in range(0, len(distinct), QUERY_CHUNK_SIZE):
+            query = {
+                'locator': {'$in': distinct[i:i + QUERY_CHUNK_SIZE]},
+                'expiration': {'$gte': expiration}
+            }
+            for entry in collection.find(query, sort=[('_id', ASCENDING)]):
+                newest_by_source = newest_by_locator.setdefault(entry['locator'], {})
+                newest_by_source[entry['source_id']] = entry
+        return [newest_by_locator.get(locator, {}).values() for locator in locators]
+
     def has_entries(self, source_id):
         """
         Get whether the specified content source has entries in the catalog.
@@ -47,6 +47,36 @@ class ContentManager(object):
         collection.insert(unit_doc, safe=True)
         return unit_id
 
+    def add_content_units(self, content_type, units_metadata):
+        """
+        Add multiple content units and their metadata to the corresponding
+        pulp db collection using a single bulk insert.
+        @param content_type: unique id of content collection
+        @type content_type: str
+        @param units_metadata: list of content unit metadata dicts
+        @type units_metadata: list of dict
+        @return: list of generated unit ids, in the same order as the metadata
+        @rtype: list of str
+        """
+        if not units_metadata:
+            return []
+        collection = content_types_db.type_units_collection(content_type)
+        last_updated = dateutils.now_utc_timestamp()
+        unit_ids = []
+        unit_docs = []
+        for unit_metadata in units_metadata:
+            unit_id = str(uuid.uuid4())
+            unit_doc = {
+                '_id': unit_id,
+                '_content_type_id': content_type,
+                '_last_updated': last_updated
+            }
+            unit_doc.update(unit_metadata)
+            unit_ids.append(unit_id)
+            unit_docs.append(unit_doc)
+        collection.insert(unit_docs, safe=True)
+        return unit_ids
+
     def update_content_unit(self, content_type, unit_id, unit_metadata_delta):
         """
         Update a content unit's stored metadata.
@@ -28,6 +28,15 @@ from pulp.server.db.model.repository import RepoContentUnit
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of associated unit ids held in memory while looking for the
+# orphans of a single content type; above this the associations are probed
+# with batched $in queries instead
+ASSOCIATED_IDS_MAX_SET_SIZE = 1000000
+
+# Number of unit ids handled per query when probing associations in batches
+# and per remove call when deleting orphans
+ORPHAN_CHUNK_SIZE = 1000
+
 
 class OrphanManager(object):
 
@@ -97,6 +106,12 @@ class OrphanManager(object):
 
         If fields is not specified, only the `_id` field will be present.
 
+        The associated unit ids for the type are loaded into memory once and the
+        content units are streamed and checked against them, so the number of
+        database queries does not depend on the number of units. Types with more
+        associations than ASSOCIATED_IDS_MAX_SET_SIZE are instead checked with
+        one $in query per ORPHAN_CHUNK_SIZE units.
+
         :param content_type_id: id of the content type
         :type content_type_id: basestring
         :param fields: list of fields to include in each content unit
@@ -109,15 +124,43 @@ class OrphanManager(object):
         content_units_collection = content_types_db.type_units_collection(content_type_id)
         repo_content_units_collection = RepoContentUnit.get_collection()
 
-        for content_unit in content_units_collection.find({}, fields=fields):
+        spec = {'unit_type_id': content_type_id}
+        association_count = repo_content_units_collection.find(spec).count()
+        content_units = content_units_collection.find({}, fields=fields)
 
-            repo_content_units_cursor = repo_content_units_collection.find(
-                {'unit_id': content_unit['_id']})
+        if association_count <= ASSOCIATED_IDS_MAX_SET_SIZE:
+            associated_unit_ids = set(
+                a['unit_id'] for a in repo_content_units_collection.find(spec, fields=['unit_id']))
 
-            if repo_content_units_cursor.count() > 0:
-                continue
+            for content_unit in content_units:
+                if content_unit['_id'] not in associated_unit_ids:
+                    yield content_unit
+            return
+
+        for chunk in _chunks(content_units, ORPHAN_CHUNK_SIZE):
+            associated_unit_ids = OrphanManager._associated_unit_ids(
+                content_type_id, [content_unit['_id'] for content_unit in chunk])
 
-            yield content_unit
+            for content_unit in chunk:
+                if content_unit['_id'] not in associated_unit_ids:
+                    yield content_unit
+
+    @staticmethod
+    def _associated_unit_ids(content_type_id, content_unit_ids):
+        """
+        Return the subset of the given content unit ids that are associated
+        with at least one repository.
+
+        :param content_type_id: id of the content type
+        :type content_type_id: basestring
+        :param content_unit_ids: content unit ids to check
+        :type content_unit_ids: list
+        :return: set of the associated content unit ids
+        :rtype: set
+        """
+        spec = {'unit_type_id': content_type_id, 'unit_id': {'$in': content_unit_ids}}
+        cursor = RepoContentUnit.get_collection().find(spec, fields=['unit_id'])
+        return set(a['unit_id'] for a in cursor)
 
     @staticmethod
     def generate_orphans_by_type_with_unit_keys(content_type_id):
@@ -153,15 +196,16 @@ class OrphanManager(object):
                                  given content type and unit id
         """
 
-        for content_unit in OrphanManager.generate_orphans_by_type(content_type_id):
-
-            if content_unit['_id'] != content_unit_id:
-                continue
+        content_units_collection = content_types_db.type_units_collection(content_type_id)
+        content_unit = content_units_collection.find_one({'_id': content_unit_id},
+                                                         fields=['_id'])
 
-            return content_unit
+        if content_unit is None or \
+                OrphanManager._associated_unit_ids(content_type_id, [content_unit_id]):
+            raise pulp_exceptions.MissingResource(content_type=content_type_id,
+                                                  content_unit=content_unit_id)
 
-        raise pulp_exceptions.MissingResource(content_type=content_type_id,
-                                              content_unit=content_unit_id)
+        return content_unit
 
     @staticmethod
     def delete_all_orphans(flush=True):
@@ -220,6 +264,12 @@ class OrphanManager(object):
         If the content_unit_ids parameter is not None, is acts as a filter of
         the specific orphaned content units that may be deleted.
 
+        The orphans are deleted in chunks of ORPHAN_CHUNK_SIZE. Each chunk is
+        checked again against the repository associations right before it is
+        removed, so units associated while the deletion is running are kept.
+        Every chunk is complete once it is removed, so an interrupted deletion
+        can be resumed by simply calling this method again.
+
         NOTE: this method deletes the content unit's bits from disk, if applicable.
         NOTE: `flush` should not be set to False unless you know what you're doing
 
@@ -229,27 +279,44 @@ class OrphanManager(object):
         :type content_unit_ids: iterable or None
         :param flush: flush the database updates to disk on completion
         :type flush: bool
+        :return: number of orphaned content units deleted
+        :rtype: int
         """
 
         content_units_collection = content_types_db.type_units_collection(content_type_id)
+        if content_unit_ids is not None:
+            content_unit_ids = set(content_unit_ids)
+
+        orphans = OrphanManager.generate_orphans_by_type(content_type_id,
+                                                         fields=['_id', '_storage_path'])
+        if content_unit_ids is not None:
+            orphans = (o for o in orphans if o['_id'] in content_unit_ids)
 
-        for content_unit in OrphanManager.generate_orphans_by_type(content_type_id,
-                                                                   fields=['_id', '_storage_path']):
+        deleted_count = 0
+        for chunk in _chunks(orphans, ORPHAN_CHUNK_SIZE):
 
-            if content_unit_ids is not None and content_unit['_id'] not in content_unit_ids:
+            chunk_ids = [content_unit['_id'] for content_unit in chunk]
+            associated_unit_ids = OrphanManager._associated_unit_ids(content_type_id, chunk_ids)
+            chunk = [c for c in chunk if c['_id'] not in associated_unit_ids]
+            if not chunk:
                 continue
 
-            content_units_collection.remove(content_unit['_id'], safe=False)
+            content_units_collection.remove({'_id': {'$in': [c['_id'] for c in chunk]}},
+                                            safe=False)
+            deleted_count += len(chunk)
 
-            storage_path = content_unit.get('_storage_path', None)
-            if storage_path is not None:
-                OrphanManager.delete_orphaned_file(storage_path)
+            for content_unit in chunk:
+                storage_path = content_unit.get('_storage_path', None)
+                if storage_path is not None:
+                    OrphanManager.delete_orphaned_file(storage_path)
 
         # this forces the database to flush any cached changes to the disk
         # in the background; for example: the unsafe deletes in the loop above
         if flush:
             db_connection.flush_database()
 
+        return deleted_count
+
     @staticmethod
     def delete_orphaned_file(path):
         """
@@ -290,6 +357,28 @@ class OrphanManager(object):
             os.rmdir(path)
 
 
+def _chunks(iterable, chunk_size):
+    """
+    Split an iterable into lists of at most chunk_size items without loading
+    the whole iterable into memory.
+
+    :param iterable: items to split
+    :type iterable: iterable
+    :param chunk_size: maximum number of items per chunk
+    :type chunk_size: int
+    :return: generator of lists
+    :rtype: generator
+    """
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
 delete_all_orphans = task(OrphanManager.delete_all_orphans, base=Task, ignore_result=True)
 delete_orphans_by_id = task(OrphanManager.delete_orphans_by_id, base=Task, ignore_result=True)
 delete_orphans_by_type = task(OrphanManager.delete_orphans_by_type, base=Task, ignore_result=True)
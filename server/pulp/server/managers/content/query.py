@@ -182,6 +182,36 @@ class ContentQueryManager(object):
         cursor = collection.find(spec, fields=model_fields)
         return tuple(cursor)
 
+    def find_by_unit_keys(self, content_type, unit_keys_dicts, model_fields=None):
+        """
+        Look up the content units that exactly match any of the given keys
+        dictionaries with a single $or query. Unlike
+        get_multiple_units_by_keys_dicts, the spec built here never matches
+        units whose key values come from different keys dictionaries, which
+        keeps the result bounded by the number of keys dictionaries when
+        resolving large batches of units.
+        @param content_type: unique id of content collection
+        @type content_type: str
+        @param unit_keys_dicts: list of dictionaries whose key, value pairs can
+                                uniquely identify a content unit
+        @type unit_keys_dicts: list of dict's
+        @param model_fields: fields of each content unit to report,
+                             None means all fields
+        @type model_fields: None or list of str's
+        @return: tuple of content units found in the content type collection
+                 that match the given unit keys dictionaries
+        @rtype: (possibly empty) tuple of dict's
+        @raise ValueError if any of the keys dictionaries are invalid
+        """
+        if not unit_keys_dicts:
+            return ()
+        # validates every keys dictionary against the type's unit key
+        _build_multi_keys_spec(content_type, unit_keys_dicts)
+        collection = content_types_db.type_units_collection(content_type)
+        spec = {'$or': [dict(keys_dict) for keys_dict in unit_keys_dicts]}
+        cursor = collection.find(spec, fields=model_fields)
+        return tuple(cursor)
+
     def get_multiple_units_by_ids(self, content_type, unit_ids, model_fields=None):
         """
         Look up multiple content units in the collection for the given content
@@ -13,10 +13,15 @@
 from celery import task
 from gettext import gettext as _
 from uuid import uuid4
+import errno
+import hashlib
 import logging
 import os
+import shutil
 import sys
+import threading
 
+from pulp.common.compat import json
 from pulp.plugins.conduits.upload import UploadConduit
 from pulp.plugins.config import PluginCallConfiguration
 from pulp.plugins.loader import api as plugin_api, exceptions as plugin_exceptions
@@ -31,6 +36,42 @@ import pulp.server.managers.repo._common as repo_common_utils
 
 logger = logging.getLogger(__name__)
 
+# Number of bytes read at a time when verifying the checksum of an uploaded file
+CHECKSUM_BUFFER_SIZE = 1048576
+
+# Number of bytes read at a time when saving a segment streamed from the client
+STREAM_BUFFER_SIZE = 65536
+
+# Digests of the uploads whose segments have arrived in order in this process,
+# keyed by upload ID. A hash can't be resumed from its saved hex digest, so the
+# running digests are kept here; an upload's entry is dropped as soon as it
+# stops being digested, is deleted, or its files are removed by another process.
+_DIGESTS = {}
+_DIGESTS_LOCK = threading.Lock()
+
+
+class RollingDigest(object):
+    """
+    SHA-256 of an uploaded file, calculated as its segments arrive. It can
+    only be kept while the segments arrive in order, one at a time.
+
+    :ivar length:  number of bytes digested
+    :type length:  int
+    :ivar sha256:  digest of the bytes so far
+    :type sha256:  hashlib.sha256
+    :ivar writing: True while a segment is being saved
+    :type writing: bool
+    """
+
+    def __init__(self):
+        self.length = 0
+        self.sha256 = hashlib.sha256()
+        self.writing = False
+
+    def update(self, data):
+        self.sha256.update(data)
+        self.length += len(data)
+
 
 class ContentUploadManager(object):
     def initialize_upload(self):
@@ -59,6 +100,12 @@ class ContentUploadManager(object):
         f = open(file_path, 'w')
         f.close()
 
+        digest = RollingDigest()
+        with _DIGESTS_LOCK:
+            ContentUploadManager._evict_stale_digests()
+            _DIGESTS[upload_id] = digest
+            ContentUploadManager._save_digest(upload_id, digest)
+
         return upload_id
 
     def save_data(self, upload_id, offset, data):
@@ -77,17 +124,27 @@ class ContentUploadManager(object):
         @param data: content to write to the file
         @type  data: str
         """
+        ContentUploadManager._write(upload_id, offset, [data])
 
-        file_path = ContentUploadManager._upload_file_path(upload_id)
+    def save_stream(self, upload_id, offset, stream, length):
+        """
+        Saves bits read from a file-like object into the given upload request
+        starting at an offset value. The bits are read STREAM_BUFFER_SIZE bytes
+        at a time, so the segment is never held in memory whole.
 
-        # Make sure the upload was initialized first and hasn't been deleted
-        if not os.path.exists(file_path):
-            raise MissingResource(upload_request=upload_id)
+        @param upload_id: upload request ID
+        @type  upload_id: str
 
-        f = open(file_path, 'r+')
-        f.seek(offset)
-        f.write(data)
-        f.close()
+        @param offset: area in the uploaded file to start writing at
+        @type  offset: int
+
+        @param stream: content to write to the file
+        @type  stream: file
+
+        @param length: number of bytes to read from the stream
+        @type  length: int
+        """
+        ContentUploadManager._write(upload_id, offset, _read_buffers(stream, length))
 
     def delete_upload(self, upload_id):
         """
@@ -103,6 +160,10 @@ class ContentUploadManager(object):
         if os.path.exists(file_path):
             os.remove(file_path)
 
+        with _DIGESTS_LOCK:
+            _DIGESTS.pop(upload_id, None)
+            ContentUploadManager._remove_digest(upload_id)
+
     def read_upload(self, upload_id):
         """
         Utility method for reading and returning the contents of an upload
@@ -166,7 +227,8 @@ class ContentUploadManager(object):
         return True
 
     @staticmethod
-    def import_uploaded_unit(repo_id, unit_type_id, unit_key, unit_metadata, upload_id):
+    def import_uploaded_unit(repo_id, unit_type_id, unit_key, unit_metadata, upload_id,
+                             checksum=None):
         """
         Called to trigger the importer's handling of an uploaded unit. This
         should not be called until the bits have finished uploading. The
@@ -188,12 +250,19 @@ class ContentUploadManager(object):
         :type  unit_metadata: dict
         :param upload_id:     upload being imported
         :type  upload_id:     str
+        :param checksum:      hex SHA-256 digest of the uploaded file as calculated by the
+                              client; None to skip the verification
+        :type  checksum:      str
         :return:              A SyncReport indicating the success or failure of the upload
         :rtype:               pulp.plugins.model.SyncReport
+        :raise PulpDataException: if the uploaded file does not match the checksum
         """
         # If it doesn't raise an exception, it's good to go
         ContentUploadManager.is_valid_upload(repo_id, unit_type_id)
 
+        if checksum is not None:
+            ContentUploadManager.verify_checksum(upload_id, checksum)
+
         repo_query_manager = manager_factory.repo_query_manager()
         importer_manager = manager_factory.repo_importer_manager()
 
@@ -208,7 +277,8 @@ class ContentUploadManager(object):
 
         # Assemble the data needed for the import
         conduit = UploadConduit(repo_id, repo_importer['id'], RepoContentUnit.OWNER_TYPE_USER,
-                                manager_factory.principal_manager().get_principal()['login'])
+                                manager_factory.principal_manager().get_principal()['login'],
+                                upload_id)
 
         call_config = PluginCallConfiguration(plugin_config, repo_importer['config'], None)
         transfer_repo = repo_common_utils.to_transfer_repo(repo)
@@ -234,6 +304,240 @@ class ContentUploadManager(object):
 
         # TODO: Add support for tracking the report as a history entry on the repo
 
+    @staticmethod
+    def verify_checksum(upload_id, checksum):
+        """
+        Verifies the uploaded file matches the checksum calculated by the client.
+        Segments may be uploaded out of order, so this is the only way to know
+        every segment arrived intact. The digest calculated as the segments
+        arrived is used if there is one; otherwise the file is read.
+
+        :param upload_id: identifies the upload in question
+        :type  upload_id: str
+        :param checksum:  hex SHA-256 digest of the file as calculated by the client
+        :type  checksum:  str
+        :raise PulpDataException: if the uploaded file does not match the checksum
+        """
+        hex_digest = ContentUploadManager.upload_checksum(upload_id)
+        if hex_digest is None:
+            digest = hashlib.sha256()
+            file_path = ContentUploadManager._upload_file_path(upload_id)
+            f = open(file_path, 'rb')
+            try:
+                while True:
+                    data = f.read(CHECKSUM_BUFFER_SIZE)
+                    if not data:
+                        break
+                    digest.update(data)
+            finally:
+                f.close()
+            hex_digest = digest.hexdigest()
+
+        if hex_digest != checksum.lower():
+            msg = _('The uploaded file for upload [%(u)s] does not match the checksum [%(c)s]')
+            raise PulpDataException(msg % {'u': upload_id, 'c': checksum})
+
+    @staticmethod
+    def upload_checksum(upload_id):
+        """
+        Returns the SHA-256 digest of an uploaded file calculated as its
+        segments arrived, which spares reading the file again to calculate it.
+        It is only known if the segments arrived in order.
+
+        :param upload_id: identifies the upload in question
+        :type  upload_id: str
+        :return:          hex SHA-256 digest of the uploaded file; None if it isn't known
+        :rtype:           str or None
+        """
+        saved = ContentUploadManager._load_digest(upload_id)
+        if saved is None:
+            return None
+        try:
+            size = os.path.getsize(ContentUploadManager._upload_file_path(upload_id))
+        except OSError:
+            return None
+        # segments written after the last one digested make it incomplete
+        if saved['length'] != size:
+            return None
+        return saved['sha256']
+
+    @staticmethod
+    def store_upload(upload_id, storage_path):
+        """
+        Moves an uploaded file to the storage path of the unit it is imported
+        as. The file is renamed when both are on the same filesystem, which
+        spares copying it; otherwise it is copied. Either way, the uploaded
+        file must not be used afterwards.
+
+        :param upload_id:    identifies the upload in question
+        :type  upload_id:    str
+        :param storage_path: full path the file is stored at
+        :type  storage_path: str
+        :return:             True if the file was renamed; False if it was copied
+        :rtype:              bool
+        """
+        file_path = ContentUploadManager._upload_file_path(upload_id)
+        storage_dir = os.path.dirname(storage_path)
+        if not os.path.exists(storage_dir):
+            os.makedirs(storage_dir)
+        try:
+            os.rename(file_path, storage_path)
+            return True
+        except OSError, e:
+            if e.errno != errno.EXDEV:
+                raise
+        shutil.copy(file_path, storage_path)
+        return False
+
+    @staticmethod
+    def _write(upload_id, offset, buffers):
+        """
+        Writes bits into an upload starting at an offset value, adding them
+        to the upload's digest if they follow the bits digested so far.
+
+        :param upload_id: identifies the upload in question
+        :type  upload_id: str
+        :param offset:    area in the uploaded file to start writing at
+        :type  offset:    int
+        :param buffers:   content to write to the file
+        :type  buffers:   iterable of str
+        :raise MissingResource: if the upload was not initialized or has been deleted
+        """
+        file_path = ContentUploadManager._upload_file_path(upload_id)
+
+        # Make sure the upload was initialized first and hasn't been deleted
+        if not os.path.exists(file_path):
+            raise MissingResource(upload_request=upload_id)
+
+        digest = ContentUploadManager._begin_digest(upload_id, offset)
+        written = False
+        f = open(file_path, 'r+b')
+        try:
+            f.seek(offset)
+            for data in buffers:
+                f.write(data)
+                if digest is not None:
+                    digest.update(data)
+            written = True
+        finally:
+            f.close()
+            if digest is not None:
+                ContentUploadManager._end_digest(upload_id, digest, written)
+
+    @staticmethod
+    def _begin_digest(upload_id, offset):
+        """
+        :return: the digest of an upload, if the segment at the offset follows
+                 the bits digested so far; otherwise None, and the upload has
+                 no digest from then on
+        :rtype:  RollingDigest or None
+        """
+        with _DIGESTS_LOCK:
+            digest = _DIGESTS.get(upload_id)
+            digest_path = ContentUploadManager._digest_file_path(upload_id)
+            if digest is None and offset == 0:
+                # initialized by another process, and nothing written yet; an
+                # upload that stopped being digested has no digest file
+                saved = ContentUploadManager._load_digest(upload_id)
+                if saved is not None and saved['length'] == 0:
+                    digest = RollingDigest()
+            # another process writing segments removes the digest file
+            if digest is None or digest.writing or digest.length != offset or \
+                    not os.path.exists(digest_path):
+                _DIGESTS.pop(upload_id, None)
+                ContentUploadManager._remove_digest(upload_id)
+                return None
+            digest.writing = True
+            _DIGESTS[upload_id] = digest
+            return digest
+
+    @staticmethod
+    def _end_digest(upload_id, digest, written):
+        """
+        Saves the digest of an upload once a segment has been written, or
+        stops digesting the upload if the segment could not be written.
+        """
+        with _DIGESTS_LOCK:
+            digest.writing = False
+            if _DIGESTS.get(upload_id) is not digest:
+                return
+            if written:
+                ContentUploadManager._save_digest(upload_id, digest)
+            else:
+                del _DIGESTS[upload_id]
+                ContentUploadManager._remove_digest(upload_id)
+
+    @staticmethod
+    def _evict_stale_digests():
+        """
+        Drops the digests of uploads whose files have been removed, such as
+        uploads deleted or imported by another process. The caller must hold
+        _DIGESTS_LOCK.
+        """
+        for upload_id, digest in _DIGESTS.items():
+            if digest.writing:
+                continue
+            if not os.path.exists(ContentUploadManager._upload_file_path(upload_id)) or \
+                    not os.path.exists(ContentUploadManager._digest_file_path(upload_id)):
+                del _DIGESTS[upload_id]
+
+    @staticmethod
+    def _save_digest(upload_id, digest):
+        """
+        Saves the digest of an upload so other processes, and importers, can
+        use it. It is written to a temporary file that is then renamed, so it
+        is never read partially written.
+        """
+        digest_path = ContentUploadManager._digest_file_path(upload_id)
+        temp_path = digest_path + '.tmp'
+        f = open(temp_path, 'w')
+        try:
+            json.dump({'length': digest.length, 'sha256': digest.sha256.hexdigest()}, f)
+        finally:
+            f.close()
+        os.rename(temp_path, digest_path)
+
+    @staticmethod
+    def _load_digest(upload_id):
+        """
+        :return: the saved digest of an upload, with the number of bytes
+                 digested; None if it has no digest
+        :rtype:  dict or None
+        """
+        try:
+            f = open(ContentUploadManager._digest_file_path(upload_id))
+            try:
+                return json.load(f)
+            finally:
+                f.close()
+        except (IOError, ValueError):
+            return None
+
+    @staticmethod
+    def _remove_digest(upload_id):
+        digest_path = ContentUploadManager._digest_file_path(upload_id)
+        if os.path.exists(digest_path):
+            os.remove(digest_path)
+
+    @staticmethod
+    def _digest_file_path(upload_id):
+        """
+        Returns the full path to the file the digest of the given upload is
+        saved in. It is kept apart from the uploads so it isn't listed as one.
+
+        :param upload_id: identifies the upload in question
+        :type  upload_id: str
+        :return:          full path on the server's filesystem
+        :rtype:           str
+        """
+        storage_dir = pulp_config.config.get('server', 'storage_dir')
+        digest_dir = os.path.join(storage_dir, 'upload_digests')
+
+        if not os.path.exists(digest_dir):
+            os.makedirs(digest_dir)
+
+        return os.path.join(digest_dir, upload_id)
+
     @staticmethod
     def _upload_file_path(upload_id):
         """
@@ -268,4 +572,24 @@ class ContentUploadManager(object):
         return upload_storage_dir
 
 
+def _read_buffers(stream, length):
+    """
+    Reads a number of bytes from a stream STREAM_BUFFER_SIZE bytes at a time.
+    Reading stops early if the stream ends.
+
+    :param stream: stream to read
+    :type  stream: file
+    :param length: number of bytes to read
+    :type  length: int
+    :return:       generator of the bytes read
+    :rtype:        generator of str
+    """
+    while length > 0:
+        data = stream.read(min(length, STREAM_BUFFER_SIZE))
+        if not data:
+            break
+        length -= len(data)
+        yield data
+
+
 import_uploaded_unit = task(ContentUploadManager.import_uploaded_unit, base=Task)
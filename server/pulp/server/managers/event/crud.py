@@ -21,6 +21,7 @@ from pulp.server.compat import ObjectId
 from pulp.server.db.model.event import EventListener
 from pulp.server.exceptions import InvalidValue, MissingResource
 from pulp.server.event import notifiers
+from pulp.server.managers.event import listeners
 from pulp.server.event.data import ALL_EVENT_TYPES
 
 # -- manager -----------------------------------------------------------------
@@ -70,6 +71,7 @@ class EventListenerManager(object):
         el = EventListener(notifier_type_id, notifier_config, event_types)
         collection = EventListener.get_collection()
         created_id = collection.save(el, safe=True)
+        listeners.bump_generation()
         created = collection.find_one(created_id)
 
         return created
@@ -116,6 +118,7 @@ class EventListenerManager(object):
         self.get(event_listener_id) # check for MissingResource
 
         collection.remove({'_id' : ObjectId(event_listener_id)})
+        listeners.bump_generation()
 
     def update(self, event_listener_id, notifier_config=None, event_types=None):
         """
@@ -166,6 +169,7 @@ class EventListenerManager(object):
 
         # Update the database
         collection.save(existing, safe=True)
+        listeners.bump_generation()
 
         # Reload to return
         existing = collection.find_one({'_id' : ObjectId(event_listener_id)})
@@ -20,9 +20,9 @@ in a consistent event format for that type.
 
 import logging
 
-from pulp.server.db.model.event import EventListener
 from pulp.server.event import notifiers
 from pulp.server.event import data as e
+from pulp.server.managers.event import listeners as event_listeners
 
 _LOG = logging.getLogger(__name__)
 
@@ -78,8 +78,7 @@ class EventFireManager(object):
         @type  event: pulp.server.event.data.Event
         """
         # Determine which listeners should be notified
-        listeners = list(EventListener.get_collection().find(
-            {'$or': ({'event_types' : event.event_type}, {'event_types' : '*'})}))
+        listeners = event_listeners.listener_table().matching(event.event_type)
 
         # For each listener, retrieve the notifier and invoke it. Be sure that
         # an exception from a notifier is logged but does not interrupt the
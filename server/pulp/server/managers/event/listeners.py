@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2014 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Contains the in memory table of event listeners used to fire events, and the
+generation counter that tells processes when to reload it.
+
+Every change to event listeners must call bump_generation once the change has
+been saved.
+"""
+
+import logging
+import threading
+
+from pulp.server.db.model.event import EventListener, EventListenerGeneration
+
+
+_LOG = logging.getLogger(__name__)
+
+# _id of the generation counter document
+GENERATION_ID = 'event_listeners'
+
+_LOCK = threading.Lock()
+_TABLE = None
+
+
+class ListenerTable(object):
+    """
+    Snapshot of the event listeners, keyed by the event types they listen for.
+    It is not changed once loaded; a new one replaces it when the generation
+    changes.
+
+    @ivar generation: generation the snapshot was loaded at
+    @type generation: int
+    @ivar listeners: listener documents for each event type, including '*'
+    @type listeners: dict
+    """
+
+    def __init__(self, generation, listeners):
+        self.generation = generation
+        self.listeners = {}
+        for listener in listeners:
+            for event_type in listener['event_types']:
+                self.listeners.setdefault(event_type, []).append(listener)
+
+    @classmethod
+    def load(cls, generation):
+        """
+        Load the table from the database.
+
+        @param generation: generation read before loading
+        @type  generation: int
+        @rtype: ListenerTable
+        """
+        return cls(generation, list(EventListener.get_collection().find()))
+
+    def matching(self, event_type):
+        """
+        @param event_type: type of the event being fired
+        @type  event_type: str
+        @return: listeners for the event type or for every event type
+        @rtype:  list
+        """
+        matching = []
+        # a listener for both the event type and '*' is only notified once
+        seen = set()
+        for listener in self.listeners.get(event_type, []) + self.listeners.get('*', []):
+            if id(listener) not in seen:
+                seen.add(id(listener))
+                matching.append(listener)
+        return matching
+
+
+def current_generation():
+    """
+    @return: the current generation of event listeners
+    @rtype:  int
+    """
+    document = EventListenerGeneration.get_collection().find_one({'_id': GENERATION_ID})
+    if document is None:
+        return 0
+    return document['generation']
+
+
+def bump_generation():
+    """
+    Record that event listeners have changed, so every process reloads its
+    table before firing another event.
+    """
+    EventListenerGeneration.get_collection().update(
+        {'_id': GENERATION_ID}, {'$inc': {'generation': 1}}, upsert=True, safe=True)
+
+
+def listener_table():
+    """
+    Return the table of the current generation, loading it if event listeners
+    changed since it was last loaded by this process.
+
+    @rtype: ListenerTable
+    """
+    global _TABLE
+    # The generation is read before the documents, so a change made while
+    # loading results in another reload rather than a stale table.
+    generation = current_generation()
+    table = _TABLE
+    if table is not None and table.generation == generation:
+        return table
+    with _LOCK:
+        if _TABLE is None or _TABLE.generation != generation:
+            _TABLE = ListenerTable.load(generation)
+            _LOG.debug('Loaded event listener table generation [%s]' % generation)
+        return _TABLE
+
+
+def reset():
+    """
+    Forget the table loaded by this process, so the next event reloads it.
+    This should only need to be called in unit test cleanup.
+    """
+    global _TABLE
+    _TABLE = None
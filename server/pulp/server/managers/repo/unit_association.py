@@ -56,6 +56,10 @@ SORT_DESCENDING = pymongo.DESCENDING
 
 _VALID_DIRECTIONS = (SORT_ASCENDING, SORT_DESCENDING)
 
+# Maximum number of unit IDs looked up in a single $in query or inserted in a
+# single bulk insert when creating associations
+ASSOCIATION_CHUNK_SIZE = 1000
+
 
 logger = logging.getLogger(__name__)
 
@@ -107,32 +111,13 @@ class RepoUnitAssociationManager(object):
         @raise InvalidType: if the given owner type is not of the valid enumeration
         """
 
-        if owner_type not in _OWNER_TYPES:
-            raise exceptions.InvalidValue(['owner_type'])
-
-        # If the association already exists, no need to do anything else
-        spec = {'repo_id' : repo_id,
-                'unit_id' : unit_id,
-                'unit_type_id' : unit_type_id,
-                'owner_type' : owner_type,
-                'owner_id' : owner_id,}
-        existing_association = RepoContentUnit.get_collection().find_one(spec)
-        if existing_association is not None:
-            return
-
-        similar_exists = False
-        if update_unit_count:
-            similar_exists = RepoUnitAssociationManager.association_exists(repo_id, unit_id,
-                                                                           unit_type_id)
-
-        # Create the database entry
-        association = RepoContentUnit(repo_id, unit_id, unit_type_id, owner_type, owner_id)
-        RepoContentUnit.get_collection().save(association, safe=True)
+        unique_count = self.bulk_associate_units_by_ids(repo_id, unit_type_id, [unit_id],
+                                                        owner_type, owner_id)
 
         # update the count of associated units on the repo object
-        if update_unit_count and not similar_exists:
+        if update_unit_count and unique_count:
             manager = manager_factory.repo_manager()
-            manager.update_unit_count(repo_id, unit_type_id, 1)
+            manager.update_unit_count(repo_id, unit_type_id, unique_count)
 
     def associate_all_by_ids(self, repo_id, unit_type_id, unit_id_list, owner_type, owner_id):
         """
@@ -160,21 +145,93 @@ class RepoUnitAssociationManager(object):
         @raise InvalidType: if the given owner type is not of the valid enumeration
         """
 
-        # There may be a way to batch this in mongo which would be ideal for a
-        # bulk operation like this. But for deadline purposes, this call will
-        # simply loop and call the single method.
-
-        unique_count = 0
-        for unit_id in unit_id_list:
-            if not RepoUnitAssociationManager.association_exists(repo_id, unit_id, unit_type_id):
-                unique_count += 1
-            self.associate_unit_by_id(repo_id, unit_type_id, unit_id, owner_type, owner_id, False)
+        unique_count = self.bulk_associate_units_by_ids(repo_id, unit_type_id, unit_id_list,
+                                                        owner_type, owner_id)
 
         # update the count of associated units on the repo object
         if unique_count:
             manager_factory.repo_manager().update_unit_count(
                 repo_id, unit_type_id, unique_count)
 
+    @staticmethod
+    def bulk_associate_units_by_ids(repo_id, unit_type_id, unit_id_list, owner_type, owner_id):
+        """
+        Creates the associations between the given repo and content units that
+        do not already exist for the given owner. This is the set-based engine
+        behind all of the associate calls in this manager.
+
+        The unit IDs are processed in chunks of ASSOCIATION_CHUNK_SIZE. For each
+        chunk, the existing associations are retrieved with a single $in query,
+        the missing ones are computed in memory and inserted with a single bulk
+        insert.
+
+        The unit counts on the repository are *not* updated by this call.
+        Instead, the number of units that were not associated with the
+        repository at all before this call is returned so the caller can apply
+        a single update_unit_count once it is done. Those units are recorded in
+        the repository's content delta for applicability regeneration.
+
+        :param repo_id:      identifies the repo
+        :type  repo_id:      str
+        :param unit_type_id: identifies the type of units being added
+        :type  unit_type_id: str
+        :param unit_id_list: unique identifiers for units within the given type
+        :type  unit_id_list: iterable of str
+        :param owner_type:   category of the caller making the association;
+                             must be one of the OWNER_* variables in this module
+        :type  owner_type:   str
+        :param owner_id:     identifies the caller making the association, either
+                             the importer ID or user login
+        :type  owner_id:     str
+        :return:             number of units newly associated with the repository
+        :rtype:              int
+        :raise InvalidValue: if the given owner type is not of the valid enumeration
+        """
+        if owner_type not in _OWNER_TYPES:
+            raise exceptions.InvalidValue(['owner_type'])
+
+        # Duplicates are removed up front so they are neither inserted twice
+        # nor counted twice.
+        unit_ids = list(set(unit_id_list))
+
+        collection = RepoContentUnit.get_collection()
+        fields = ['unit_id', 'owner_type', 'owner_id']
+        new_unit_ids = []
+
+        for index in range(0, len(unit_ids), ASSOCIATION_CHUNK_SIZE):
+            chunk = unit_ids[index:index + ASSOCIATION_CHUNK_SIZE]
+            spec = {'repo_id': repo_id,
+                    'unit_type_id': unit_type_id,
+                    'unit_id': {'$in': chunk}}
+
+            associated_ids = set()
+            owned_ids = set()
+            for association in collection.find(spec, fields=fields):
+                associated_ids.add(association['unit_id'])
+                if association['owner_type'] == owner_type and \
+                        association['owner_id'] == owner_id:
+                    owned_ids.add(association['unit_id'])
+
+            missing_ids = [unit_id for unit_id in chunk if unit_id not in owned_ids]
+            if missing_ids:
+                associations = [RepoContentUnit(repo_id, unit_id, unit_type_id, owner_type,
+                                                owner_id) for unit_id in missing_ids]
+                try:
+                    collection.insert(associations, safe=True, continue_on_error=True)
+                except pymongo.errors.DuplicateKeyError:
+                    # Another caller created some of the same associations
+                    # between our query and the insert; the remaining ones were
+                    # still inserted because of continue_on_error.
+                    logger.debug(_('Skipped existing associations in repository [%(r)s]') %
+                                 {'r': repo_id})
+
+            new_unit_ids.extend(unit_id for unit_id in chunk if unit_id not in associated_ids)
+
+        manager_factory.applicability_regeneration_manager().record_repo_content_delta(
+            repo_id, added_unit_ids={unit_type_id: new_unit_ids})
+
+        return len(new_unit_ids)
+
     @staticmethod
     def associate_from_repo(source_repo_id, dest_repo_id, criteria=None,
                             import_config_override=None):
@@ -381,6 +438,7 @@ class RepoUnitAssociationManager(object):
 
         collection = RepoContentUnit.get_collection()
         repo_manager = manager_factory.repo_manager()
+        removed_unit_ids = {}
 
         for unit_type_id, unit_ids in unit_map.items():
             spec = {'repo_id': repo_id,
@@ -390,13 +448,21 @@ class RepoUnitAssociationManager(object):
                     'owner_id': owner_id}
             collection.remove(spec, safe=True)
 
-            unique_count = sum(
-                1 for unit_id in unit_ids if not RepoUnitAssociationManager.association_exists(
-                    repo_id, unit_id, unit_type_id))
-            if not unique_count:
+            # Units that are still associated through another owner remain in the repo
+            spec = {'repo_id': repo_id,
+                    'unit_type_id': unit_type_id,
+                    'unit_id': {'$in': unit_ids}}
+            associated_ids = set(a['unit_id'] for a in collection.find(spec, fields=['unit_id']))
+            removed_ids = [unit_id for unit_id in set(unit_ids) if unit_id not in associated_ids]
+            if not removed_ids:
                 continue
 
-            repo_manager.update_unit_count(repo_id, unit_type_id, -unique_count)
+            repo_manager.update_unit_count(repo_id, unit_type_id, -len(removed_ids))
+            removed_unit_ids[unit_type_id] = removed_ids
+
+        # The removals of every type are recorded at once
+        manager_factory.applicability_regeneration_manager().record_repo_content_delta(
+            repo_id, removed_unit_ids=removed_unit_ids)
 
         # Convert the units into transfer units. This happens regardless of whether or not
         # the plugin will be notified as it's used to generate the return result,
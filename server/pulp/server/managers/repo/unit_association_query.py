@@ -15,12 +15,17 @@
 Contains the manager class for performing queries for repo-unit associations.
 """
 
+import base64
 import copy
+import heapq
 import logging
+import sys
 
 import pymongo
 
 from pulp.plugins.types import database as types_db
+from pulp.server import exceptions
+from pulp.server.compat import json, json_util
 from pulp.server.db.model.criteria import UnitAssociationCriteria
 from pulp.server.db.model.repository import RepoContentUnit
 
@@ -42,6 +47,12 @@ SORT_DESCENDING = pymongo.DESCENDING
 
 _VALID_DIRECTIONS = (SORT_ASCENDING, SORT_DESCENDING)
 
+# Order of the pages returned by get_units_page when no association sort is given
+_DEFAULT_PAGE_SORT = [('unit_type_id', SORT_ASCENDING), ('created', SORT_ASCENDING)]
+
+# Maximum number of associations or units joined with each other per query
+ASSOCIATION_BATCH_SIZE = 1000
+
 # -- manager ------------------------------------------------------------------
 
 class RepoUnitAssociationQueryManager(object):
@@ -117,6 +128,11 @@ class RepoUnitAssociationQueryManager(object):
         Get the units associated with the repository based on the provided unit
         association criteria.
 
+        The query is streamed: associations and units are retrieved from the
+        database in batches of ASSOCIATION_BATCH_SIZE as the results are
+        consumed, and skip and limit are applied by the database cursors
+        whenever the sort order allows it.
+
         :param repo_id: identifies the repository
         :type  repo_id: str
 
@@ -132,88 +148,10 @@ class RepoUnitAssociationQueryManager(object):
 
         criteria = criteria or UnitAssociationCriteria()
 
-        unit_associations_generator = self._unit_associations_cursor(repo_id, criteria)
-
-        if criteria.remove_duplicates:
-            unit_associations_generator = self._unit_associations_no_duplicates(criteria, unit_associations_generator)
-
-        if criteria.association_sort and not criteria.unit_filters:
-            # If we're ordering by association fields, but not filtering the
-            # content units, then perform the skip and limit on this generator
-            # to limit the number of units we load into memory.
-            # Manually perform skip and limit so we don't have to differentiate
-            # based on whether we're removing duplicates or not.
-            unit_associations_generator = self._with_skip_and_limit(unit_associations_generator,
-                                                                    criteria.skip, criteria.limit)
-
-        # The unit ids are used for ordering the units when association field
-        # ordering is specified (i.e. created timestamps, etc.)
-        # The ids are (unit_type_id, unit_id) tuples.
-        association_ordered_unit_ids = []
-
-        # The unit association information is part of the return values, so we
-        # construct a lookup in order to retrieve that information when we are
-        # iterating over the content units.
-        #
-        # unit_type_id -> unit_id -> (ordered)[association_1, association_2, ...]
-        #
-        # We also use the unit_id keys to lookup the units from unit_type_id
-        # collections.
-        associations_lookup = {}
-
-        for association in unit_associations_generator:
-
-            unit_type_id = association['unit_type_id']
-            unit_id = association['unit_id']
-
-            # Build the ordering.
-            association_ordered_unit_ids.append((unit_type_id, unit_id))
-
-            # Build the lookup.
-            association_type_dict = associations_lookup.setdefault(unit_type_id, {})
-            association_list = association_type_dict.setdefault(unit_id, [])
-            association_list.append(association)
-
-        association_unit_types = criteria.type_ids or self.unit_type_ids_for_repo(repo_id)
-        # The unit types should always be sorted in the same order, this allows
-        # multiple calls with skip and limit to work across types.
-        association_unit_types = sorted(association_unit_types)
-
-        # Use a generator expression here to keep from going back to the types
-        # collections once we've returned our limit of results.
-        # Be sure to skip cursors that would otherwise return an empty result set.
-        units_cursors = (self._associated_units_by_type_cursor(t, criteria, associations_lookup[t].keys())
-                         for t in association_unit_types if t in associations_lookup)
-
-        if not criteria.association_sort:
-            # If we're not sorting based on association fields, then set the
-            # skip and limit individually across the cursors to get consistent
-            # behavior across multiple calls across multiple unit types.
-            # The order that the generators are applied here is extremely
-            # important. DO NOT CHANGE!
-            units_cursors = self._associated_units_cursors_with_skip(units_cursors, criteria.skip)
-            units_cursors = self._associated_units_cursors_with_limit(units_cursors, criteria.limit)
-
-        units_generator = self._units_from_chained_cursors(units_cursors)
-
         if criteria.association_sort:
-            # Use the ordered associations we created to properly order the results.
-            units_generator = self._association_ordered_units(association_ordered_unit_ids, units_generator)
-
-            if criteria.unit_filters:
-                # If we're ordering by association fields and filtering the
-                # content units, then skip and limit must be performed manually
-                # and last (skip and limit must always come after sorting).
-                units_generator = self._with_skip_and_limit(units_generator, criteria.skip, criteria.limit)
-
-            # The association ordering will generate the same unit for every
-            # association it has with the repository, hence "duplicate units".
-            units_generator = self._merged_units_duplicate_units(associations_lookup, units_generator)
-
+            units_generator = self._units_in_association_order(repo_id, criteria)
         else:
-            # Unit ordering or no ordering only produce unique units, hence
-            # "unique units".
-            units_generator = self._merged_units_unique_units(associations_lookup, units_generator)
+            units_generator = self._units_in_unit_order(repo_id, criteria)
 
         if as_generator:
             return units_generator
@@ -222,6 +160,69 @@ class RepoUnitAssociationQueryManager(object):
         # to a list. Should probably log this. Is there a log-level "stupid"?
         return list(units_generator)
 
+    def get_units_page(self, repo_id, criteria=None, continuation=None):
+        """
+        Get a single page of the units associated with the repository.
+
+        Unlike skip based paging, each page is located directly from the
+        position where the previous one ended, so retrieving a page costs the
+        same regardless of how deep into the results it is. Pages are always
+        ordered by association fields; if the criteria does not specify an
+        association sort, they are ordered by unit type and creation time. The
+        criteria's limit is the page size.
+
+        The returned page must be iterated to retrieve its units. Once it is
+        exhausted, its continuation attribute holds the opaque token used to
+        retrieve the next page, or None if this is the last page.
+
+        :param repo_id: identifies the repository
+        :type  repo_id: str
+
+        :param criteria: if specified will drive the query; it may not contain
+                         a unit sort or request duplicates be removed
+        :type  criteria: UnitAssociationCriteria
+
+        :param continuation: token returned with the previous page, or None to
+                             retrieve the first page
+        :type  continuation: str
+
+        :return: iterable page of units associated with the repo
+        :rtype:  UnitAssociationPage
+
+        :raise InvalidValue: if the criteria cannot be paged or the continuation
+                             token is not valid
+        """
+
+        criteria = copy.copy(criteria) if criteria else UnitAssociationCriteria()
+
+        # Removing duplicates relies on every association preceding the page
+        # having been seen, and a unit sort cannot be resumed from an association.
+        if criteria.unit_sort or criteria.remove_duplicates:
+            raise exceptions.InvalidValue(['criteria'])
+
+        sort = list(criteria.association_sort or _DEFAULT_PAGE_SORT)
+        # The association ID makes the page boundaries unique
+        if '_id' not in [field for field, direction in sort]:
+            sort.append(('_id', SORT_ASCENDING))
+        criteria.association_sort = sort
+
+        # The fields that locate the page boundary must be retrieved, but are
+        # only returned if they were requested.
+        hidden_fields = []
+        if criteria.association_fields is not None:
+            criteria.association_fields = list(criteria.association_fields)
+            for field, direction in sort:
+                if field not in criteria.association_fields and field != '_id':
+                    criteria.association_fields.append(field)
+                    hidden_fields.append(field)
+
+        after = None
+        if continuation:
+            after = _decode_continuation(continuation, len(sort))
+
+        units = self._units_in_association_order(repo_id, criteria, after=after)
+        return UnitAssociationPage(units, sort, criteria.limit, hidden_fields)
+
     def get_units_across_types(self, repo_id, criteria=None, as_generator=False):
         """
         Retrieves data describing units associated with the given repository
@@ -308,13 +309,17 @@ class RepoUnitAssociationQueryManager(object):
     # -- unit association methods ----------------------------------------------
 
     @staticmethod
-    def _unit_associations_cursor(repo_id, criteria):
+    def _unit_associations_cursor(repo_id, criteria, after=None):
         """
         Retrieve a pymongo cursor for unit associations for the given repository
         that match the given criteria.
 
+        If after is specified, only the associations that follow the given
+        values of the criteria's association sort fields are returned.
+
         :type repo_id: str
         :type criteria: UnitAssociationCriteria
+        :type after: list or None
         :rtype: pymongo.cursor.Cursor
         """
 
@@ -324,6 +329,9 @@ class RepoUnitAssociationQueryManager(object):
         if criteria.type_ids:
             spec['unit_type_id'] = {'$in': criteria.type_ids}
 
+        if after is not None:
+            spec = {'$and': [spec, _after_spec(criteria.association_sort, after)]}
+
         collection = RepoContentUnit.get_collection()
 
         cursor = collection.find(spec, fields=criteria.association_fields)
@@ -385,10 +393,10 @@ class RepoUnitAssociationQueryManager(object):
         skipped_elements = 0
         generated_elements = 0
 
-        for element in iterator:
+        if limit and generated_elements == limit:
+            return
 
-            if limit and generated_elements == limit:
-                raise StopIteration()
+        for element in iterator:
 
             if skip and skipped_elements < skip:
                 skipped_elements += 1
@@ -398,6 +406,261 @@ class RepoUnitAssociationQueryManager(object):
 
             generated_elements += 1
 
+            # Stop without pulling another element from the iterator, which
+            # may cost another trip to the database.
+            if limit and generated_elements == limit:
+                return
+
+    # -- streaming query methods -----------------------------------------------
+
+    def _units_in_association_order(self, repo_id, criteria, after=None):
+        """
+        Generate the units associated with the repository in the order of the
+        criteria's association sort.
+
+        The associations are read from a single sorted cursor. Each batch of
+        associations is joined with its units using one query per unit type,
+        so only a batch of associations and units is held in memory at a time.
+        Skip and limit are applied by the association cursor unless they must be
+        applied after units are filtered or duplicates are removed.
+
+        :type repo_id: str
+        :type criteria: UnitAssociationCriteria
+        :type after: list or None
+        :rtype: generator
+        """
+
+        cursor = self._unit_associations_cursor(repo_id, criteria, after=after)
+        associations = cursor
+
+        if criteria.remove_duplicates:
+            associations = self._unit_associations_no_duplicates(criteria, cursor)
+
+        if not criteria.unit_filters:
+            if criteria.remove_duplicates:
+                associations = self._with_skip_and_limit(associations, criteria.skip,
+                                                         criteria.limit)
+            else:
+                if criteria.skip:
+                    cursor.skip(criteria.skip)
+                if criteria.limit:
+                    cursor.limit(criteria.limit)
+
+        units_generator = self._associations_with_units(associations, criteria)
+
+        if criteria.unit_filters:
+            # Associations without a matching unit are dropped, so skip and
+            # limit must be performed on the joined results.
+            units_generator = self._with_skip_and_limit(units_generator, criteria.skip,
+                                                        criteria.limit)
+
+        return units_generator
+
+    def _units_in_unit_order(self, repo_id, criteria):
+        """
+        Generate the units associated with the repository in unit order: by
+        unit type, then by the criteria's unit sort or the type's unit key.
+
+        The IDs of the associated units are loaded up front, in batches of
+        ASSOCIATION_BATCH_SIZE, to restrict each unit query to the repository's
+        units. When every type fits in a single batch, skip and limit are
+        applied by the unit cursors. Otherwise the units of a type are read with
+        one sorted query per batch of IDs, the cursors are merged in sort
+        order, and skip and limit are applied to the merged units. Either way,
+        the associations of each batch of units are retrieved as the units are
+        generated.
+
+        :type repo_id: str
+        :type criteria: UnitAssociationCriteria
+        :rtype: generator
+        """
+
+        unit_id_batches = self._associated_unit_id_batches_by_type(repo_id, criteria)
+
+        # The unit types should always be sorted in the same order, this allows
+        # multiple calls with skip and limit to work across types.
+        unit_type_ids = sorted(unit_id_batches)
+
+        if [t for t in unit_type_ids if len(unit_id_batches[t]) > 1]:
+            # The merged units of a type are not a single cursor, so skip and
+            # limit can't be applied by the database.
+            units_iterators = (self._units_by_type_in_batches(t, criteria, unit_id_batches[t])
+                               for t in unit_type_ids)
+            units_generator = self._units_from_chained_cursors(units_iterators)
+            units_generator = self._with_skip_and_limit(units_generator, criteria.skip,
+                                                        criteria.limit)
+            return self._units_with_associations(repo_id, criteria, units_generator)
+
+        # Use a generator expression here to keep from going back to the types
+        # collections once we've returned our limit of results.
+        units_cursors = (self._associated_units_by_type_cursor(t, criteria, unit_id_batches[t][0])
+                         for t in unit_type_ids)
+
+        # Set the skip and limit individually across the cursors to get
+        # consistent behavior across multiple calls across multiple unit types.
+        # The order that the generators are applied here is extremely
+        # important. DO NOT CHANGE!
+        units_cursors = self._associated_units_cursors_with_skip(units_cursors, criteria.skip)
+        units_cursors = self._associated_units_cursors_with_limit(units_cursors, criteria.limit)
+
+        units_generator = self._units_from_chained_cursors(units_cursors)
+
+        return self._units_with_associations(repo_id, criteria, units_generator)
+
+    @staticmethod
+    def _associated_unit_id_batches_by_type(repo_id, criteria):
+        """
+        Retrieve the IDs of the units associated with the repository through
+        associations that match the criteria, grouped by unit type and split
+        into batches of at most ASSOCIATION_BATCH_SIZE IDs. The associations
+        are read in unit ID order so each unit ID is listed only once without
+        collecting them in a set.
+
+        :type repo_id: str
+        :type criteria: UnitAssociationCriteria
+        :return: unit type ID -> list of lists of unit IDs
+        :rtype: dict
+        """
+
+        spec = criteria.association_filters.copy()
+        spec['repo_id'] = repo_id
+
+        if criteria.type_ids:
+            spec['unit_type_id'] = {'$in': criteria.type_ids}
+
+        collection = RepoContentUnit.get_collection()
+
+        unit_id_batches = {}
+        for unit_type_id in collection.find(spec, fields=['unit_type_id']).distinct('unit_type_id'):
+            type_spec = spec.copy()
+            type_spec['unit_type_id'] = unit_type_id
+            cursor = collection.find(type_spec, fields=['unit_id'])
+            cursor.sort('unit_id', SORT_ASCENDING)
+
+            unit_ids = _distinct_sorted(a['unit_id'] for a in cursor)
+            unit_id_batches[unit_type_id] = list(_batches(unit_ids, ASSOCIATION_BATCH_SIZE))
+
+        return unit_id_batches
+
+    @staticmethod
+    def _units_by_type_in_batches(unit_type_id, criteria, unit_id_batches):
+        """
+        Generate the units of the given type with the given IDs in the order of
+        the criteria's unit sort or the type's unit key, using one query per
+        batch of IDs and merging the cursors in sort order.
+
+        :type unit_type_id: str
+        :type criteria: UnitAssociationCriteria
+        :type unit_id_batches: list of lists
+        :rtype: generator
+        """
+
+        sort = _unit_sort(unit_type_id, criteria)
+
+        # The sort fields must be retrieved to merge the cursors, but are only
+        # returned if they were requested.
+        hidden_fields = []
+        if sort is not None and criteria.unit_fields is not None:
+            criteria = copy.copy(criteria)
+            criteria.unit_fields = list(criteria.unit_fields)
+            for field, direction in sort:
+                if field not in criteria.unit_fields:
+                    criteria.unit_fields.append(field)
+                    hidden_fields.append(field)
+
+        cursors = [RepoUnitAssociationQueryManager._associated_units_by_type_cursor(
+                   unit_type_id, criteria, unit_ids) for unit_ids in unit_id_batches]
+
+        if sort is None:
+            units = RepoUnitAssociationQueryManager._units_from_chained_cursors(cursors)
+        else:
+            units = _merge_sorted(cursors, sort)
+
+        for unit in units:
+            for field in hidden_fields:
+                unit.pop(field, None)
+            yield unit
+
+    @staticmethod
+    def _associations_with_units(associations, criteria):
+        """
+        Join associations with the units they reference, preserving the order
+        of the associations. Associations whose unit does not match the
+        criteria's unit filters are dropped.
+
+        :type associations: iterator
+        :type criteria: UnitAssociationCriteria
+        :rtype: generator
+        """
+
+        for batch in _batches(associations, ASSOCIATION_BATCH_SIZE):
+
+            unit_ids_by_type = {}
+            for association in batch:
+                unit_ids_by_type.setdefault(association['unit_type_id'], set()).add(
+                    association['unit_id'])
+
+            units_by_id = {}
+            for unit_type_id, unit_ids in unit_ids_by_type.items():
+                cursor = RepoUnitAssociationQueryManager._associated_units_by_type_cursor(
+                    unit_type_id, criteria, list(unit_ids))
+                for unit in cursor:
+                    units_by_id[(unit['_content_type_id'], unit['_id'])] = unit
+
+            for association in batch:
+                unit = units_by_id.get((association['unit_type_id'], association['unit_id']))
+                if unit is None:
+                    continue
+                association['metadata'] = unit
+                yield association
+
+    @staticmethod
+    def _units_with_associations(repo_id, criteria, units):
+        """
+        Return each unit as its associations with the repository that match the
+        criteria, with the unit as metadata on the associations. The units are
+        processed in batches, retrieving the associations for each batch with
+        one query per unit type.
+
+        If duplicates are removed, only the earliest association of each unit
+        is returned.
+
+        :type repo_id: str
+        :type criteria: UnitAssociationCriteria
+        :type units: iterator
+        :rtype: generator
+        """
+
+        collection = RepoContentUnit.get_collection()
+
+        for batch in _batches(units, ASSOCIATION_BATCH_SIZE):
+
+            unit_ids_by_type = {}
+            for unit in batch:
+                unit_ids_by_type.setdefault(unit['_content_type_id'], []).append(unit['_id'])
+
+            associations_lookup = {}
+            for unit_type_id, unit_ids in unit_ids_by_type.items():
+                spec = criteria.association_filters.copy()
+                spec['repo_id'] = repo_id
+                spec['unit_type_id'] = unit_type_id
+                spec['unit_id'] = {'$in': unit_ids}
+
+                cursor = collection.find(spec, fields=criteria.association_fields)
+                cursor.sort('created', SORT_ASCENDING)
+
+                for association in cursor:
+                    association_list = associations_lookup.setdefault(
+                        (unit_type_id, association['unit_id']), [])
+                    if criteria.remove_duplicates and association_list:
+                        continue
+                    association_list.append(association)
+
+            for unit in batch:
+                for association in associations_lookup.get((unit['_content_type_id'], unit['_id']), []):
+                    association['metadata'] = unit
+                    yield association
+
     # -- associated units methods ----------------------------------------------
 
     @staticmethod
@@ -426,13 +689,7 @@ class RepoUnitAssociationQueryManager(object):
 
         cursor = collection.find(spec, fields=fields)
 
-        sort = criteria.unit_sort
-
-        if sort is None:
-            unit_key = types_db.type_units_unit_key(unit_type_id)
-
-            if unit_key is not None:
-                sort = [(u, SORT_ASCENDING) for u in unit_key]
+        sort = _unit_sort(unit_type_id, criteria)
 
         if sort is not None:
             cursor.sort(sort)
@@ -517,80 +774,215 @@ class RepoUnitAssociationQueryManager(object):
             for element in cursor:
                 yield element
 
-    @staticmethod
-    def _association_ordered_units(associated_unit_ids, associated_units):
-        """
-        Return associated units in the order specified by the associated unit id
-        list.
-
-        :type associated_unit_ids: list
-        :type associated_units: iterator
-        :rtype: generator
-        """
-
-        # This algorithm assumes that associated_unit_ids has already been sorted.
-
-        # XXX This is unfortunate as it's the one place that loads all of the
-        # associated_units into memory.
-        # It is worth noting that the units have already been filtered by type,
-        # association filters, and unit filters. In addition, skip and limit
-        # may have also been performed, so it's potentially not as bad as it seems.
-        associated_units_by_id = dict(((u['_content_type_id'], u['_id']), u) for u in associated_units)
-
-        for id_tuple in associated_unit_ids:
-            # the associated_unit_ids are sorted, but not all of the units may
-            # be in the associated_units_by_id
-            if id_tuple not in associated_units_by_id:
-                continue
-
-            yield associated_units_by_id[id_tuple]
-
-    @staticmethod
-    def _merged_units_duplicate_units(associations_lookup, associated_units):
-        """
-        Return associated units as the unit association information and the unit
-        information as metadata on the unit association information.
-
-        Used when there are duplicate units returned by the associated_units iterator.
-
-        :type associations_lookup: dict
-        :type associated_units: iterator
-        :rtype: generator
-        """
-
-        # This algorithm assumes that the units will come in the same order that
-        # the associations are listed in the associations_lookup.
-
-        for unit in associated_units:
-            # Remove the associations from the list in the order they were
-            # placed in it.
-            association = associations_lookup[unit['_content_type_id']][unit['_id']].pop(0)
-            association['metadata'] = unit
-            yield association
-
-    @staticmethod
-    def _merged_units_unique_units(associations_lookup, associated_units):
-        """
-        Return associated units as the unit association information and the unit
-        information as metadata on the unit association information.
-
-        Used when no duplicate units returned by the associated_units iterator.
-
-        :type associations_lookup: dict
-        :type associated_units: iterator
-        :rtype: generator
-        """
-
-        # This algorithm assumes that only unique units will be generated,
-        # regardless of the number of times a unit is associated with a repo.
-
-        # It also assumes that the units will be presented in the proper order
-        # and the association ordering, if any, is secondary.
-
-        for unit in associated_units:
-            # Use the associations_lookup to determine how many times to return
-            # the unit in the results.
-            for association in associations_lookup[unit['_content_type_id']][unit['_id']]:
-                association['metadata'] = unit
-                yield association
 
+class UnitAssociationPage(object):
+    """
+    Iterable page of units returned by get_units_page. The continuation
+    attribute is populated once the page has been iterated.
+    """
+
+    def __init__(self, units, sort, limit, hidden_fields):
+        """
+        :param units: units in the page, in sort order
+        :type  units: iterator
+        :param sort: association sort locating the page boundaries
+        :type  sort: list
+        :param limit: page size; None if the page holds all remaining units
+        :type  limit: int or None
+        :param hidden_fields: association fields retrieved only to locate the
+               page boundary, removed from the returned units
+        :type  hidden_fields: list
+        """
+        self.continuation = None
+
+        self._units = units
+        self._sort = sort
+        self._limit = limit
+        self._hidden_fields = hidden_fields
+
+    def __iter__(self):
+        count = 0
+        last_values = None
+
+        for unit in self._units:
+            last_values = [unit.get(field) for field, direction in self._sort]
+            for field in self._hidden_fields:
+                unit.pop(field, None)
+
+            yield unit
+            count += 1
+
+        # A full page may be followed by more units; a short one is the last
+        if self._limit and count == self._limit:
+            self.continuation = _encode_continuation(last_values)
+
+# -- utilities ----------------------------------------------------------------
+
+def _batches(iterable, batch_size):
+    """
+    Split an iterable into lists of at most batch_size elements without
+    consuming more of the iterable than needed for the current batch.
+
+    :type iterable: iterable
+    :type batch_size: int
+    :rtype: generator of lists
+    """
+    batch = []
+    for element in iterable:
+        batch.append(element)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _distinct_sorted(iterable):
+    """
+    Drop the repeated elements of a sorted iterable.
+
+    :type iterable: iterable
+    :rtype: generator
+    """
+    previous = None
+    first = True
+    for element in iterable:
+        if first or element != previous:
+            yield element
+        previous = element
+        first = False
+
+
+def _unit_sort(unit_type_id, criteria):
+    """
+    Return the sort of the units of the given type: the criteria's unit sort,
+    or the type's unit key ascending.
+
+    :type unit_type_id: str
+    :type criteria: UnitAssociationCriteria
+    :return: list of (field, direction) or None if the units are not sorted
+    :rtype: list or None
+    """
+    if criteria.unit_sort is not None:
+        return criteria.unit_sort
+
+    unit_key = types_db.type_units_unit_key(unit_type_id)
+    if unit_key is None:
+        return None
+
+    return [(u, SORT_ASCENDING) for u in unit_key]
+
+
+def _merge_sorted(iterables, sort):
+    """
+    Merge iterables of documents that are each sorted in the given sort order
+    into a single iterator in that order. Only one document from each iterable
+    is held at a time; documents that compare equal are generated in the order
+    of the iterables.
+
+    :type iterables: list
+    :type sort: list of (str, int)
+    :rtype: generator
+    """
+    heap = []
+    for index, iterable in enumerate(iterables):
+        iterator = iter(iterable)
+        for document in iterator:
+            heap.append((_SortKey(document, sort), index, document, iterator))
+            break
+    heapq.heapify(heap)
+
+    while heap:
+        key, index, document, iterator = heap[0]
+        yield document
+        for document in iterator:
+            heapq.heapreplace(heap, (_SortKey(document, sort), index, document, iterator))
+            break
+        else:
+            heapq.heappop(heap)
+
+
+class _SortKey(object):
+    """
+    Orders documents by the values of their sort fields in the directions of
+    a mongo sort.
+    """
+
+    def __init__(self, document, sort):
+        self.values = [(_field_value(document, field), direction) for field, direction in sort]
+
+    def __eq__(self, other):
+        return self.values == other.values
+
+    def __ne__(self, other):
+        return self.values != other.values
+
+    def __lt__(self, other):
+        for (value, direction), (other_value, other_direction) in zip(self.values, other.values):
+            if value != other_value:
+                return (value < other_value) == (direction == SORT_ASCENDING)
+        return False
+
+
+def _field_value(document, field):
+    """
+    Return the value of a possibly dotted field of a document, or None if the
+    document does not have it.
+
+    :type document: dict
+    :type field: str
+    """
+    value = document
+    for name in field.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(name)
+    return value
+
+
+def _after_spec(sort, values):
+    """
+    Build a mongo spec matching the documents that follow the given values of
+    the sort fields in the given sort order.
+
+    :type sort: list of (str, int)
+    :type values: list
+    :rtype: dict
+    """
+    clauses = []
+    for index, (field, direction) in enumerate(sort):
+        clause = dict((f, v) for (f, d), v in zip(sort[:index], values[:index]))
+        operator = direction == SORT_ASCENDING and '$gt' or '$lt'
+        clause[field] = {operator: values[index]}
+        clauses.append(clause)
+    return {'$or': clauses}
+
+
+def _encode_continuation(values):
+    """
+    Encode the sort field values of the last unit of a page as an opaque token.
+
+    :type values: list
+    :rtype: str
+    """
+    return base64.urlsafe_b64encode(json.dumps(values, default=json_util.default))
+
+
+def _decode_continuation(continuation, value_count):
+    """
+    Decode a continuation token into the sort field values it was created from.
+
+    :type continuation: str
+    :type value_count: int
+    :rtype: list
+    :raise InvalidValue: if the token was not created by _encode_continuation
+                         for the same sort
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(str(continuation)),
+                            object_hook=json_util.object_hook)
+    except (TypeError, ValueError):
+        raise exceptions.InvalidValue(['continuation']), None, sys.exc_info()[2]
+    if not isinstance(values, list) or len(values) != value_count:
+        raise exceptions.InvalidValue(['continuation'])
+    return values
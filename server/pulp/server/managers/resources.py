@@ -15,7 +15,8 @@ This module contains management functions for the models found in the
 pulp.server.db.model.resources module.
 """
 from gettext import gettext as _
-import pymongo
+
+from pymongo.errors import DuplicateKeyError
 
 from pulp.server.db.model import resources
 
@@ -34,24 +35,6 @@ def filter_available_queues(criteria):
         yield resources.AvailableQueue.from_bson(q)
 
 
-def get_least_busy_available_queue():
-    """
-    Return the AvailableQueue instance with the lowest num_reservations. This function makes no
-    guarantees about which AvailableQueue gets returned in the event of a tie.
-
-    :returns: The AvailableQueue instance with the lowest num_reservations.
-    :rtype:   pulp.server.db.model.resources.AvailableQueue
-    """
-    available_queue = resources.AvailableQueue.get_collection().find_one(
-        sort=[('num_reservations', pymongo.ASCENDING)])
-
-    if available_queue is None:
-        msg = _('There are no available queues in the system for reserved task work.')
-        raise NoAvailableQueues(msg)
-
-    return resources.AvailableQueue.from_bson(available_queue)
-
-
 def get_or_create_available_queue(name):
     """
     Get or create an AvailableQueue object with the given name. If the object is created, initialize
@@ -69,28 +52,171 @@ def get_or_create_available_queue(name):
     return resources.AvailableQueue.from_bson(available_queue)
 
 
-def get_or_create_reserved_resource(name):
+def reserve_resource(name):
     """
-    Get or create a ReservedResource instance with the given name. If the object is created,
-    initialize its num_reservations attribute to 1, and set its assigned_queue to None.
+    Reserve a single resource. See reserve_resources().
 
-    :param name: The name of the resource that the ReservedResource tracks
+    :param name: The name of the resource to reserve
     :type  name: basestring
-    :return:     A ReservedResource instance for the given name
-    :rtype:      pulp.server.db.model.resources.ReservedResource
+    :return:     The name of the queue the task using the resource must be placed in
+    :rtype:      basestring
     """
-    reserved_resource = resources.ReservedResource.get_collection().find_and_modify(
-        query={'_id': name},
-        update={'$setOnInsert': {'num_reservations': 1, 'assigned_queue': None}},
-        upsert=True, new=True)
-    return resources.ReservedResource(
-        name=reserved_resource['_id'], assigned_queue=reserved_resource['assigned_queue'],
-        num_reservations=reserved_resource['num_reservations'])
+    return reserve_resources([name])[name]
+
+
+def reserve_resources(names):
+    """
+    Reserve each of the named resources, assigning the resources that are not already reserved to
+    the least busy AvailableQueues. Every reservation must later be released with
+    release_resources().
+
+    Each reservation is a single atomic update of its ReservedResource, so this may be called from
+    any process without going through the resource manager. The AvailableQueues are read at most
+    once, and their num_reservations are incremented once per queue rather than once per resource.
+
+    :param names: The names of the resources to reserve. A name listed more than once is reserved
+                  that many times.
+    :type  names: list
+    :return:      Map of each resource name to the name of the queue it is assigned to
+    :rtype:       dict
+    :raises NoAvailableQueues: if a resource needs a queue and there are none
+    """
+    collection = resources.ReservedResource.get_collection()
+    queue_loads = None
+    assigned = {}
+    reserved = []
+    reservations = {}
+    try:
+        for name in names:
+            # A resource that is already reserved only needs its count incremented
+            reserved_resource = collection.find_and_modify(
+                query={'_id': name, 'assigned_queue': {'$ne': None}},
+                update={'$inc': {'num_reservations': 1}}, new=True)
+            if reserved_resource is None:
+                if queue_loads is None:
+                    queue_loads = _available_queue_loads()
+                    for queue, count in reservations.items():
+                        if queue in queue_loads:
+                            queue_loads[queue] += count
+                queue = min(queue_loads, key=queue_loads.get)
+                reserved_resource = _insert_reserved_resource(collection, name, queue)
+            queue = reserved_resource['assigned_queue']
+            assigned[name] = queue
+            reserved.append(name)
+            reservations[queue] = reservations.get(queue, 0) + 1
+            if queue_loads is not None and queue in queue_loads:
+                queue_loads[queue] += 1
+    except NoAvailableQueues:
+        _release_reserved_resources(collection, reserved)
+        raise
+
+    queue_collection = resources.AvailableQueue.get_collection()
+    for queue, count in reservations.items():
+        queue_collection.update({'_id': queue}, {'$inc': {'num_reservations': count}}, safe=True)
+    return assigned
+
+
+def release_resources(names):
+    """
+    Release one reservation of each of the named resources, deleting the ReservedResources that no
+    longer have any. Resources that are not reserved are ignored. The num_reservations of each
+    AvailableQueue is decremented once per queue, and never below 0.
+
+    :param names: The names of the resources to release
+    :type  names: list
+    """
+    reservations = _release_reserved_resources(resources.ReservedResource.get_collection(), names)
+
+    queue_collection = resources.AvailableQueue.get_collection()
+    for queue, count in reservations.items():
+        result = queue_collection.update(
+            {'_id': queue, 'num_reservations': {'$gte': count}},
+            {'$inc': {'num_reservations': -count}}, safe=True)
+        if not result['n']:
+            # The count is out of step with the reservations, so don't let it go negative
+            queue_collection.update(
+                {'_id': queue, 'num_reservations': {'$lt': count}},
+                {'$set': {'num_reservations': 0}}, safe=True)
+
+
+def _available_queue_loads():
+    """
+    :return: Map of the name of each AvailableQueue to its num_reservations
+    :rtype:  dict
+    :raises NoAvailableQueues: if there are no AvailableQueues
+    """
+    queue_loads = dict(
+        (q['_id'], q['num_reservations']) for q in
+        resources.AvailableQueue.get_collection().find(fields=['num_reservations']))
+    if not queue_loads:
+        msg = _('There are no available queues in the system for reserved task work.')
+        raise NoAvailableQueues(msg)
+    return queue_loads
+
+
+def _insert_reserved_resource(collection, name, queue):
+    """
+    Reserve a resource that was not reserved when last checked, assigning it to the given queue
+    unless another process has reserved it in the meantime.
+
+    :param collection: The ReservedResource collection
+    :type  collection: pulp.server.db.connection.PulpCollection
+    :param name:       The name of the resource to reserve
+    :type  name:       basestring
+    :param queue:      The name of the queue to assign the resource to if it is not reserved
+    :type  queue:      basestring
+    :return:           The ReservedResource document after the reservation
+    :rtype:            dict
+    """
+    while True:
+        try:
+            reserved_resource = collection.find_and_modify(
+                query={'_id': name},
+                update={'$inc': {'num_reservations': 1}, '$setOnInsert': {'assigned_queue': queue}},
+                upsert=True, new=True)
+        except DuplicateKeyError:
+            # Another process inserted it between our query and our insert, so increment theirs
+            continue
+        if reserved_resource['assigned_queue'] is None:
+            # Left unassigned by an earlier version of Pulp
+            reserved_resource = collection.find_and_modify(
+                query={'_id': name, 'assigned_queue': None},
+                update={'$set': {'assigned_queue': queue}}, new=True) or \
+                collection.find_one({'_id': name})
+        return reserved_resource
+
+
+def _release_reserved_resources(collection, names):
+    """
+    Decrement the num_reservations of each of the named ReservedResources, deleting those that
+    reach 0.
+
+    :param collection: The ReservedResource collection
+    :type  collection: pulp.server.db.connection.PulpCollection
+    :param names:      The names of the resources to release
+    :type  names:      list
+    :return:           Map of queue name to the number of reservations released from it
+    :rtype:            dict
+    """
+    reservations = {}
+    for name in names:
+        reserved_resource = collection.find_and_modify(
+            query={'_id': name, 'num_reservations': {'$gt': 0}},
+            update={'$inc': {'num_reservations': -1}}, new=True)
+        if reserved_resource is None:
+            # Not reserved, or left behind with no reservations
+            collection.remove({'_id': name, 'num_reservations': 0}, safe=True)
+            continue
+        queue = reserved_resource['assigned_queue']
+        reservations[queue] = reservations.get(queue, 0) + 1
+        if not reserved_resource['num_reservations']:
+            # Matching on the count leaves the resource alone if it was reserved again meanwhile
+            collection.remove({'_id': name, 'num_reservations': 0}, safe=True)
+    return reservations
 
 
 class NoAvailableQueues(Exception):
     """ 
-    This Exception is raised by _get_least_busy_available_queue() if there are no AvailableQueue
-    objects.
+    This Exception is raised by reserve_resources() if there are no AvailableQueue objects.
     """
     pass
@@ -92,6 +92,32 @@ def get_updated_since(seconds):
     return ScheduledCall.get_collection().query(criteria)
 
 
+def get_changed_since(seconds):
+    """
+    Get schedules that have been updated since the timestamp represented by
+    "seconds", whether or not they are enabled.
+
+    :param seconds: seconds since the epoch
+    :param seconds: float
+
+    :return:    pymongo cursor of ScheduledCall database objects
+    :rtype:     pymongo.cursor.Cursor
+    """
+    criteria = Criteria(filters={'last_updated': {'$gt': seconds}})
+    return ScheduledCall.get_collection().query(criteria)
+
+
+def get_enabled_ids():
+    """
+    Get the IDs of schedules that are enabled, without loading the schedules.
+
+    :return:    set of schedule IDs
+    :rtype:     set
+    """
+    criteria = Criteria(filters={'enabled': True}, fields=['_id'])
+    return set(str(call['_id']) for call in ScheduledCall.get_collection().query(criteria))
+
+
 def delete(schedule_id):
     """
     Deletes the schedule with unique ID schedule_id
@@ -13,6 +13,8 @@
 
 import logging
 import sys
+import zlib
+from cStringIO import StringIO
 from gettext import gettext as _
 
 import web
@@ -25,6 +27,14 @@ from pulp.server.webservices import http, serialization
 
 _log = logging.getLogger(__name__)
 
+# Number of items encoded, or processed, together in each chunk of a streamed
+# JSON list
+STREAM_CHUNK_SIZE = 100
+
+# Responses at least this many bytes long are compressed for clients that
+# accept gzip; smaller ones aren't worth the CPU
+COMPRESSION_THRESHOLD = 8192
+
 
 class JSONController(object):
     """
@@ -74,6 +84,20 @@ class JSONController(object):
         """
         return web.data()
 
+    def data_stream(self):
+        """
+        Get binary POST/PUT payload as a stream, so a large payload can be
+        read a piece at a time rather than held in memory whole.
+        @return: the stream and the number of bytes to read from it
+        @rtype: tuple
+        """
+        length = web.ctx.env.get('CONTENT_LENGTH')
+        if 'data' in web.ctx or not length:
+            # already read, or of unknown length
+            data = web.data()
+            return StringIO(data), len(data)
+        return web.ctx.env['wsgi.input'], int(length)
+
     def filters(self, valid):
         """
         Fetch any parameters passed on the url
@@ -129,13 +153,48 @@ class JSONController(object):
 
     def _output(self, data):
         """
-        JSON encode the response and set the appropriate headers
+        JSON encode the response and set the appropriate headers. Large
+        responses are gzip compressed if the client accepts it.
         """
         body = json.dumps(data, default=json_util.default)
         http.header('Content-Type', 'application/json')
+        if len(body) >= COMPRESSION_THRESHOLD and self._accepts_gzip():
+            body = gzip_compress(body)
+            http.header('Content-Encoding', 'gzip')
+            http.header('Vary', 'Accept-Encoding')
         http.header('Content-Length', len(body))
         return body
 
+    def _accepts_gzip(self):
+        """
+        @return: True if the client accepts gzip encoded responses
+        @rtype:  bool
+        """
+        accepted = http.request_info('HTTP_ACCEPT_ENCODING') or ''
+        for encoding in accepted.split(','):
+            params = encoding.strip().split(';')
+            if params[0].strip().lower() != 'gzip':
+                continue
+            # gzip;q=0 means gzip is not acceptable
+            for param in params[1:]:
+                name, sep, value = param.strip().partition('=')
+                if name == 'q' and value.strip() in ('0', '0.0', '0.00', '0.000'):
+                    return False
+            return True
+        return False
+
+    def _output_stream(self, chunks):
+        """
+        Set the appropriate headers for a JSON response whose body is generated
+        in chunks. No Content-Length is sent since it is not known up front; the
+        WSGI server sends the body with chunked transfer encoding instead.
+
+        @param chunks: generator of the pieces of the JSON encoded body
+        @return: the generator passed in
+        """
+        http.header('Content-Type', 'application/json')
+        return chunks
+
     def _error_dict(self, msg, code=None):
         """
         Standardized error returns
@@ -157,6 +216,23 @@ class JSONController(object):
         http.status_ok()
         return self._output(data)
 
+    def ok_stream(self, items):
+        """
+        Return an ok response whose body is a JSON list streamed from the given
+        items, so large results are neither loaded nor encoded in memory all at
+        once. Any iterable can be streamed; passing a database cursor, or a
+        generator over one, encodes the documents as they are read from the
+        database.
+
+        Since the items are consumed after the controller method returns, any
+        request input they depend on must be read beforehand.
+        @type items: iterable
+        @param items: items to be encoded as the list in the body of the response
+        @return: generator of the JSON encoded response
+        """
+        http.status_ok()
+        return self._output_stream(json_list_chunks(items))
+
     def created(self, location, data):
         """
         Return a created response.
@@ -289,3 +365,75 @@ class JSONController(object):
         for key in keys_list:
             if key not in merged_whitelist:
                 source_dict.pop(key, None)
+
+
+def gzip_compress(data):
+    """
+    @param data: data to compress
+    @type  data: str
+    @return: the data compressed in the gzip format
+    @rtype:  str
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def json_list_chunks(items, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Generate the JSON encoding of a list, chunk_size items at a time.
+
+    Nothing is generated until the first chunk of items has been retrieved, so
+    an error raised while retrieving them is reported as an error response
+    instead of interrupting a response that was already started.
+
+    @type items: iterable
+    @param items: items to encode
+    @type chunk_size: int
+    @param chunk_size: maximum number of items encoded into each chunk
+    @return: generator of str
+    """
+    separator = '['
+    encoded_items = []
+    for item in items:
+        encoded_items.append(json.dumps(item, default=json_util.default))
+        if len(encoded_items) >= chunk_size:
+            yield separator + ','.join(encoded_items)
+            separator = ','
+            encoded_items = []
+    if encoded_items:
+        yield separator + ','.join(encoded_items)
+        separator = ','
+    # Nothing was yielded yet if the list is empty
+    yield separator == '[' and '[]' or ']'
+
+
+def processed_in_batches(items, process, batch_size=STREAM_CHUNK_SIZE):
+    """
+    Generate the given items after passing them through process, batch_size
+    items at a time. This allows processing that looks up related data for
+    many items at once to be applied to a streamed result without loading all
+    of it first.
+
+    Like a single call on all of the items, process is called at least once,
+    with an empty batch if there are no items.
+
+    @type items: iterable
+    @param items: items to process
+    @type process: callable
+    @param process: called with each batch as a list; returns the processed items
+    @type batch_size: int
+    @param batch_size: maximum number of items passed to each process call
+    @return: generator of the processed items
+    """
+    batch = []
+    processed_any = False
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            for processed in process(batch):
+                yield processed
+            processed_any = True
+            batch = []
+    if batch or not processed_any:
+        for processed in process(batch):
+            yield processed
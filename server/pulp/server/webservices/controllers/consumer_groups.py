@@ -67,16 +67,17 @@ class ConsumerGroupSearch(SearchController):
             managers_factory.consumer_group_query_manager().find_by_criteria)
 
     def GET(self):
-        items = self._get_query_results_from_get()
-        for item in items:
-            item.update(serialization.link.search_safe_link_obj(item['id']))
-        return self.ok(items)
+        items = self._get_query_results_from_get(as_generator=True)
+        return self.ok_stream(self._add_link(item) for item in items)
 
     def POST(self):
-        items = self._get_query_results_from_post()
-        for item in items:
-            item.update(serialization.link.search_safe_link_obj(item['id']))
-        return self.ok(items)
+        items = self._get_query_results_from_post(as_generator=True)
+        return self.ok_stream(self._add_link(item) for item in items)
+
+    @staticmethod
+    def _add_link(item):
+        item.update(serialization.link.search_safe_link_obj(item['id']))
+        return item
 
 
 class ConsumerGroupResource(JSONController):
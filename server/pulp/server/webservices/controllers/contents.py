@@ -22,7 +22,7 @@ from pulp.server.db.model.criteria import Criteria
 from pulp.server.exceptions import MissingResource, InvalidValue, OperationPostponed
 from pulp.server.managers import factory
 from pulp.server.webservices import serialization
-from pulp.server.webservices.controllers.base import JSONController
+from pulp.server.webservices.controllers.base import JSONController, processed_in_batches
 from pulp.server.webservices.controllers.decorators import auth_required
 from pulp.server.webservices.controllers.search import SearchController
 from pulp.server.managers.content import orphan
@@ -57,7 +57,8 @@ class ContentTypeResource(JSONController):
         if content_type is None:
             return self.not_found(_('No content type resource: %(r)s') %
                                   {'r': type_id})
-        resource = serialization.content.content_type_obj(content_type)
+        # the definition is shared and cannot be modified, so copy it
+        resource = serialization.content.content_type_obj(dict(content_type))
         links = {'actions': serialization.link.child_link_obj('actions'),
                  'content_units': serialization.link.child_link_obj('units')}
         resource.update(links)
@@ -80,7 +81,7 @@ class ContentUnitsCollection(JSONController):
         """
         cqm = factory.content_query_manager()
         units = cqm.find_by_criteria(type_id, Criteria())
-        return self.ok([self.process_unit(unit) for unit in units])
+        return self.ok_stream(self.process_unit(unit) for unit in units)
 
 
 class ContentUnitsSearch(SearchController):
@@ -158,12 +159,14 @@ class ContentUnitsSearch(SearchController):
         @type  type_id: basestring
         """
         self._type_id = type_id
-        raw_units = self._get_query_results_from_get(ignore_fields=('include_repos',))
-        units = [ContentUnitsCollection.process_unit(unit) for unit in raw_units]
+        raw_units = self._get_query_results_from_get(ignore_fields=('include_repos',),
+                                                     as_generator=True)
+        units = (ContentUnitsCollection.process_unit(unit) for unit in raw_units)
         if web.input().get('include_repos'):
-            self._add_repo_memberships(units, type_id)
+            units = processed_in_batches(
+                units, lambda batch: self._add_repo_memberships(batch, type_id))
 
-        return self.ok(units)
+        return self.ok_stream(units)
 
     @auth_required(READ)
     def POST(self, type_id):
@@ -178,12 +181,13 @@ class ContentUnitsSearch(SearchController):
         @type  type_id: basestring
         """
         self._type_id = type_id
-        raw_units = self._get_query_results_from_post()
-        units = [ContentUnitsCollection.process_unit(unit) for unit in raw_units]
+        raw_units = self._get_query_results_from_post(as_generator=True)
+        units = (ContentUnitsCollection.process_unit(unit) for unit in raw_units)
         if self.params().get('include_repos'):
-            self._add_repo_memberships(units, type_id)
+            units = processed_in_batches(
+                units, lambda batch: self._add_repo_memberships(batch, type_id))
 
-        return self.ok(units)
+        return self.ok_stream(units)
 
 
 class ContentUnitResource(JSONController):
@@ -257,8 +261,8 @@ class UploadSegmentResource(JSONController):
             raise InvalidValue(['offset'])
 
         upload_manager = factory.content_upload_manager()
-        data = self.data()
-        upload_manager.save_data(upload_id, offset, data)
+        stream, length = self.data_stream()
+        upload_manager.save_stream(upload_id, offset, stream, length)
 
         return self.ok(None)
 
@@ -12,6 +12,8 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 from gettext import gettext as _
 import httplib
+import math
+import sys
 
 import web
 
@@ -19,7 +21,7 @@ from pulp.server.async import tasks
 from pulp.server.async.task_status_manager import TaskStatusManager
 from pulp.server.auth import authorization
 from pulp.server.db.model.criteria import Criteria
-from pulp.server.exceptions import MissingResource
+from pulp.server.exceptions import InvalidValue, MissingResource, MissingValue
 from pulp.server.webservices import serialization
 from pulp.server.webservices.controllers.base import JSONController
 from pulp.server.webservices.controllers.decorators import auth_required
@@ -35,36 +37,117 @@ class TaskNotFound(MissingResource):
 class SearchTaskCollection(SearchController):
     """
     Allows authorized API users to search our Task collection.
+
+    Including a continuation in the search, even a null or empty one for the first page, returns
+    a single page of tasks along with the continuation for the next page. See
+    TaskStatusManager.find_page.
     """
     def __init__(self):
         super(SearchTaskCollection, self).__init__(TaskStatusManager.find_by_criteria)
 
+    @auth_required(authorization.READ)
+    def GET(self):
+        if 'continuation' not in web.input():
+            return self.ok_stream(self._get_query_results_from_get(as_generator=True))
+        continuation = web.input()['continuation'] or None
+        criteria = self._criteria_from_get(ignore_fields=('continuation',))
+        return self.ok(_task_page(criteria, continuation))
+
+    @auth_required(authorization.READ)
+    def POST(self):
+        try:
+            criteria_param = self.params()['criteria']
+        except KeyError:
+            raise MissingValue(['criteria'])
+        if not isinstance(criteria_param, dict) or 'continuation' not in criteria_param:
+            criteria = self._criteria_from_post(criteria_param)
+            return self.ok_stream(self._query(criteria, as_generator=True))
+        continuation = criteria_param.pop('continuation') or None
+        criteria = self._criteria_from_post(criteria_param)
+        return self.ok(_task_page(criteria, continuation))
+
 
 class TaskCollection(JSONController):
     @auth_required(authorization.READ)
     def GET(self):
-        valid_filters = ['tag']
+        valid_filters = ['tag', 'state', 'limit', 'continuation']
         filters = self.filters(valid_filters)
         criteria_filters = {}
         tags = filters.get('tag', [])
         if tags:
             criteria_filters['tags'] = {'$all':  filters.get('tag', [])}
-        criteria = Criteria.from_client_input({'filters': criteria_filters})
-        serialized_task_statuses = []
-        for task in TaskStatusManager.find_by_criteria(criteria):
-            task.update(serialization.dispatch.spawned_tasks(task))
-            serialized_task_statuses.append(task)
-        return self.ok(serialized_task_statuses)
+        states = filters.get('state', [])
+        if states:
+            criteria_filters['state'] = {'$in': states}
+        query = {'filters': criteria_filters}
+        if 'limit' in filters:
+            query['limit'] = filters['limit'][0]
+        criteria = Criteria.from_client_input(query)
+        if 'continuation' in filters:
+            # Including a continuation, even an empty one for the first page, requests paging
+            continuation = filters['continuation'][0] or None
+            return self.ok(_task_page(criteria, continuation))
+        task_statuses = TaskStatusManager.find_by_criteria(criteria)
+        return self.ok_stream(self._serialize(task) for task in task_statuses)
+
+    @staticmethod
+    def _serialize(task):
+        """
+        Add the links to the tasks spawned by the given task.
+
+        :param task: task status document
+        :type  task: dict
+        :return:     the same task status, updated in place
+        :rtype:      dict
+        """
+        task.update(serialization.dispatch.spawned_tasks(task))
+        return task
+
+
+def _task_page(criteria, continuation):
+    """
+    Retrieve a page of task statuses.
+
+    :param criteria:     criteria the tasks must match
+    :type  criteria:     pulp.server.db.model.criteria.Criteria
+    :param continuation: continuation returned with the previous page, or None for the first page
+    :type  continuation: basestring or None
+    :return:             the page of tasks under 'tasks', and the continuation for the next page
+                         under 'continuation'
+    :rtype:              dict
+    """
+    task_statuses, continuation = TaskStatusManager.find_page(criteria, continuation)
+    return {'tasks': [TaskCollection._serialize(task) for task in task_statuses],
+            'continuation': continuation}
 
 
 class TaskResource(JSONController):
 
     @auth_required(authorization.READ)
     def GET(self, task_id):
-        task = TaskStatusManager.find_by_task_id(task_id)
+        """
+        Return the status of the task. If a wait is given, the response is delayed for up to
+        that many seconds until the status no longer matches the _hash of a status returned
+        earlier, passed as since.
+
+        :param task_id: The ID of the task
+        :type  task_id: basestring
+        """
+        params = web.input(wait=None, since=None)
+        if params.wait is None:
+            task = TaskStatusManager.find_by_task_id(task_id)
+        else:
+            try:
+                wait = float(params.wait)
+            except ValueError:
+                raise InvalidValue(['wait']), None, sys.exc_info()[2]
+            if math.isnan(wait) or math.isinf(wait) or wait < 0:
+                raise InvalidValue(['wait'])
+            task = TaskStatusManager.wait_for_change(task_id, params.since, wait)
         if task is None:
             raise MissingResource(task_id)
         else:
+            task['_hash'] = TaskStatusManager.status_hash(task)
             link = serialization.link.link_obj('/pulp/api/v2/tasks/%s/' % task_id)
             task.update(link)
             task.update(serialization.dispatch.spawned_tasks(task))
@@ -38,7 +38,8 @@ class Types(JSONController):
     @auth_required(READ)
     def GET(self):
         manager = manager_factory.plugin_manager()
-        type_defs = manager.types()
+        # the definitions are shared and cannot be modified, so copy them
+        type_defs = [dict(t) for t in manager.types()]
 
         for t in type_defs:
             href = link.child_link_obj(t['id'])
@@ -60,7 +61,7 @@ class Type(JSONController):
         if len(matching_types) is 0:
             raise MissingResource(type=type_id)
         else:
-            t = matching_types[0]
+            t = dict(matching_types[0])
             href = link.current_link_obj()
             t.update(href)
 
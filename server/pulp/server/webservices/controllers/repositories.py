@@ -20,6 +20,7 @@ from pulp.common import constants
 from pulp.common.tags import action_tag, resource_tag
 from pulp.server.async import constants as dispatch_constants
 from pulp.server.auth.authorization import CREATE, READ, DELETE, EXECUTE, UPDATE
+from pulp.server.compat import json
 from pulp.server.db.model.criteria import UnitAssociationCriteria, Criteria
 from pulp.server.db.model.repository import RepoContentUnit, Repo
 from pulp.server.managers.consumer.applicability import regenerate_applicability_for_repos
@@ -27,8 +28,9 @@ from pulp.server.managers.content.upload import import_uploaded_unit
 from pulp.server.managers.repo.importer import set_importer, remove_importer, update_importer_config
 from pulp.server.managers.repo.unit_association import associate_from_repo, unassociate_by_criteria
 from pulp.server.tasks import repository
-from pulp.server.webservices import serialization
-from pulp.server.webservices.controllers.base import JSONController
+from pulp.server.webservices import http, serialization
+from pulp.server.webservices.controllers.base import (JSONController, json_list_chunks,
+                                                      processed_in_batches)
 from pulp.server.webservices.controllers.decorators import auth_required
 from pulp.server.webservices.controllers.schedule import ScheduleResource
 from pulp.server.webservices.controllers.search import SearchController
@@ -130,20 +132,19 @@ class RepoCollection(JSONController):
         'distributors'.
         """
         query_params = web.input()
-        all_repos = list(Repo.get_collection().find(projection={'scratchpad': 0}))
+        all_repos = Repo.get_collection().find(projection={'scratchpad': 0})
 
         if query_params.get('details', False):
             query_params['importers'] = True
             query_params['distributors'] = True
 
-        self._process_repos(
-            all_repos,
-            query_params.get('importers', False),
-            query_params.get('distributors', False)
-        )
+        importers = query_params.get('importers', False)
+        distributors = query_params.get('distributors', False)
+        repos = processed_in_batches(
+            all_repos, lambda batch: self._process_repos(batch, importers, distributors))
 
         # Return the repos or an empty list; either way it's a 200
-        return self.ok(all_repos)
+        return self.ok_stream(repos)
 
     @auth_required(CREATE)
     def POST(self):
@@ -184,14 +185,13 @@ class RepoSearch(SearchController):
             query_params['importers'] = True
             query_params['distributors'] = True
         items = self._get_query_results_from_get(
-            ('details', 'importers', 'distributors'))
+            ('details', 'importers', 'distributors'), as_generator=True)
 
-        RepoCollection._process_repos(
-            items,
-            query_params.pop('importers', False),
-            query_params.pop('distributors', False)
-        )
-        return self.ok(items)
+        importers = query_params.pop('importers', False)
+        distributors = query_params.pop('distributors', False)
+        items = processed_in_batches(
+            items, lambda batch: RepoCollection._process_repos(batch, importers, distributors))
+        return self.ok_stream(items)
 
     @auth_required(READ)
     def POST(self):
@@ -200,14 +200,13 @@ class RepoSearch(SearchController):
         'criteria' which has a data structure that can be turned into a
         Criteria instance.
         """
-        items = self._get_query_results_from_post()
+        items = self._get_query_results_from_post(as_generator=True)
 
-        RepoCollection._process_repos(
-            items,
-            self.params().get('importers', False),
-            self.params().get('distributors', False)
-        )
-        return self.ok(items)
+        importers = self.params().get('importers', False)
+        distributors = self.params().get('distributors', False)
+        items = processed_in_batches(
+            items, lambda batch: RepoCollection._process_repos(batch, importers, distributors))
+        return self.ok_stream(items)
 
 
 class RepoResource(JSONController):
@@ -828,6 +827,7 @@ class RepoImportUpload(JSONController):
         unit_type_id = params['unit_type_id']
         unit_key = params['unit_key']
         unit_metadata = params.pop('unit_metadata', None)
+        checksum = params.get('checksum')
 
         tags = [resource_tag(dispatch_constants.RESOURCE_REPOSITORY_TYPE, repo_id),
                 action_tag('import_upload')]
@@ -835,6 +835,7 @@ class RepoImportUpload(JSONController):
                                     dispatch_constants.RESOURCE_REPOSITORY_TYPE,
                                     repo_id,
                                     [repo_id, unit_type_id, unit_key, unit_metadata, upload_id],
+                                    kwargs={'checksum': checksum},
                                     tags=tags)
         raise exceptions.OperationPostponed(async_result)
 
@@ -887,6 +888,11 @@ class RepoUnitAdvancedSearch(JSONController):
         if query is None:
             raise exceptions.MissingValue(['criteria'])
 
+        # Including a continuation, even a null one for the first page, requests
+        # keyset paging; it is not part of the criteria itself.
+        paged = 'continuation' in query
+        continuation = query.pop('continuation', None)
+
         try:
             criteria = UnitAssociationCriteria.from_client_input(query)
         except:
@@ -895,13 +901,38 @@ class RepoUnitAdvancedSearch(JSONController):
 
         # Data lookup
         manager = manager_factory.repo_unit_association_query_manager()
+        if paged:
+            page = manager.get_units_page(repo_id, criteria=criteria,
+                                          continuation=continuation)
+            http.status_ok()
+            return self._output_stream(_units_page_chunks(page))
+
         if criteria.type_ids is not None and len(criteria.type_ids) == 1:
             type_id = criteria.type_ids[0]
-            units = manager.get_units_by_type(repo_id, type_id, criteria=criteria)
+            units = manager.get_units_by_type(repo_id, type_id, criteria=criteria,
+                                              as_generator=True)
         else:
-            units = manager.get_units_across_types(repo_id, criteria=criteria)
+            units = manager.get_units_across_types(repo_id, criteria=criteria,
+                                                   as_generator=True)
+
+        return self.ok_stream(units)
+
 
-        return self.ok(units)
+def _units_page_chunks(page):
+    """
+    Generate the JSON encoding of a page of units from a unit association
+    search, followed by the continuation token for the next page.
+
+    :param page: page returned by the association query manager
+    :type  page: pulp.server.managers.repo.unit_association_query.UnitAssociationPage
+    :return: generator of str
+    """
+    chunks = json_list_chunks(page)
+    # Retrieve the first units before anything is sent
+    yield '{"units": ' + chunks.next()
+    for chunk in chunks:
+        yield chunk
+    yield ', "continuation": %s}' % json.dumps(page.continuation)
 
 
 class ContentApplicabilityRegeneration(JSONController):
@@ -39,7 +39,7 @@ class SearchController(JSONController):
         example, '/v2/sometype/search/?field=id&field=display_name' will
         return the fields 'id' and 'display_name'.
         """
-        return self.ok(self._get_query_results_from_get())
+        return self.ok_stream(self._get_query_results_from_get(as_generator=True))
 
     @auth_required(READ)
     def POST(self):
@@ -56,9 +56,10 @@ class SearchController(JSONController):
         @rtype:     list
         """
 
-        return self.ok(self._get_query_results_from_post())
+        return self.ok_stream(self._get_query_results_from_post(as_generator=True))
 
-    def _get_query_results_from_get(self, ignore_fields=None, is_user_search=False):
+    def _get_query_results_from_get(self, ignore_fields=None, is_user_search=False,
+                                    as_generator=False):
         """
         Looks for query parameters that define a Criteria, and returns the
         results of a search based on that Criteria.
@@ -74,9 +75,24 @@ class SearchController(JSONController):
 
         @type is_user_search
 
-        @return:    list of documents from the DB that match the given criteria
+        @param as_generator:    if True, the results are returned as given by
+                                the query method, typically a database cursor,
+                                instead of being loaded into a list
+        @type  as_generator:    bool
+
+        @return:    documents from the DB that match the given criteria
                     for the collection associated with this controller
-        @rtype:     list
+        @rtype:     list or iterable
+        """
+        criteria = self._criteria_from_get(ignore_fields, is_user_search)
+        return self._query(criteria, as_generator)
+
+    def _criteria_from_get(self, ignore_fields=None, is_user_search=False):
+        """
+        Build a Criteria from the query parameters. See
+        _get_query_results_from_get for the parameters.
+
+        @rtype: pulp.server.db.model.criteria.Criteria
         """
         input = self._ensure_input_encoding(web.input(field=[]))
         if ignore_fields:
@@ -93,26 +109,57 @@ class SearchController(JSONController):
                 fields.append('login')
             input['fields'] = fields
 
-        criteria = Criteria.from_client_input(input)
-        return list(self.query_method(criteria))
+        return Criteria.from_client_input(input)
 
-    def _get_query_results_from_post(self, is_user_search=False):
+    def _get_query_results_from_post(self, is_user_search=False, as_generator=False):
         """
         Looks for a Criteria passed as a POST parameter on ket 'criteria', and
         returns the results of a search based on that Criteria.
 
-        @return:    list of documents from the DB that match the given criteria
+        @param as_generator:    if True, the results are returned as given by
+                                the query method, typically a database cursor,
+                                instead of being loaded into a list
+        @type  as_generator:    bool
+
+        @return:    documents from the DB that match the given criteria
                     for the collection associated with this controller
-        @rtype:     list
+        @rtype:     list or iterable
         """
         try:
             criteria_param = self.params()['criteria']
         except KeyError:
             raise exceptions.MissingValue(['criteria'])
+        criteria = self._criteria_from_post(criteria_param, is_user_search)
+        return self._query(criteria, as_generator)
+
+    def _criteria_from_post(self, criteria_param, is_user_search=False):
+        """
+        Build a Criteria from the 'criteria' passed as a POST parameter.
+
+        @param criteria_param:  data structure that can be turned into an
+                                instance of the Criteria model
+        @type  criteria_param:  dict
+        @type  is_user_search:  bool
+
+        @rtype: pulp.server.db.model.criteria.Criteria
+        """
         criteria = Criteria.from_client_input(criteria_param)
         if criteria.fields:
             if not is_user_search and 'id' not in criteria.fields and u'id' not in criteria.fields:
                 criteria.fields.append('id')
             if is_user_search and 'login' not in criteria.fields and u'login' not in criteria.fields:
                 criteria.fields.append('login')
-        return list(self.query_method(criteria))
+        return criteria
+
+    def _query(self, criteria, as_generator):
+        """
+        Run the query method with the given criteria.
+
+        @type  criteria:        pulp.server.db.model.criteria.Criteria
+        @type  as_generator:    bool
+        @rtype:                 list or iterable
+        """
+        results = self.query_method(criteria)
+        if as_generator:
+            return results
+        return list(results)
@@ -14,7 +14,6 @@
 import web
 
 from pulp.server.auth.authorization import READ, CREATE, UPDATE, DELETE
-from pulp.server.db.model.auth import Permission
 from pulp.server.webservices.controllers.base import JSONController
 from pulp.server.webservices.controllers.decorators import auth_required
 from pulp.server.webservices.controllers.search import SearchController
@@ -119,8 +118,10 @@ class UserResource(JSONController):
 
         # Delete any existing user permissions given to the creator of the user
         user_link = serialization.link.current_link_obj()['_href']
-        if Permission.get_collection().find_one({'resource': user_link}):
-            Permission.get_collection().remove({'resource': user_link}, safe=True)
+        try:
+            managers.permission_manager().delete_permission(user_link)
+        except exceptions.MissingResource:
+            pass
 
         return self.ok(result)
 
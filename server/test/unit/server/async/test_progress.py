@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2014 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+"""
+This module contains tests for the pulp.server.async.progress module.
+"""
+import unittest
+
+from celery.signals import task_postrun
+import mock
+
+from pulp.server.async import progress
+from pulp.server.exceptions import MissingResource
+
+
+@mock.patch('pulp.server.async.task_status_manager.TaskStatusManager.update_progress_report')
+class TestProgressReportWriter(unittest.TestCase):
+    """
+    Test the ProgressReportWriter class.
+    """
+    def setUp(self):
+        self.writer = progress.ProgressReportWriter('some_task', interval=60)
+
+    def test_coalesced(self, update_progress_report):
+        """
+        Assert that reports set within the interval are not written until the writer is flushed,
+        and are then written together.
+        """
+        self.writer.set('importer', {'state': 'running', 'count': 1})
+        self.writer.set('importer', {'state': 'running', 'count': 2})
+        self.writer.set('importer', {'state': 'running', 'count': 3})
+
+        self.assertEqual(update_progress_report.call_count, 1)
+        update_progress_report.assert_called_with('some_task',
+                                                   {'importer': {'state': 'running', 'count': 1}})
+
+        self.writer.flush()
+
+        self.assertEqual(update_progress_report.call_count, 2)
+        update_progress_report.assert_called_with('some_task',
+                                                   {'importer': {'state': 'running', 'count': 3}})
+
+    def test_state_changed(self, update_progress_report):
+        """
+        Assert that a report is written as soon as its state, or the state of one of its steps,
+        changes.
+        """
+        self.writer.set('importer', {'metadata': {'state': 'running'}})
+        self.writer.set('importer', {'metadata': {'state': 'running', 'count': 1}})
+        self.writer.set('importer', {'metadata': {'state': 'complete'}})
+
+        self.assertEqual(update_progress_report.call_count, 2)
+        update_progress_report.assert_called_with('some_task',
+                                                   {'importer': {'metadata': {'state': 'complete'}}})
+
+    def test_interval_passed(self, update_progress_report):
+        """
+        Assert that a report is written once the interval has passed.
+        """
+        self.writer.interval = 0
+        self.writer.set('importer', 'a')
+        self.writer.set('importer', 'b')
+
+        self.assertEqual(update_progress_report.call_count, 2)
+
+    def test_new_report(self, update_progress_report):
+        """
+        Assert that the first report of each report id is written immediately.
+        """
+        self.writer.set('importer', 'a')
+        self.writer.set('distributor', 'b')
+
+        self.assertEqual(update_progress_report.call_count, 2)
+        update_progress_report.assert_called_with('some_task', {'distributor': 'b'})
+
+    def test_write_failed(self, update_progress_report):
+        """
+        Assert that reports that could not be written are written by the next write.
+        """
+        update_progress_report.side_effect = MissingResource('some_task')
+        self.assertRaises(MissingResource, self.writer.set, 'importer', 'a')
+
+        update_progress_report.side_effect = None
+        self.writer.set('distributor', 'b')
+
+        update_progress_report.assert_called_with('some_task',
+                                                   {'importer': 'a', 'distributor': 'b'})
+
+
+@mock.patch('pulp.server.async.task_status_manager.TaskStatusManager.update_progress_report')
+class TestFlush(unittest.TestCase):
+    """
+    Test the get_writer() and flush() functions.
+    """
+    def tearDown(self):
+        progress._WRITERS.clear()
+
+    def test_flush(self, update_progress_report):
+        """
+        Assert that flush() writes pending reports and forgets the task's writer.
+        """
+        writer = progress.get_writer('some_task')
+        self.assertTrue(progress.get_writer('some_task') is writer)
+        writer.interval = 60
+        writer.set('importer', 'a')
+        writer.set('importer', 'b')
+
+        progress.flush('some_task')
+
+        update_progress_report.assert_called_with('some_task', {'importer': 'b'})
+        self.assertFalse('some_task' in progress._WRITERS)
+
+    def test_flush_failed(self, update_progress_report):
+        """
+        Assert that flush() doesn't raise when the reports can't be written.
+        """
+        writer = progress.get_writer('some_task')
+        writer.interval = 60
+        writer.set('importer', 'a')
+        update_progress_report.side_effect = MissingResource('some_task')
+        writer.set('importer', 'b')
+
+        progress.flush('some_task')
+
+    def test_flush_unknown_task(self, update_progress_report):
+        """
+        Assert that flushing a task that set no progress does nothing.
+        """
+        progress.flush('some_task')
+
+        self.assertEqual(update_progress_report.call_count, 0)
+
+    def test_task_postrun(self, update_progress_report):
+        """
+        Assert that the writer of a task not run through pulp's Task is flushed and forgotten when
+        the task returns.
+        """
+        writer = progress.get_writer('some_task')
+        writer.interval = 60
+        writer.set('importer', 'a')
+        writer.set('importer', 'b')
+
+        task_postrun.send(sender=None, task_id='some_task', task=None, args=(), kwargs={},
+                          retval=None, state='SUCCESS')
+
+        update_progress_report.assert_called_with('some_task', {'importer': 'b'})
+        self.assertFalse('some_task' in progress._WRITERS)
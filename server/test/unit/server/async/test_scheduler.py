@@ -258,46 +258,84 @@ class TestSchedulerSetupSchedule(unittest.TestCase):
         self.assertTrue('529f4bd93de3a31d0ec77340' not in sched_instance._schedule)
 
 
-class TestSchedulerScheduleChanged(unittest.TestCase):
+class TestSchedulerUpdateSchedule(unittest.TestCase):
     @mock.patch('threading.Thread', new=mock.MagicMock())
     @mock.patch('pulp.server.managers.schedule.utils.get_enabled')
-    @mock.patch('pulp.server.managers.schedule.utils.get_updated_since')
-    def test_count_changed(self, mock_updated_since, mock_get_enabled):
-        mock_updated_since.return_value.count.return_value = 0
-        mock_get_enabled.return_value = SCHEDULES
-        sched_instance = scheduler.Scheduler()
+    def setUp(self, mock_get_enabled):
+        mock_get_enabled.return_value = [dict(s) for s in SCHEDULES]
+        self.sched_instance = scheduler.Scheduler()
+
+    @mock.patch('pulp.server.managers.schedule.utils.get_enabled_ids')
+    @mock.patch('pulp.server.managers.schedule.utils.get_enabled')
+    @mock.patch('pulp.server.managers.schedule.utils.get_changed_since', return_value=[])
+    def test_no_changes(self, mock_changed_since, mock_get_enabled, mock_get_enabled_ids):
+        schedule = dict(self.sched_instance._schedule)
+        # includes the schedule that has 0 remaining runs
+        mock_get_enabled.return_value.count.return_value = len(SCHEDULES)
 
-        mock_get_enabled.return_value = mock.MagicMock()
-        mock_get_enabled.return_value.count.return_value = sched_instance._loaded_from_db_count + 1
+        self.sched_instance.update_schedule()
 
-        self.assertTrue(sched_instance.schedule_changed is True)
+        mock_changed_since.assert_called_once_with(1387218569.811224)
+        self.assertEqual(self.sched_instance._schedule, schedule)
+        self.assertEqual(mock_get_enabled_ids.call_count, 0)
 
-    @mock.patch('threading.Thread', new=mock.MagicMock())
     @mock.patch('pulp.server.managers.schedule.utils.get_enabled')
-    @mock.patch('pulp.server.managers.schedule.utils.get_updated_since')
-    def test_new_updated(self, mock_updated_since, mock_get_enabled):
-        mock_get_enabled.return_value = SCHEDULES
-        sched_instance = scheduler.Scheduler()
+    @mock.patch('pulp.server.managers.schedule.utils.get_changed_since')
+    def test_updated(self, mock_changed_since, mock_get_enabled):
+        updated = dict(SCHEDULES[1], last_updated=1387218600.0, total_run_count=3)
+        added = dict(SCHEDULES[0], _id=u'529f4bd93de3a31d0ec77341', last_updated=1387218601.0)
+        mock_changed_since.return_value = [updated, added]
+        mock_get_enabled.return_value.count.return_value = len(SCHEDULES) + 1
+        unchanged = self.sched_instance._schedule['529f4bd93de3a31d0ec77338']
+
+        self.sched_instance.update_schedule()
+
+        schedule = self.sched_instance._schedule
+        self.assertEqual(schedule['529f4bd93de3a31d0ec77339'].total_run_count, 3)
+        self.assertTrue('529f4bd93de3a31d0ec77341' in schedule)
+        self.assertTrue(schedule['529f4bd93de3a31d0ec77338'] is unchanged)
+        self.assertEqual(self.sched_instance._most_recent_timestamp, 1387218601.0)
 
-        mock_get_enabled.return_value = mock.MagicMock()
-        mock_get_enabled.return_value.count.return_value = sched_instance._loaded_from_db_count
-        mock_updated_since.return_value.count.return_value = 1
+    @mock.patch('pulp.server.managers.schedule.utils.get_enabled')
+    @mock.patch('pulp.server.managers.schedule.utils.get_changed_since')
+    def test_disabled(self, mock_changed_since, mock_get_enabled):
+        mock_changed_since.return_value = [
+            dict(SCHEDULES[0], enabled=False, last_updated=1387218600.0)]
+        mock_get_enabled.return_value.count.return_value = len(SCHEDULES) - 1
 
-        self.assertTrue(sched_instance.schedule_changed is True)
+        self.sched_instance.update_schedule()
 
-    @mock.patch('threading.Thread', new=mock.MagicMock())
-    @mock.patch('pulp.server.managers.schedule.utils.get_enabled')
-    @mock.patch('pulp.server.managers.schedule.utils.get_updated_since')
-    def test_no_changes(self, mock_updated_since, mock_get_enabled):
-        mock_updated_since.return_value.count.return_value = 0
-        mock_get_enabled.return_value = SCHEDULES
-        sched_instance = scheduler.Scheduler()
+        self.assertTrue('529f4bd93de3a31d0ec77338' not in self.sched_instance._schedule)
+        self.assertTrue('529f4bd93de3a31d0ec77339' in self.sched_instance._schedule)
 
-        mock_get_enabled.return_value = mock.MagicMock()
-        # -1 because there is an ignored schedule that has 0 remaining runs
+    @mock.patch('pulp.server.managers.schedule.utils.get_enabled_ids')
+    @mock.patch('pulp.server.managers.schedule.utils.get_enabled')
+    @mock.patch('pulp.server.managers.schedule.utils.get_changed_since', return_value=[])
+    def test_deleted(self, mock_changed_since, mock_get_enabled, mock_get_enabled_ids):
         mock_get_enabled.return_value.count.return_value = len(SCHEDULES) - 1
+        mock_get_enabled_ids.return_value = set(['529f4bd93de3a31d0ec77339',
+                                                 '529f4bd93de3a31d0ec77340'])
+
+        self.sched_instance.update_schedule()
 
-        self.assertTrue(sched_instance.schedule_changed is False)
+        self.assertTrue('529f4bd93de3a31d0ec77338' not in self.sched_instance._schedule)
+        self.assertTrue('529f4bd93de3a31d0ec77339' in self.sched_instance._schedule)
+
+    @mock.patch.object(scheduler.Scheduler, 'setup_schedule')
+    @mock.patch('pulp.server.managers.schedule.utils.get_enabled_ids')
+    @mock.patch('pulp.server.managers.schedule.utils.get_enabled')
+    @mock.patch('pulp.server.managers.schedule.utils.get_changed_since', return_value=[])
+    def test_missed_update_reloads(self, mock_changed_since, mock_get_enabled,
+                                   mock_get_enabled_ids, mock_setup_schedule):
+        mock_get_enabled.return_value.count.return_value = len(SCHEDULES) + 1
+        mock_get_enabled_ids.return_value = set(['529f4bd93de3a31d0ec77338',
+                                                 '529f4bd93de3a31d0ec77339',
+                                                 '529f4bd93de3a31d0ec77340',
+                                                 '529f4bd93de3a31d0ec77341'])
+
+        self.sched_instance.update_schedule()
+
+        mock_setup_schedule.assert_called_once_with()
 
 
 class TestSchedulerSchedule(unittest.TestCase):
@@ -314,16 +352,18 @@ class TestSchedulerSchedule(unittest.TestCase):
         mock_setup_schedule.assert_called_once_with()
 
     @mock.patch('threading.Thread', new=mock.MagicMock())
+    @mock.patch.object(scheduler.Scheduler, 'update_schedule')
     @mock.patch.object(scheduler.Scheduler, 'setup_schedule')
-    @mock.patch.object(scheduler.Scheduler, 'schedule_changed', new=True)
-    def test_schedule_changed(self, mock_setup_schedule):
+    def test_schedule_loaded(self, mock_setup_schedule, mock_update_schedule):
         sched_instance = scheduler.Scheduler()
+        sched_instance._schedule = {}
         mock_setup_schedule.reset_mock()
 
         ret = sched_instance.schedule
 
-        # make sure it called the setup_schedule() method
-        mock_setup_schedule.assert_called_once_with()
+        # make sure it applied the changes rather than loading everything again
+        mock_update_schedule.assert_called_once_with()
+        self.assertEqual(mock_setup_schedule.call_count, 0)
 
     @mock.patch('threading.Thread', new=mock.MagicMock())
     @mock.patch.object(scheduler.Scheduler, 'setup_schedule')
@@ -22,6 +22,7 @@ from datetime import datetime
 from ... import base
 
 from pulp.common import dateutils
+from pulp.server.async import task_status_manager
 from pulp.server.async.task_status_manager import TaskStatusManager
 from pulp.server.db.model.criteria import Criteria
 from pulp.server.db.model.dispatch import TaskStatus
@@ -187,6 +188,162 @@ class TaskStatusManagerTests(base.PulpServerTests):
         except exceptions.MissingResource, e:
             self.assertTrue(task_id == e.resources['resource_id'])
 
+    def test_update_progress_report(self):
+        """
+        Tests that update_progress_report() sets only the given reports.
+        """
+        task_id = self.get_random_uuid()
+        TaskStatusManager.create_task_status(task_id, 'special_queue', state='running')
+        TaskStatusManager.update_task_status(
+            task_id, {'progress_report': {'importer': 'syncing', 'distributor': 'waiting'}})
+
+        TaskStatusManager.update_progress_report(task_id, {'importer': {'state': 'done'}})
+
+        task_status = TaskStatusManager.find_by_task_id(task_id)
+        self.assertEqual(task_status['progress_report'],
+                         {'importer': {'state': 'done'}, 'distributor': 'waiting'})
+        self.assertEqual(task_status['state'], 'running')
+
+    def test_update_progress_report_missing_task_status(self):
+        """
+        Tests updating the progress of a task status that doesn't exist raises the appropriate
+        exception.
+        """
+        task_id = self.get_random_uuid()
+        try:
+            TaskStatusManager.update_progress_report(task_id, {'importer': 'syncing'})
+            self.fail('Exception expected')
+        except exceptions.MissingResource, e:
+            self.assertTrue(task_id == e.resources['resource_id'])
+
+    def test_find_page(self):
+        """
+        Tests that find_page() returns the matching task statuses in the order they were created,
+        one page at a time.
+        """
+        task_ids = [self.get_random_uuid() for i in range(5)]
+        for task_id in task_ids:
+            TaskStatusManager.create_task_status(task_id, 'special_queue', state='waiting')
+        TaskStatusManager.create_task_status(self.get_random_uuid(), 'special_queue',
+                                             state='finished')
+        criteria = Criteria(filters={'state': 'waiting'}, limit=2)
+
+        page, continuation = TaskStatusManager.find_page(criteria)
+        self.assertEqual([t['task_id'] for t in page], task_ids[:2])
+        page, continuation = TaskStatusManager.find_page(criteria, continuation)
+        self.assertEqual([t['task_id'] for t in page], task_ids[2:4])
+        page, continuation = TaskStatusManager.find_page(criteria, continuation)
+        self.assertEqual([t['task_id'] for t in page], task_ids[4:])
+        self.assertEqual(continuation, None)
+
+    def test_find_page_invalid(self):
+        """
+        Tests that find_page() rejects criteria it can't page and unknown continuations.
+        """
+        self.assertRaises(exceptions.InvalidValue, TaskStatusManager.find_page,
+                          Criteria(sort=[('task_id', 1)]))
+        self.assertRaises(exceptions.InvalidValue, TaskStatusManager.find_page,
+                          Criteria(skip=1))
+        self.assertRaises(exceptions.InvalidValue, TaskStatusManager.find_page,
+                          Criteria(), 'not-a-continuation')
+
+    def test_status_hash(self):
+        """
+        Tests that status_hash() changes when the progress report changes.
+        """
+        task_id = self.get_random_uuid()
+        TaskStatusManager.create_task_status(task_id, 'special_queue', state='running')
+        before = TaskStatusManager.status_hash(TaskStatusManager.find_by_task_id(task_id))
+        self.assertEqual(
+            before, TaskStatusManager.status_hash(TaskStatusManager.find_by_task_id(task_id)))
+
+        TaskStatusManager.update_progress_report(task_id, {'importer': {'state': 'done'}})
+
+        self.assertNotEqual(
+            before, TaskStatusManager.status_hash(TaskStatusManager.find_by_task_id(task_id)))
+
+    @mock.patch('time.sleep')
+    def test_wait_for_change(self, mock_sleep):
+        """
+        Tests that wait_for_change() returns immediately when the status differs from the hash.
+        """
+        task_id = self.get_random_uuid()
+        TaskStatusManager.create_task_status(task_id, 'special_queue', state='running')
+
+        task_status = TaskStatusManager.wait_for_change(task_id, 'stale-hash', 30)
+
+        self.assertEqual(task_status['task_id'], task_id)
+        self.assertEqual(mock_sleep.call_count, 0)
+
+    @mock.patch('time.sleep')
+    def test_wait_for_change_unchanged(self, mock_sleep):
+        """
+        Tests that wait_for_change() polls until the timeout when the status doesn't change.
+        """
+        task_id = self.get_random_uuid()
+        TaskStatusManager.create_task_status(task_id, 'special_queue', state='running')
+        since = TaskStatusManager.status_hash(TaskStatusManager.find_by_task_id(task_id))
+
+        task_status = TaskStatusManager.wait_for_change(task_id, since, 0)
+
+        self.assertEqual(task_status['task_id'], task_id)
+        self.assertEqual(mock_sleep.call_count, 0)
+
+    @mock.patch('time.sleep')
+    def test_wait_for_change_invalid_timeout(self, mock_sleep):
+        """
+        Tests that wait_for_change() doesn't wait for a negative or NaN timeout.
+        """
+        task_id = self.get_random_uuid()
+        TaskStatusManager.create_task_status(task_id, 'special_queue', state='running')
+        since = TaskStatusManager.status_hash(TaskStatusManager.find_by_task_id(task_id))
+
+        for timeout in (-1, float('nan')):
+            task_status = TaskStatusManager.wait_for_change(task_id, since, timeout)
+            self.assertEqual(task_status['task_id'], task_id)
+
+        self.assertEqual(mock_sleep.call_count, 0)
+
+    @mock.patch('time.sleep')
+    def test_wait_for_change_releases_wait(self, mock_sleep):
+        """
+        Tests that wait_for_change() waits for a change and releases its wait afterwards.
+        """
+        task_id = self.get_random_uuid()
+        TaskStatusManager.create_task_status(task_id, 'special_queue', state='running')
+        since = TaskStatusManager.status_hash(TaskStatusManager.find_by_task_id(task_id))
+        mock_sleep.side_effect = lambda seconds: TaskStatusManager.update_progress_report(
+            task_id, {'importer': {'state': 'done'}})
+
+        task_status = TaskStatusManager.wait_for_change(task_id, since, 30)
+
+        self.assertEqual(task_status['progress_report'], {'importer': {'state': 'done'}})
+        self.assertEqual(mock_sleep.call_count, 1)
+        self.assertEqual(task_status_manager._waits, 0)
+
+    @mock.patch('pulp.server.async.task_status_manager._waits', 2)
+    @mock.patch('time.sleep')
+    def test_wait_for_change_too_many_waits(self, mock_sleep):
+        """
+        Tests that wait_for_change() doesn't wait when long_poll_max_waits requests are waiting.
+        """
+        task_id = self.get_random_uuid()
+        TaskStatusManager.create_task_status(task_id, 'special_queue', state='running')
+        since = TaskStatusManager.status_hash(TaskStatusManager.find_by_task_id(task_id))
+
+        task_status = TaskStatusManager.wait_for_change(task_id, since, 30)
+
+        self.assertEqual(task_status['task_id'], task_id)
+        self.assertEqual(mock_sleep.call_count, 0)
+        self.assertEqual(task_status_manager._waits, 2)
+
+    def test_wait_for_change_missing_task_status(self):
+        """
+        Tests that wait_for_change() raises MissingResource for a task that doesn't exist.
+        """
+        self.assertRaises(exceptions.MissingResource, TaskStatusManager.wait_for_change,
+                          self.get_random_uuid(), None, 30)
+
     @mock.patch('pulp.server.db.connection.PulpCollection.query')
     def test_find_by_criteria(self, mock_query):
         criteria = Criteria()
@@ -26,10 +26,10 @@ import mock
 from ...base import PulpServerTests, ResourceReservationTests
 from pulp.common import dateutils
 from pulp.server.exceptions import PulpException, PulpCodedException
-from pulp.server.async import tasks
+from pulp.server.async import progress, tasks
 from pulp.server.async.task_status_manager import TaskStatusManager
 from pulp.server.db.model.dispatch import TaskStatus
-from pulp.server.db.model.resources import AvailableQueue, ReservedResource
+from pulp.server.db.model.resources import AvailableQueue
 from pulp.server.async.constants import (CALL_CANCELED_STATE, CALL_FINISHED_STATE,
                                             CALL_RUNNING_STATE, CALL_WAITING_STATE)
 
@@ -316,243 +316,17 @@ class TestQueueReleaseResource(ResourceReservationTests):
     """
     Test the _queue_release_resource() function.
     """
-    @mock.patch('pulp.server.async.tasks._release_resource')
-    def test__queue_release_resource(self, _release_resource):
+    @mock.patch('pulp.server.managers.resources.release_resources')
+    def test__queue_release_resource(self, release_resources):
         """
-        Make sure that _queue_release_resource queues _release_resource with the correct resource_id
-        in the resource manager's queue.
+        Make sure that _queue_release_resource releases the resource_id in the queue it is run in,
+        rather than in the resource manager's queue.
         """
         resource_id = 'some_resource'
 
         tasks._queue_release_resource.apply_async((resource_id,), queue='some_queue')
 
-        _release_resource.apply_async.assert_called_once_with(args=(resource_id,),
-                                                              queue=tasks.RESOURCE_MANAGER_QUEUE)
-
-
-class TestReleaseResource(ResourceReservationTests):
-    """
-    Test the _release_resource() Task.
-    """
-    def test__release_resource_not_in__resource_map(self):
-        """
-        Test _release_resource() with a resource that is not in the database. This should be
-        gracefully handled, and result in no changes to the database.
-        """
-        # Set up two available queues
-        available_queue_1 = AvailableQueue(RESERVED_WORKER_1, 7)
-        available_queue_1.save()
-        available_queue_2 = AvailableQueue(RESERVED_WORKER_2, 3)
-        available_queue_2.save()
-        # Set up two resource reservations, using our available_queues from above
-        reserved_resource_1 = ReservedResource('resource_1', available_queue_1.name,
-                                               available_queue_1.num_reservations)
-        reserved_resource_1.save()
-        reserved_resource_2 = ReservedResource('resource_2', available_queue_2.name,
-                                               available_queue_2.num_reservations)
-        reserved_resource_2.save()
-
-        # This should not raise any Exception, but should also not alter either the AvailableQueue
-        # collection or the ReservedResource collection
-        tasks._release_resource('made_up_resource_id')
-
-        # Make sure that the available queues collection has not been altered
-        aqc = AvailableQueue.get_collection()
-        self.assertEqual(aqc.count(), 2)
-        aq_1 = aqc.find_one({'_id': available_queue_1.name})
-        self.assertEqual(aq_1['num_reservations'], 7)
-        aq_2 = aqc.find_one({'_id': available_queue_2.name})
-        self.assertEqual(aq_2['num_reservations'], 3)
-        # Make sure that the reserved resources collection has not been altered
-        rrc = ReservedResource.get_collection()
-        self.assertEqual(rrc.count(), 2)
-        rr_1 = rrc.find_one({'_id': reserved_resource_1.name})
-        self.assertEqual(rr_1['assigned_queue'], reserved_resource_1.assigned_queue)
-        self.assertEqual(rr_1['num_reservations'], 7)
-        rr_2 = rrc.find_one({'_id': reserved_resource_2.name})
-        self.assertEqual(rr_2['assigned_queue'], reserved_resource_2.assigned_queue)
-        self.assertEqual(rr_2['num_reservations'], 3)
-
-    def test__release_resource_queue_task_count_zero(self):
-        """
-        Test _release_resource() with a resource that has a queue with a task count of zero. This
-        should not decrement the queue task count into the negative range.
-        """
-        # Set up two available queues, the second with a task count of 0
-        available_queue_1 = AvailableQueue(RESERVED_WORKER_1, 7)
-        available_queue_1.save()
-        available_queue_2 = AvailableQueue(RESERVED_WORKER_2, 0)
-        available_queue_2.save()
-        # Set up two reserved resources, and let's make it so the second one is out of sync with its
-        # queue's task count by setting its num_reservations to 1
-        reserved_resource_1 = ReservedResource('resource_1', available_queue_1.name,
-                                               available_queue_1.num_reservations)
-        reserved_resource_1.save()
-        reserved_resource_2 = ReservedResource('resource_2', available_queue_2.name, 1)
-        reserved_resource_2.save()
-
-        # This should remove resource_2 from the _resource_map, but should leave the queue's task
-        # count at 0.
-        tasks._release_resource('resource_2')
-
-        # The _available_queue_task_counts should remain as they were before, since we don't want
-        # queue lengths below zero
-        aqc = AvailableQueue.get_collection()
-        self.assertEqual(aqc.count(), 2)
-        aq_1 = aqc.find_one({'_id': available_queue_1.name})
-        self.assertEqual(aq_1['num_reservations'], 7)
-        aq_2 = aqc.find_one({'_id': available_queue_2.name})
-        self.assertEqual(aq_2['num_reservations'], 0)
-        # resource_2 should have been removed from the database
-        rrc = ReservedResource.get_collection()
-        self.assertEqual(rrc.count(), 1)
-        rr_1 = rrc.find_one({'_id': reserved_resource_1.name})
-        self.assertEqual(rr_1['assigned_queue'], reserved_resource_1.assigned_queue)
-        self.assertEqual(rr_1['num_reservations'], 7)
-
-    def test__release_resource_task_count_one(self):
-        """
-        Test _release_resource() with a resource that has a task count of one. This should remove
-        the resource from the database.
-        """
-        # Set up two available queues
-        available_queue_1 = AvailableQueue(RESERVED_WORKER_1, 7)
-        available_queue_1.save()
-        available_queue_2 = AvailableQueue(RESERVED_WORKER_2, 1)
-        available_queue_2.save()
-        # Set up two reserved resources
-        reserved_resource_1 = ReservedResource('resource_1', available_queue_1.name,
-                                               available_queue_1.num_reservations)
-        reserved_resource_1.save()
-        reserved_resource_2 = ReservedResource('resource_2', available_queue_2.name,
-                                               available_queue_2.num_reservations)
-        reserved_resource_2.save()
-
-        # This should remove resource_2 from the _resource_map, and should reduce the queue's task
-        # count to 0.
-        tasks._release_resource('resource_2')
-
-        # available_queue_2 should have had its num_reservations reduced to 0, and the other one
-        # should have remained the same
-        aqc = AvailableQueue.get_collection()
-        self.assertEqual(aqc.count(), 2)
-        aq_1 = aqc.find_one({'_id': available_queue_1.name})
-        self.assertEqual(aq_1['num_reservations'], 7)
-        aq_2 = aqc.find_one({'_id': available_queue_2.name})
-        self.assertEqual(aq_2['num_reservations'], 0)
-        # resource_2 should have been removed from the database
-        rrc = ReservedResource.get_collection()
-        self.assertEqual(rrc.count(), 1)
-        rr_1 = rrc.find_one({'_id': reserved_resource_1.name})
-        self.assertEqual(rr_1['assigned_queue'], reserved_resource_1.assigned_queue)
-        self.assertEqual(rr_1['num_reservations'], 7)
-
-    def test__release_resource_task_count_two(self):
-        """
-        Test _release_resource() with a resource that has a task count of two. This should simply
-        decrement the task_count for the resource, but should not remove it from the database.
-        """
-        # Set up two available queues
-        available_queue_1 = AvailableQueue(RESERVED_WORKER_1, 7)
-        available_queue_1.save()
-        available_queue_2 = AvailableQueue(RESERVED_WORKER_2, 2)
-        available_queue_2.save()
-        # Set up two resource reservations, using our available_queues from above
-        reserved_resource_1 = ReservedResource('resource_1', available_queue_1.name,
-                                               available_queue_1.num_reservations)
-        reserved_resource_1.save()
-        reserved_resource_2 = ReservedResource('resource_2', available_queue_2.name,
-                                               available_queue_2.num_reservations)
-        reserved_resource_2.save()
-
-        # This should reduce the reserved_resource_2 num_reservations to 1, and should also reduce
-        # available_queue_2's num_reservations to 1.
-        tasks._release_resource('resource_2')
-
-        # Make sure that the AvailableQueues are correct
-        aqc = AvailableQueue.get_collection()
-        self.assertEqual(aqc.count(), 2)
-        aq_1 = aqc.find_one({'_id': available_queue_1.name})
-        self.assertEqual(aq_1['num_reservations'], 7)
-        aq_2 = aqc.find_one({'_id': available_queue_2.name})
-        self.assertEqual(aq_2['num_reservations'], 1)
-        # Make sure the ReservedResources are also correct
-        rrc = ReservedResource.get_collection()
-        self.assertEqual(rrc.count(), 2)
-        rr_1 = rrc.find_one({'_id': reserved_resource_1.name})
-        self.assertEqual(rr_1['assigned_queue'], reserved_resource_1.assigned_queue)
-        self.assertEqual(rr_1['num_reservations'], 7)
-        rr_2 = rrc.find_one({'_id': reserved_resource_2.name})
-        self.assertEqual(rr_2['assigned_queue'], reserved_resource_2.assigned_queue)
-        self.assertEqual(rr_2['num_reservations'], 1)
-
-
-class TestReserveResource(ResourceReservationTests):
-    """
-    Test the _reserve_resource() Task.
-    """
-    def test__reserve_resource_with_existing_reservation(self):
-        """
-        Test _reserve_resource() with a resource that has an existing reservation in the database.
-        It should return the queue listed in the database, and increment the reservation counter.
-        """
-        # Set up an available queue with a reservation count of 1
-        available_queue_1 = AvailableQueue(RESERVED_WORKER_1, 1)
-        available_queue_1.save()
-        # Set up a resource reservation, using our available_queue from above
-        reserved_resource_1 = ReservedResource('resource_1', available_queue_1.name,
-                                               available_queue_1.num_reservations)
-        reserved_resource_1.save()
-
-        # This should increase the reserved_resource_1 num_reservations to 2, and should also
-        # increase available_queue_1's num_reservations to 2. available_queue_1's name should be
-        # returned
-        queue = tasks._reserve_resource('resource_1')
-
-        self.assertEqual(queue, RESERVED_WORKER_1)
-        # Make sure that the AvailableQueue is correct
-        aqc = AvailableQueue.get_collection()
-        self.assertEqual(aqc.count(), 1)
-        aq_1 = aqc.find_one({'_id': available_queue_1.name})
-        self.assertEqual(aq_1['num_reservations'], 2)
-        # Make sure the ReservedResource is also correct
-        rrc = ReservedResource.get_collection()
-        self.assertEqual(rrc.count(), 1)
-        rr_1 = rrc.find_one({'_id': reserved_resource_1.name})
-        self.assertEqual(rr_1['assigned_queue'], RESERVED_WORKER_1)
-        self.assertEqual(rr_1['num_reservations'], 2)
-
-    def test__reserve_resource_without_existing_reservation(self):
-        """
-        Test _reserve_resource() with a resource that does not have an existing reservation in the
-        database. It should find the least busy queue, add a reservation to the database with that
-        queue, and then return the queue.
-        """
-        # Set up an available queue
-        available_queue_1 = AvailableQueue(RESERVED_WORKER_1, 0)
-        available_queue_1.save()
-
-        queue = tasks._reserve_resource('resource_1')
-
-        self.assertEqual(queue, RESERVED_WORKER_1)
-        # Make sure that the AvailableQueue is correct
-        aqc = AvailableQueue.get_collection()
-        self.assertEqual(aqc.count(), 1)
-        aq_1 = aqc.find_one({'_id': available_queue_1.name})
-        self.assertEqual(aq_1['num_reservations'], 1)
-        # Make sure the ReservedResource is also correct
-        rrc = ReservedResource.get_collection()
-        self.assertEqual(rrc.count(), 1)
-        rr_1 = rrc.find_one({'_id': 'resource_1'})
-        self.assertEqual(rr_1['assigned_queue'], RESERVED_WORKER_1)
-        self.assertEqual(rr_1['num_reservations'], 1)
-
-
-def _reserve_resource_apply_async():
-    class AsyncResult(object):
-        def get(self):
-            return RESERVED_WORKER_1
-    return AsyncResult()
+        release_resources.assert_called_once_with([resource_id])
 
 
 class TestTaskResult(unittest.TestCase):
@@ -574,8 +348,7 @@ class TestTask(ResourceReservationTests):
     Test the pulp.server.tasks.Task class.
     """
     @mock.patch('pulp.server.async.tasks._queue_release_resource')
-    @mock.patch('pulp.server.async.tasks._reserve_resource.apply_async',
-                return_value=_reserve_resource_apply_async())
+    @mock.patch('pulp.server.managers.resources.reserve_resource', return_value=RESERVED_WORKER_1)
     @mock.patch('pulp.server.async.tasks.Task.apply_async', autospec=True)
     def test_apply_async_with_reservation_calls_apply_async(
             self, apply_async, _reserve_resource, _queue_release_resource):
@@ -599,8 +372,7 @@ class TestTask(ResourceReservationTests):
 
         self.assertEqual(async_result, mock_async_result)
         expected_resource_id = ":".join([resource_type, resource_id])
-        _reserve_resource.assert_called_once_with((expected_resource_id,),
-                                                  queue=tasks.RESOURCE_MANAGER_QUEUE)
+        _reserve_resource.assert_called_once_with(expected_resource_id)
         apply_async.assert_called_once_with(task, *some_args, **some_kwargs)
         _queue_release_resource.apply_async.assert_called_once_with((expected_resource_id,),
                                                                     queue=RESERVED_WORKER_1)
@@ -748,6 +520,29 @@ class TestTask(ResourceReservationTests):
         dateutils.parse_iso8601_datetime(new_task_status['finish_time'])
         self.assertEqual(new_task_status['traceback'], einfo.traceback)
 
+    @mock.patch('pulp.server.async.tasks.Task.request')
+    def test_on_success_handler_flushes_progress(self, mock_request):
+        """
+        Make sure that progress reported by the task but not yet written is written when it
+        finishes.
+        """
+        task_id = str(uuid.uuid4())
+        mock_request.called_directly = False
+        TaskStatusManager.create_task_status(task_id, 'some_queue')
+        writer = progress.get_writer(task_id)
+        writer.interval = 60
+        writer.set('importer', {'state': 'running', 'count': 1})
+        writer.set('importer', {'state': 'running', 'count': 2})
+
+        task = tasks.Task()
+        task.on_success('random_return_value', task_id, [], {})
+
+        new_task_status = TaskStatusManager.find_by_task_id(task_id)
+        self.assertEqual(new_task_status['state'], 'finished')
+        self.assertEqual(new_task_status['progress_report'],
+                         {'importer': {'state': 'running', 'count': 2}})
+        self.assertFalse(task_id in progress._WRITERS)
+
     @mock.patch('celery.Task.apply_async')
     def test_apply_async_task_status(self, apply_async):
         """
@@ -443,7 +443,7 @@ class TestScheduleEntryInit(unittest.TestCase):
         self.assertTrue(entry._scheduled_call is call)
 
 
-@mock.patch.object(ScheduledCall, 'save')
+@mock.patch.object(ScheduledCall, 'get_collection')
 class TestScheduleEntryNextInstance(unittest.TestCase):
     def setUp(self):
         super(TestScheduleEntryNextInstance, self).setUp()
@@ -451,25 +451,25 @@ class TestScheduleEntryNextInstance(unittest.TestCase):
                                   remaining_runs=5)
         self.entry = self.call.as_schedule_entry()
 
-    def test_increments_last_run(self, mock_save):
+    def test_increments_last_run(self, mock_get_collection):
         next_entry = next(self.entry)
         now = datetime.utcnow().replace(tzinfo=dateutils.utc_tz())
 
         self.assertTrue(now - next_entry.last_run_at < timedelta(seconds=1))
 
-    def test_increments_run_count(self, mock_save):
+    def test_increments_run_count(self, mock_get_collection):
         next_entry = next(self.entry)
 
         self.assertEqual(self.entry.total_run_count + 1, next_entry.total_run_count)
 
-    def test_decrements_remaining_runs(self, mock_save):
+    def test_decrements_remaining_runs(self, mock_get_collection):
         remaining = self.call.remaining_runs
 
         next_entry = next(self.entry)
 
         self.assertEqual(remaining - 1, self.call.remaining_runs)
 
-    def test_disables_for_remaining_runs(self, mock_save):
+    def test_disables_for_remaining_runs(self, mock_get_collection):
         self.call.remaining_runs = 1
         # just verify that we have the correct starting state
         self.assertTrue(self.call.enabled)
@@ -479,12 +479,24 @@ class TestScheduleEntryNextInstance(unittest.TestCase):
         # call should have been disabled because the remaining_runs hit 0
         self.assertFalse(self.call.enabled)
 
-    def test_calls_save(self, mock_save):
+    def test_updates_counts(self, mock_get_collection):
         next_entry = next(self.entry)
 
-        mock_save.assert_called_once_with()
+        mock_get_collection.return_value.update.assert_called_once_with(
+            {'_id': bson.ObjectId(self.call.id)},
+            {'$set': {'last_run_at': self.call.last_run_at},
+             '$inc': {'total_run_count': 1, 'remaining_runs': -1}})
 
-    def test_returns_entry(self, mock_save):
+    def test_updates_disabled(self, mock_get_collection):
+        self.call.remaining_runs = 1
+
+        next_entry = next(self.entry)
+
+        delta = mock_get_collection.return_value.update.call_args[0][1]
+        self.assertEqual(delta['$set']['enabled'], False)
+        self.assertEqual(delta['$set']['last_updated'], self.call.last_updated)
+
+    def test_returns_entry(self, mock_get_collection):
         next_entry = next(self.entry)
 
         self.assertTrue(isinstance(next_entry, ScheduleEntry))
@@ -23,6 +23,7 @@ from ... import base
 from pulp.server.compat import ObjectId
 from pulp.server.db import reaper
 from pulp.server.db.model.consumer import ConsumerHistoryEvent
+from pulp.server.db.model.dispatch import TaskStatus
 
 
 class TestCreateExpiredObjectId(unittest.TestCase):
@@ -59,6 +60,7 @@ class TestReapExpiredDocuments(base.PulpServerTests):
         """
         super(TestReapExpiredDocuments, self).tearDown()
         ConsumerHistoryEvent.get_collection().remove()
+        TaskStatus.get_collection().remove()
 
     @mock.patch('pulp.server.db.reaper.pulp_config.config.getfloat')
     def test_leave_unexpired_entries(self, getfloat):
@@ -89,3 +91,20 @@ class TestReapExpiredDocuments(base.PulpServerTests):
 
         # The event should no longer exist
         self.assertTrue(chec.find({'_id': event['_id']}).count() == 0)
+
+    @mock.patch('pulp.server.db.reaper.pulp_config.config.getfloat')
+    def test_remove_expired_complete_task_statuses(self, getfloat):
+        tsc = TaskStatus.get_collection()
+        for task_id, state in (('finished', 'finished'), ('error', 'error'),
+                               ('canceled', 'canceled'), ('running', 'running'),
+                               ('waiting', 'waiting')):
+            tsc.insert(TaskStatus(task_id, 'some_queue', state=state), safe=True)
+        # Pretend that the user wants to reap things from the future, so that all the task
+        # statuses look old enough to delete
+        getfloat.return_value = -1.0
+
+        reaper.reap_expired_documents()
+
+        # Only the statuses of the tasks that are not complete should remain
+        self.assertEqual(sorted(t['task_id'] for t in tsc.find()), ['running', 'waiting'])
+
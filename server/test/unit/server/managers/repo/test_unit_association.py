@@ -146,6 +146,49 @@ class RepoUnitAssociationManagerTests(PulpServerTests):
         for unit in repo_units:
             self.assertTrue(unit['unit_id'] in ids)
 
+    def test_bulk_associate_units_by_ids(self):
+        """
+        Tests that only missing associations are created and that the returned
+        count reflects units new to the repository.
+        """
+
+        # Setup
+        self.manager.associate_unit_by_id(self.repo_id, 'type-1', 'foo', OWNER_TYPE_USER, 'admin')
+        self.manager.associate_unit_by_id(self.repo_id, 'type-1', 'bar', OWNER_TYPE_USER, 'other')
+
+        # Test
+        unique_count = self.manager.bulk_associate_units_by_ids(
+            self.repo_id, 'type-1', ['foo', 'bar', 'baz', 'baz'], OWNER_TYPE_USER, 'admin')
+
+        # Verify
+        self.assertEqual(1, unique_count)
+        repo_units = list(RepoContentUnit.get_collection().find(
+            {'repo_id' : self.repo_id, 'owner_id' : 'admin'}))
+        self.assertEqual(set(['foo', 'bar', 'baz']), set(u['unit_id'] for u in repo_units))
+
+    @mock.patch('pulp.server.managers.repo.unit_association.ASSOCIATION_CHUNK_SIZE', 2)
+    @mock.patch('pulp.server.managers.repo.cud.RepoManager.update_unit_count')
+    def test_associate_all_chunked(self, mock_call):
+        """
+        Makes sure associations spanning several chunks are all created and
+        the unique count is applied in a single update.
+        """
+        self.manager.associate_unit_by_id(
+            self.repo_id, 'type-1', 'unit-0', OWNER_TYPE_IMPORTER, 'test-importer')
+        mock_call.reset_mock()
+
+        ids = ['unit-%d' % i for i in range(0, 5)]
+        self.manager.associate_all_by_ids(self.repo_id, 'type-1', ids, OWNER_TYPE_USER, 'admin')
+
+        mock_call.assert_called_once_with(self.repo_id, 'type-1', 4)
+        repo_units = list(RepoContentUnit.get_collection().find(
+            {'repo_id' : self.repo_id, 'owner_type' : OWNER_TYPE_USER}))
+        self.assertEqual(set(ids), set(u['unit_id'] for u in repo_units))
+
+    def test_bulk_associate_invalid_owner_type(self):
+        self.assertRaises(exceptions.InvalidValue, self.manager.bulk_associate_units_by_ids,
+                          self.repo_id, 'type-1', ['unit-1'], 'bad-owner', 'irrelevant')
+
     def test_unassociate_by_id(self):
         """
         Tests removing an association that exists by its unit ID.
@@ -150,6 +150,35 @@ class TestGetUpdatedSince(unittest.TestCase):
         mock_get_collection.assert_called_once_with()
 
 
+class TestGetChangedSince(unittest.TestCase):
+    @mock.patch('pulp.server.db.connection.PulpCollection.query')
+    def test_query(self, mock_query):
+        mock_query.return_value = SCHEDULES
+
+        now = time.time()
+        ret = list(utils.get_changed_since(now))
+
+        self.assertEqual(mock_query.call_count, 1)
+        criteria = mock_query.call_args[0][0]
+        self.assertTrue(isinstance(criteria, Criteria))
+        # disabled schedules must be included so they can be removed
+        self.assertEqual(criteria.filters, {'last_updated': {'$gt': now}})
+        self.assertEqual(len(ret), 3)
+
+
+class TestGetEnabledIds(unittest.TestCase):
+    @mock.patch('pulp.server.db.connection.PulpCollection.query')
+    def test_query(self, mock_query):
+        mock_query.return_value = [{'_id': ObjectId('529f4bd93de3a31d0ec77338')}]
+
+        ret = utils.get_enabled_ids()
+
+        criteria = mock_query.call_args[0][0]
+        self.assertEqual(criteria.filters, {'enabled': True})
+        self.assertEqual(criteria.fields, ['_id'])
+        self.assertEqual(ret, set(['529f4bd93de3a31d0ec77338']))
+
+
 class TestGetEnabled(unittest.TestCase):
     @mock.patch('pulp.server.db.connection.PulpCollection.query')
     def test_query(self, mock_query):
@@ -67,38 +67,6 @@ class TestFilterAvailableQueues(ResourceReservationTests):
         self.assertEqual(aqs[1].num_reservations, 3)
 
 
-class TestGetLeastBusyAvailableQueue(ResourceReservationTests):
-    """
-    Test the get_least_busy_available_queue_function().
-    """
-    def test_no_queues_available(self):
-        """
-        Test for the case when there are no reserved queues available at all.
-        It should raise a NoAvailableQueues Exception.
-        """
-        # When no queues are available, a NoAvailableQueues Exception should be raised
-        self.assertRaises(resources.NoAvailableQueues, resources.get_least_busy_available_queue)
-
-    def test_picks_least_busy_queue(self):
-        """
-        Test that the function picks the least busy queue.
-        """
-        # Set up three available queues, with the least busy one in the middle so that we can
-        # demonstrate that it did pick the least busy and not the last or first.
-        available_queue_1 = AvailableQueue('busy_queue', 7)
-        available_queue_1.save()
-        available_queue_2 = AvailableQueue('less_busy_queue', 3)
-        available_queue_2.save()
-        available_queue_3 = AvailableQueue('most_busy_queue', 10)
-        available_queue_3.save()
-
-        queue = resources.get_least_busy_available_queue()
-
-        self.assertEqual(type(queue), AvailableQueue)
-        self.assertEqual(queue.num_reservations, 3)
-        self.assertEqual(queue.name, 'less_busy_queue')
-
-
 class TestGetOrCreateAvailableQueue(ResourceReservationTests):
     """
     Test the get_or_create_available_queue() function.
@@ -153,53 +121,88 @@ class TestGetOrCreateAvailableQueue(ResourceReservationTests):
         self.assertEqual(aq_bson['missing_since'], missing_since)
 
 
-class TestGetOrCreateReservedResource(ResourceReservationTests):
+class TestReserveResources(ResourceReservationTests):
     """
-    Test the get_or_create_reserved_resource() function.
+    Test the reserve_resources() function.
     """
-    def test_create(self):
+    def test_existing_and_new(self):
         """
-        Test for the case when the requested resource does not exist.
+        Test that reserved resources keep their queue, and that new ones are spread over the least
+        busy queues.
         """
-        # Let's add an ReservedResource just to make sure that it doesn't return any existing
-        # resource.
-        rr_1 = ReservedResource('resource_1')
-        rr_1.save()
+        AvailableQueue('queue_1', 1).save()
+        AvailableQueue('queue_2', 0).save()
+        ReservedResource('resource_1', 'queue_1', 1).save()
 
-        rr_2 = resources.get_or_create_reserved_resource('resource_2')
+        assigned = resources.reserve_resources(['resource_1', 'resource_2', 'resource_3'])
 
-        # Assert that the returned instance is correct
-        self.assertEqual(type(rr_2), ReservedResource)
-        self.assertEqual(rr_2.name, 'resource_2')
-        # By default, the assigned_queue should be set to None
-        self.assertEqual(rr_2.assigned_queue, None)
-        # A new resource should default to 1 reservations
-        self.assertEqual(rr_2.num_reservations, 1)
-        # Now we need to assert that it made it to the database as well
-        rrc = rr_2.get_collection()
+        self.assertEqual(assigned['resource_1'], 'queue_1')
+        # queue_1 has two reservations once resource_1 is reserved again, so both new resources
+        # go to queue_2
+        self.assertEqual(assigned['resource_2'], 'queue_2')
+        self.assertEqual(assigned['resource_3'], 'queue_2')
+        rrc = ReservedResource.get_collection()
+        self.assertEqual(rrc.find_one({'_id': 'resource_1'})['num_reservations'], 2)
         self.assertEqual(rrc.find_one({'_id': 'resource_2'})['num_reservations'], 1)
-        self.assertEqual(rrc.find_one({'_id': 'resource_2'})['assigned_queue'], None)
+        aqc = AvailableQueue.get_collection()
+        self.assertEqual(aqc.find_one({'_id': 'queue_1'})['num_reservations'], 2)
+        self.assertEqual(aqc.find_one({'_id': 'queue_2'})['num_reservations'], 2)
 
-    def test_get(self):
+    def test_unassigned(self):
         """
-        Test for the case when the requested resource does exist.
+        Test that a resource left without a queue by an earlier version of Pulp is assigned one.
         """
-        # Let's add two ReservedResources just to make sure that it doesn't return the wrong
-        # resource.
-        rr_1 = ReservedResource('resource_1')
-        rr_1.save()
-        rr_2 = ReservedResource('resource_2', 'some_queue', 7)
-        rr_2.save()
+        AvailableQueue('queue_1').save()
+        ReservedResource('resource_1', None, 1).save()
 
-        rr_2 = resources.get_or_create_reserved_resource('resource_2')
+        self.assertEqual(resources.reserve_resource('resource_1'), 'queue_1')
+        rr = ReservedResource.get_collection().find_one({'_id': 'resource_1'})
+        self.assertEqual(rr['assigned_queue'], 'queue_1')
 
-        # Assert that the returned instance is correct
-        self.assertEqual(type(rr_2), ReservedResource)
-        self.assertEqual(rr_2.name, 'resource_2')
-        self.assertEqual(rr_2.assigned_queue, 'some_queue')
-        # The resource should have 7 reservations
-        self.assertEqual(rr_2.num_reservations, 7)
-        # Now we need to assert that the DB is still correct
-        rrc = rr_2.get_collection()
-        self.assertEqual(rrc.find_one({'_id': 'resource_2'})['num_reservations'], 7)
-        self.assertEqual(rrc.find_one({'_id': 'resource_2'})['assigned_queue'], 'some_queue')
+    def test_no_queues_available(self):
+        """
+        Test that reservations already made are released when no queue is available for a new
+        resource.
+        """
+        ReservedResource('resource_1', 'queue_1', 1).save()
+
+        self.assertRaises(resources.NoAvailableQueues, resources.reserve_resources,
+                          ['resource_1', 'resource_2'])
+
+        rrc = ReservedResource.get_collection()
+        self.assertEqual(rrc.find_one({'_id': 'resource_1'})['num_reservations'], 1)
+        self.assertEqual(rrc.find_one({'_id': 'resource_2'}), None)
+
+
+class TestReleaseResources(ResourceReservationTests):
+    """
+    Test the release_resources() function.
+    """
+    def test_release(self):
+        """
+        Test that each resource is released once, and removed when it has no reservations left.
+        """
+        AvailableQueue('queue_1', 3).save()
+        ReservedResource('resource_1', 'queue_1', 2).save()
+        ReservedResource('resource_2', 'queue_1', 1).save()
+
+        resources.release_resources(['resource_1', 'resource_2', 'made_up_resource'])
+
+        rrc = ReservedResource.get_collection()
+        self.assertEqual(rrc.find_one({'_id': 'resource_1'})['num_reservations'], 1)
+        self.assertEqual(rrc.find_one({'_id': 'resource_2'}), None)
+        aqc = AvailableQueue.get_collection()
+        self.assertEqual(aqc.find_one({'_id': 'queue_1'})['num_reservations'], 1)
+
+    def test_queue_count_not_negative(self):
+        """
+        Test that the queue's num_reservations stops at 0 when it is out of step.
+        """
+        AvailableQueue('queue_1', 1).save()
+        ReservedResource('resource_1', 'queue_1', 1).save()
+        ReservedResource('resource_2', 'queue_1', 1).save()
+
+        resources.release_resources(['resource_1', 'resource_2'])
+
+        aqc = AvailableQueue.get_collection()
+        self.assertEqual(aqc.find_one({'_id': 'queue_1'})['num_reservations'], 0)
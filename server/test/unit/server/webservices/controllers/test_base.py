@@ -12,10 +12,16 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 import copy
+import json
 import unittest
+import zlib
+
+import mock
 
 from pulp.devel.unit import util
-from pulp.server.webservices.controllers.base import JSONController
+from pulp.server.webservices.controllers import base
+from pulp.server.webservices.controllers.base import (JSONController, json_list_chunks,
+                                                      processed_in_batches)
 
 
 class JSONControllerTests(unittest.TestCase):
@@ -56,4 +62,93 @@ class JSONControllerTests(unittest.TestCase):
         target_result.pop(u'qux', None)
 
         JSONController.process_dictionary_against_whitelist(test_dictionary, [])
-        util.compare_dict(target_result, test_dictionary)
\ No newline at end of file
+        util.compare_dict(target_result, test_dictionary)
+
+
+@mock.patch('pulp.server.webservices.http.header')
+@mock.patch('pulp.server.webservices.http.request_info')
+class JSONControllerOutputTests(unittest.TestCase):
+
+    def setUp(self):
+        self.data = [{'id': i} for i in range(1000)]
+
+    def test_compressed(self, mock_request_info, mock_header):
+        mock_request_info.return_value = 'deflate, gzip'
+
+        body = JSONController()._output(self.data)
+
+        self.assertEqual(json.loads(zlib.decompress(body, 16 + zlib.MAX_WBITS)), self.data)
+        mock_request_info.assert_called_once_with('HTTP_ACCEPT_ENCODING')
+        mock_header.assert_any_call('Content-Encoding', 'gzip')
+        mock_header.assert_any_call('Content-Length', len(body))
+
+    def test_gzip_not_accepted(self, mock_request_info, mock_header):
+        for accepted in (None, 'deflate', 'gzip;q=0'):
+            mock_request_info.return_value = accepted
+            mock_header.reset_mock()
+
+            body = JSONController()._output(self.data)
+
+            self.assertEqual(json.loads(body), self.data)
+            headers = [c[0][0] for c in mock_header.call_args_list]
+            self.assertFalse('Content-Encoding' in headers)
+
+    def test_small_not_compressed(self, mock_request_info, mock_header):
+        mock_request_info.return_value = 'gzip'
+
+        body = JSONController()._output({'id': 1})
+
+        self.assertEqual(json.loads(body), {'id': 1})
+        self.assertTrue(len(body) < base.COMPRESSION_THRESHOLD)
+        headers = [c[0][0] for c in mock_header.call_args_list]
+        self.assertFalse('Content-Encoding' in headers)
+
+
+class JSONListChunksTests(unittest.TestCase):
+
+    def test_empty(self):
+        self.assertEqual(list(json_list_chunks([])), ['[]'])
+
+    def test_chunks(self):
+        items = [{'id': i} for i in range(5)]
+
+        chunks = list(json_list_chunks(iter(items), chunk_size=2))
+
+        # three chunks of items and the closing bracket
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(json.loads(''.join(chunks)), items)
+
+
+class ProcessedInBatchesTests(unittest.TestCase):
+
+    def test_batches(self):
+        batches = []
+
+        def process(batch):
+            batches.append(list(batch))
+            return [i * 10 for i in batch]
+
+        processed = list(processed_in_batches(iter(range(5)), process, batch_size=2))
+
+        self.assertEqual(processed, [0, 10, 20, 30, 40])
+        self.assertEqual(batches, [[0, 1], [2, 3], [4]])
+
+    def test_empty(self):
+        batches = []
+
+        def process(batch):
+            batches.append(batch)
+            return batch
+
+        self.assertEqual(list(processed_in_batches([], process)), [])
+        # process is still called once, as it would be for a whole list
+        self.assertEqual(batches, [[]])
+
+    def test_lazy(self):
+        process = lambda batch: batch
+        items = iter(range(5))
+        processed = processed_in_batches(items, process, batch_size=2)
+
+        self.assertEqual(processed.next(), 0)
+        # only the first batch has been read
+        self.assertEqual(list(items), [2, 3, 4])
@@ -1288,17 +1288,9 @@ class TestConsumerApplicabilityRegeneration(base.PulpWebserviceTests):
         for consumer_id in self.CONSUMER_IDS:
             manager.create(consumer_id, 'rpm', self.PROFILE)
 
-    class ReservedResourceApplyAsync(object):
-        """
-        This object allows us to mock the return value of _reserve_resource.apply_async.get().
-        """
-        def get(self):
-            return 'some_queue'
-
-    @mock.patch('pulp.server.async.tasks._reserve_resource.apply_async')
+    @mock.patch('pulp.server.managers.resources.reserve_resource', return_value='some_queue')
     def test_regenerate_applicability(self, _reserve_resource):
         # We need to fake the _resource_manager returning a queue to us
-        _reserve_resource.return_value = self.ReservedResourceApplyAsync()
         self.populate()
         self.populate_bindings()
         request_body = dict(consumer_criteria={'filters': self.FILTER})
@@ -1308,10 +1300,9 @@ class TestConsumerApplicabilityRegeneration(base.PulpWebserviceTests):
         self.assertEquals(status, 202)
         self.assertTrue('task_id' in body.get('spawned_tasks')[0])
 
-    @mock.patch('pulp.server.async.tasks._reserve_resource.apply_async')
+    @mock.patch('pulp.server.managers.resources.reserve_resource', return_value='some_queue')
     def test_regenerate_applicability_no_consumers(self, _reserve_resource):
         # We need to fake the _resource_manager returning a queue to us
-        _reserve_resource.return_value = self.ReservedResourceApplyAsync()
         # Test
         request_body = dict(consumer_criteria={'filters':self.FILTER})
         status, body = self.post(self.PATH, request_body)
@@ -1319,10 +1310,9 @@ class TestConsumerApplicabilityRegeneration(base.PulpWebserviceTests):
         self.assertEquals(status, 202)
         self.assertTrue('task_id' in body.get('spawned_tasks')[0])
 
-    @mock.patch('pulp.server.async.tasks._reserve_resource.apply_async')
+    @mock.patch('pulp.server.managers.resources.reserve_resource', return_value='some_queue')
     def test_regenerate_applicability_no_bindings(self, _reserve_resource):
         # We need to fake the _resource_manager returning a queue to us
-        _reserve_resource.return_value = self.ReservedResourceApplyAsync()
         # Setup
         self.populate()
         # Test
@@ -171,6 +171,63 @@ class TestTaskCollection(base.PulpWebserviceTests):
         self.assertEqual(200, status)
         self.assertTrue(len(body) == 0)
 
+    def test_GET_celery_tasks_by_state(self):
+        """
+        Test the GET() method to get the tasks in some states.
+        """
+        TaskStatusManager.create_task_status('task_1', 'queue_1', state='waiting')
+        TaskStatusManager.create_task_status('task_2', 'queue_1', state='running')
+        TaskStatusManager.create_task_status('task_3', 'queue_1', state='finished')
+
+        status, body = self.get('/v2/tasks/?state=waiting&state=running')
+
+        self.assertEqual(200, status)
+        self.assertEqual(sorted(t['task_id'] for t in body), ['task_1', 'task_2'])
+
+    def test_GET_celery_tasks_paged(self):
+        """
+        Test the GET() method to get the tasks one page at a time.
+        """
+        task_ids = ['task_%s' % i for i in range(5)]
+        for task_id in task_ids:
+            TaskStatusManager.create_task_status(task_id, 'queue_1', state='waiting')
+
+        pages = []
+        continuation = ''
+        while continuation is not None:
+            status, body = self.get('/v2/tasks/?limit=2&continuation=%s' % continuation)
+            self.assertEqual(200, status)
+            pages.append([t['task_id'] for t in body['tasks']])
+            continuation = body['continuation']
+
+        self.assertEqual(pages, [task_ids[:2], task_ids[2:4], task_ids[4:]])
+
+    def test_GET_celery_tasks_invalid_continuation(self):
+        """
+        Test that a continuation that was not returned by the server is rejected.
+        """
+        status, body = self.get('/v2/tasks/?continuation=not-a-continuation')
+
+        self.assertEqual(400, status)
+
+    def test_POST_search_paged(self):
+        """
+        Test paging through a task search.
+        """
+        TaskStatusManager.create_task_status('task_1', 'queue_1', state='waiting')
+        TaskStatusManager.create_task_status('task_2', 'queue_1', state='running')
+        TaskStatusManager.create_task_status('task_3', 'queue_1', state='running')
+        criteria = {'filters': {'state': 'running'}, 'limit': 1, 'continuation': None}
+
+        status, body = self.post('/v2/tasks/search/', {'criteria': criteria})
+        self.assertEqual(200, status)
+        self.assertEqual([t['task_id'] for t in body['tasks']], ['task_2'])
+
+        criteria['continuation'] = body['continuation']
+        status, body = self.post('/v2/tasks/search/', {'criteria': criteria})
+        self.assertEqual(200, status)
+        self.assertEqual([t['task_id'] for t in body['tasks']], ['task_3'])
+
     def test_GET_celery_task_by_id(self):
         """
         Test the GET() method to get a current task with given id.
@@ -196,6 +253,33 @@ class TestTaskCollection(base.PulpWebserviceTests):
         self.assertEqual(body['queue'], queue_2)
         self.assertEquals(body['tags'], tags)
 
+    def test_GET_celery_task_wait(self):
+        """
+        Test the GET() method returns a task as soon as it differs from the given hash.
+        """
+        task_id = str(uuid.uuid4())
+        TaskStatusManager.create_task_status(task_id, 'queue_1', [], 'running')
+        status, body = self.get('/v2/tasks/%s/' % task_id)
+        self.assertEqual(200, status)
+
+        TaskStatusManager.update_progress_report(task_id, {'importer': {'state': 'done'}})
+        status, changed = self.get('/v2/tasks/%s/?wait=30&since=%s' % (task_id, body['_hash']))
+
+        self.assertEqual(200, status)
+        self.assertNotEqual(changed['_hash'], body['_hash'])
+        self.assertEqual(changed['progress_report'], {'importer': {'state': 'done'}})
+
+    def test_GET_celery_task_wait_invalid(self):
+        """
+        Test the GET() method rejects a wait that isn't a finite, non-negative number.
+        """
+        task_id = str(uuid.uuid4())
+        TaskStatusManager.create_task_status(task_id, 'queue_1', [], 'running')
+        for wait in ('soon', 'nan', 'inf', '-1'):
+            status, body = self.get('/v2/tasks/%s/?wait=%s' % (task_id, wait))
+
+            self.assertEqual(400, status)
+
     def test_GET_celery_task_by_missing_id(self):
         """
         Test the GET() method to get a current task with given id.
@@ -54,13 +54,6 @@ class RepoControllersTests(base.PulpWebserviceTests):
         Repo.get_collection().remove(safe=True)
 
 
-class ReservedResourceApplyAsync(object):
-    """
-    This object allows us to mock the return value of _reserve_resource.apply_async.get().
-    """
-    def get(self):
-        return 'some_queue'
-
 
 class RepoImportUploadTests(RepoControllersTests):
     """
@@ -69,7 +62,7 @@ class RepoImportUploadTests(RepoControllersTests):
     URL = '/v2/repositories/%s/actions/import_upload/'
 
     @mock.patch('celery.Task.apply_async')
-    @mock.patch('pulp.server.async.tasks._reserve_resource.apply_async')
+    @mock.patch('pulp.server.managers.resources.reserve_resource', return_value='some_queue')
     @mock.patch('pulp.server.managers.content.upload.ContentUploadManager.import_uploaded_unit')
     def test_POST_returns_report(self, import_uploaded_unit, _reserve_resource, mock_apply_async):
         """
@@ -83,7 +76,6 @@ class RepoImportUploadTests(RepoControllersTests):
         import_uploaded_unit.return_value = upload_report
         task_id = str(uuid.uuid4())
         mock_apply_async.return_value = AsyncResult(task_id)
-        _reserve_resource.return_value = ReservedResourceApplyAsync()
         params = {'upload_id': 'upload_id', 'unit_type_id': 'unit_type_id', 'unit_key': 'unit_key'}
 
         status, body = self.post(self.URL % 'repo_id', params)
@@ -575,7 +567,7 @@ class RepoImportersTests(RepoPluginsTests):
         self.assertEqual(404, status)
 
     @mock.patch('celery.Task.apply_async')
-    @mock.patch('pulp.server.async.tasks._reserve_resource.apply_async')
+    @mock.patch('pulp.server.managers.resources.reserve_resource', return_value='some_queue')
     def test_post(self, _reserve_resource, mock_apply_async):
         """
         Tests adding an importer to a repo.
@@ -584,7 +576,6 @@ class RepoImportersTests(RepoPluginsTests):
         self.repo_manager.create_repo('gravy')
         task_id = str(uuid.uuid4())
         mock_apply_async.return_value = AsyncResult(task_id)
-        _reserve_resource.return_value = ReservedResourceApplyAsync()
 
         # Test
         req_body = {
@@ -600,12 +591,11 @@ class RepoImportersTests(RepoPluginsTests):
         self.assertEqual(call_args, ['gravy', 'dummy-importer'])
         self.assertEqual(call_kwargs, {'repo_plugin_config': {'foo': 'bar'}})
 
-    @mock.patch('pulp.server.async.tasks._reserve_resource.apply_async')
+    @mock.patch('pulp.server.managers.resources.reserve_resource', return_value='some_queue')
     def test_post_missing_repo(self, _reserve_resource):
         """
         Tests adding an importer to a repo that doesn't exist.
         """
-        _reserve_resource.return_value = ReservedResourceApplyAsync()
         # Test
         req_body = {
             'importer_type_id' : 'dummy-importer',
@@ -626,7 +616,7 @@ class RepoImportersTests(RepoPluginsTests):
         # Verify
         self.assertEqual(400, status)
 
-    @mock.patch('pulp.server.async.tasks._reserve_resource.apply_async')
+    @mock.patch('pulp.server.managers.resources.reserve_resource', return_value='some_queue')
     def test_post_bad_request_invalid_data(self, _reserve_resource):
         """
         Tests adding an importer but specifying incorrect metadata.
@@ -636,7 +626,6 @@ class RepoImportersTests(RepoPluginsTests):
         req_body = {
             'importer_type_id' : 'not-a-real-importer'
         }
-        _reserve_resource.return_value = ReservedResourceApplyAsync()
         # Test
         status, body = self.post('/v2/repositories/walnuts/importers/', params=req_body)
         # Verify
@@ -679,7 +668,7 @@ class RepoImporterTests(RepoPluginsTests):
         self.assertEqual(404, status)
 
     @mock.patch('celery.Task.apply_async')
-    @mock.patch('pulp.server.async.tasks._reserve_resource.apply_async')
+    @mock.patch('pulp.server.managers.resources.reserve_resource', return_value='some_queue')
     def test_delete(self, _reserve_resource, mock_apply_async):
         """
         Tests removing an importer from a repo.
@@ -690,7 +679,6 @@ class RepoImporterTests(RepoPluginsTests):
         self.importer_manager.set_importer(repo_id, 'dummy-importer', {})
         task_id = str(uuid.uuid4())
         mock_apply_async.return_value = AsyncResult(task_id)
-        _reserve_resource.return_value = ReservedResourceApplyAsync()
 
         # Test
         status, body = self.delete('/v2/repositories/blueberry_pie/importers/dummy-importer/')
@@ -701,32 +689,30 @@ class RepoImporterTests(RepoPluginsTests):
         call_args = mock_apply_async.call_args[0]
         self.assertTrue([repo_id] in call_args)
 
-    @mock.patch('pulp.server.async.tasks._reserve_resource.apply_async')
+    @mock.patch('pulp.server.managers.resources.reserve_resource', return_value='some_queue')
     def test_delete_missing_repo(self, _reserve_resource):
         """
         Tests deleting the importer from a repo that doesn't exist.
         """
-        _reserve_resource.return_value = ReservedResourceApplyAsync()
         # Test
         status, body = self.delete('/v2/repositories/bad_pie/importers/dummy-importer/')
         # Verify
         self.assertEqual(202, status)
 
-    @mock.patch('pulp.server.async.tasks._reserve_resource.apply_async')
+    @mock.patch('pulp.server.managers.resources.reserve_resource', return_value='some_queue')
     def test_delete_missing_importer(self, _reserve_resource):
         """
         Tests deleting an importer from a repo that doesn't have one.
         """
         # Setup
         self.repo_manager.create_repo('apple_pie')
-        _reserve_resource.return_value = ReservedResourceApplyAsync()
         # Test
         status, body = self.delete('/v2/repositories/apple_pie/importers/dummy-importer/')
         # Verify
         self.assertEqual(202, status)
 
     @mock.patch('celery.Task.apply_async')
-    @mock.patch('pulp.server.async.tasks._reserve_resource.apply_async')
+    @mock.patch('pulp.server.managers.resources.reserve_resource', return_value='some_queue')
     def test_update_importer_config(self, _reserve_resource, mock_apply_async):
         """
         Tests successfully updating an importer's config.
@@ -737,7 +723,6 @@ class RepoImporterTests(RepoPluginsTests):
         self.importer_manager.set_importer(repo_id, 'dummy-importer', {})
         task_id = str(uuid.uuid4())
         mock_apply_async.return_value = AsyncResult(task_id)
-        _reserve_resource.return_value = ReservedResourceApplyAsync()
         # Test
         new_config = {'importer_config' : {'ice_cream' : True}}
         status, body = self.put('/v2/repositories/pumpkin_pie/importers/dummy-importer/', 
@@ -749,26 +734,24 @@ class RepoImporterTests(RepoPluginsTests):
         self.assertTrue(repo_id in call_args)
         self.assertEqual(call_kwargs['importer_config'], {'ice_cream' : True})
 
-    @mock.patch('pulp.server.async.tasks._reserve_resource.apply_async')
+    @mock.patch('pulp.server.managers.resources.reserve_resource', return_value='some_queue')
     def test_update_missing_repo(self, _reserve_resource):
         """
         Tests updating an importer config on a repo that doesn't exist.
         """
-        _reserve_resource.return_value = ReservedResourceApplyAsync()
         # Test
         status, body = self.put('/v2/repositories/foo/importers/dummy-importer/', 
                                 params={'importer_config' : {}})
         # Verify
         self.assertEqual(202, status)
 
-    @mock.patch('pulp.server.async.tasks._reserve_resource.apply_async')
+    @mock.patch('pulp.server.managers.resources.reserve_resource', return_value='some_queue')
     def test_update_missing_importer(self, _reserve_resource):
         """
         Tests updating a repo that doesn't have an importer.
         """
         # Setup
         self.repo_manager.create_repo('pie')
-        _reserve_resource.return_value = ReservedResourceApplyAsync()
         # Test
         status, body = self.put('/v2/repositories/pie/importers/dummy-importer/', 
                                 params={'importer_config' : {}})
@@ -1203,6 +1186,32 @@ class RepoUnitAssociationQueryTests(RepoControllersTests):
         self.assertEqual(1, self.association_query_mock.get_units_across_types.call_count)
         self.assertTrue(isinstance(self.association_query_mock.get_units_across_types.call_args[1]['criteria'], UnitAssociationCriteria))
 
+    def test_post_paged(self):
+        """
+        Passes in a continuation to ensure a page is returned with the token for the next one.
+        """
+
+        # Setup
+        page = mock.MagicMock()
+        page.__iter__.return_value = iter([{'unit_id': 'a'}, {'unit_id': 'b'}])
+        page.continuation = 'next-token'
+        self.association_query_mock.get_units_page.return_value = page
+
+        query = {'type_ids': ['rpm'], 'limit': 2, 'continuation': 'token'}
+
+        params = {'criteria': query}
+        status, body = self.post('/v2/repositories/repo-1/search/units/', params=params)
+
+        # Verify
+        self.assertEqual(200, status)
+        self.assertEqual(body, {'units': [{'unit_id': 'a'}, {'unit_id': 'b'}],
+                                'continuation': 'next-token'})
+
+        self.assertEqual(0, self.association_query_mock.get_units_by_type.call_count)
+        call_kwargs = self.association_query_mock.get_units_page.call_args[1]
+        self.assertEqual('token', call_kwargs['continuation'])
+        self.assertEqual(2, call_kwargs['criteria'].limit)
+
     def test_post_missing_query(self):
         # Test
         status, body = self.post('/v2/repositories/repo-1/search/units/')
@@ -1612,10 +1621,9 @@ class TestRepoApplicabilityRegeneration(base.PulpWebserviceTests):
         for consumer_id in self.CONSUMER_IDS:
             manager.create(consumer_id, 'rpm', self.PROFILE)
 
-    @mock.patch('pulp.server.async.tasks._reserve_resource.apply_async')
+    @mock.patch('pulp.server.managers.resources.reserve_resource', return_value='some_queue')
     def test_regenerate_applicability(self, _reserve_resource):
         # Setup
-        _reserve_resource.return_value = ReservedResourceApplyAsync()
         self.populate()
         self.populate_bindings()
         # Test
@@ -1626,20 +1634,18 @@ class TestRepoApplicabilityRegeneration(base.PulpWebserviceTests):
         self.assertTrue('task_id' in body['spawned_tasks'][0])
 
 
-    @mock.patch('pulp.server.async.tasks._reserve_resource.apply_async')
+    @mock.patch('pulp.server.managers.resources.reserve_resource', return_value='some_queue')
     def test_regenerate_applicability_no_consumer(self, _reserve_resource):
         # Test
-        _reserve_resource.return_value = ReservedResourceApplyAsync()
         request_body = dict(repo_criteria={'filters':self.REPO_FILTER})
         status, body = self.post(self.PATH, request_body)
         # Verify
         self.assertEquals(status, 202)
         self.assertTrue('task_id' in body['spawned_tasks'][0])
 
-    @mock.patch('pulp.server.async.tasks._reserve_resource.apply_async')
+    @mock.patch('pulp.server.managers.resources.reserve_resource', return_value='some_queue')
     def test_regenerate_applicability_no_bindings(self, _reserve_resource):
         # Setup
-        _reserve_resource.return_value = ReservedResourceApplyAsync()
         self.populate()
         # Test
         request_body = dict(repo_criteria={'filters':self.REPO_FILTER})
@@ -17,9 +17,14 @@ import base
 from pulp.server.event.amqp import handle_event
 
 
+def deliver_now(send, notifier_config, events, batch_key=None):
+    send(notifier_config, events)
+
+
+@mock.patch('pulp.server.event.delivery.submit', side_effect=deliver_now)
 class TestAMQPNotifier(base.PulpServerTests):
     @mock.patch('pulp.server.managers.event.remote.TopicPublishManager.publish')
-    def test_handle_event(self, mock_publish):
+    def test_handle_event(self, mock_publish, mock_submit):
         event = mock.MagicMock()
 
         handle_event({}, event)
@@ -27,7 +32,7 @@ class TestAMQPNotifier(base.PulpServerTests):
         mock_publish.assert_called_once_with(event, None)
 
     @mock.patch('pulp.server.managers.event.remote.TopicPublishManager.publish')
-    def test_handle_event_with_exchange(self, mock_publish):
+    def test_handle_event_with_exchange(self, mock_publish, mock_submit):
         event = mock.MagicMock()
 
         handle_event({'exchange': 'pulp'}, event)
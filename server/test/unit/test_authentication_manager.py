@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2014 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import time
+
+import mock
+
+import base
+
+from pulp.server.db.model.auth import User
+from pulp.server.managers import factory as manager_factory
+from pulp.server.managers.auth import authentication
+from pulp.server.managers.auth.cert.cert_generator import SerialNumber
+
+
+SerialNumber.PATH = '/tmp/sn.dat'
+
+
+class AuthenticationCacheTests(base.PulpServerTests):
+
+    def setUp(self):
+        super(AuthenticationCacheTests, self).setUp()
+        self.cache = authentication.AuthenticationCache()
+
+    def test_get_set(self):
+        key = self.cache.key('password', 'fred', u'sécret')
+
+        self.assertEqual(self.cache.get(key), (False, None))
+        self.cache.set(key, True, 'fred')
+        self.assertEqual(self.cache.get(key), (True, True))
+
+        self.assertEqual(self.cache.stats(), {'size': 1, 'hits': 1, 'misses': 1})
+
+    def test_keyed(self):
+        other = authentication.AuthenticationCache()
+        self.assertNotEqual(self.cache.key('a', 'b'), other.key('a', 'b'))
+        self.assertNotEqual(self.cache.key('a', 'b'), self.cache.key('a', 'c'))
+
+    def test_expires(self):
+        key = self.cache.key('certificate', 'ca', 'cert')
+        self.cache.set(key, True, authentication.CERTIFICATE_TAG, expires=time.time() - 1)
+        self.assertEqual(self.cache.get(key), (False, None))
+
+    @mock.patch('pulp.server.managers.auth.authentication.config')
+    def test_disabled(self, mock_config):
+        mock_config.getint.return_value = 0
+        key = self.cache.key('password', 'fred', 'secret')
+        self.cache.set(key, True, 'fred')
+        self.assertEqual(self.cache.get(key), (False, None))
+
+    @mock.patch('pulp.server.managers.auth.authentication.config')
+    def test_bounded(self, mock_config):
+        mock_config.getint.side_effect = lambda section, option: {
+            'auth_cache_ttl': 300, 'auth_cache_max_size': 2}[option]
+        keys = [self.cache.key(str(i)) for i in range(3)]
+        for key in keys:
+            self.cache.set(key, True, 'fred')
+        # use the second so the third is evicted first
+        self.cache.get(keys[1])
+        self.cache.set(self.cache.key('3'), True, 'fred')
+
+        self.assertFalse(self.cache.get(keys[0])[0])
+        self.assertTrue(self.cache.get(keys[1])[0])
+        self.assertFalse(self.cache.get(keys[2])[0])
+
+    def test_invalidate(self):
+        fred = self.cache.key('fred')
+        wilma = self.cache.key('wilma')
+        self.cache.set(fred, True, 'fred')
+        self.cache.set(wilma, True, 'wilma')
+
+        self.cache.invalidate('fred')
+
+        self.assertFalse(self.cache.get(fred)[0])
+        self.assertTrue(self.cache.get(wilma)[0])
+
+    def test_set_generation(self):
+        key = self.cache.key('certificate')
+        self.cache.set_generation(authentication.CERTIFICATE_TAG, 'ca-1')
+        self.cache.set(key, True, authentication.CERTIFICATE_TAG)
+
+        self.cache.set_generation(authentication.CERTIFICATE_TAG, 'ca-1')
+        self.assertTrue(self.cache.get(key)[0])
+
+        self.cache.set_generation(authentication.CERTIFICATE_TAG, 'ca-2')
+        self.assertFalse(self.cache.get(key)[0])
+
+
+class AuthenticationManagerTests(base.PulpServerTests):
+
+    def setUp(self):
+        super(AuthenticationManagerTests, self).setUp()
+        authentication._CACHE.clear()
+        self.manager = manager_factory.authentication_manager()
+        self.user_manager = manager_factory.user_manager()
+        self.user_manager.create_user('fred', password='secret')
+
+    def tearDown(self):
+        super(AuthenticationManagerTests, self).tearDown()
+        User.get_collection().remove()
+        authentication._CACHE.clear()
+
+    @mock.patch('pulp.server.managers.auth.password.PasswordManager.check_password',
+                return_value=True)
+    def test_password_cached(self, mock_check):
+        self.assertEqual(self.manager.check_username_password('fred', 'secret'), 'fred')
+        self.assertEqual(self.manager.check_username_password('fred', 'secret'), 'fred')
+
+        self.assertEqual(mock_check.call_count, 1)
+        self.assertEqual(self.manager.cache_stats()['hits'], 1)
+
+    def test_wrong_password(self):
+        self.assertEqual(self.manager.check_username_password('fred', 'secret'), 'fred')
+        self.assertEqual(self.manager.check_username_password('fred', 'wrong'), None)
+
+    def test_password_changed(self):
+        self.assertEqual(self.manager.check_username_password('fred', 'secret'), 'fred')
+
+        self.user_manager.update_user('fred', {'password': 'changed'})
+
+        self.assertEqual(self.manager.check_username_password('fred', 'secret'), None)
+        self.assertEqual(self.manager.check_username_password('fred', 'changed'), 'fred')
+
+    def test_password_changed_elsewhere(self):
+        # a change by another process is not seen by invalidate_user
+        self.assertEqual(self.manager.check_username_password('fred', 'secret'), 'fred')
+        password = manager_factory.password_manager().hash_password('changed')
+        User.get_collection().update({'login': 'fred'}, {'$set': {'password': password}})
+
+        self.assertEqual(self.manager.check_username_password('fred', 'secret'), None)
+
+    def test_user_deleted(self):
+        self.assertEqual(self.manager.check_username_password('fred', 'secret'), 'fred')
+
+        self.user_manager.delete_user('fred')
+
+        self.assertEqual(self.manager.check_username_password('fred', 'secret'), None)
+        self.assertEqual(self.manager.cache_stats()['size'], 0)
+
+    def test_consumer_cert_cached(self):
+        cert_gen_manager = manager_factory.cert_generation_manager()
+        key, cert_pem = cert_gen_manager.make_cert('consumer-1', 7)
+
+        with mock.patch.object(cert_gen_manager.__class__, 'verify_cert',
+                               return_value=True) as mock_verify:
+            self.assertEqual(self.manager.check_consumer_cert(cert_pem), 'consumer-1')
+            self.assertEqual(self.manager.check_consumer_cert(cert_pem), 'consumer-1')
+
+            self.manager.invalidate_certificates()
+            self.assertEqual(self.manager.check_consumer_cert(cert_pem), 'consumer-1')
+
+        self.assertEqual(mock_verify.call_count, 2)
@@ -11,6 +11,8 @@
 
 from uuid import uuid4
 
+from mock import patch
+
 from base import PulpServerTests
 
 from pulp.server.db.model.content import ContentCatalog
@@ -50,6 +52,7 @@ class TestCatalogerConduit(PulpServerTests):
         conduit = CatalogerConduit(SOURCE_ID, EXPIRES)
         for unit_key, url in units:
             conduit.add_entry(TYPE_ID, unit_key, url)
+        conduit.flush()
         collection = ContentCatalog.get_collection()
         self.assertEqual(conduit.source_id, SOURCE_ID)
         self.assertEqual(conduit.expires, EXPIRES)
@@ -83,6 +86,34 @@ class TestCatalogerConduit(PulpServerTests):
         entry = collection.find_one({'locator': locator})
         self.assertTrue(entry is None)
 
+    @patch('pulp.plugins.conduits.cataloger.INSERT_CHUNK_SIZE', 4)
+    def test_add_buffered(self):
+        units = self.units(0, 10)
+        conduit = CatalogerConduit(SOURCE_ID, EXPIRES, 'r1')
+        for unit_key, url in units:
+            conduit.add_entry(TYPE_ID, unit_key, url)
+        collection = ContentCatalog.get_collection()
+        # written in chunks of 4; the remaining 2 are written by flush()
+        self.assertEqual(collection.find().count(), 8)
+        self.assertEqual(conduit.added_count, len(units))
+        conduit.flush()
+        self.assertEqual(collection.find().count(), len(units))
+        self.assertEqual(collection.find({'refresh_id': 'r1'}).count(), len(units))
+        conduit.flush()
+        self.assertEqual(collection.find().count(), len(units))
+
+    def test_delete_buffered(self):
+        units = self.units(0, 10)
+        conduit = CatalogerConduit(SOURCE_ID, EXPIRES)
+        for unit_key, url in units:
+            conduit.add_entry(TYPE_ID, unit_key, url)
+        conduit.delete_entry(TYPE_ID, units[5][0])
+        conduit.flush()
+        collection = ContentCatalog.get_collection()
+        self.assertEqual(len(units) - 1, collection.find().count())
+        locator = ContentCatalog.get_locator(TYPE_ID, units[5][0])
+        self.assertTrue(collection.find_one({'locator': locator}) is None)
+
     def test_reset(self):
         conduit = CatalogerConduit(SOURCE_ID, EXPIRES)
         conduit.added_count = 10
@@ -16,6 +16,7 @@ import unittest
 
 from pulp.plugins.conduits import mixins
 from pulp.plugins.model import Unit, PublishReport
+from pulp.server.async import progress
 from pulp.server.exceptions import MissingResource
 from pulp.server.managers import factory as manager_factory
 
@@ -95,7 +96,7 @@ class RepoScratchpadReadMixinTests(unittest.TestCase):
         self.assertEqual(mock_call.call_args[0][0], repo_id)
 
     @mock.patch('pulp.server.managers.repo.cud.RepoManager.get_repo_scratchpad')
-    def test_get_repo_scratchpad(self, mock_call):
+    def test_get_repo_scratchpad_other_repo(self, mock_call):
         # Setup
         mock_call.return_value = 'foo'
         repo_id = 'bad-repo'
@@ -465,6 +466,30 @@ class AddUnitMixinTests(unittest.TestCase):
         self.assertEqual(1, self.mixin._updated_count)
         self.assertEqual(saved.id, 'existing')
 
+    @mock.patch('pulp.server.managers.consumer.applicability.ApplicabilityRegenerationManager.record_updated_units')
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.request_content_unit_file_path')
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.get_content_unit_by_keys_dict')
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.update_content_unit')
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.add_content_unit')
+    @mock.patch('pulp.server.managers.repo.unit_association.RepoUnitAssociationManager.associate_unit_by_id')
+    def test_save_unit_unchanged_unit(self, mock_associate, mock_add, mock_update, mock_get, mock_path,
+                                      mock_record):
+        # Setup
+        mock_path.return_value = '/tmp'
+        unit = self.mixin.init_unit('t', {'k' : 'v'}, {'m' : 'm1'}, '/bar')
+        mock_get.return_value = {'_id' : 'existing', '_content_type_id' : 't', 'k' : 'v',
+                                 'm' : 'm1', '_storage_path' : '/tmp'}
+
+        # Test
+        saved = self.mixin.save_unit(unit)
+
+        # Verify
+        self.assertEqual(0, mock_update.call_count)
+        self.assertEqual(0, mock_record.call_count)
+        self.assertEqual(1, mock_associate.call_count)
+        self.assertEqual(1, self.mixin._updated_count)
+        self.assertEqual(saved.id, 'existing')
+
     @mock.patch('pulp.server.managers.content.query.ContentQueryManager.request_content_unit_file_path')
     @mock.patch('pulp.server.managers.content.query.ContentQueryManager.get_content_unit_by_keys_dict')
     @mock.patch('pulp.server.managers.content.cud.ContentManager.update_content_unit')
@@ -534,8 +559,9 @@ class StatusMixinTests(unittest.TestCase):
 
     def setUp(self):
         manager_factory.initialize()
+        progress._WRITERS.clear()
 
-    @mock.patch('pulp.server.async.task_status_manager.TaskStatusManager.update_task_status')
+    @mock.patch('pulp.server.async.task_status_manager.TaskStatusManager.update_progress_report')
     @mock.patch('pulp.plugins.conduits.mixins.get_current_task_id')
     def test_set_progress(self, mock_get_task_id, mock_update):
         # Setup
@@ -554,10 +580,9 @@ class StatusMixinTests(unittest.TestCase):
         }
 
         self.assertEqual(1, mock_update.call_count)
-        delta = {'progress_report': expected_report}
         call_args = mock_update.call_args[0]
         self.assertEqual(call_args[0], task_id)
-        self.assertEqual(call_args[1], delta)
+        self.assertEqual(call_args[1], expected_report)
 
     @mock.patch('pulp.server.async.tasks.get_current_task_id')
     def test_set_progress_with_exception(self, mock_call):
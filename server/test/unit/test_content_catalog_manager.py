@@ -11,6 +11,8 @@
 
 from uuid import uuid4
 
+from mock import patch
+
 from base import PulpServerTests
 
 from pulp.server.db.model.content import ContentCatalog
@@ -107,6 +109,47 @@ class TestCatalogManager(PulpServerTests):
         self.assertEqual(collection.find({'source_id': source_a}).count(), 0)
         self.assertEqual(collection.find({'source_id': source_b}).count(), 10)
 
+    def test_add_entries(self):
+        units = self.units(0, 10)
+        manager = ContentCatalogManager()
+        entries = [ContentCatalog(SOURCE_ID, EXPIRATION, TYPE_ID, unit_key, url, 'r1')
+                   for unit_key, url in units]
+        with patch('pulp.server.managers.content.catalog.INSERT_CHUNK_SIZE', 4):
+            manager.add_entries(entries)
+        collection = ContentCatalog.get_collection()
+        self.assertEqual(len(units), collection.find().count())
+        for unit_key, url in units:
+            locator = ContentCatalog.get_locator(TYPE_ID, unit_key)
+            entry = collection.find_one({'locator': locator})
+            self.assertEqual(entry['unit_key'], unit_key)
+            self.assertEqual(entry['url'], url)
+            self.assertEqual(entry['refresh_id'], 'r1')
+
+    @patch('pulp.server.managers.content.catalog.INSERT_CHUNK_SIZE', 4)
+    @patch('pulp.server.db.model.content.ContentCatalog.get_collection')
+    def test_add_entries_chunked(self, mock_get_collection):
+        entries = range(10)
+        manager = ContentCatalogManager()
+        manager.add_entries(entries)
+        calls = mock_get_collection.return_value.insert.call_args_list
+        self.assertEqual([c[0][0] for c in calls], [range(4), range(4, 8), range(8, 10)])
+
+    def test_purge_superseded(self):
+        manager = ContentCatalogManager()
+        for unit_key, url in self.units(0, 10):
+            manager.add_entry(SOURCE_ID, EXPIRATION, TYPE_ID, unit_key, url)
+        for unit_key, url in self.units(0, 10):
+            manager.add_entry(SOURCE_ID, EXPIRATION, TYPE_ID, unit_key, url, 'r1')
+        for unit_key, url in self.units(0, 10):
+            manager.add_entry(SOURCE_ID, EXPIRATION, TYPE_ID, unit_key, url, 'r2')
+        for unit_key, url in self.units(0, 10):
+            manager.add_entry('other', EXPIRATION, TYPE_ID, unit_key, url, 'r1')
+        manager.purge_superseded(SOURCE_ID, 'r2')
+        collection = ContentCatalog.get_collection()
+        self.assertEqual(collection.find({'source_id': SOURCE_ID}).count(), 10)
+        self.assertEqual(collection.find({'refresh_id': 'r2'}).count(), 10)
+        self.assertEqual(collection.find({'source_id': 'other'}).count(), 10)
+
     def test_has_entries(self):
         source_a = 'A'
         source_b = 'B'
@@ -180,6 +223,27 @@ class TestCatalogManager(PulpServerTests):
             self.assertEqual(entry['unit_key'], unit_key)
             self.assertEqual(entry['url'], url)
 
+    def test_find_many(self):
+        units = self.units(0, 10)
+        manager = ContentCatalogManager()
+        for unit_key, url in units:
+            manager.add_entry(SOURCE_ID, EXPIRATION, TYPE_ID, unit_key, url)
+        # a newer entry from the same source replaces the older one
+        manager.add_entry(SOURCE_ID, EXPIRATION, TYPE_ID, units[0][0], 'http://newer')
+        manager.add_entry('other', EXPIRATION, TYPE_ID, units[1][0], 'http://other')
+        manager.add_entry(SOURCE_ID, -1, TYPE_ID, units[2][0], 'http://expired')
+        unit_keys = [unit_key for unit_key, url in units]
+        unit_keys.append({'name': 'not-cataloged'})
+        with patch('pulp.server.managers.content.catalog.QUERY_CHUNK_SIZE', 3):
+            found = manager.find_many(TYPE_ID, unit_keys)
+        self.assertEqual(len(found), len(unit_keys))
+        self.assertEqual([e['url'] for e in found[0]], ['http://newer'])
+        self.assertEqual(sorted(e['url'] for e in found[1]), sorted([units[1][1], 'http://other']))
+        self.assertEqual([e['url'] for e in found[2]], [units[2][1]])
+        for entries, (unit_key, url) in zip(found[3:], units[3:]):
+            self.assertEqual([e['unit_key'] for e in entries], [unit_key])
+        self.assertEqual(found[-1], [])
+
     def test_expired(self):
         units = self.units(0, 10)
         manager = ContentCatalogManager()
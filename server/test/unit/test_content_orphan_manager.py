@@ -18,6 +18,8 @@ import tempfile
 import traceback
 from pprint import pformat
 
+import mock
+
 import base
 
 from pulp.server import exceptions as pulp_exceptions
@@ -172,6 +174,28 @@ class OrphanManagerGeneratorTests(OrphanManagerTests):
         orphans_2 = list(self.orphan_manager.generate_orphans_by_type(PHONY_TYPE_2.id))
         self.assertEqual(len(orphans_2), 1)
 
+    @mock.patch('pulp.server.managers.content.orphan.ORPHAN_CHUNK_SIZE', 2)
+    @mock.patch('pulp.server.managers.content.orphan.ASSOCIATED_IDS_MAX_SET_SIZE', 0)
+    def test_list_orphans_by_type_batched_probing(self):
+        units = [gen_content_unit(PHONY_TYPE_1.id, self.content_root) for i in range(5)]
+        associate_content_unit_with_repo(units[1])
+        associate_content_unit_with_repo(units[4])
+
+        orphans = list(self.orphan_manager.generate_orphans_by_type(PHONY_TYPE_1.id))
+
+        expected_ids = set(units[i]['_id'] for i in (0, 2, 3))
+        self.assertEqual(expected_ids, set(o['_id'] for o in orphans))
+
+    def test_orphans_count_by_type(self):
+        unit_1 = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        unit_2 = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        gen_content_unit(PHONY_TYPE_2.id, self.content_root)
+        associate_content_unit_with_repo(unit_1)
+
+        self.assertEqual(self.orphan_manager.orphans_count_by_type(PHONY_TYPE_1.id), 1)
+        self.assertEqual(self.orphan_manager.orphans_summary(),
+                         {PHONY_TYPE_1.id: 1, PHONY_TYPE_2.id: 1})
+
     def test_get_orphan_using_generators(self):
         unit = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
 
@@ -250,6 +274,25 @@ class OrphanManagerGeneratorTests(OrphanManagerTests):
         self.assertFalse(os.path.exists(unit_1['_storage_path']))
         self.assertTrue(os.path.exists(unit_2['_storage_path']))
 
+    @mock.patch('pulp.server.managers.content.orphan.ORPHAN_CHUNK_SIZE', 2)
+    def test_delete_by_type_in_chunks(self):
+        units = [gen_content_unit(PHONY_TYPE_1.id, self.content_root) for i in range(5)]
+        associate_content_unit_with_repo(units[0])
+
+        deleted = self.orphan_manager.delete_orphans_by_type(PHONY_TYPE_1.id)
+
+        self.assertEqual(deleted, 4)
+        self.assertEqual(self.number_of_files_in_content_root(), 1)
+        self.assertTrue(os.path.exists(units[0]['_storage_path']))
+
+    def test_get_associated_unit_is_not_orphan(self):
+        unit = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        associate_content_unit_with_repo(unit)
+
+        self.assertRaises(pulp_exceptions.MissingResource,
+                          self.orphan_manager.get_orphan,
+                          PHONY_TYPE_1.id, unit['_id'])
+
     def test_delete_by_id_using_generators(self):
         unit = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
 
@@ -27,10 +27,11 @@ from base import PulpServerTests
 from pulp.plugins.loader import api as plugins
 from pulp.plugins.conduits.cataloger import CatalogerConduit
 from pulp.server.db.model.content import ContentCatalog
+from pulp.server.managers.content.catalog import ContentCatalogManager
 from pulp.server.content.sources import ContentContainer, Request, ContentSource, Listener
 from pulp.server.content.sources.descriptor import to_seconds, is_valid
 from pulp.server.content.sources import model
-from pulp.server.content.sources.container import NectarListener
+from pulp.server.content.sources.container import NectarListener, DownloadScheduler
 
 
 PRIMARY = 'primary'
@@ -151,6 +152,25 @@ class MockListener(Listener):
     download_started = Mock()
     download_succeeded = Mock()
     download_failed = Mock()
+    download_stats = Mock()
+
+
+class MockSource(object):
+
+    def __init__(self, source_id, priority, download):
+        self.id = source_id
+        self._priority = priority
+        self._downloader = Mock()
+        self._downloader.download.side_effect = download
+
+    def downloader(self):
+        return self._downloader
+
+    def priority(self):
+        return self._priority
+
+    def __lt__(self, other):
+        return self.priority() < other.priority()
 
 
 class CancelEvent(object):
@@ -176,6 +196,7 @@ class ContainerTest(PulpServerTests):
         MockListener.download_started.reset_mock()
         MockListener.download_succeeded.reset_mock()
         MockListener.download_failed.reset_mock()
+        MockListener.download_stats.reset_mock()
         plugins._create_manager()
         plugins._MANAGER.catalogers.add_plugin('yum', MockCataloger, {})
 
@@ -319,6 +340,28 @@ class TestDownloading(ContainerTest):
         self.assertEqual(listener.download_succeeded.call_count, len(request_list))
         self.assertEqual(listener.download_failed.call_count, 0)
 
+    @patch('pulp.server.managers.content.catalog.ContentCatalogManager.find')
+    def test_download_finds_sources_in_bulk(self, mock_find):
+        _dir, cataloged = self.populate_catalog(UNIT_WORLD, 0, 10)
+        request_list = []
+        for n in range(0, 10):
+            request = Request(
+                cataloged[n].type_id,
+                cataloged[n].unit_key,
+                'file://%s/unit_%d' % (_dir, n),
+                os.path.join(self.downloaded, 'unit_%d' % n))
+            request_list.append(request)
+        container = ContentContainer(path=self.tmp_dir)
+        primary = model.PrimarySource(LocalFileDownloader(DownloaderConfig()))
+        with patch('pulp.server.managers.content.catalog.ContentCatalogManager.find_many',
+                   wraps=ContentCatalogManager().find_many) as mock_find_many:
+            container.find_sources(primary, request_list)
+        self.assertEqual(mock_find.call_count, 0)
+        self.assertEqual(mock_find_many.call_count, 1)
+        for request in request_list:
+            self.assertEqual(request.sources[0][0].id, UNIT_WORLD)
+            self.assertEqual(request.sources[-1][0], primary)
+
     def test_download_cancelled_during_refreshing(self):
         downloader = LocalFileDownloader(DownloaderConfig())
         container = ContentContainer(path=self.tmp_dir)
@@ -463,6 +506,10 @@ class TestDownloading(ContainerTest):
         self.assertEqual(listener.download_started.call_count, len(request_list))
         self.assertEqual(listener.download_succeeded.call_count, len(request_list))
         self.assertEqual(listener.download_failed.call_count, 0)
+        stats = listener.download_stats.call_args[0][0]
+        self.assertEqual(stats[UNIT_WORLD].failed, 10)
+        self.assertEqual(stats[UNDERGROUND].succeeded, 10)
+        self.assertEqual(stats[model.PrimarySource(None).id].succeeded, 9)
 
     def test_download_fail_completely(self):
         request_list = []
@@ -556,13 +603,55 @@ class TestRefreshing(ContainerTest):
             self.assertTrue(r.succeeded)
             self.assertEqual(r.added_count, 100)
             self.assertEqual(r.deleted_count, 0)
-        calls = iter(plugin.refresh.call_args_list)
+            self.assertTrue(r.started is not None)
+            self.assertTrue(r.duration >= 0)
+        # the URLs are refreshed concurrently so the order of calls is not known
+        expected = []
         for source in ContentSource.load_all(self.tmp_dir).values():
             for url in source.urls():
-                args = calls.next()[0]
-                self.assertTrue(isinstance(args[0], CatalogerConduit))
-                self.assertEqual(args[1], source.descriptor)
-                self.assertEqual(args[2], url)
+                expected.append((source.id, url))
+        called = []
+        for args in [c[0] for c in plugin.refresh.call_args_list]:
+            self.assertTrue(isinstance(args[0], CatalogerConduit))
+            called.append((args[0].source_id, args[2]))
+            source = container.sources[args[0].source_id]
+            self.assertEqual(args[1], source.descriptor)
+        self.assertEqual(sorted(called), sorted(expected))
+        # every URL of a source is refreshed under the same refresh ID
+        refresh_ids = {}
+        for args in [c[0] for c in plugin.refresh.call_args_list]:
+            refresh_ids.setdefault(args[0].source_id, set()).add(args[0].refresh_id)
+        for ids in refresh_ids.values():
+            self.assertEqual(len(ids), 1)
+
+    @patch('pulp.plugins.loader.api.get_cataloger_by_id', return_value=(MockCataloger(), {}))
+    def test_refresh_purges_superseded(self, mock_plugin):
+        self.populate_catalog(UNIT_WORLD, 0, 10)
+        self.populate_catalog(UNDERGROUND, 0, 10)
+        container = ContentContainer(path=self.tmp_dir)
+        container.refresh(Event(), force=True)
+        collection = ContentCatalog.get_collection()
+        self.assertEqual(collection.find().count(), 0)
+
+    @patch('pulp.plugins.loader.api.get_cataloger_by_id', return_value=(MockCataloger(ValueError), {}))
+    def test_refresh_failure_keeps_entries(self, mock_plugin):
+        self.populate_catalog(UNIT_WORLD, 0, 10)
+        container = ContentContainer(path=self.tmp_dir)
+        container.refresh(Event(), force=True)
+        collection = ContentCatalog.get_collection()
+        self.assertEqual(collection.find({'source_id': UNIT_WORLD}).count(), 10)
+
+    @patch('pulp.plugins.loader.api.get_cataloger_by_id', return_value=(MockCataloger(), {}))
+    def test_refresh_source(self, mock_plugin):
+        self.populate_catalog(UNDERGROUND, 0, 10)
+        container = ContentContainer(path=self.tmp_dir)
+        source = container.sources[UNDERGROUND]
+        report = source.refresh(Event())
+        plugin = mock_plugin.return_value[0]
+        self.assertEqual(plugin.refresh.call_count, 4)
+        self.assertEqual([r.url for r in report], source.urls())
+        collection = ContentCatalog.get_collection()
+        self.assertEqual(collection.find().count(), 0)
 
     @patch('pulp.plugins.loader.api.get_cataloger_by_id', return_value=(MockCataloger(), {}))
     def test_refresh_cancel_in_sources(self, mock_plugin):
@@ -598,19 +687,19 @@ class TestRefreshing(ContainerTest):
         self.assertEqual(plugin.refresh.call_count, 5)
         self.assertEqual(collection.find().count(), 0)
 
-    @patch('pulp.server.content.sources.model.ContentSource.refresh', side_effect=ValueError)
+    @patch('pulp.server.content.sources.model.ContentSource.refresh_url', side_effect=ValueError)
     def test_refresh_exception(self, mock_refresh):
         container = ContentContainer(path=self.tmp_dir)
         event = Event()
         report = container.refresh(event, force=True)
-        self.assertEqual(len(report), 2)
+        self.assertEqual(len(report), 5)
         for r in report:
             self.assertFalse(r.succeeded)
             self.assertEqual(r.added_count, 0)
             self.assertEqual(r.deleted_count, 0)
             self.assertEqual(len(r.errors), 1)
         collection = ContentCatalog.get_collection()
-        self.assertEqual(mock_refresh.call_count, 2)
+        self.assertEqual(mock_refresh.call_count, 5)
         self.assertEqual(collection.find().count(), 0)
 
     def test_purge_orphans(self):
@@ -627,6 +716,76 @@ class TestRefreshing(ContainerTest):
         self.assertEqual(collection.find({'source_id': UNIT_WORLD}).count(), 10)
 
 
+class TestDownloadScheduler(TestCase):
+
+    def test_failed_requeued_immediately(self):
+        fallback_started = Event()
+
+        def slow(batch):
+            # fail the first request, then wait for the fallback source
+            # to be downloading it before finishing the rest
+            report = Mock(data=batch[0].data, error_msg='failed')
+            slow_source.downloader().event_listener.download_failed(report)
+            fallback_started.wait(10)
+            for nectar_request in batch[1:]:
+                report = Mock(data=nectar_request.data, bytes_downloaded=10)
+                slow_source.downloader().event_listener.download_succeeded(report)
+
+        def fast(batch):
+            fallback_started.set()
+            for nectar_request in batch:
+                report = Mock(data=nectar_request.data, bytes_downloaded=100)
+                fast_source.downloader().event_listener.download_succeeded(report)
+
+        slow_source = MockSource('slow', 1, slow)
+        fast_source = MockSource('fast', 2, fast)
+        request_list = []
+        for n in range(3):
+            request = Request(TYPE_ID, {'n': n}, 'http://primary/%d' % n, '/tmp/%d' % n)
+            request.sources = [(slow_source, 'http://slow/%d' % n),
+                               (fast_source, 'http://fast/%d' % n)]
+            request_list.append(request)
+        collated = ContentContainer.collated(request_list)
+        listener = MockListener()
+        scheduler = DownloadScheduler(Event(), listener)
+        stats = scheduler.run(collated)
+        self.assertTrue(fallback_started.isSet())
+        for request in request_list:
+            self.assertTrue(request.downloaded)
+        self.assertEqual(len(request_list[0].errors), 1)
+        self.assertEqual(stats['slow'].succeeded, 2)
+        self.assertEqual(stats['slow'].failed, 1)
+        self.assertEqual(stats['slow'].bytes, 20)
+        self.assertEqual(stats['fast'].succeeded, 1)
+        self.assertEqual(stats['fast'].bytes, 100)
+        fast_batch = fast_source.downloader().download.call_args[0][0]
+        self.assertEqual([r.url for r in fast_batch], ['http://fast/0'])
+
+    def test_no_more_sources(self):
+        def fail(batch):
+            for nectar_request in batch:
+                report = Mock(data=nectar_request.data, error_msg='failed')
+                source.downloader().event_listener.download_failed(report)
+
+        source = MockSource('only', 1, fail)
+        request = Request(TYPE_ID, {}, 'http://primary', '/tmp/0')
+        request.sources = [(source, 'http://only')]
+        listener = MockListener()
+        listener.download_failed = Mock()
+        scheduler = DownloadScheduler(Event(), listener)
+        stats = scheduler.run(ContentContainer.collated([request]))
+        self.assertFalse(request.downloaded)
+        listener.download_failed.assert_called_once_with(request)
+        self.assertEqual(stats['only'].failed, 1)
+
+    def test_downloader_exception(self):
+        source = MockSource('broken', 1, ValueError)
+        request = Request(TYPE_ID, {}, 'http://primary', '/tmp/0')
+        request.sources = [(source, 'http://broken')]
+        scheduler = DownloadScheduler(Event())
+        self.assertRaises(ValueError, scheduler.run, ContentContainer.collated([request]))
+
+
 class TestNectarListener(TestCase):
 
     @patch('pulp.server.content.sources.model.ContentSource.load_all', returns={})
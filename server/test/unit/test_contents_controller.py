@@ -290,23 +290,15 @@ class UploadSegmentResourceTests(BaseUploadTest):
         self.assertEqual(404, status)
 
 
-class ReservedResourceApplyAsync(object):
-    """
-    This object allows us to mock the return value of _reserve_resource.apply_async.get().
-    """
-    def get(self):
-        return 'some_queue'
-
 
 class ImportUnitTests(BaseUploadTest):
 
     @mock.patch('celery.Task.apply_async')
-    @mock.patch('pulp.server.async.tasks._reserve_resource.apply_async')
+    @mock.patch('pulp.server.managers.resources.reserve_resource', return_value='some_queue')
     def test_post(self, _reserve_resource, mock_apply_async):
         # Setup
         task_id = str(uuid.uuid4())
         mock_apply_async.return_value = AsyncResult(task_id)
-        _reserve_resource.return_value = ReservedResourceApplyAsync()
         upload_id = self.upload_manager.initialize_upload()
         self.upload_manager.save_data(upload_id, 0, 'string data')
 
@@ -331,6 +323,7 @@ class ImportUnitTests(BaseUploadTest):
                               {'name': 'foo'}, {'stuff': 'bar'}, 
                               upload_id]
         self.assertEqual(exepcted_call_args, mock_apply_async.call_args[0][0])
+        self.assertEqual({'checksum': None}, mock_apply_async.call_args[1]['kwargs'])
 
 
 class CatalogTests(base.PulpWebserviceTests):
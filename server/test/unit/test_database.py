@@ -14,6 +14,9 @@
 
 import logging
 
+import mock
+import pymongo
+
 import base
 
 from pulp.server.db import connection
@@ -32,3 +35,50 @@ class TestDatabase(base.PulpServerTests):
 
     def test_database_name(self):
         self.assertEquals(connection._DATABASE.name, self.config.get("database", "name"))
+
+    def test_get_collection_cached(self):
+        collection = connection.get_collection('test_collection')
+        self.assertTrue(collection is connection.get_collection('test_collection'))
+        self.assertFalse(collection is connection.get_collection('test_other_collection'))
+
+    def test_get_collection_create(self):
+        collection = connection.get_collection('test_collection')
+        created = connection.get_collection('test_collection', create=True)
+        try:
+            self.assertFalse(collection is created)
+            self.assertTrue(created is connection.get_collection('test_collection'))
+            self.assertTrue('test_collection' in connection.get_database().collection_names())
+        finally:
+            created.drop()
+
+    @mock.patch('pymongo.MongoClient')
+    def test_initialize_options(self, mock_client):
+        options = {'max_pool_size': '25', 'write_concern': 'majority',
+                   'journal_writes': 'true', 'read_preference': 'secondaryPreferred'}
+        for option, value in options.items():
+            self.config.set('database', option, value)
+        try:
+            connection.initialize()
+        finally:
+            for option in options:
+                self.config.remove_option('database', option)
+
+        kwargs = mock_client.call_args[1]
+        self.assertEqual(kwargs['max_pool_size'], 25)
+        self.assertEqual(kwargs['w'], 'majority')
+        self.assertEqual(kwargs['j'], True)
+        self.assertEqual(kwargs['read_preference'], pymongo.ReadPreference.SECONDARY_PREFERRED)
+
+    @mock.patch('pymongo.MongoClient')
+    def test_initialize_invalid_read_preference(self, mock_client):
+        self.config.set('database', 'read_preference', 'anywhere')
+        try:
+            self.assertRaises(ValueError, connection.initialize)
+        finally:
+            self.config.remove_option('database', 'read_preference')
+        self.assertEqual(mock_client.call_count, 0)
+
+    def tearDown(self):
+        base.PulpServerTests.tearDown(self)
+        # replace any connection made with a mock client
+        connection.initialize()
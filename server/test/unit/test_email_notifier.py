@@ -13,7 +13,6 @@
 
 import smtplib
 import unittest
-import dummy_threading
 try:
     from email.parser import Parser
 except ImportError:
@@ -26,6 +25,11 @@ from pulp.server.compat import json
 from pulp.server.config import config
 from pulp.server.event import data, mail
 from pulp.server.managers import factory
+from pulp.server.managers.event import listeners
+
+
+def deliver_now(send, notifier_config, events, batch_key=None):
+    send(notifier_config, events)
 
 
 class TestSendEmail(unittest.TestCase):
@@ -51,18 +55,19 @@ class TestSendEmail(unittest.TestCase):
         self.assertEqual(message.get('To', None), 'someone@some.domain')
 
     @mock.patch('smtplib.SMTP')
-    @mock.patch('logging.Logger.error')
-    def test_connect_failure(self, mock_error, mock_smtp):
+    def test_connect_failure(self, mock_smtp):
+        # the failure is raised so that the delivery is retried
         mock_smtp.side_effect = smtplib.SMTPConnectError(123, 'aww crap')
-        mail._send_email('hello', 'stuff', 'someone@some.domain')
-        self.assertTrue(mock_error.called)
+        self.assertRaises(smtplib.SMTPConnectError, mail._send_email,
+                          'hello', 'stuff', 'someone@some.domain')
 
     @mock.patch('smtplib.SMTP')
-    @mock.patch('logging.Logger.error')
-    def test_send_failure(self, mock_error, mock_smtp):
+    def test_send_failure(self, mock_smtp):
         mock_smtp.return_value.sendmail.side_effect = smtplib.SMTPRecipientsRefused(['someone@some.domain'])
-        mail._send_email('hello', 'stuff', 'someone@some.domain')
-        self.assertTrue(mock_error.called)
+        self.assertRaises(smtplib.SMTPRecipientsRefused, mail._send_email,
+                          'hello', 'stuff', 'someone@some.domain')
+        self.assertEqual(mock_smtp.return_value.close.call_count, 1)
+        self.assertEqual(mock_smtp.return_value.quit.call_count, 0)
 
 
 class TestHandleEvent(unittest.TestCase):
@@ -75,22 +80,25 @@ class TestHandleEvent(unittest.TestCase):
         self.event.payload = 'stuff'
         self.event.data.return_value = self.event.payload
 
-    # don't actually spawn a thread
-    @mock.patch('threading.Thread', new=dummy_threading.Thread)
+    # deliver in this thread
+    @mock.patch('pulp.server.event.delivery.submit', side_effect=deliver_now)
     @mock.patch('ConfigParser.SafeConfigParser.getboolean', return_value=False)
     @mock.patch('smtplib.SMTP')
-    def test_email_disabled(self, mock_smtp, mock_getbool):
+    def test_email_disabled(self, mock_smtp, mock_getbool, mock_submit):
         mail.handle_event(self.notifier_config, self.event)
         self.assertFalse(mock_smtp.called)
 
-    # don't actually spawn a thread
-    @mock.patch('threading.Thread', new=dummy_threading.Thread)
+    # deliver in this thread
+    @mock.patch('pulp.server.event.delivery.submit', side_effect=deliver_now)
     @mock.patch('ConfigParser.SafeConfigParser.getboolean', return_value=True)
     @mock.patch('smtplib.SMTP')
-    def test_email_enabled(self, mock_smtp, mock_getbool):
+    def test_email_enabled(self, mock_smtp, mock_getbool, mock_submit):
         mail.handle_event(self.notifier_config, self.event)
 
         #verify
+        self.assertEqual(mock_submit.call_count, 2)
+        for call, address in zip(mock_submit.call_args_list, self.notifier_config['addresses']):
+            self.assertEqual(call[0][1], {'subject': 'hello', 'address': address})
         self.assertEqual(mock_smtp.call_count, 2)
         mock_sendmail = mock_smtp.return_value.sendmail
         self.assertEqual(mock_sendmail.call_args[0][0],
@@ -115,23 +123,23 @@ class TestSystem(unittest.TestCase):
         }
         self.event_doc = {
             'notifier_type_id' : mail.TYPE_ID,
-            'event_types' : data.TYPE_REPO_SYNC_FINISHED,
+            'event_types' : [data.TYPE_REPO_SYNC_FINISHED],
             'notifier_config' : self.notifier_config,
         }
 
-    # don't actually spawn a thread
-    @mock.patch('threading.Thread', new=dummy_threading.Thread)
-    # mock qpid, because it freaks out over dummy_threading
+    # deliver in this thread
+    @mock.patch('pulp.server.event.delivery.submit', side_effect=deliver_now)
+    # mock qpid
     @mock.patch('pulp.server.managers.event.remote.TopicPublishManager')
     # don't actually send any email
     @mock.patch('smtplib.SMTP')
     # act as if the config has email enabled
     @mock.patch('ConfigParser.SafeConfigParser.getboolean', return_value=True)
-    # inject fake results from the database query
-    @mock.patch('pulp.server.db.model.event.EventListener.get_collection')
-    def test_fire(self, mock_get_collection, mock_getbool, mock_smtp, mock_publish):
+    # inject fake listeners in place of those loaded from the database
+    @mock.patch('pulp.server.managers.event.listeners.listener_table')
+    def test_fire(self, mock_listener_table, mock_getbool, mock_smtp, mock_publish, mock_submit):
         # verify that the event system will trigger listeners of this type
-        mock_get_collection.return_value.find.return_value = [self.event_doc]
+        mock_listener_table.return_value = listeners.ListenerTable(0, [self.event_doc])
         event = data.Event(data.TYPE_REPO_SYNC_FINISHED, 'stuff')
         factory.initialize()
         factory.event_fire_manager()._do_fire(event)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2014 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import unittest
+
+import mock
+
+from pulp.server.event import delivery
+
+
+def pipeline(workers=0, queue_size=10, retries=2, batch_size=10):
+    return delivery.Pipeline(workers, queue_size, 0, retries, 0, batch_size)
+
+
+class PipelineTests(unittest.TestCase):
+
+    def test_deliver(self):
+        send = mock.Mock()
+        events = [mock.Mock()]
+        p = pipeline()
+
+        p._deliver(delivery.Delivery(send, {'a': 1}, events))
+
+        send.assert_called_once_with({'a': 1}, events)
+        self.assertEqual(p.stats()['delivered'], 1)
+
+    @mock.patch('time.sleep')
+    def test_deliver_retries(self, mock_sleep):
+        send = mock.Mock(side_effect=[Exception('down'), None])
+        p = pipeline()
+
+        p._deliver(delivery.Delivery(send, {}, [mock.Mock()]))
+
+        self.assertEqual(send.call_count, 2)
+        mock_sleep.assert_called_once_with(0)
+        stats = p.stats()
+        self.assertEqual((stats['retried'], stats['delivered'], stats['failed']), (1, 1, 0))
+
+    @mock.patch('time.sleep')
+    def test_deliver_fails(self, mock_sleep):
+        send = mock.Mock(side_effect=Exception('down'))
+        p = pipeline(retries=2)
+
+        p._deliver(delivery.Delivery(send, {}, [mock.Mock()]))
+
+        self.assertEqual(send.call_count, 3)
+        self.assertEqual(p.stats()['failed'], 1)
+
+    def test_submit_full(self):
+        p = pipeline(queue_size=1)
+
+        p.submit(delivery.Delivery(mock.Mock(), {}, [mock.Mock()]))
+        p.submit(delivery.Delivery(mock.Mock(), {}, [mock.Mock()]))
+
+        stats = p.stats()
+        self.assertEqual((stats['queued'], stats['dropped']), (1, 1))
+
+    def test_combine(self):
+        send = mock.Mock()
+        p = pipeline()
+        deliveries = [delivery.Delivery(send, {}, ['e1'], 'a'),
+                      delivery.Delivery(send, {}, ['e2']),
+                      delivery.Delivery(send, {}, ['e3'], 'a'),
+                      delivery.Delivery(send, {}, ['e4'], 'b')]
+
+        combined = p._combine(deliveries)
+
+        self.assertEqual([d.events for d in combined], [['e1', 'e3'], ['e2'], ['e4']])
+        # the queued deliveries are not changed
+        self.assertEqual(deliveries[0].events, ['e1'])
+
+    def test_take_queued(self):
+        p = pipeline(batch_size=3)
+        for i in range(4):
+            p.submit(delivery.Delivery(mock.Mock(), {}, ['e%d' % i], 'a'))
+
+        taken = p._take_queued(1)
+
+        self.assertEqual(len(taken), 2)
+        self.assertEqual(p.stats()['queued'], 2)
+
+    def test_workers(self):
+        send = mock.Mock()
+        p = pipeline(workers=2)
+
+        for i in range(5):
+            p.submit(delivery.Delivery(send, {}, [i], 'a'))
+        p.join()
+
+        delivered = []
+        for args in send.call_args_list:
+            delivered.extend(args[0][1])
+        self.assertEqual(sorted(delivered), range(5))
+        self.assertEqual(p.stats()['delivered'], 5)
+
+
+class ModuleTests(unittest.TestCase):
+
+    def setUp(self):
+        delivery._PIPELINE = None
+
+    def tearDown(self):
+        delivery._PIPELINE = None
+
+    @mock.patch('pulp.server.event.delivery.Pipeline.from_config')
+    def test_submit(self, mock_from_config):
+        mock_from_config.return_value.pid = 0
+        send = mock.Mock()
+
+        with mock.patch('os.getpid', return_value=0):
+            delivery.submit(send, {}, ['e1'])
+            delivery.submit(send, {}, ['e2'])
+
+        self.assertEqual(mock_from_config.call_count, 1)
+        self.assertEqual(mock_from_config.return_value.submit.call_count, 2)
+
+    @mock.patch('pulp.server.event.delivery.Pipeline.from_config')
+    def test_forked(self, mock_from_config):
+        mock_from_config.return_value.pid = 0
+
+        with mock.patch('os.getpid', return_value=0):
+            delivery.pipeline()
+        with mock.patch('os.getpid', return_value=1):
+            delivery.pipeline()
+
+        self.assertEqual(mock_from_config.call_count, 2)
+
+    def test_stats_not_started(self):
+        self.assertEqual(delivery.stats(), None)
@@ -18,6 +18,7 @@ from pulp.server.db.model.event import EventListener
 from pulp.server.event import notifiers
 from pulp.server.event import data as event_data
 from pulp.server.managers import factory as manager_factory
+from pulp.server.managers.event import listeners
 
 
 class EventFireManagerTests(base.PulpServerTests):
@@ -33,6 +34,7 @@ class EventFireManagerTests(base.PulpServerTests):
 
         EventListener.get_collection().remove()
         notifiers.reset()
+        listeners.reset()
 
     # -- plumbing tests -------------------------------------------------------
 
@@ -117,6 +119,66 @@ class EventFireManagerTests(base.PulpServerTests):
         self.assertEqual({'2' : '2'}, notifier_2.fire.call_args[0][0])
         self.assertEqual(event, notifier_2.fire.call_args[0][1])
 
+    def test_do_fire_with_star_and_type(self):
+        # Setup
+        notifiers.NOTIFIER_FUNCTIONS.clear()
+
+        notifier_1 = mock.Mock()
+
+        notifiers.NOTIFIER_FUNCTIONS['notifier_1'] = notifier_1.fire
+
+        self.event_manager.create('notifier_1', {}, [event_data.TYPE_REPO_SYNC_STARTED, '*'])
+
+        # Test
+        event = event_data.Event(event_data.TYPE_REPO_SYNC_STARTED, 'payload')
+        self.manager._do_fire(event)
+
+        # Verify
+        self.assertEqual(1, notifier_1.fire.call_count)
+
+    def test_do_fire_listener_table_cached(self):
+        # Setup
+        notifiers.NOTIFIER_FUNCTIONS.clear()
+
+        notifier_1 = mock.Mock()
+
+        notifiers.NOTIFIER_FUNCTIONS['notifier_1'] = notifier_1.fire
+
+        self.event_manager.create('notifier_1', {}, [event_data.TYPE_REPO_SYNC_STARTED])
+        event = event_data.Event(event_data.TYPE_REPO_SYNC_STARTED, 'payload')
+        self.manager._do_fire(event)
+
+        # Test
+        with mock.patch.object(EventListener, 'get_collection') as mock_get_collection:
+            self.manager._do_fire(event)
+
+        # Verify
+        self.assertEqual(0, mock_get_collection.call_count)
+        self.assertEqual(2, notifier_1.fire.call_count)
+
+    def test_do_fire_listener_changes(self):
+        # Setup
+        notifiers.NOTIFIER_FUNCTIONS.clear()
+
+        notifier_1 = mock.Mock()
+
+        notifiers.NOTIFIER_FUNCTIONS['notifier_1'] = notifier_1.fire
+
+        created = self.event_manager.create('notifier_1', {}, [event_data.TYPE_REPO_SYNC_STARTED])
+        event = event_data.Event(event_data.TYPE_REPO_SYNC_STARTED, 'payload')
+        self.manager._do_fire(event)
+
+        # Test
+        self.event_manager.update(str(created['_id']), event_types=[event_data.TYPE_REPO_SYNC_FINISHED])
+        self.manager._do_fire(event)
+        self.event_manager.update(str(created['_id']), event_types=[event_data.TYPE_REPO_SYNC_STARTED])
+        self.manager._do_fire(event)
+        self.event_manager.delete(str(created['_id']))
+        self.manager._do_fire(event)
+
+        # Verify
+        self.assertEqual(2, notifier_1.fire.call_count)
+
     # -- event format tests ---------------------------------------------------
 
     def test_fire_repo_sync_started(self):
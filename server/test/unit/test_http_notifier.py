@@ -25,6 +25,10 @@ import base
 
 class TestHTTPNotifierTests(base.PulpServerTests):
 
+    def tearDown(self):
+        super(TestHTTPNotifierTests, self).tearDown()
+        http._POOL.clear()
+
     @mock.patch('pulp.server.event.http._create_connection')
     def test_handle_event(self, mock_create):
         # Setup
@@ -106,6 +110,76 @@ class TestHTTPNotifierTests(base.PulpServerTests):
         # Verify
         self.assertEqual(0, mock_create.call_count)
 
+    @mock.patch('pulp.server.event.delivery.submit')
+    def test_handle_event_batch(self, mock_submit):
+        # Setup
+        notifier_config = {'url' : 'https://localhost/api/', 'batch' : True}
+        event = Event('type-1', {'k1' : 'v1'})
+
+        # Test
+        http.handle_event(notifier_config, event)
+        http.handle_event({'url' : 'https://localhost/api/'}, event)
+
+        # Verify
+        batch_key = mock_submit.call_args_list[0][0][3]
+        self.assertNotEqual(batch_key, None)
+        self.assertEqual(mock_submit.call_args_list[1][0][3], None)
+
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_send_post_batch(self, mock_create):
+        # Setup
+        mock_create.return_value.getresponse.return_value.status = httplib.OK
+        events = [Event('type-1', {'k1' : 'v1'}), Event('type-2', {'k2' : 'v2'})]
+
+        # Test
+        http._send_post({'url' : 'http://localhost/api/', 'batch' : True}, events)
+
+        # Verify
+        request_kwargs = mock_create.return_value.request.call_args[1]
+        parsed_body = json.loads(request_kwargs['body'])
+        self.assertEqual([e['event_type'] for e in parsed_body], ['type-1', 'type-2'])
+
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_send_post_keep_alive(self, mock_create):
+        # Setup
+        mock_response = mock_create.return_value.getresponse.return_value
+        mock_response.status = httplib.OK
+        mock_response.will_close = False
+        notifier_config = {'url' : 'http://localhost/api/'}
+        event = Event('type-1', {'k1' : 'v1'})
+
+        # Test
+        http._send_post(notifier_config, [event])
+        http._send_post(notifier_config, [event])
+
+        # Verify
+        self.assertEqual(1, mock_create.call_count)
+        self.assertEqual(2, mock_create.return_value.request.call_count)
+
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_send_post_stale_connection(self, mock_create):
+        # Setup
+        stale = mock.Mock()
+        stale.getresponse.side_effect = httplib.BadStatusLine('')
+        http._POOL.put('http:', 'localhost', stale)
+        mock_create.return_value.getresponse.return_value.status = httplib.OK
+
+        # Test
+        http._send_post({'url' : 'http://localhost/api/'}, [Event('type-1', {})])
+
+        # Verify
+        self.assertEqual(1, stale.close.call_count)
+        self.assertEqual(1, mock_create.return_value.request.call_count)
+
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_send_post_server_error(self, mock_create):
+        # Setup
+        mock_create.return_value.getresponse.return_value.status = httplib.SERVICE_UNAVAILABLE
+
+        # Test
+        self.assertRaises(http.HTTPNotifierError, http._send_post,
+                          {'url' : 'http://localhost/api/'}, [Event('type-1', {})])
+
     def test_create_configuration(self):
         # Test HTTPS
         conn = http._create_connection('https', 'foo')
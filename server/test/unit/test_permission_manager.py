@@ -16,11 +16,14 @@ import base
 import random
 import string
 
+import mock
+
 from pulp.server.auth import authorization
 from pulp.server.managers import factory as manager_factory
 import pulp.server.exceptions as exceptions
 
 from pulp.server.db.model.auth import Role
+from pulp.server.managers.auth.permission import index as permission_index
 
 
 # -- test cases ---------------------------------------------------------------
@@ -164,5 +167,28 @@ class RoleManagerTests(base.PulpServerTests):
         self.permission_manager.grant('/', u['login'], [o])
         self.assertTrue(self.user_query_manager.is_authorized(r, u['login'], o))
 
+    def test_index_reloaded_on_change(self):
+        u = self._create_user()
+        r = self._create_resource()
+        o = authorization.READ
+        self.assertFalse(self.user_query_manager.is_authorized(r, u['login'], o))
+        generation = permission_index.loaded_index().generation
+
+        with mock.patch.object(permission_index.PermissionIndex, 'load',
+                               wraps=permission_index.PermissionIndex.load) as mock_load:
+            # unchanged, so it is not reloaded
+            self.assertFalse(self.user_query_manager.is_authorized(r, u['login'], o))
+            self.assertEqual(mock_load.call_count, 0)
 
+            self.permission_manager.grant(r, u['login'], [o])
+            self.assertTrue(self.user_query_manager.is_authorized(r, u['login'], o))
+            self.assertEqual(mock_load.call_count, 1)
 
+        self.assertTrue(permission_index.loaded_index().generation > generation)
+
+    def test_index_user_deleted(self):
+        u = self._create_user()
+        self.assertFalse(self.user_query_manager.is_superuser(u['login']))
+        self.user_manager.delete_user(u['login'])
+        self.assertRaises(exceptions.MissingResource,
+                          self.user_query_manager.is_superuser, u['login'])
@@ -104,6 +104,134 @@ class RepoSyncConduitTests(base.PulpServerTests):
         db_unit = self.query_manager.get_content_unit_by_id(TYPE_1_DEF.id, unit_1.id)
         self.assertTrue(db_unit is not None)
 
+    def test_save_units(self):
+        """
+        Tests saving a mix of new and existing units in bulk.
+        """
+
+        # Setup
+        existing = self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'unit_0'}, {}, '/foo/bar')
+        self.conduit.save_unit(existing)
+
+        units = [self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'unit_%d' % i},
+                                        {'meta' : i}, '/foo/bar') for i in range(0, 5)]
+        units.append(self.conduit.init_unit(TYPE_2_DEF.id, {'key-2a' : 'a', 'key-2b' : 'b'},
+                                            {}, None))
+
+        # Test
+        saved = self.conduit.save_units(units, batch_size=2)
+
+        # Verify
+        self.assertEqual(units, saved)
+        self.assertEqual(existing.id, saved[0].id)
+        self.assertTrue(all(u.id is not None for u in saved))
+
+        self.assertEqual(self.conduit._added_count, 6)
+        self.assertEqual(self.conduit._updated_count, 1)
+
+        db_unit = self.query_manager.get_content_unit_by_id(TYPE_1_DEF.id, existing.id)
+        self.assertEqual(db_unit['meta'], 0)
+
+        associated_units = list(RepoContentUnit.get_collection().find({'repo_id' : 'repo-1'}))
+        self.assertEqual(6, len(associated_units))
+
+        repo = Repo.get_collection().find_one({'id' : 'repo-1'})
+        self.assertEqual(repo['content_unit_counts'], {TYPE_1_DEF.id : 5, TYPE_2_DEF.id : 1})
+
+    def test_save_units_duplicate_keys(self):
+        """
+        Tests that a unit key repeated within one call is stored once and
+        counted as an update, the same as two save_unit calls.
+        """
+
+        # Setup
+        first = self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'dupe'}, {'meta' : 1}, None)
+        second = self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'dupe'}, {'meta' : 2}, None)
+
+        # Test
+        self.conduit.save_units([first, second])
+
+        # Verify
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(self.conduit._added_count, 1)
+        self.assertEqual(self.conduit._updated_count, 1)
+        db_unit = self.query_manager.get_content_unit_by_id(TYPE_1_DEF.id, first.id)
+        self.assertEqual(db_unit['meta'], 2)
+
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.update_content_unit')
+    def test_save_units_unchanged(self, mock_update):
+        """
+        Tests that existing units are only written back when their values differ
+        from the stored documents.
+        """
+
+        # Setup
+        same = self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'same'}, {'meta' : 1}, None)
+        changed = self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'changed'}, {'meta' : 1}, None)
+        self.conduit.save_units([same, changed])
+
+        same = self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'same'}, {'meta' : 1}, None)
+        changed = self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'changed'}, {'meta' : 2}, None)
+
+        # Test
+        self.conduit.save_units([same, changed])
+
+        # Verify
+        self.assertEqual(1, mock_update.call_count)
+        self.assertEqual(changed.id, mock_update.call_args[0][1])
+        self.assertEqual(self.conduit._added_count, 2)
+        self.assertEqual(self.conduit._updated_count, 2)
+
+    @mock.patch('pulp.server.managers.consumer.applicability.ApplicabilityRegenerationManager.record_updated_units')
+    def test_save_units_records_changed(self, mock_record):
+        """
+        Tests that only the existing units whose values changed are recorded for
+        applicability regeneration, once per type per batch.
+        """
+
+        # Setup
+        units = [self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'unit_%d' % i},
+                                        {'meta' : i}, None) for i in range(0, 3)]
+        self.conduit.save_units(units)
+        mock_record.reset_mock()
+
+        units = [self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'unit_%d' % i},
+                                        {'meta' : i % 2}, None) for i in range(0, 3)]
+
+        # Test
+        self.conduit.save_units(units)
+
+        # Verify
+        mock_record.assert_called_once_with(TYPE_1_DEF.id, [units[2].id])
+
+    @mock.patch('pulp.server.managers.repo.cud.RepoManager.update_unit_count')
+    def test_save_units_count_failure(self, mock_update_count):
+        """
+        Tests that a failure to update the unit counts after a failed save does
+        not replace the error that stopped the save.
+        """
+
+        # Setup
+        def save_batch(units, unique_counts):
+            if unique_counts:
+                raise ValueError('save failed')
+            unique_counts[TYPE_1_DEF.id] = len(units)
+        mock_update_count.side_effect = RuntimeError('count failed')
+        units = [self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'unit_%d' % i}, {}, None)
+                 for i in range(0, 4)]
+
+        # Test
+        with mock.patch.object(self.conduit, '_save_units_batch', side_effect=save_batch):
+            try:
+                self.conduit.save_units(units, batch_size=2)
+                self.fail('Expected exception')
+            except ImporterConduitException, e:
+                error = e.args[0]
+
+        # Verify
+        self.assertTrue(isinstance(error, ValueError))
+        mock_update_count.assert_called_once_with('repo-1', TYPE_1_DEF.id, 2)
+
     def test_build_reports(self):
         """
         Tests that the conduit correctly inserts the count values into the report.
@@ -19,6 +19,7 @@ import mock
 import base
 from pulp.common import dateutils
 from pulp.plugins.types import database, model
+from pulp.server import exceptions
 from pulp.server.db.model.criteria import Criteria, UnitAssociationCriteria
 from pulp.server.db.model.repository import RepoContentUnit
 import pulp.server.managers.repo.unit_association as association_manager
@@ -600,6 +601,88 @@ class UnitAssociationQueryTests(base.PulpServerTests):
         for u in units:
             self.assertTrue(u['metadata']['key_1'] != 'aardvark')
 
+    @mock.patch.object(association_query_manager, 'ASSOCIATION_BATCH_SIZE', 2)
+    def test_get_units_in_batches(self):
+        # Test
+        unit_order = self.manager.get_units_across_types('repo-1')
+        association_order = self.manager.get_units_across_types('repo-1', UnitAssociationCriteria(
+            association_sort=[('created', association_manager.SORT_ASCENDING)]))
+
+        # Verify
+        self.assertEqual(self.repo_1_count, len(unit_order))
+        self.assertEqual(self.repo_1_count, len(association_order))
+        for u in unit_order + association_order:
+            self._assert_unit_integrity(u)
+            self.assertEqual(u['unit_id'], u['metadata']['key_1'])
+
+        for i in range(0, len(association_order) - 1):
+            self.assertTrue(association_order[i]['created'] <= association_order[i+1]['created'])
+
+    def test_get_units_in_unit_id_batches(self):
+        # Setup
+        criteria = UnitAssociationCriteria(skip=2, limit=5)
+        sorted_criteria = UnitAssociationCriteria(
+            unit_fields=['md_1'], unit_sort=[('key_1', association_manager.SORT_DESCENDING)])
+        expected = self.manager.get_units_across_types('repo-1')
+        expected_page = self.manager.get_units_across_types('repo-1', criteria)
+        expected_sorted = self.manager.get_units_across_types('repo-1', sorted_criteria)
+
+        # Test
+        with mock.patch.object(association_query_manager, 'ASSOCIATION_BATCH_SIZE', 2):
+            units = self.manager.get_units_across_types('repo-1')
+            page = self.manager.get_units_across_types('repo-1', criteria)
+            sorted_units = self.manager.get_units_across_types('repo-1', sorted_criteria)
+
+        # Verify
+        self.assertEqual(expected, units)
+        self.assertEqual(expected_page, page)
+        self.assertEqual(expected_sorted, sorted_units)
+        for u in sorted_units:
+            self.assertTrue('key_1' not in u['metadata'])
+
+    def test_get_units_page(self):
+        # Test
+        all_units = self.manager.get_units_across_types('repo-1', UnitAssociationCriteria(
+            association_sort=[('unit_type_id', association_manager.SORT_ASCENDING),
+                              ('created', association_manager.SORT_ASCENDING),
+                              ('_id', association_manager.SORT_ASCENDING)]))
+
+        pages = []
+        continuation = None
+        while True:
+            page = self.manager.get_units_page('repo-1', UnitAssociationCriteria(limit=3),
+                                               continuation)
+            pages.append(list(page))
+            continuation = page.continuation
+            if continuation is None:
+                break
+
+        # Verify
+        self.assertEqual(int(math.ceil(self.repo_1_count / 3.0)), len(pages))
+        self.assertEqual(all_units, reduce(lambda x, y: x + y, pages))
+
+    def test_get_units_page_hides_sort_fields(self):
+        # Test
+        criteria = UnitAssociationCriteria(association_fields=['owner_id'], limit=2)
+        page = self.manager.get_units_page('repo-1', criteria)
+        units = list(page)
+
+        # Verify
+        self.assertEqual(2, len(units))
+        for u in units:
+            self.assertTrue('created' not in u)
+        next_units = list(self.manager.get_units_page('repo-1', criteria, page.continuation))
+        self.assertEqual(2, len(next_units))
+        self.assertTrue(units[-1]['_id'] != next_units[0]['_id'])
+
+    def test_get_units_page_invalid(self):
+        self.assertRaises(exceptions.InvalidValue, self.manager.get_units_page, 'repo-1',
+                          UnitAssociationCriteria(remove_duplicates=True))
+        self.assertRaises(exceptions.InvalidValue, self.manager.get_units_page, 'repo-1',
+                          UnitAssociationCriteria(unit_sort=[('key_1', 1)]))
+        self.assertRaises(exceptions.InvalidValue, self.manager.get_units_page, 'repo-1',
+                          None, 'not-a-token')
+
     def test_criteria_str(self):
         # Setup
         c1 = UnitAssociationCriteria()
@@ -68,3 +68,15 @@ class TestGetQueryResultsFromGet(unittest.TestCase):
         self.controller._get_query_results_from_get()
         self.assertTrue('id' in self.mock_query_method.call_args[0][0].fields)
 
+
+    @mock.patch('web.input', return_value={'field':[]})
+    def test_as_generator(self, mock_input):
+        # the query results must be handed back as is, so they can be streamed
+        results = self.controller._get_query_results_from_get(as_generator=True)
+        self.assertTrue(results is self.mock_query_method.return_value)
+
+    @mock.patch('web.input', return_value={'field':[]})
+    def test_loads_list(self, mock_input):
+        self.mock_query_method.return_value = iter([{'id': 'a'}])
+        results = self.controller._get_query_results_from_get()
+        self.assertEqual(results, [{'id': 'a'}])
@@ -18,7 +18,7 @@ from pulp.plugins.loader import api as plugins
 from pulp.server.db.model.consumer import (Bind, Consumer, RepoProfileApplicability,
                                            UnitProfile)
 from pulp.server.db.model.criteria import Criteria
-from pulp.server.db.model.repository import Repo, RepoDistributor
+from pulp.server.db.model.repository import Repo, RepoContentDelta, RepoDistributor
 from pulp.server.managers import factory as factory
 from pulp.server.managers.consumer.applicability import (
     _add_consumers_to_applicability_map, _add_profiles_to_consumer_map_and_get_hashes,
@@ -53,6 +53,7 @@ class ApplicabilityRegenerationManagerTests(base.PulpServerTests):
         Consumer.get_collection().remove()
         UnitProfile.get_collection().remove()
         RepoProfileApplicability.get_collection().remove()
+        RepoContentDelta.get_collection().remove()
         plugins._create_manager()
         mock_plugins.install()
 
@@ -66,6 +67,8 @@ class ApplicabilityRegenerationManagerTests(base.PulpServerTests):
 
         ApplicabilityRegenerationManager._get_existing_repo_content_types = mock.Mock(
             return_value=['rpm','erratum'])
+        ApplicabilityRegenerationManager._get_existing_repo_content_types_map = mock.Mock(
+            side_effect=lambda repo_ids: dict((r, ['rpm', 'erratum']) for r in repo_ids))
 
     def tearDown(self):
         base.PulpServerTests.tearDown(self)
@@ -75,6 +78,7 @@ class ApplicabilityRegenerationManagerTests(base.PulpServerTests):
         Consumer.get_collection().remove()
         UnitProfile.get_collection().remove()
         RepoProfileApplicability.get_collection().remove()
+        RepoContentDelta.get_collection().remove()
         mock_plugins.reset()
 
     def populate_consumers(self):
@@ -164,6 +168,46 @@ class ApplicabilityRegenerationManagerTests(base.PulpServerTests):
             self.assertEqual(applicability['profile'], self.PROFILE1)
             self.assertEqual(applicability['applicability'], expected_applicability)
 
+    @mock.patch('pulp.server.managers.consumer.applicability.batch_regenerate_applicability')
+    @mock.patch('pulp.server.managers.consumer.applicability.APPLICABILITY_BATCH_SIZE', 1)
+    def test_regenerate_applicability_for_consumers_in_subtasks(self, mock_batch_task):
+        # Setup
+        self.populate_consumers_different_profiles()
+        self.populate_bindings()
+        run_batch = lambda resource_type, resource_id, args: \
+            ApplicabilityRegenerationManager.batch_regenerate_applicability(*args)
+        mock_batch_task.apply_async_with_reservation.side_effect = run_batch
+        # Test
+        manager = factory.applicability_regeneration_manager()
+        result = manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        # Verify
+        self.assertEqual(len(result.spawned_tasks), 4)
+        calls = mock_batch_task.apply_async_with_reservation.call_args_list
+        self.assertEqual(len(calls), 4)
+        for call in calls:
+            self.assertEqual(call[0][0], 'repository_profile_applicability')
+        # Each batch reserves its own resource so the batches can run on different workers
+        self.assertEqual(len(set(call[0][1] for call in calls)), 4)
+        applicability_list = list(RepoProfileApplicability.get_collection().find())
+        self.assertEqual(len(applicability_list), 4)
+        for applicability in applicability_list:
+            self.assertTrue(applicability['profile'] in [self.PROFILE1, self.PROFILE2])
+
+    def test_regenerate_applicability_for_consumers_skips_existing(self):
+        # Setup
+        self.populate_consumers()
+        self.populate_bindings()
+        manager = factory.applicability_regeneration_manager()
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        profiler, cfg = plugins.get_profiler_by_type('rpm')
+        profiler.calculate_applicable_units.reset_mock()
+        # Test
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        # Verify
+        self.assertEqual(profiler.calculate_applicable_units.call_count, 0)
+        applicability_list = list(RepoProfileApplicability.get_collection().find())
+        self.assertEqual(len(applicability_list), 2)
+
     def test_regenerate_applicability_for_empty_consumer_criteria(self):
         # Setup
         self.populate_consumers()
@@ -275,6 +319,94 @@ class ApplicabilityRegenerationManagerTests(base.PulpServerTests):
         applicability_list = list(RepoProfileApplicability.get_collection().find())
         self.assertEqual(len(applicability_list), 0)
 
+    def test_regenerate_applicability_for_repos_incremental(self):
+        # Setup
+        self.populate_consumers()
+        self.populate_bindings()
+        manager = factory.applicability_regeneration_manager()
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        manager.record_repo_content_delta('repo-1', added_unit_ids={'rpm': ['rpm-3']})
+        manager.record_repo_content_delta('repo-1', removed_unit_ids={'erratum': ['errata-2']})
+        profiler, cfg = plugins.get_profiler_by_type('rpm')
+        profiler.calculate_applicable_units.reset_mock()
+        profiler.update_applicable_units = mock.Mock(
+            side_effect=lambda p, r, a, added, removed, c, x:
+            {'rpm': a['rpm'] + added['rpm'],
+             'erratum': [u for u in a['erratum'] if u not in removed['erratum']]})
+        # Test
+        manager.regenerate_applicability_for_repos(self.REPO_CRITERIA)
+        # Verify
+        self.assertEqual(profiler.update_applicable_units.call_count, 1)
+        args = profiler.update_applicable_units.call_args[0]
+        self.assertEqual(args[1], 'repo-1')
+        self.assertEqual(args[3], {'rpm': ['rpm-3']})
+        self.assertEqual(args[4], {'erratum': ['errata-2']})
+        # repo-2 had no recorded delta, so it was recalculated in full
+        self.assertEqual(profiler.calculate_applicable_units.call_count, 1)
+        applicability = RepoProfileApplicability.get_collection().find_one({'repo_id': 'repo-1'})
+        self.assertEqual(applicability['applicability'],
+                         {'rpm': ['rpm-1', 'rpm-2', 'rpm-3'], 'erratum': ['errata-1']})
+        self.assertEqual(RepoContentDelta.get_collection().find().count(), 0)
+
+    def test_regenerate_applicability_for_repos_delta_too_large(self):
+        # Setup
+        self.populate_consumers()
+        self.populate_bindings()
+        manager = factory.applicability_regeneration_manager()
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        with mock.patch('pulp.server.managers.consumer.applicability.'
+                        'REPO_CONTENT_DELTA_MAX_UNITS', 1):
+            manager.record_repo_content_delta('repo-1', added_unit_ids={'rpm': ['rpm-3', 'rpm-4']})
+        delta = RepoContentDelta.get_collection().find_one({'repo_id': 'repo-1'})
+        self.assertTrue(delta['full'])
+        self.assertTrue('added' not in delta)
+        profiler, cfg = plugins.get_profiler_by_type('rpm')
+        profiler.calculate_applicable_units.reset_mock()
+        profiler.update_applicable_units = mock.Mock()
+        # Test
+        manager.regenerate_applicability_for_repos(self.REPO_CRITERIA)
+        # Verify
+        self.assertFalse(profiler.update_applicable_units.called)
+        self.assertEqual(profiler.calculate_applicable_units.call_count, 2)
+
+    def test_record_repo_content_delta(self):
+        # Setup
+        self.populate_consumers()
+        self.populate_bindings()
+        manager = factory.applicability_regeneration_manager()
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        # Test
+        manager.record_repo_content_delta('repo-1', added_unit_ids={'rpm': ['rpm-3', 'rpm-4']})
+        manager.record_repo_content_delta('repo-1', removed_unit_ids={'rpm': ['rpm-4', 'rpm-5']})
+        # Verify
+        delta = RepoContentDelta.get_collection().find_one({'repo_id': 'repo-1'})
+        self.assertEqual(delta['added'], {'rpm': ['rpm-3']})
+        self.assertEqual(delta['removed'], {'rpm': ['rpm-4', 'rpm-5']})
+        self.assertEqual(delta['unit_count'], 4)
+
+    def test_record_repo_content_delta_several_types(self):
+        # Setup
+        self.populate_consumers()
+        self.populate_bindings()
+        manager = factory.applicability_regeneration_manager()
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        # Test
+        manager.record_repo_content_delta(
+            'repo-1', added_unit_ids={'rpm': ['rpm-3'], 'erratum': ['errata-3'], 'srpm': []})
+        # Verify
+        delta = RepoContentDelta.get_collection().find_one({'repo_id': 'repo-1'})
+        self.assertEqual(delta['added'], {'rpm': ['rpm-3'], 'erratum': ['errata-3']})
+        self.assertEqual(delta['unit_count'], 2)
+
+    def test_record_repo_content_delta_without_applicability(self):
+        # Setup
+        self.populate_repos()
+        manager = factory.applicability_regeneration_manager()
+        # Test
+        manager.record_repo_content_delta('repo-1', added_unit_ids={'rpm': ['rpm-3']})
+        # Verify
+        self.assertEqual(RepoContentDelta.get_collection().find().count(), 0)
+
 
 class TestRepoProfileApplicabilityManager(base.PulpServerTests):
     """
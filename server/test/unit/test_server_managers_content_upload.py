@@ -9,10 +9,14 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import errno
+import hashlib
 import os
 import shutil
+from StringIO import StringIO
 
 import base
+import mock
 
 from pulp.devel import mock_plugins
 from pulp.plugins.conduits.upload import UploadConduit
@@ -21,6 +25,7 @@ from pulp.server.db.model.auth import User
 from pulp.server.db.model.repository import Repo, RepoImporter
 from pulp.server.exceptions import (MissingResource, PulpDataException, PulpExecutionException,
                                     InvalidValue)
+from pulp.server.managers.content import upload
 from pulp.server.managers.repo.unit_association import OWNER_TYPE_USER
 import pulp.server.managers.factory as manager_factory
 
@@ -41,6 +46,8 @@ class ContentUploadManagerTests(base.PulpServerTests):
 
         upload_storage_dir = self.upload_manager._upload_storage_dir()
         shutil.rmtree(upload_storage_dir)
+        digest_dir = os.path.dirname(self.upload_manager._digest_file_path('upload'))
+        shutil.rmtree(digest_dir)
 
     def clean(self):
         base.PulpServerTests.clean(self)
@@ -98,6 +105,95 @@ class ContentUploadManagerTests(base.PulpServerTests):
 
         self.assertEqual(expected_size, found_size)
 
+    @mock.patch('pulp.server.managers.content.upload.STREAM_BUFFER_SIZE', 3)
+    def test_save_stream(self):
+        upload_id = self.upload_manager.initialize_upload()
+
+        self.upload_manager.save_stream(upload_id, 0, StringIO('abcdefgh'), 8)
+        # reading stops at the length given
+        self.upload_manager.save_stream(upload_id, 8, StringIO('ijklmnop'), 4)
+
+        self.assertEqual(self.upload_manager.read_upload(upload_id), 'abcdefghijkl')
+
+    def test_upload_checksum(self):
+        upload_id = self.upload_manager.initialize_upload()
+        self.assertEqual(self.upload_manager.upload_checksum(upload_id),
+                         hashlib.sha256('').hexdigest())
+
+        self.upload_manager.save_data(upload_id, 0, 'abc')
+        self.upload_manager.save_stream(upload_id, 3, StringIO('def'), 3)
+
+        self.assertEqual(self.upload_manager.upload_checksum(upload_id),
+                         hashlib.sha256('abcdef').hexdigest())
+
+    def test_upload_checksum_out_of_order(self):
+        upload_id = self.upload_manager.initialize_upload()
+
+        self.upload_manager.save_data(upload_id, 3, 'def')
+        self.upload_manager.save_data(upload_id, 0, 'abc')
+
+        self.assertEqual(self.upload_manager.upload_checksum(upload_id), None)
+        self.assertTrue(upload_id not in upload._DIGESTS)
+        # the file is read instead
+        self.upload_manager.verify_checksum(upload_id, hashlib.sha256('abcdef').hexdigest())
+
+    def test_upload_checksum_other_process(self):
+        upload_id = self.upload_manager.initialize_upload()
+        # another process initialized the upload
+        upload._DIGESTS.clear()
+
+        self.upload_manager.save_data(upload_id, 0, 'abc')
+        upload._DIGESTS.clear()
+        # the process that saved the first segment has the digest
+        self.upload_manager.save_data(upload_id, 3, 'def')
+
+        self.assertEqual(self.upload_manager.upload_checksum(upload_id), None)
+
+    def test_upload_checksum_write_failure(self):
+        upload_id = self.upload_manager.initialize_upload()
+        stream = mock.Mock()
+        stream.read.side_effect = IOError()
+
+        self.assertRaises(IOError, self.upload_manager.save_stream, upload_id, 0, stream, 10)
+
+        self.assertEqual(self.upload_manager.upload_checksum(upload_id), None)
+        self.assertTrue(upload_id not in upload._DIGESTS)
+
+    def test_stale_digests_evicted(self):
+        deleted_id = self.upload_manager.initialize_upload()
+        kept_id = self.upload_manager.initialize_upload()
+        # another process deleted the upload
+        os.remove(self.upload_manager._upload_file_path(deleted_id))
+        os.remove(self.upload_manager._digest_file_path(deleted_id))
+
+        self.upload_manager.initialize_upload()
+
+        self.assertTrue(deleted_id not in upload._DIGESTS)
+        self.assertTrue(kept_id in upload._DIGESTS)
+
+    def test_store_upload(self):
+        upload_id = self.upload_manager.initialize_upload()
+        self.upload_manager.save_data(upload_id, 0, 'abc')
+        storage_path = os.path.join(self.upload_manager._upload_storage_dir(), 'unit', 'abc')
+
+        renamed = self.upload_manager.store_upload(upload_id, storage_path)
+
+        self.assertTrue(renamed)
+        self.assertEqual(open(storage_path).read(), 'abc')
+        self.assertTrue(upload_id not in self.upload_manager.list_upload_ids())
+
+    def test_store_upload_other_filesystem(self):
+        upload_id = self.upload_manager.initialize_upload()
+        self.upload_manager.save_data(upload_id, 0, 'abc')
+        storage_path = os.path.join(self.upload_manager._upload_storage_dir(), 'unit', 'abc')
+
+        with mock.patch('os.rename') as mock_rename:
+            mock_rename.side_effect = OSError(errno.EXDEV, 'Invalid cross-device link')
+            renamed = self.upload_manager.store_upload(upload_id, storage_path)
+
+        self.assertFalse(renamed)
+        self.assertEqual(open(storage_path).read(), 'abc')
+
     def test_save_no_init(self):
 
         # Test
@@ -121,6 +217,7 @@ class ContentUploadManagerTests(base.PulpServerTests):
 
         # Verify
         self.assertTrue(not os.path.exists(uploaded_filename))
+        self.assertTrue(upload_id not in upload._DIGESTS)
 
     def test_list_upload_ids(self):
 
@@ -205,6 +302,32 @@ class ContentUploadManagerTests(base.PulpServerTests):
         mock_plugins.MOCK_IMPORTER.upload_unit.return_value = None
         manager_factory.principal_manager().set_principal(principal=None)
 
+    def test_import_uploaded_unit_checksum(self):
+        self.repo_manager.create_repo('repo-u')
+        self.importer_manager.set_importer('repo-u', 'mock-importer', {})
+        mock_plugins.MOCK_IMPORTER.upload_unit.return_value = None
+
+        upload_id = self.upload_manager.initialize_upload()
+        self.upload_manager.save_data(upload_id, 0, 'string data')
+        checksum = hashlib.sha256('string data').hexdigest()
+
+        self.upload_manager.import_uploaded_unit('repo-u', 'mock-type', {}, {}, upload_id,
+                                                 checksum=checksum.upper())
+
+        self.assertEqual(1, mock_plugins.MOCK_IMPORTER.upload_unit.call_count)
+
+    def test_import_uploaded_unit_checksum_mismatch(self):
+        self.repo_manager.create_repo('repo-u')
+        self.importer_manager.set_importer('repo-u', 'mock-importer', {})
+
+        upload_id = self.upload_manager.initialize_upload()
+        self.upload_manager.save_data(upload_id, 0, 'string data')
+        checksum = hashlib.sha256('other data').hexdigest()
+
+        self.assertRaises(PulpDataException, self.upload_manager.import_uploaded_unit, 'repo-u',
+                          'mock-type', {}, {}, upload_id, checksum=checksum)
+        self.assertEqual(0, mock_plugins.MOCK_IMPORTER.upload_unit.call_count)
+
     def test_import_uploaded_unit_missing_repo(self):
         # Test
         self.assertRaises(MissingResource, self.upload_manager.import_uploaded_unit, 'fake', 'mock-type', {}, {}, 'irrelevant')
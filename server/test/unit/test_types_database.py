@@ -12,11 +12,15 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import copy
+
+import mock
+
 import base
 
 import pulp.plugins.types.database as types_db
 from pulp.plugins.types.model import TypeDefinition
-from pulp.server.db.model.content import ContentType
+from pulp.server.db.model.content import ContentType, ContentTypeGeneration
 import pulp.server.db.connection as pulp_db
 
 # -- constants -----------------------------------------------------------------
@@ -450,3 +454,122 @@ class TypesDatabaseTests(base.PulpServerTests):
         index_dict = collection.index_information()
 
         self.assertEqual(2, len(index_dict)) # default (_id) + new one
+
+    # -- registry tests --------------------------------------------------------
+
+    def test_definitions_cached(self):
+        """
+        Tests the definitions are loaded once rather than on each call.
+        """
+
+        # Setup
+        types_db.update_database([DEF_1, DEF_2])
+        types_db.load_type_definitions()
+
+        # Test
+        with mock.patch.object(ContentType, 'get_collection') as mock_get_collection:
+            type_def = types_db.type_definition('def_2')
+            unit_key = types_db.type_units_unit_key('def_2')
+            type_ids = types_db.all_type_ids()
+            all_defs = types_db.all_type_definitions()
+
+        # Verify
+        self.assertEqual(0, mock_get_collection.call_count)
+        self.assertEqual('def_2', type_def['id'])
+        self.assertEqual(['single_1'], unit_key)
+        self.assertEqual(['def_1', 'def_2'], type_ids)
+        self.assertEqual(2, len(all_defs))
+
+    def test_definitions_immutable(self):
+        """
+        Tests the shared definitions cannot be modified, but copies of them can.
+        """
+
+        # Setup
+        types_db.update_database([DEF_2])
+        type_def = types_db.type_definition('def_2')
+
+        # Test
+        self.assertRaises(TypeError, type_def.__setitem__, 'id', 'foo')
+        self.assertRaises(TypeError, type_def.update, {'id': 'foo'})
+        self.assertRaises(TypeError, type_def['unit_key'].append, 'foo')
+
+        copied = copy.deepcopy(type_def)
+        copied['unit_key'].append('foo')
+        copied['id'] = 'foo'
+
+        # Verify
+        self.assertEqual('def_2', types_db.type_definition('def_2')['id'])
+        self.assertEqual(['single_1'], types_db.type_units_unit_key('def_2'))
+        self.assertEqual(['single_1', 'foo'], type_def['unit_key'] + ['foo'])
+
+    def test_update_reloads_definitions(self):
+        """
+        Tests changes made through update_database are seen immediately.
+        """
+
+        # Setup
+        types_db.update_database([DEF_1])
+        self.assertEqual(['def_1'], types_db.all_type_ids())
+
+        # Test
+        types_db.update_database([DEF_1, DEF_2])
+
+        # Verify
+        self.assertEqual(['def_1', 'def_2'], types_db.all_type_ids())
+
+    def test_generation_changed_elsewhere(self):
+        """
+        Tests a change by another process is seen once the generation is checked.
+        """
+
+        # Setup
+        types_db.update_database([DEF_1])
+        types_db.load_type_definitions()
+        ContentType.get_collection().update({'id': 'def_1'},
+                                            {'$set': {'display_name': 'changed'}})
+
+        # Test
+        ContentTypeGeneration.get_collection().update(
+            {'_id': types_db.GENERATION_ID}, {'$inc': {'generation': 1}})
+        before_check = types_db.type_definition('def_1')['display_name']
+        types_db._REGISTRY.checked -= types_db.GENERATION_CHECK_INTERVAL
+        after_check = types_db.type_definition('def_1')['display_name']
+
+        # Verify
+        self.assertEqual('Definition 1', before_check)
+        self.assertEqual('changed', after_check)
+
+    def test_type_added_elsewhere(self):
+        """
+        Tests a type added by another process is found without waiting for the
+        generation to be checked.
+        """
+
+        # Setup
+        types_db.update_database([DEF_1])
+        types_db.load_type_definitions()
+        ContentType.get_collection().save(dict(id='added', unit_key=['name']), safe=True)
+
+        # Test
+        type_def = types_db.type_definition('added')
+
+        # Verify
+        self.assertEqual(['name'], type_def['unit_key'])
+        self.assertTrue('added' in types_db.all_type_ids())
+        self.assertEqual(None, types_db.type_definition('missing'))
+
+    def test_type_units_collection_cached(self):
+        """
+        Tests the collection of a type is created once.
+        """
+
+        # Setup
+        types_db.update_database([DEF_1])
+
+        # Test
+        collection = types_db.type_units_collection('def_1')
+
+        # Verify
+        self.assertTrue(collection is types_db.type_units_collection('def_1'))
+        self.assertEqual(types_db.unit_collection_name('def_1'), collection.name)
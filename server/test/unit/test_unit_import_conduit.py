@@ -15,6 +15,7 @@ import mock
 import base
 from pulp.plugins.conduits import mixins, unit_import
 from pulp.plugins.conduits.mixins import ImporterConduitException
+from pulp.plugins.model import Unit
 from pulp.server.db.model.criteria import UnitAssociationCriteria
 
 
@@ -60,3 +61,33 @@ class ImportUnitConduitTests(base.PulpServerTests):
 
         # Verify the correct propagation to the mixin method
         mock_get.assert_called_once_with(self.dest_repo_id, criteria, ImporterConduitException)
+
+    @mock.patch('pulp.server.managers.repo.unit_association.RepoUnitAssociationManager.associate_all_by_ids')
+    def test_associate_units(self, mock_associate):
+        # Setup
+        units = [Unit('t1', {'k' : 'a'}, {}, None), Unit('t1', {'k' : 'b'}, {}, None),
+                 Unit('t2', {'k' : 'c'}, {}, None)]
+        for i, u in enumerate(units):
+            u.id = 'unit-%d' % i
+
+        # Test
+        associated = self.conduit.associate_units(units)
+
+        # Verify
+        self.assertEqual(units, associated)
+        self.assertEqual(2, mock_associate.call_count)
+        calls = sorted(c[0] for c in mock_associate.call_args_list)
+        self.assertEqual(calls[0], (self.dest_repo_id, 't1', ['unit-0', 'unit-1'],
+                                    self.association_owner_type, self.association_owner_id))
+        self.assertEqual(calls[1], (self.dest_repo_id, 't2', ['unit-2'],
+                                    self.association_owner_type, self.association_owner_id))
+
+    @mock.patch('pulp.server.managers.repo.unit_association.RepoUnitAssociationManager.associate_all_by_ids')
+    def test_associate_units_with_error(self, mock_associate):
+        # Setup
+        mock_associate.side_effect = Exception()
+        unit = Unit('t1', {'k' : 'a'}, {}, None)
+        unit.id = 'unit-1'
+
+        # Test
+        self.assertRaises(ImporterConduitException, self.conduit.associate_units, [unit])
@@ -35,3 +35,21 @@ class UserSearchTests(base.PulpWebserviceTests):
         """
         call_status, call_body = self.post('/v2/users/search/')
         self.assertEqual(401, call_status)
+
+
+class UserResourceTests(base.PulpWebserviceTests):
+    @mock.patch('pulp.server.managers.auth.permission.cud.PermissionManager.delete_permission')
+    @mock.patch('pulp.server.managers.auth.user.cud.UserManager.delete_user')
+    def test_delete(self, mock_delete_user, mock_delete_permission):
+        """
+        Test that deleting a user removes the permissions on the user through the permission
+        manager, so that cached permissions are invalidated.
+        """
+        mock_delete_user.return_value = None
+
+        call_status, call_body = self.delete('/v2/users/fred/')
+
+        self.assertEqual(200, call_status)
+        mock_delete_user.assert_called_once_with('fred')
+        self.assertEqual(1, mock_delete_permission.call_count)
+        self.assertTrue(mock_delete_permission.call_args[0][0].endswith('/v2/users/fred/'))